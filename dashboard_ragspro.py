@@ -4,7 +4,7 @@ RAGSPRO DASHBOARD - Complete Dark Theme Dashboard with All Features
 Port: 5002
 """
 
-from flask import Flask, render_template, jsonify, request, send_file
+from flask import Flask, render_template, jsonify, request, send_file, g
 import sys
 import os
 import json
@@ -36,22 +36,238 @@ limiter = Limiter(
     storage_uri="memory://"
 )
 
-# Global state with thread safety
-generation_status = {
-    'running': False,
-    'progress': 0,
-    'current_query': '',
-    'leads_found': 0,
-    'message': 'Ready to generate premium leads',
-    'last_run': None,
-    'stop_signal': False,
-    'latest_leads': []
-}
+# When the last generation run completed (guarded by status_lock)
+last_run_at = None
 
 # Thread locks for safety
 status_lock = threading.Lock()
 file_lock = threading.Lock()
-generation_lock = threading.Lock()
+
+# Searches per generation run (the old 20 cities × 20 categories cap)
+MAX_QUERIES_PER_RUN = 400
+
+# Generation runs execute concurrently, each with its own status channel
+# (src/run_scheduler.py); searches share one SerpAPI budget, fair-share across users
+MAX_ACTIVE_RUNS = int(os.getenv('MAX_ACTIVE_RUNS', 4))
+MAX_RUNS_PER_USER = 3  # Queued + running runs one user may have
+SERPAPI_SEARCHES_PER_MINUTE = int(os.getenv('SERPAPI_SEARCHES_PER_MINUTE', 60))
+
+# Warm the Gemini client (SDK import, connection, model health probe) in the
+# background on the first request; AI_WARMUP=0 disables it
+AI_WARMUP = os.getenv('AI_WARMUP', '1') != '0'
+ai_warmup_started = False
+
+# Requests without a Bearer token run as the anonymous local user, who has no
+# plan limits. That only suits a single-user local install: set
+# ALLOW_ANONYMOUS=0 when the dashboard is shared so every API call needs a token
+ALLOW_ANONYMOUS = os.getenv('ALLOW_ANONYMOUS', '1') != '0'
+
+run_store = None
+run_store_lock = threading.Lock()
+run_recovery_at = None
+
+# Seconds between checks for runs whose worker died (gunicorn restarts, recycles)
+RUN_RECOVERY_INTERVAL = 60
+# Seconds between lease renewals of a running run (well inside RUN_LEASE_SECONDS)
+RUN_HEARTBEAT_SECONDS = 60
+scheduler = None
+scheduler_lock = threading.Lock()
+website_scanner = None
+website_scanner_lock = threading.Lock()
+website_scan_pool = None
+website_scans_pending = set()  # Websites queued for a background scan (guarded by website_scanner_lock)
+
+# Lead analysis never waits for a website: it uses a cached scan, or queues one
+# in the background for next time, which may take up to WEBSITE_SCAN_TIMEOUT seconds
+WEBSITE_SCAN_TIMEOUT = 5
+WEBSITE_SCAN_WORKERS = 2
+
+# Bulk analysis never waits for the Gemini rate limiter: leads past the free
+# budget get their keyword/feature analysis without AI insights
+BULK_ANALYZE_AI_WAIT = 0
+
+
+def get_run_store():
+    """Generation run store; at most once per RUN_RECOVERY_INTERVAL, runs whose worker died are flagged resumable."""
+    global run_store, run_recovery_at
+    with run_store_lock:
+        if run_store is None:
+            from src.generation_runs import GenerationRunStore
+            run_store = GenerationRunStore()
+        if run_recovery_at is None or time.monotonic() - run_recovery_at >= RUN_RECOVERY_INTERVAL:
+            run_recovery_at = time.monotonic()
+            try:
+                run_store.recover_orphaned()
+            except Exception as e:
+                logger.error(f"Could not check for orphaned runs: {e}")
+        return run_store
+
+
+def get_scheduler():
+    """Generation run scheduler drawing on the shared 'serpapi' rate limiter budget."""
+    global scheduler
+    with scheduler_lock:
+        if scheduler is None:
+            from src.run_scheduler import RunScheduler
+            from src.rate_limiter import get_rate_limiter
+            limiter = get_rate_limiter()
+            limiter.set_limit('serpapi', SERPAPI_SEARCHES_PER_MINUTE)
+            scheduler = RunScheduler(max_active_runs=MAX_ACTIVE_RUNS, service='serpapi', rate_limiter=limiter)
+        return scheduler
+
+
+def get_website_scanner():
+    """Website scanner shared by lead analysis (pooled HTTP session, cached scans, public addresses only)."""
+    global website_scanner, website_scan_pool
+    with website_scanner_lock:
+        if website_scanner is None:
+            from concurrent.futures import ThreadPoolExecutor
+            from src.advanced_features import create_website_scanner
+            website_scanner = create_website_scanner(timeout=WEBSITE_SCAN_TIMEOUT)
+            website_scan_pool = ThreadPoolExecutor(max_workers=WEBSITE_SCAN_WORKERS,
+                                                   thread_name_prefix='website-scan')
+        return website_scanner
+
+
+def stored_lead(lead):
+    """The lead saved in premium_leads.json with the same (title, address) id as lead, or None."""
+    from src.history_store import lead_id
+    key = lead_id(lead)
+    return next((saved for saved in load_premium_leads() if lead_id(saved) == key), None)
+
+
+def run_website_scan(website):
+    """Background job: scan a website into the scanner's cache."""
+    try:
+        get_website_scanner().scan_website(website)
+    except Exception as e:
+        logger.warning(f"Website scan error for {website}: {e}")
+    finally:
+        with website_scanner_lock:
+            website_scans_pending.discard(website)
+
+
+def scan_lead_website(lead):
+    """
+    Cached scan findings for the website of a saved lead, or None.
+    
+    The website comes from the lead as saved in premium_leads.json, never from
+    the request. Without a cached scan one is queued in the background (used
+    by the next analysis), so the request never waits on the site.
+    """
+    saved = stored_lead(lead)
+    website = saved.get('website') if saved else None
+    if not website:
+        return None
+    
+    scanner = get_website_scanner()
+    result = scanner.cached_scan(website)
+    if result:
+        return result['analysis'] if result.get('success') else None
+    
+    with website_scanner_lock:
+        if website not in website_scans_pending:
+            website_scans_pending.add(website)
+            website_scan_pool.submit(run_website_scan, website)
+    return None
+
+
+def run_owner(user_id):
+    """Scheduler owner key: the authenticated user, or 'local' for the anonymous dashboard."""
+    return user_id if user_id is not None else 'local'
+
+
+def check_run_limit(user_id):
+    """Error response if the user already has MAX_RUNS_PER_USER runs queued or running."""
+    active = get_scheduler().list_runs(run_owner(user_id), active_only=True)
+    if len(active) >= MAX_RUNS_PER_USER:
+        return jsonify({'success': False, 'message': f'You already have {len(active)} runs in progress'})
+    return None
+
+
+def run_started_response(channel, message):
+    """Response for a queued run: its job id (for /api/status?job=) and queue position."""
+    status = channel.snapshot()
+    position = get_scheduler().queue_position(channel.job_id)
+    if position:
+        message = f'{message} (queued at position {position})'
+    return {'success': True, 'message': message, 'job_id': channel.job_id,
+            'state': status['state'], 'queue_position': position}
+
+
+@app.before_request
+def warm_ai_clients():
+    """On the first request, warm the shared Gemini client in the background so no AI call pays setup cost."""
+    global ai_warmup_started
+    if ai_warmup_started or not AI_WARMUP:
+        return
+    ai_warmup_started = True
+    try:
+        from src.config import get_settings
+        api_key = get_settings().get('GEMINI_API_KEY')
+        if api_key:
+            from src.ai_gemini import get_client_registry
+            get_client_registry().warm_up(api_key)
+    except Exception as e:
+        logger.warning(f"AI warm-up not started: {e}")
+
+
+@app.before_request
+def authenticate():
+    """Resolve the Bearer token once per request; a missing, expired or forged token is a 401, never anonymous."""
+    g.user_id = None
+    header = request.headers.get('Authorization')
+    if header is None:
+        if ALLOW_ANONYMOUS or not request.path.startswith('/api/'):
+            return None
+        return jsonify({'success': False, 'error': 'Authentication required'}), 401
+    
+    token = header[7:] if header.startswith('Bearer ') else header
+    result = {'error': 'Missing token'}
+    if token.strip():
+        from src.auth import AuthManager
+        result = AuthManager().verify_token(token.strip())
+    user_id = result['payload'].get('user_id') if 'success' in result else None
+    if user_id is None:
+        return jsonify({'success': False, 'error': result.get('error', 'Invalid token')}), 401
+    g.user_id = user_id
+    return None
+
+
+def metered_user_id():
+    """User authenticated for this request; None for the anonymous local user (only with ALLOW_ANONYMOUS), who is not metered."""
+    return g.get('user_id')
+
+
+def reserve_usage(user_id, metric, amount):
+    """
+    Reserve quota for a whole request up front.
+    
+    Returns (error response if it exceeds the plan, billing period the quota
+    was taken from); pass the period to release_usage.
+    """
+    if user_id is None or amount <= 0:
+        return None, None
+    
+    from src.usage_meter import get_usage_meter
+    result = get_usage_meter().reserve(user_id, metric, amount)
+    if 'error' in result:
+        return (jsonify({'success': False, **result}), 429), None
+    return None, result['period']
+
+
+def record_usage(user_id, metric, amount=1):
+    """Count unlimited usage (AI requests) for a metered user."""
+    if user_id is not None and amount > 0:
+        from src.usage_meter import get_usage_meter
+        get_usage_meter().increment(user_id, metric, amount)
+
+
+def release_usage(user_id, metric, amount, period=None):
+    """Give back the unused part of a reservation, to the billing period it was reserved in."""
+    if user_id is not None and amount > 0:
+        from src.usage_meter import get_usage_meter
+        get_usage_meter().release(user_id, metric, amount, period=period)
 
 
 def load_premium_leads():
@@ -114,17 +330,9 @@ def save_premium_leads(leads, append=False):
             # Atomic rename (prevents corruption)
             os.replace(temp_path, json_path)
             
-            # Save to history
-            today = datetime.now().strftime('%Y-%m-%d')
-            history_path = f"data/history/leads_{today}.json"
-            history_data = {
-                'date': today,
-                'timestamp': datetime.now().isoformat(),
-                'total_leads': len(leads),
-                'leads': leads
-            }
-            with open(history_path, 'w', encoding='utf-8') as f:
-                json.dump(history_data, f, indent=2, ensure_ascii=False)
+            # Save to history (only leads added or changed since the last save)
+            from src.history_store import get_history_store
+            get_history_store().record(leads)
             
             logger.info(f"Saved {len(leads)} leads")
             return True
@@ -142,14 +350,14 @@ def save_premium_leads(leads, append=False):
 def generate_ai_content(lead):
     """Generate AI content for a lead."""
     try:
-        from src.ai_gemini import create_ai_assistant
-        from src.config import load_config
+        from src.ai_gemini import get_ai_assistant
+        from src.config import get_settings
         
-        config = load_config()
+        config = get_settings()
         if not config.get('GEMINI_API_KEY'):
             return generate_fallback_content(lead)
         
-        ai = create_ai_assistant(config['GEMINI_API_KEY'])
+        ai = get_ai_assistant(config['GEMINI_API_KEY'])
         
         email = ai.generate_cold_email(
             lead['title'],
@@ -170,6 +378,72 @@ def generate_ai_content(lead):
         return generate_fallback_content(lead)
 
 
+def wants_stream():
+    """Whether the client asked for Server-Sent Events (?stream=1 or Accept: text/event-stream)."""
+    return request.args.get('stream') == '1' or 'text/event-stream' in request.headers.get('Accept', '')
+
+
+def sse_response(events):
+    """Stream (event, data) pairs as Server-Sent Events; an exception ends the stream with an 'error' event."""
+    from flask import Response, stream_with_context
+    
+    def generate():
+        try:
+            for event, data in events:
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+        except Exception as e:
+            logger.error(f"AI stream error: {e}")
+            yield f"event: error\ndata: {json.dumps({'success': False, 'error': str(e)})}\n\n"
+    
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+def stream_drafts(ai, business_name, business_type, address, rating, reviews):
+    """Email then WhatsApp draft as ('email' | 'whatsapp', text chunk) pairs, as Gemini generates them."""
+    for chunk in ai.stream_cold_email(business_name, business_type, address, rating, reviews):
+        yield 'email', chunk
+    for chunk in ai.stream_whatsapp_message(business_name, business_type):
+        yield 'whatsapp', chunk
+
+
+def stream_ai_content(lead_id, lead):
+    """get_lead_ai_content as events: draft chunks, then 'done' with the content cached on the lead."""
+    from src.ai_gemini import get_ai_assistant
+    from src.config import get_settings
+    
+    config = get_settings()
+    if config.get('GEMINI_API_KEY'):
+        ai = get_ai_assistant(config['GEMINI_API_KEY'])
+        chunks = stream_drafts(ai, lead['title'], lead.get('type', 'business'), lead.get('address', ''),
+                               lead.get('rating', 0), lead.get('reviews', 0))
+    else:
+        chunks = generate_fallback_content(lead).items()
+    
+    drafts = {'email': '', 'whatsapp': ''}
+    for field, chunk in chunks:
+        drafts[field] += chunk
+        yield field, {'text': chunk}
+    
+    ai_content = {field: text.strip() for field, text in drafts.items()}
+    yield 'done', {'success': True, 'ai_content': ai_content,
+                   'lead': cache_ai_content(lead_id, lead, ai_content), 'cached': False}
+
+
+def cache_ai_content(lead_id, lead, ai_content):
+    """Save AI content on a lead, re-reading the list since it may have changed while the content streamed."""
+    leads = load_premium_leads()
+    if lead_id >= len(leads) or leads[lead_id].get('title') != lead.get('title'):
+        logger.warning(f"Lead {lead_id} changed while generating AI content; not caching it")
+        return {**lead, 'ai_content': ai_content}
+    
+    lead = leads[lead_id]
+    lead['ai_content'] = ai_content
+    lead['ai_generated_at'] = datetime.now().isoformat()
+    save_premium_leads(leads)
+    return lead
+
+
 def generate_fallback_content(lead):
     """Generate fallback content without AI."""
     business_name = lead['title']
@@ -211,112 +485,224 @@ FREE consultation available! Interested?
     return {'email': email, 'whatsapp': whatsapp}
 
 
-def run_premium_generation(target_countries, target_cities, business_types, num_leads, quality_threshold):
-    """Run premium lead generation with thread safety and user-specified filters."""
-    global generation_status
+def select_query_candidates(target_countries, target_cities, business_types):
+    """Cities and categories a run draws its queries from, honoring user filters."""
+    from src.queries import CITIES, CATEGORIES
+    
+    # Filter cities based on user selection
+    if target_cities and len(target_cities) > 0:
+        # User selected specific cities
+        filtered_cities = target_cities
+        logger.info(f"🎯 Using user-selected cities: {filtered_cities}")
+    elif target_countries and len(target_countries) > 0:
+        # User selected countries, filter cities by country
+        filtered_cities = [city for city in CITIES 
+                          if any(country in city for country in target_countries)]
+        logger.info(f"🌍 Filtered {len(filtered_cities)} cities for countries: {target_countries}")
+    else:
+        # No filter: the planner picks the best combinations from every city
+        filtered_cities = CITIES
+        logger.info(f"🌎 Planning across all {len(CITIES)} cities")
+    
+    # Filter categories based on user selection
+    if business_types and len(business_types) > 0:
+        # User selected specific business types
+        filtered_categories = business_types
+        logger.info(f"💼 Using user-selected categories: {filtered_categories}")
+    else:
+        # No filter: the planner picks the best combinations from every category
+        filtered_categories = CATEGORIES
+        logger.info(f"🎯 Planning across all {len(CATEGORIES)} categories")
+    
+    return filtered_cities, filtered_categories
+
+
+def plan_generation(target_countries, target_cities, business_types):
+    """Ordered queries and expected yield for a run (MAX_QUERIES_PER_RUN budget)."""
+    from src.query_planner import get_query_planner
+    
+    cities, categories = select_query_candidates(target_countries, target_cities, business_types)
+    return get_query_planner().plan(cities, categories, MAX_QUERIES_PER_RUN)
+
+
+def keep_run_leased(store, run_id, channel):
+    """Renew a run's lease from a background thread until the returned event is set; a lost lease stops the run."""
+    from src.generation_runs import worker_id
+    worker = worker_id()  # The run's thread holds the lease, not the heartbeat thread
+    done = threading.Event()
+    
+    def beat():
+        while not done.wait(RUN_HEARTBEAT_SECONDS):
+            try:
+                if not store.heartbeat(run_id, worker):
+                    logger.warning(f"Run {run_id} was claimed by another worker, stopping it here")
+                    channel.request_stop()
+                    return
+            except Exception as e:
+                logger.warning(f"Could not renew the lease of run {run_id}: {e}")
+    
+    threading.Thread(target=beat, name=f'run-{run_id}-heartbeat', daemon=True).start()
+    return done
+
+
+def run_premium_generation(target_countries, target_cities, business_types, num_leads, quality_threshold,
+                           resume_run_id=None, user_id=None, reserved_leads=0, reserved_period=None,
+                           channel=None):
+    """
+    Run premium lead generation with thread safety and user-specified filters.
+    
+    Every run is persisted (src/generation_runs.py) and checkpointed after each
+    query; pass resume_run_id to continue an interrupted or stopped run from its
+    last completed query instead of planning a new one.
+    
+    reserved_leads is the lead quota reserved for user_id (in billing period
+    reserved_period) when the run was requested; whatever the run does not
+    deliver is released when it ends, to that period even if the month changed.
+    
+    Progress goes to the run's own status channel (the scheduler passes it in),
+    and every search waits for a fair-share slot from get_scheduler(). The run's
+    lease is renewed in the background meanwhile; if another worker claims the
+    run anyway, this pass stops without touching it again.
+    """
+    global last_run_at
+    from src.run_scheduler import RunChannel
+    from src.generation_runs import LeaseLost
+    
+    if channel is None:
+        channel = RunChannel(0, run_owner(user_id))
+    run_id = resume_run_id
+    store = None
+    heartbeat = None
+    delivered = 0
+    carried_over = 0  # Leads a resumed run found (and was charged for) before
     
     try:
-        with status_lock:
-            generation_status['running'] = True
-            generation_status['stop_signal'] = False
-            generation_status['progress'] = 5
-            generation_status['message'] = '🚀 Initializing...'
+        channel.update(progress=5, message='🚀 Initializing...')
         
         from src.scraper import search_places
         from src.lead_quality_filter import filter_serious_clients_only
-        from src.queries import CITIES, CATEGORIES
         from src.filters import remove_duplicates
-        from src.config import load_config
+        from src.config import get_settings
+        from src.query_planner import get_query_planner
         
-        config = load_config()
+        config = get_settings()
         api_key = config.get('SERPAPI_KEY')
         
         if not api_key:
-            generation_status['running'] = False
-            generation_status['message'] = '❌ API Key not configured'
+            channel.update(message='❌ API Key not configured')
             return
         
-        with status_lock:
-            generation_status['progress'] = 15
-            generation_status['message'] = 'Preparing queries...'
-        
-        # Filter cities based on user selection
-        if target_cities and len(target_cities) > 0:
-            # User selected specific cities
-            filtered_cities = target_cities
-            logger.info(f"🎯 Using user-selected cities: {filtered_cities}")
-        elif target_countries and len(target_countries) > 0:
-            # User selected countries, filter cities by country
-            filtered_cities = [city for city in CITIES 
-                              if any(country in city for country in target_countries)]
-            logger.info(f"🌍 Filtered {len(filtered_cities)} cities for countries: {target_countries}")
-        else:
-            # No filter, use all cities (limit to 10 for speed)
-            filtered_cities = CITIES[:10]
-            logger.info(f"🌎 Using all cities (limited to 10)")
-        
-        # Filter categories based on user selection
-        if business_types and len(business_types) > 0:
-            # User selected specific business types
-            filtered_categories = business_types
-            logger.info(f"💼 Using user-selected categories: {filtered_categories}")
-        else:
-            # No filter, use all categories (limit to 10 for speed)
-            filtered_categories = CATEGORIES[:10]
-            logger.info(f"🎯 Using all categories (limited to 10)")
-        
-        # Generate queries from filtered cities and categories
-        all_queries = []
-        for city in filtered_cities[:20]:  # Max 20 cities
-            for category in filtered_categories[:20]:  # Max 20 categories
-                query = f"{category} in {city}"
-                all_queries.append(query)
+        planner = get_query_planner()
+        store = get_run_store()
         
-        logger.info(f"📋 Generated {len(all_queries)} search queries")
-        
-        with status_lock:
-            generation_status['progress'] = 20
-            generation_status['message'] = f'Searching {len(all_queries)} locations...'
+        if resume_run_id is not None:
+            run = store.start_resume(resume_run_id)
+            if run is None:
+                run_id = None
+                channel.update(message=f'❌ Run {resume_run_id} cannot be resumed')
+                return
+            
+            parameters = run['parameters']
+            num_leads = parameters['num_leads']
+            quality_threshold = parameters['quality_threshold']
+            planned_queries = run['queries']
+            start_index = run['completed_queries']
+            premium_leads = run['results']
+            carried_over = delivered = len(premium_leads)
+            logger.info(f"♻️ Resuming run {run_id} at query {start_index + 1}/{len(planned_queries)} "
+                        f"with {len(premium_leads)} leads so far")
+        else:
+            channel.update(progress=15, message='Preparing queries...')
+            
+            # Order queries by historical yield (unseen ones explored, dead ones skipped)
+            plan = plan_generation(target_countries, target_cities, business_types)
+            planned_queries = plan['queries']
+            start_index = 0
+            premium_leads = []
+            
+            logger.info(f"📋 Planned {len(planned_queries)} of {plan['candidates']} queries "
+                        f"({plan['unexplored']} unexplored, {len(plan['skipped'])} skipped), "
+                        f"expecting ~{plan['expected_premium']} premium leads")
+            
+            run_id = store.create_run({
+                'countries': target_countries,
+                'cities': target_cities,
+                'business_types': business_types,
+                'num_leads': num_leads,
+                'quality_threshold': quality_threshold,
+            }, planned_queries, user_id=user_id)
+        
+        channel.update(run_id=run_id, progress=20, leads_found=len(premium_leads),
+                       message=f'Searching {len(planned_queries) - start_index} locations...')
+        heartbeat = keep_run_leased(store, run_id, channel)
         
         # Scrape leads
-        premium_leads = []
-        
-        for i, query in enumerate(all_queries):
-            with status_lock:
-                if generation_status['stop_signal'] or len(premium_leads) >= num_leads:
-                    break
-                
-                progress = 20 + int((i / len(all_queries)) * 60)
-                generation_status['progress'] = progress
-                generation_status['current_query'] = query
-                generation_status['message'] = f'Searching... ({i+1}/{len(all_queries)})'
+        seen_keys = {(lead.get('title', '').lower().strip(), lead.get('address', '').lower().strip())
+                     for lead in premium_leads}
+        stopped = False
+        
+        for i in range(start_index, len(planned_queries)):
+            entry = planned_queries[i]
+            query = entry['query']
+            if channel.stop_requested or len(premium_leads) >= num_leads:
+                stopped = channel.stop_requested
+                break
             
+            progress = 20 + int((i / len(planned_queries)) * 60)
+            channel.update(progress=progress, current_query=query,
+                           message=f'Waiting for a search slot... ({i+1}/{len(planned_queries)})')
+            
+            # Fair-share turn within the global search budget
+            if not get_scheduler().acquire(channel):
+                stopped = True
+                break
+            channel.update(message=f'Searching... ({i+1}/{len(planned_queries)})')
+            
+            started = time.monotonic()
+            results = []
+            premium = []
+            failed = False
             try:
-                results = search_places(query, api_key)
+                # A failed search (network, quota) raises, so only real empty results count as zero yield
+                results = search_places(query, api_key, raise_errors=True)
                 if not results:
+                    planner.record(entry['city'], entry['category'], results=0, premium=0)
                     continue
                 
                 quality_leads = filter_serious_clients_only(results)
                 premium = [lead for lead in quality_leads 
                           if lead.get('quality_score', 0) >= quality_threshold]
                 
+                # Premium leads an earlier query in this run already found
+                duplicates = 0
+                for lead in premium:
+                    key = (lead.get('title', '').lower().strip(), lead.get('address', '').lower().strip())
+                    if key in seen_keys:
+                        duplicates += 1
+                    seen_keys.add(key)
+                planner.record(entry['city'], entry['category'], results=len(results),
+                               premium=len(premium), duplicates=duplicates)
+                
                 if premium:
                     premium_leads.extend(premium)
-                    with status_lock:
-                        generation_status['leads_found'] = len(premium_leads)
-                        # Limit latest_leads to prevent memory leak
-                        generation_status['latest_leads'] = (generation_status['latest_leads'] + premium)[-100:]
+                    channel.update(leads_found=len(premium_leads))
+                    channel.add_leads(premium)
                     save_premium_leads(premium, append=True)
+                    delivered = len(premium_leads)
                     
             except Exception as e:
                 logger.error(f"Error scraping {query}: {e}")
+                failed = True
                 continue
+            finally:
+                # Checkpoint: a restart resumes after this query
+                store.checkpoint(run_id, i + 1, places=len(results or []), new_leads=premium,
+                                 error=failed, seconds=time.monotonic() - started)
         
-        with status_lock:
-            generation_status['progress'] = 90
-            generation_status['message'] = 'Removing duplicates...'
+        channel.update(progress=90, message='Removing duplicates...')
         
         unique_leads = remove_duplicates(premium_leads)
+        delivered = len(unique_leads)
         
         # Add timestamp to new leads so we can identify them
         timestamp = datetime.now().isoformat()
@@ -332,22 +718,33 @@ def run_premium_generation(target_countries, target_cities, business_types, num_
         else:
             logger.warning("⚠️ No unique leads to save")
         
+        if stopped:
+            store.finish(run_id, 'stopped', f'Stopped with {len(unique_leads)} premium leads', unique_leads)
+        else:
+            store.finish(run_id, 'completed', f'Generated {len(unique_leads)} premium leads', unique_leads)
+        
+        channel.update(progress=100, leads_found=len(unique_leads),
+                       message=f'✅ Complete! Generated {len(unique_leads)} premium leads')
         with status_lock:
-            generation_status['progress'] = 100
-            generation_status['leads_found'] = len(unique_leads)
-            generation_status['message'] = f'✅ Complete! Generated {len(unique_leads)} premium leads'
-            generation_status['last_run'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            last_run_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         
         logger.info(f"✅ Generation complete: {len(unique_leads)} leads")
         
+    except LeaseLost as e:
+        logger.warning(f"⚠️ {e}; stopped this pass")
+        channel.update(message=f'⚠️ Run {run_id} was resumed by another worker, stopped here')
     except Exception as e:
         logger.error(f"❌ Generation error: {e}", exc_info=True)
-        with status_lock:
-            generation_status['message'] = f'❌ Error: {str(e)}'
-            generation_status['progress'] = 0
+        if store is not None and run_id is not None:
+            try:
+                store.finish(run_id, 'failed', str(e))
+            except Exception as store_error:
+                logger.error(f"Could not record failed run {run_id}: {store_error}")
+        channel.update(message=f'❌ Error: {str(e)}', progress=0)
     finally:
-        with status_lock:
-            generation_status['running'] = False
+        if heartbeat is not None:
+            heartbeat.set()
+        release_usage(user_id, 'leads', reserved_leads - max(delivered - carried_over, 0), reserved_period)
 
 
 @app.route('/')
@@ -416,7 +813,7 @@ def get_stats():
                     'avg_rating': 0,
                     'countries': {},
                     'categories': {},
-                    'last_run': generation_status.get('last_run', 'Never')
+                    'last_run': last_run_at
                 }
             })
         
@@ -449,7 +846,7 @@ def get_stats():
                 'avg_rating': round(avg_rating, 2),
                 'countries': dict(sorted(countries.items(), key=lambda x: x[1], reverse=True)[:5]),
                 'categories': dict(sorted(categories.items(), key=lambda x: x[1], reverse=True)[:5]),
-                'last_run': generation_status.get('last_run', 'Never')
+                'last_run': last_run_at
             }
         })
     except Exception as e:
@@ -460,13 +857,7 @@ def get_stats():
 @app.route('/api/generate', methods=['POST'])
 @limiter.limit("5 per hour")  # Rate limit: 5 generations per hour
 def generate_leads():
-    """Start premium lead generation."""
-    global generation_status
-    
-    with generation_lock:  # Thread-safe check
-        if generation_status['running']:
-            return jsonify({'success': False, 'message': 'Generation already running'})
-    
+    """Queue premium lead generation; runs from different users progress concurrently."""
     try:
         data = request.json or {}
         
@@ -478,52 +869,203 @@ def generate_leads():
         quality_threshold = float(data.get('quality_threshold', 70))
         clear_old = data.get('clear_old', False)
         
-        # Clear old leads if requested
-        if clear_old:
-            logger.info("🗑️ Clearing old leads before generation...")
-            save_premium_leads([])
+        user_id = metered_user_id()
         
-        thread = threading.Thread(
-            target=run_premium_generation,
-            args=(target_countries, target_cities, business_types, num_leads, quality_threshold)
-        )
-        thread.daemon = True
-        thread.start()
+        # Continue the caller's most recent unfinished run instead of starting over
+        if data.get('resume'):
+            run_id = get_run_store().latest_resumable(user_id)
+            if run_id is None:
+                return jsonify({'success': False, 'message': 'No unfinished run to resume'})
+            return resume_generation_run(run_id)
         
-        return jsonify({'success': True, 'message': 'Premium lead generation started'})
+        busy = check_run_limit(user_id)
+        if busy:
+            return busy
+        
+        # Reserve the whole run's lead quota; unused leads are released when it ends
+        denied, period = reserve_usage(user_id, 'leads', num_leads)
+        if denied:
+            return denied
+        
+        # Clear old leads if requested (not while other runs are still writing theirs)
+        if clear_old:
+            if get_scheduler().list_runs(active_only=True):
+                logger.info("Other runs in progress, keeping existing leads")
+            else:
+                logger.info("🗑️ Clearing old leads before generation...")
+                save_premium_leads([])
+        
+        try:
+            channel = get_scheduler().submit(
+                run_owner(user_id), run_premium_generation,
+                target_countries, target_cities, business_types, num_leads, quality_threshold,
+                user_id=user_id, reserved_leads=num_leads if user_id is not None else 0,
+                reserved_period=period,
+                # Stopped while queued: the run never starts to release its reservation
+                on_cancel=lambda: release_usage(user_id, 'leads', num_leads, period)
+            )
+        except Exception:
+            release_usage(user_id, 'leads', num_leads, period)
+            raise
+        
+        return jsonify(run_started_response(channel, 'Premium lead generation started'))
     except Exception as e:
         logger.error(f"Error starting generation: {e}")
         return jsonify({'success': False, 'error': str(e)})
 
 
+@app.route('/api/runs')
+def list_generation_runs():
+    """The caller's past generation runs with throughput metrics (most recent first)."""
+    try:
+        limit = int(request.args.get('limit', 20))
+        return jsonify({'success': True, 'runs': get_run_store().list_runs(limit, user_id=metered_user_id())})
+    except Exception as e:
+        logger.error(f"Error listing runs: {e}")
+        return jsonify({'success': False, 'error': str(e)})
+
+
+@app.route('/api/runs/<int:run_id>')
+def get_generation_run(run_id):
+    """One of the caller's generation runs including its planned queries and leads found."""
+    run = get_run_store().get_run(run_id, include_results=True)
+    if run is None or run['user_id'] != metered_user_id():
+        return jsonify({'success': False, 'error': 'Run not found'}), 404
+    return jsonify({'success': True, 'run': run})
+
+
+@app.route('/api/runs/<int:run_id>/resume', methods=['POST'])
+@limiter.limit("5 per hour")
+def resume_generation_run(run_id):
+    """Continue one of the caller's interrupted or stopped runs from its last completed query."""
+    user_id = metered_user_id()
+    run = get_run_store().get_run(run_id)
+    if run is None or run['user_id'] != user_id:
+        return jsonify({'success': False, 'error': 'Run not found'}), 404
+    
+    busy = check_run_limit(user_id)
+    if busy:
+        return busy
+    if any(active['run_id'] == run_id for active in get_scheduler().list_runs(active_only=True)):
+        return jsonify({'success': False, 'message': f'Run {run_id} is already in progress'})
+    if run['status'] not in ('interrupted', 'stopped', 'failed'):
+        return jsonify({'success': False, 'message': f"Run is {run['status']}, nothing to resume"})
+    
+    remaining = max(int(run['parameters'].get('num_leads', 0)) - run['leads_found'], 0)
+    denied, period = reserve_usage(user_id, 'leads', remaining)
+    if denied:
+        return denied
+    
+    try:
+        channel = get_scheduler().submit(
+            run_owner(user_id), run_premium_generation,
+            None, None, None, None, None,
+            resume_run_id=run_id, user_id=user_id,
+            reserved_leads=remaining if user_id is not None else 0, reserved_period=period,
+            on_cancel=lambda: release_usage(user_id, 'leads', remaining, period)
+        )
+    except Exception:
+        release_usage(user_id, 'leads', remaining, period)
+        raise
+    channel.update(run_id=run_id)
+    
+    return jsonify(run_started_response(
+        channel, f"Resuming run {run_id} at query {run['completed_queries'] + 1}/{run['total_queries']}"
+    ))
+
+
+@app.route('/api/generate/plan', methods=['POST'])
+def preview_generation_plan():
+    """Show which queries a generation run would search and its expected yield."""
+    try:
+        data = request.json or {}
+        plan = plan_generation(
+            data.get('markets', data.get('countries', [])),
+            data.get('cities', []),
+            data.get('business_types', []),
+        )
+        return jsonify({'success': True, **plan})
+    except Exception as e:
+        logger.error(f"Error planning generation: {e}")
+        return jsonify({'success': False, 'error': str(e)})
+
+
 @app.route('/api/status')
 def get_status():
-    """Get generation status with thread safety."""
-    with status_lock:  # Thread-safe read
-        return jsonify({
-            'success': True,
-            'is_running': generation_status['running'],
-            'progress': generation_status['progress'],
-            'current_lead': generation_status.get('current_query', ''),
-            'leads_found': generation_status.get('leads_found', 0),
-            'message': generation_status.get('message', ''),
-            'status': generation_status.copy()  # Return copy to prevent external modification
-        })
+    """Status of one of the caller's runs (?job=<id>, default: their latest)."""
+    owner = run_owner(metered_user_id())
+    job_id = request.args.get('job', type=int)
+    channel = get_scheduler().get(job_id) if job_id else get_scheduler().latest(owner)
+    if job_id and (channel is None or channel.owner != owner):
+        return jsonify({'success': False, 'error': 'Run not found'}), 404
+    
+    if channel is None:
+        status = {'running': False, 'progress': 0, 'current_query': '', 'leads_found': 0,
+                  'message': 'Ready to generate premium leads', 'run_id': None, 'latest_leads': []}
+    else:
+        status = channel.snapshot()
+    status['last_run'] = last_run_at
+    
+    return jsonify({
+        'success': True,
+        'is_running': status['running'],
+        'progress': status['progress'],
+        'current_lead': status.get('current_query', ''),
+        'leads_found': status.get('leads_found', 0),
+        'message': status.get('message', ''),
+        'queue_position': get_scheduler().queue_position(channel.job_id) if channel else None,
+        'active_runs': len(get_scheduler().list_runs(owner, active_only=True)),
+        'status': status
+    })
+
+
+@app.route('/api/scheduler')
+def get_scheduler_status():
+    """Scheduler load (runs active and queued across users) and the caller's runs."""
+    owner = run_owner(metered_user_id())
+    return jsonify({
+        'success': True,
+        'stats': get_scheduler().get_stats(),
+        'runs': get_scheduler().list_runs(owner)
+    })
+
+
+@app.route('/api/ai/health')
+def get_ai_health():
+    """Gemini client health: model in use, probe results and per-model call latency."""
+    from src.ai_gemini import get_client_registry
+    return jsonify({'success': True, **get_client_registry().get_stats()})
+
+
+@app.route('/api/usage')
+def get_usage():
+    """This month's metered usage and plan limits for the authenticated user."""
+    user_id = metered_user_id()
+    if user_id is None:
+        return jsonify({'success': False, 'error': 'Usage is metered per user; send a Bearer token'}), 401
+    
+    from src.subscription import create_subscription_manager
+    result = create_subscription_manager().check_usage_limits(user_id)
+    if 'error' in result:
+        return jsonify({'success': False, 'error': result['error']}), 404
+    return jsonify(result)
 
 
 @app.route('/api/stop', methods=['POST'])
 def stop_generation():
-    """Stop generation with thread safety."""
-    global generation_status
+    """Stop one of the caller's runs ({"job": id}) or all of them."""
+    owner = run_owner(metered_user_id())
+    job_id = (request.get_json(silent=True) or {}).get('job')
     
-    with status_lock:  # Thread-safe write
-        if not generation_status['running']:
-            return jsonify({'success': False, 'message': 'Generation is not running'})
-        
-        generation_status['stop_signal'] = True
-        generation_status['message'] = '🛑 Stopping...'
+    active = get_scheduler().list_runs(owner, active_only=True)
+    job_ids = [run['job_id'] for run in active if job_id is None or run['job_id'] == job_id]
+    if not job_ids:
+        return jsonify({'success': False, 'message': 'Generation is not running'})
+    
+    for active_job in job_ids:
+        get_scheduler().stop(active_job)
     
-    return jsonify({'success': True, 'message': 'Stop signal sent'})
+    return jsonify({'success': True, 'message': 'Stop signal sent', 'jobs': job_ids})
 
 
 @app.route('/api/leads/clear', methods=['POST'])
@@ -580,7 +1122,7 @@ def search_leads():
 @app.route('/api/lead/<int:lead_id>/ai-content')
 @limiter.limit("30 per minute")  # Rate limit: 30 AI requests per minute
 def get_lead_ai_content(lead_id):
-    """Generate AI content for a specific lead with caching."""
+    """Generate AI content for a specific lead with caching (?stream=1 streams drafts as SSE)."""
     try:
         leads = load_premium_leads()
         
@@ -592,10 +1134,15 @@ def get_lead_ai_content(lead_id):
         # Check if AI content already exists (cached)
         if lead.get('ai_content'):
             logger.info(f"Using cached AI content for lead {lead_id}")
+            if wants_stream():
+                return sse_response([('done', {'success': True, 'ai_content': lead['ai_content'], 'lead': lead, 'cached': True})])
             return jsonify({'success': True, 'ai_content': lead['ai_content'], 'lead': lead, 'cached': True})
         
         # Generate AI content
         logger.info(f"Generating new AI content for lead {lead_id}")
+        record_usage(metered_user_id(), 'ai_requests')
+        if wants_stream():
+            return sse_response(stream_ai_content(lead_id, lead))
         ai_content = generate_ai_content(lead)
         
         # Save it back with timestamp
@@ -841,17 +1388,12 @@ def get_hot_leads():
 
 @app.route('/api/leads/today')
 def get_todays_leads():
-    """Get today's leads."""
+    """Get today's leads (added or changed today)."""
     try:
+        from src.history_store import get_history_store
         today = datetime.now().strftime('%Y-%m-%d')
-        history_path = f"data/history/leads_{today}.json"
-        
-        if os.path.exists(history_path):
-            with open(history_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            return jsonify({'success': True, 'leads': data.get('leads', [])})
-        else:
-            return jsonify({'success': True, 'leads': []})
+        leads = get_history_store().leads_for_day(today) or []
+        return jsonify({'success': True, 'leads': leads})
     except Exception as e:
         logger.error(f"Error getting today's leads: {e}")
         return jsonify({'success': False, 'error': str(e)})
@@ -859,28 +1401,10 @@ def get_todays_leads():
 
 @app.route('/api/history')
 def get_history():
-    """Get generation history."""
+    """Get generation history (per-day summaries from the history index)."""
     try:
-        history_dir = "data/history"
-        if not os.path.exists(history_dir):
-            return jsonify({'success': True, 'history': []})
-        
-        history_files = sorted([f for f in os.listdir(history_dir) if f.startswith('leads_') and f.endswith('.json')], reverse=True)
-        
-        history = []
-        for filename in history_files[:30]:  # Last 30 days
-            try:
-                with open(os.path.join(history_dir, filename), 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    history.append({
-                        'date': data.get('date', filename.replace('leads_', '').replace('.json', '')),
-                        'total_leads': data.get('total_leads', len(data.get('leads', []))),
-                        'timestamp': data.get('timestamp', '')
-                    })
-            except:
-                continue
-        
-        return jsonify({'success': True, 'history': history})
+        from src.history_store import get_history_store
+        return jsonify({'success': True, 'history': get_history_store().list_days(30)})  # Last 30 days
     except Exception as e:
         logger.error(f"Error getting history: {e}")
         return jsonify({'success': False, 'error': str(e)})
@@ -888,25 +1412,21 @@ def get_history():
 
 @app.route('/api/history/all')
 def get_all_history():
-    """Get all historical leads."""
+    """Stream every lead ever generated, once each, in its latest version."""
     try:
-        history_dir = "data/history"
-        if not os.path.exists(history_dir):
-            return jsonify({'success': True, 'leads': [], 'total': 0})
+        from flask import Response
+        from src.history_store import get_history_store
         
-        all_leads = []
-        history_files = sorted([f for f in os.listdir(history_dir) if f.startswith('leads_') and f.endswith('.json')], reverse=True)
+        store = get_history_store()
+        total = store.count_unique()
         
-        for filename in history_files:
-            try:
-                with open(os.path.join(history_dir, filename), 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    leads = data.get('leads', [])
-                    all_leads.extend(leads)
-            except:
-                continue
+        def generate():
+            yield '{"success": true, "leads": ['
+            for n, lead in enumerate(store.iter_unique_leads()):
+                yield (',' if n else '') + json.dumps(lead, ensure_ascii=False, default=str)
+            yield f'], "total": {total}, "total_leads": {total}}}'
         
-        return jsonify({'success': True, 'leads': all_leads, 'total': len(all_leads)})
+        return Response(generate(), mimetype='application/json')
     except Exception as e:
         logger.error(f"Error getting all history: {e}")
         return jsonify({'success': False, 'error': str(e)})
@@ -914,21 +1434,20 @@ def get_all_history():
 
 @app.route('/api/history/<date>')
 def get_history_by_date(date):
-    """Get leads for a specific date."""
+    """Get leads added or changed on a specific date."""
     try:
-        history_path = f"data/history/leads_{date}.json"
+        from src.history_store import get_history_store
+        leads = get_history_store().leads_for_day(date)
         
-        if not os.path.exists(history_path):
+        if leads is None:
             return jsonify({'success': False, 'error': 'No data for this date'}), 404
         
-        with open(history_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
         return jsonify({
             'success': True,
             'date': date,
-            'leads': data.get('leads', []),
-            'total': data.get('total_leads', len(data.get('leads', [])))
+            'leads': leads,
+            'total': len(leads),
+            'total_leads': len(leads)
         })
     except Exception as e:
         logger.error(f"Error getting history for {date}: {e}")
@@ -992,6 +1511,10 @@ def send_email():
         if not body:
             return jsonify({'success': False, 'error': 'Email body required'})
         
+        denied, _ = reserve_usage(metered_user_id(), 'emails', 1)
+        if denied:
+            return denied
+        
         # Create mailto URL
         import urllib.parse
         subject_encoded = urllib.parse.quote(subject)
@@ -1031,6 +1554,13 @@ def bulk_send_email():
         if not selected_leads:
             return jsonify({'success': False, 'error': 'No leads selected'})
         
+        # Reserve quota for the whole batch instead of checking per lead
+        user_id = metered_user_id()
+        denied, _ = reserve_usage(user_id, 'emails', len(selected_leads))
+        if denied:
+            return denied
+        record_usage(user_id, 'ai_requests', len(selected_leads))
+        
         # Generate AI content for each lead
         results = []
         for lead in selected_leads:
@@ -1066,6 +1596,8 @@ def bulk_send_whatsapp():
         if not selected_leads:
             return jsonify({'success': False, 'error': 'No leads selected'})
         
+        record_usage(metered_user_id(), 'ai_requests', sum(1 for lead in selected_leads if lead.get('phone')))
+        
         # Generate WhatsApp URLs
         results = []
         for lead in selected_leads:
@@ -1155,25 +1687,40 @@ def bulk_analyze_leads():
         if not selected_leads:
             return jsonify({'success': False, 'error': 'Invalid lead IDs'})
         
-        # Analyze each lead
+        # Deep research per lead; AI insights (when configured) are fetched concurrently
+        from src.ai_gemini import get_ai_assistant
+        from src.config import get_settings
+        from src.deep_research import create_deep_research_engine
+        
+        api_key = get_settings().get('GEMINI_API_KEY')
+        ai = get_ai_assistant(api_key) if api_key else None
+        engine = create_deep_research_engine(ai, rate_limit_wait=BULK_ANALYZE_AI_WAIT)
+        
+        batch = selected_leads[:10]  # Limit to 10 for performance
         results = []
-        for lead in selected_leads[:10]:  # Limit to 10 for performance
-            try:
-                # Quick analysis for bulk
-                business_name = lead.get('title', '')
-                business_type = lead.get('type', '')
-                rating = lead.get('rating', 0)
-                
-                results.append({
-                    'business_name': business_name,
-                    'business_type': business_type,
-                    'rating': rating,
-                    'quick_pitch': f"Hi {business_name}! Your {rating}★ rating is impressive. Let's get you 3-5x more customers online!",
-                    'pain_point': f"Strong reputation but limited online presence",
-                    'solution': "Modern website + mobile app + SEO"
-                })
-            except:
+        for lead, analysis in zip(batch, engine.analyze_companies(batch)):
+            if 'error' in analysis:
                 continue
+            
+            business_name = lead.get('title', '')
+            rating = lead.get('rating', 0)
+            pain_points = analysis['pain_points']
+            solutions = analysis['ragspro_solutions']['immediate']
+            
+            results.append({
+                'business_name': business_name,
+                'business_type': lead.get('type', ''),
+                'rating': rating,
+                'quick_pitch': f"Hi {business_name}! Your {rating}★ rating is impressive. Let's get you 3-5x more customers online!",
+                'pain_point': pain_points[0] if pain_points else "Strong reputation but limited online presence",
+                'solution': ' + '.join(s['title'] for s in solutions) or "Modern website + mobile app + SEO",
+                'priority_score': analysis['priority_score'],
+                'estimated_budget': analysis['estimated_budget']['range'],
+                'ai_insights': analysis.get('ai_insights')
+            })
+        
+        # One AI request per Gemini call actually made
+        record_usage(metered_user_id(), 'ai_requests', engine.ai_calls)
         
         return jsonify({
             'success': True,
@@ -1187,10 +1734,173 @@ def bulk_analyze_leads():
         return jsonify({'success': False, 'error': str(e)})
 
 
+@app.route('/api/replies/<int:interaction_id>/classification', methods=['POST'])
+@limiter.limit("60 per minute")
+def correct_reply_classification(interaction_id):
+    """Record the human-verified category of a saved reply ({"category", "sentiment"}); it becomes reply model training data."""
+    try:
+        data = request.json or {}
+        from src.reply_classifier import create_reply_classifier
+        result = create_reply_classifier(None, use_model=False).correct_classification(
+            interaction_id, data.get('category', ''), data.get('sentiment')
+        )
+        if 'error' in result:
+            return jsonify({'success': False, **result}), 404 if result['error'] == 'Reply not found' else 400
+        return jsonify(result)
+    except Exception as e:
+        logger.error(f"Reply correction error: {e}")
+        return jsonify({'success': False, 'error': str(e)})
+
+
+def lead_analysis_prompt(lead, website_scan=None):
+    """Prompt asking Gemini for a JSON analysis of a lead (grounded in its website scan when there is one)."""
+    business_name = lead.get('title', '')
+    business_type = lead.get('type', '')
+    rating = lead.get('rating', 0)
+    reviews = lead.get('reviews', 0)
+    address = lead.get('address', '')
+    website = lead.get('website', '')
+    
+    audit = ''
+    if website_scan:
+        audit = f"""
+Website audit: SEO score {website_scan['seo_score']}/100, loads in {website_scan['load_time']}s, built with {', '.join(website_scan['tech_stack']) or 'unknown stack'}
+Website issues: {'; '.join(website_scan['issues']) or 'none found'}
+"""
+    
+    return f"""Analyze this business and provide detailed insights:
+
+Business: {business_name}
+Type: {business_type}
+Rating: {rating} stars ({reviews} reviews)
+Location: {address}
+Website: {website if website else 'No website'}
+{audit}
+Provide a JSON response with:
+1. pain_points: Array of 3-5 specific problems this business likely faces
+2. solutions: Array of 3-5 RagsPro solutions that can help
+3. revenue_opportunity: Estimated revenue potential (e.g., "$50k-$200k project")
+4. quick_pitch: One compelling sentence to grab their attention
+5. email_subject: Catchy email subject line
+6. call_script: 30-second phone script
+
+Focus on digital transformation, online presence, and tech solutions."""
+
+
+def parse_lead_analysis(analysis_text, lead):
+    """Analysis dict from Gemini's reply (JSON, or JSON in a code block), or a structured default."""
+    import re
+    
+    business_name = lead.get('title', '')
+    business_type = lead.get('type', '')
+    rating = lead.get('rating', 0)
+    reviews = lead.get('reviews', 0)
+    
+    # Extract JSON from markdown code blocks if present
+    json_match = re.search(r'```json\s*(.*?)\s*```', analysis_text, re.DOTALL)
+    if json_match:
+        analysis_json = json.loads(json_match.group(1))
+    else:
+        # Try direct JSON parse
+        try:
+            analysis_json = json.loads(analysis_text)
+        except:
+            # Fallback: create structured response
+            analysis_json = {
+                'pain_points': [
+                    f"Limited online presence despite {rating}★ rating",
+                    f"Missing modern website to capture {reviews}+ satisfied customers",
+                    "No online booking/ordering system",
+                    "Weak SEO - losing customers to competitors",
+                    "No mobile app for customer convenience"
+                ],
+                'solutions': [
+                    "Modern responsive website with SEO optimization",
+                    "Mobile app for iOS & Android",
+                    "Online booking/ordering system",
+                    "AI-powered chatbot for 24/7 customer support",
+                    "Digital marketing & Google Ads management"
+                ],
+                'revenue_opportunity': "$30k-$150k project value",
+                'quick_pitch': f"Hi {business_name}! Your {rating}★ rating shows customers love you. Let's capture the 70% searching online with a modern website & app!",
+                'email_subject': f"Grow {business_name} Online - 3-5x More Customers",
+                'call_script': f"Hi, this is Raghav from RagsPro. I noticed {business_name} has an amazing {rating}-star rating! We help {business_type} businesses like yours get 3-5x more customers through modern websites and apps. Do you have 2 minutes to discuss how we can help you grow?"
+            }
+    return analysis_json
+
+
+def fallback_lead_analysis(lead, website_scan=None):
+    """Analysis used when Gemini fails (email and WhatsApp drafts are added by the caller)."""
+    business_name = lead.get('title', '')
+    business_type = lead.get('type', '')
+    rating = lead.get('rating', 0)
+    if website_scan and website_scan['issues']:
+        pain_points = [f"Website: {issue}" for issue in website_scan['issues'][:3]]
+    else:
+        pain_points = ["Missing modern website to convert online searches"]
+    return {
+        'analysis': {
+            'pain_points': [
+                f"Strong reputation ({rating}★) but limited online visibility",
+                *pain_points,
+                "No digital marketing strategy",
+                "Competitors capturing online customers"
+            ],
+            'solutions': [
+                "Professional website with SEO",
+                "Mobile app development",
+                "Digital marketing campaigns",
+                "Online booking/ordering system"
+            ],
+            'revenue_opportunity': "$30k-$100k",
+            'quick_pitch': f"Transform {business_name}'s {rating}★ reputation into 3-5x more customers!",
+            'email_subject': f"Grow {business_name} Online",
+            'call_script': f"Hi, Raghav from RagsPro. Noticed your {rating}★ rating! We help {business_type} businesses get more customers online. Quick chat?"
+        },
+        'quick_pitch': f"Transform {business_name}'s reputation into more customers!",
+        'call_script': f"Hi, this is Raghav from RagsPro. Quick question about growing {business_name} online?"
+    }
+
+
+def stream_lead_analysis(ai, lead, website_scan=None):
+    """analyze_lead as events: analysis text, the parsed analysis, then email and WhatsApp drafts as generated."""
+    from src.ai_gemini import StreamInterrupted
+    
+    try:
+        chunks = []
+        for chunk in ai.stream_text(lead_analysis_prompt(lead, website_scan), lambda: '', max_output_tokens=2048):
+            if chunk:
+                chunks.append(chunk)
+                yield 'analysis', {'text': chunk}
+        if not chunks:
+            raise ValueError("No analysis generated")
+        analysis_json = parse_lead_analysis(''.join(chunks).strip(), lead)
+        result = {
+            'analysis': analysis_json,
+            'quick_pitch': analysis_json.get('quick_pitch', ''),
+            'call_script': analysis_json.get('call_script', '')
+        }
+    except (StreamInterrupted, ValueError) as e:
+        logger.error(f"AI analysis error: {e}")
+        result = fallback_lead_analysis(lead, website_scan)
+    result['website_scan'] = website_scan
+    yield 'analysis_result', result
+    
+    drafts = {'email': '', 'whatsapp': ''}
+    for field, chunk in stream_drafts(ai, lead.get('title', ''), lead.get('type', ''), lead.get('address', ''),
+                                      lead.get('rating', 0), lead.get('reviews', 0)):
+        drafts[field] += chunk
+        yield field, {'text': chunk}
+    
+    yield 'done', {'success': True, **result,
+                   'email_content': drafts['email'].strip(),
+                   'whatsapp_content': drafts['whatsapp'].strip()}
+
+
 @app.route('/api/lead/analyze', methods=['POST'])
 @limiter.limit("20 per minute")
 def analyze_lead():
-    """Analyze a lead with AI to identify problems, pain points, and solutions."""
+    """Analyze a lead with AI to identify problems, pain points, and solutions (?stream=1 for SSE)."""
     try:
         data = request.json
         lead = data.get('lead')
@@ -1199,83 +1909,32 @@ def analyze_lead():
             return jsonify({'success': False, 'error': 'No lead provided'})
         
         # Use AI to analyze the lead
-        from src.ai_gemini import create_ai_assistant
-        from src.config import load_config
+        from src.ai_gemini import get_ai_assistant
+        from src.config import get_settings
         
-        config = load_config()
+        config = get_settings()
         if not config.get('GEMINI_API_KEY'):
             return jsonify({
                 'success': False,
                 'error': 'AI not configured'
             })
         
-        ai = create_ai_assistant(config['GEMINI_API_KEY'])
+        ai = get_ai_assistant(config['GEMINI_API_KEY'])
+        record_usage(metered_user_id(), 'ai_requests')
+        website_scan = scan_lead_website(lead)
+        
+        if wants_stream():
+            return sse_response(stream_lead_analysis(ai, lead, website_scan))
         
-        # Generate detailed analysis
         business_name = lead.get('title', '')
         business_type = lead.get('type', '')
         rating = lead.get('rating', 0)
         reviews = lead.get('reviews', 0)
         address = lead.get('address', '')
-        website = lead.get('website', '')
         
-        # Create detailed analysis prompt
-        analysis_prompt = f"""Analyze this business and provide detailed insights:
-
-Business: {business_name}
-Type: {business_type}
-Rating: {rating} stars ({reviews} reviews)
-Location: {address}
-Website: {website if website else 'No website'}
-
-Provide a JSON response with:
-1. pain_points: Array of 3-5 specific problems this business likely faces
-2. solutions: Array of 3-5 RagsPro solutions that can help
-3. revenue_opportunity: Estimated revenue potential (e.g., "$50k-$200k project")
-4. quick_pitch: One compelling sentence to grab their attention
-5. email_subject: Catchy email subject line
-6. call_script: 30-second phone script
-
-Focus on digital transformation, online presence, and tech solutions."""
-
         try:
-            response = ai.model.generate_content(analysis_prompt)
-            analysis_text = response.text.strip()
-            
-            # Try to parse as JSON
-            import json
-            import re
-            
-            # Extract JSON from markdown code blocks if present
-            json_match = re.search(r'```json\s*(.*?)\s*```', analysis_text, re.DOTALL)
-            if json_match:
-                analysis_json = json.loads(json_match.group(1))
-            else:
-                # Try direct JSON parse
-                try:
-                    analysis_json = json.loads(analysis_text)
-                except:
-                    # Fallback: create structured response
-                    analysis_json = {
-                        'pain_points': [
-                            f"Limited online presence despite {rating}★ rating",
-                            f"Missing modern website to capture {reviews}+ satisfied customers",
-                            "No online booking/ordering system",
-                            "Weak SEO - losing customers to competitors",
-                            "No mobile app for customer convenience"
-                        ],
-                        'solutions': [
-                            "Modern responsive website with SEO optimization",
-                            "Mobile app for iOS & Android",
-                            "Online booking/ordering system",
-                            "AI-powered chatbot for 24/7 customer support",
-                            "Digital marketing & Google Ads management"
-                        ],
-                        'revenue_opportunity': "$30k-$150k project value",
-                        'quick_pitch': f"Hi {business_name}! Your {rating}★ rating shows customers love you. Let's capture the 70% searching online with a modern website & app!",
-                        'email_subject': f"Grow {business_name} Online - 3-5x More Customers",
-                        'call_script': f"Hi, this is Raghav from RagsPro. I noticed {business_name} has an amazing {rating}-star rating! We help {business_type} businesses like yours get 3-5x more customers through modern websites and apps. Do you have 2 minutes to discuss how we can help you grow?"
-                    }
+            response = ai.model.generate_content(lead_analysis_prompt(lead, website_scan))
+            analysis_json = parse_lead_analysis(response.text.strip(), lead)
             
             # Generate full email and WhatsApp content
             email_content = ai.generate_cold_email(business_name, business_type, address, rating, reviews)
@@ -1287,7 +1946,8 @@ Focus on digital transformation, online presence, and tech solutions."""
                 'email_content': email_content,
                 'whatsapp_content': whatsapp_content,
                 'quick_pitch': analysis_json.get('quick_pitch', ''),
-                'call_script': analysis_json.get('call_script', '')
+                'call_script': analysis_json.get('call_script', ''),
+                'website_scan': website_scan
             })
             
         except Exception as e:
@@ -1295,28 +1955,10 @@ Focus on digital transformation, online presence, and tech solutions."""
             # Fallback response
             return jsonify({
                 'success': True,
-                'analysis': {
-                    'pain_points': [
-                        f"Strong reputation ({rating}★) but limited online visibility",
-                        "Missing modern website to convert online searches",
-                        "No digital marketing strategy",
-                        "Competitors capturing online customers"
-                    ],
-                    'solutions': [
-                        "Professional website with SEO",
-                        "Mobile app development",
-                        "Digital marketing campaigns",
-                        "Online booking/ordering system"
-                    ],
-                    'revenue_opportunity': "$30k-$100k",
-                    'quick_pitch': f"Transform {business_name}'s {rating}★ reputation into 3-5x more customers!",
-                    'email_subject': f"Grow {business_name} Online",
-                    'call_script': f"Hi, Raghav from RagsPro. Noticed your {rating}★ rating! We help {business_type} businesses get more customers online. Quick chat?"
-                },
+                **fallback_lead_analysis(lead, website_scan),
+                'website_scan': website_scan,
                 'email_content': ai.generate_cold_email(business_name, business_type, address, rating, reviews),
-                'whatsapp_content': ai.generate_whatsapp_message(business_name, business_type),
-                'quick_pitch': f"Transform {business_name}'s reputation into more customers!",
-                'call_script': f"Hi, this is Raghav from RagsPro. Quick question about growing {business_name} online?"
+                'whatsapp_content': ai.generate_whatsapp_message(business_name, business_type)
             })
         
     except Exception as e:
@@ -3,12 +3,13 @@ A/B Testing Framework - LEVEL 2
 Test different email templates, subject lines, and strategies
 """
 
+import hashlib
 import logging
-import random
+import math
 from typing import Dict, List, Optional
 from datetime import datetime
-from sqlalchemy import func
-from src.database import get_db, Template, Lead, Interaction, Campaign
+from sqlalchemy import func, case
+from src.database import get_db, Template, Campaign, ABAssignment, ABTestStats
 
 logger = logging.getLogger(__name__)
 
@@ -16,6 +17,12 @@ logger = logging.getLogger(__name__)
 class ABTestingFramework:
     """Manage A/B tests for templates and strategies"""
     
+    # Sequential test (SPRT) settings: detect a relative reply-rate lift of
+    # MIN_LIFT with false-positive rate ALPHA and miss rate BETA
+    MIN_LIFT = 0.5
+    ALPHA = 0.05
+    BETA = 0.2
+    
     def __init__(self):
         logger.info("A/B Testing framework initialized")
     
@@ -64,66 +71,182 @@ class ABTestingFramework:
             session.close()
     
     def assign_variant(self, test_id: int, lead_id: int) -> str:
-        """Assign a variant (A or B) to a lead"""
-        # Simple 50/50 split
-        variant = random.choice(['A', 'B'])
+        """
+        Assign a variant (A or B) to a lead.
+        
+        Assignment is a deterministic hash of (test_id, lead_id), so the same
+        lead always gets the same variant, and is stored in ab_assignments.
+        """
+        session = get_db()
+        
+        try:
+            existing = session.query(ABAssignment.variant).filter_by(
+                test_id=test_id, lead_id=lead_id
+            ).first()
+            if existing:
+                return existing.variant
+            
+            digest = hashlib.sha256(f"{test_id}:{lead_id}".encode()).digest()
+            variant = 'A' if digest[0] % 2 == 0 else 'B'
+            
+            session.add(ABAssignment(test_id=test_id, lead_id=lead_id, variant=variant))
+            
+            stats = self._get_stats(session, test_id)
+            if variant == 'A':
+                stats.assigned_a += 1
+            else:
+                stats.assigned_b += 1
+            
+            session.commit()
+            return variant
+            
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Error assigning variant: {e}")
+            raise
+        finally:
+            session.close()
+    
+    def record_reply(self, lead_id: int, test_id: Optional[int] = None) -> int:
+        """
+        Record a reply from a lead in every test it is enrolled in (or just test_id).
+        
+        Updates the sequential test statistic incrementally, so results never
+        need to rescan the test's history.
         
-        # Store assignment in lead notes or custom field
+        Returns:
+            Number of assignments marked as replied
+        """
         session = get_db()
+        
         try:
-            lead = session.query(Lead).get(lead_id)
-            if lead:
-                if not lead.notes:
-                    lead.notes = ''
-                lead.notes += f"\nA/B Test {test_id}: Variant {variant}"
-                session.commit()
+            query = session.query(ABAssignment).filter(
+                ABAssignment.lead_id == lead_id,
+                ABAssignment.replied == False
+            )
+            if test_id is not None:
+                query = query.filter(ABAssignment.test_id == test_id)
+            
+            assignments = query.all()
+            now = datetime.utcnow()
+            
+            for assignment in assignments:
+                assignment.replied = True
+                assignment.replied_at = now
+                
+                stats = self._get_stats(session, assignment.test_id)
+                self._update_sequential_test(stats, assignment.variant)
+                if assignment.variant == 'A':
+                    stats.replied_a += 1
+                else:
+                    stats.replied_b += 1
+            
+            session.commit()
+            return len(assignments)
+            
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Error recording A/B reply: {e}")
+            return 0
         finally:
             session.close()
+    
+    def _get_stats(self, session, test_id: int) -> ABTestStats:
+        """Get (or create) the running stats row for a test"""
+        stats = session.get(ABTestStats, test_id)
+        if stats is None:
+            stats = ABTestStats(test_id=test_id, assigned_a=0, assigned_b=0,
+                                replied_a=0, replied_b=0, llr_a=0.0, llr_b=0.0)
+            session.add(stats)
+        return stats
+    
+    def _sprt_bounds(self) -> tuple:
+        """Wald SPRT decision boundaries (lower, upper) on the log-likelihood ratio"""
+        upper = math.log((1 - self.BETA) / self.ALPHA)
+        lower = math.log(self.BETA / (1 - self.ALPHA))
+        return lower, upper
+    
+    def _update_sequential_test(self, stats: ABTestStats, variant: str):
+        """
+        Update the SPRT with one reply.
+        
+        Given a reply arrived, under H0 (equal reply rates) it came from B with
+        probability n_B / (n_A + n_B). Under "B is better by MIN_LIFT" that
+        probability is (1+lift)*n_B / (n_A + (1+lift)*n_B). Each reply adds
+        the log-likelihood ratio of where it came from; "A is better" is the
+        mirror image.
+        """
+        if stats.decision:
+            return
+        
+        n_a, n_b = stats.assigned_a or 0, stats.assigned_b or 0
+        if n_a == 0 or n_b == 0:
+            return
         
-        return variant
+        lift = 1 + self.MIN_LIFT
+        p0_b = n_b / (n_a + n_b)
+        p1_b = lift * n_b / (n_a + lift * n_b)   # H1: B better
+        p1_a = n_b / (lift * n_a + n_b)          # H1: A better
+        
+        if variant == 'B':
+            stats.llr_b = (stats.llr_b or 0.0) + math.log(p1_b / p0_b)
+            stats.llr_a = (stats.llr_a or 0.0) + math.log(p1_a / p0_b)
+        else:
+            stats.llr_b = (stats.llr_b or 0.0) + math.log((1 - p1_b) / (1 - p0_b))
+            stats.llr_a = (stats.llr_a or 0.0) + math.log((1 - p1_a) / (1 - p0_b))
+        
+        lower, upper = self._sprt_bounds()
+        if stats.llr_b >= upper:
+            stats.decision = 'Variant B'
+        elif stats.llr_a >= upper:
+            stats.decision = 'Variant A'
+        elif stats.llr_a <= lower and stats.llr_b <= lower:
+            stats.decision = 'No clear winner'
     
     def get_test_results(self, test_id: int) -> Dict:
         """Get results of an A/B test"""
         session = get_db()
         
         try:
-            campaign = session.query(Campaign).get(test_id)
+            campaign = session.get(Campaign, test_id)
             if not campaign:
                 return {'error': 'Test not found'}
             
-            # Parse template IDs from description
-            # In real implementation, store these properly
-            
-            # Get interactions for this campaign
-            # For now, use all recent interactions as proxy
-            variant_a_interactions = session.query(Interaction).filter(
-                Interaction.type == 'Email',
-                Interaction.direction == 'Outbound'
-            ).limit(50).all()
+            # Per-variant totals in one grouped query
+            rows = session.query(
+                ABAssignment.variant,
+                func.count(ABAssignment.id),
+                func.sum(case((ABAssignment.replied == True, 1), else_=0))
+            ).filter(
+                ABAssignment.test_id == test_id
+            ).group_by(ABAssignment.variant).all()
             
-            # Calculate metrics
-            total_a = len([i for i in variant_a_interactions if 'Variant A' in (i.lead.notes or '')])
-            total_b = len([i for i in variant_a_interactions if 'Variant B' in (i.lead.notes or '')])
-            
-            replied_a = len([i for i in variant_a_interactions 
-                           if 'Variant A' in (i.lead.notes or '') and i.replied])
-            replied_b = len([i for i in variant_a_interactions 
-                           if 'Variant B' in (i.lead.notes or '') and i.replied])
+            totals = {variant: (sent or 0, replied or 0) for variant, sent, replied in rows}
+            total_a, replied_a = totals.get('A', (0, 0))
+            total_b, replied_b = totals.get('B', (0, 0))
             
             # Calculate rates
             reply_rate_a = (replied_a / total_a * 100) if total_a > 0 else 0
             reply_rate_b = (replied_b / total_b * 100) if total_b > 0 else 0
             
+            # Sequential test result (maintained incrementally on each reply)
+            stats = session.get(ABTestStats, test_id)
+            lower, upper = self._sprt_bounds()
+            decision = stats.decision if stats else None
+            
             # Determine winner
-            if total_a < 30 or total_b < 30:
+            if decision:
+                winner = decision
+                confidence = 'high'
+            elif total_a < 30 or total_b < 30:
                 winner = 'Insufficient data'
                 confidence = 'low'
             elif reply_rate_a > reply_rate_b * 1.1:
                 winner = 'Variant A'
-                confidence = 'high' if total_a >= 50 else 'medium'
+                confidence = 'medium'
             elif reply_rate_b > reply_rate_a * 1.1:
                 winner = 'Variant B'
-                confidence = 'high' if total_b >= 50 else 'medium'
+                confidence = 'medium'
             else:
                 winner = 'No clear winner'
                 confidence = 'medium'
@@ -145,6 +268,13 @@ class ABTestingFramework:
                 'winner': winner,
                 'confidence': confidence,
                 'improvement': round(abs(reply_rate_a - reply_rate_b), 1),
+                'sequential_test': {
+                    'llr_a': round(stats.llr_a or 0.0, 3) if stats else 0.0,
+                    'llr_b': round(stats.llr_b or 0.0, 3) if stats else 0.0,
+                    'lower_bound': round(lower, 3),
+                    'upper_bound': round(upper, 3),
+                    'decision': decision
+                },
                 'recommendation': self._get_test_recommendation(winner, reply_rate_a, reply_rate_b)
             }
             
@@ -3,10 +3,20 @@ Advanced Features - LEVEL 3 & 4 Combined
 White-label, LinkedIn, Website Scanner, Multi-channel, Proposals
 """
 
+import ipaddress
 import logging
 import json
-from typing import Dict, List
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
 from datetime import datetime
+from urllib.parse import urljoin, urlparse
+
+import requests
+from bs4 import BeautifulSoup
+
 from src.database import get_db, User
 
 logger = logging.getLogger(__name__)
@@ -108,47 +118,317 @@ class LinkedInIntegration:
 # LEVEL 4: Website Scanner
 # ============================================================================
 
+class BlockedURLError(Exception):
+    """A URL points at a private, loopback or link-local address (or is not http/https)"""
+
+
 class WebsiteScanner:
     """Scan and analyze websites for personalized pitches"""
     
-    def __init__(self):
+    SLOW_LOAD_SECONDS = 2.0
+    SLOW_TTFB_SECONDS = 0.8
+    MAX_REDIRECTS = 5
+    
+    # (technology, where to look, lowercase signature)
+    TECH_SIGNATURES = [
+        ('WordPress', 'html', 'wp-content/'),
+        ('WordPress', 'html', 'wp-includes/'),
+        ('Shopify', 'html', 'cdn.shopify.com'),
+        ('Wix', 'html', 'static.wixstatic.com'),
+        ('Squarespace', 'html', 'squarespace.com'),
+        ('Webflow', 'html', 'webflow.js'),
+        ('Joomla', 'html', '/media/jui/'),
+        ('Drupal', 'html', 'drupal-settings-json'),
+        ('Next.js', 'html', '__next_data__'),
+        ('React', 'html', 'data-reactroot'),
+        ('Angular', 'html', 'ng-version'),
+        ('Vue.js', 'html', 'data-v-app'),
+        ('jQuery', 'html', 'jquery'),
+        ('Bootstrap', 'html', 'bootstrap'),
+        ('Google Analytics', 'html', 'googletagmanager.com'),
+        ('PHP', 'headers', 'php'),
+        ('ASP.NET', 'headers', 'asp.net'),
+        ('Express', 'headers', 'express'),
+        ('Nginx', 'headers', 'nginx'),
+        ('Apache', 'headers', 'apache'),
+        ('Cloudflare', 'headers', 'cloudflare'),
+        ('LiteSpeed', 'headers', 'litespeed'),
+    ]
+    
+    def __init__(self, timeout: int = 10, max_workers: int = 8, per_host_limit: int = 2,
+                 cache_ttl: int = 24 * 3600, error_cache_ttl: int = 600, cache=None,
+                 max_bytes: int = 2 * 1024 * 1024, allowed_hosts=()):
+        """
+        Initialize website scanner.
+        
+        Args:
+            timeout: Request timeout in seconds
+            max_workers: Concurrent scans in scan_websites()
+            per_host_limit: Concurrent scans per host
+            cache_ttl: Seconds a scan result is reused for the same URL
+            error_cache_ttl: Seconds an HTTP 4xx result is reused (5xx is never cached)
+            cache: CacheManager for scan results (defaults to the global cache)
+            max_bytes: Bytes of a page read at most (the rest is not downloaded)
+            allowed_hosts: Hostnames scanned even though they resolve to a
+                private address (e.g. an intranet site); all others must be public
+        """
+        from src.cache_manager import get_cache
+        
+        self.timeout = timeout
+        self.max_workers = max_workers
+        self.per_host_limit = per_host_limit
+        self.cache_ttl = cache_ttl
+        self.error_cache_ttl = error_cache_ttl
+        self.cache = cache or get_cache()
+        self.max_bytes = max_bytes
+        self.allowed_hosts = {host.lower() for host in allowed_hosts}
+        
+        self.session = requests.Session()
+        self.session.headers.update({
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+        })
+        adapter = requests.adapters.HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        
+        self._host_slots = {}
+        self._lock = threading.Lock()
         logger.info("Website scanner initialized")
     
-    def scan_website(self, url: str) -> Dict:
-        """Scan website and generate analysis"""
-        # In production, use requests + BeautifulSoup + SEO tools
+    def _host_slot(self, url: str) -> threading.BoundedSemaphore:
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            if host not in self._host_slots:
+                self._host_slots[host] = threading.BoundedSemaphore(self.per_host_limit)
+            return self._host_slots[host]
+    
+    def _check_address(self, url: str):
+        """
+        Raise BlockedURLError unless url is http(s) and its host resolves only
+        to public addresses (or is in allowed_hosts).
+        """
+        parsed = urlparse(url)
+        host = (parsed.hostname or '').lower()
+        if parsed.scheme not in ('http', 'https') or not host:
+            raise BlockedURLError(f"Not a website URL: {url}")
+        if host in self.allowed_hosts:
+            return
+        
+        port = parsed.port or (443 if parsed.scheme == 'https' else 80)
+        for *_, sockaddr in socket.getaddrinfo(host, port, proto=socket.IPPROTO_TCP):
+            address = ipaddress.ip_address(sockaddr[0].split('%')[0])
+            if address.version == 6 and address.ipv4_mapped:
+                address = address.ipv4_mapped
+            if not address.is_global or address.is_multicast:
+                raise BlockedURLError(f"{host} resolves to non-public address {address}")
+    
+    def _fetch(self, url: str):
+        """GET url, following redirects here so every hop's address is checked"""
+        for _ in range(self.MAX_REDIRECTS + 1):
+            self._check_address(url)
+            response = self.session.get(url, timeout=self.timeout, stream=True, allow_redirects=False)
+            if not response.is_redirect:
+                return response
+            response.close()
+            url = urljoin(url, response.headers['Location'])
+        raise requests.TooManyRedirects(f"More than {self.MAX_REDIRECTS} redirects")
+    
+    def _read(self, response) -> bytes:
+        """Body of a streamed response, at most max_bytes of it"""
+        content = bytearray()
+        try:
+            for chunk in response.iter_content(64 * 1024):
+                content += chunk
+                if len(content) >= self.max_bytes:
+                    break
+        finally:
+            response.close()
+        return bytes(content[:self.max_bytes])
+    
+    def _cache_key(self, url: str) -> str:
+        return f"website_scan:{self._normalize(url)}"
+    
+    @staticmethod
+    def _normalize(url: str) -> str:
+        return url if url.startswith(('http://', 'https://')) else f"https://{url}"
+    
+    def cached_scan(self, url: str) -> Optional[Dict]:
+        """A recent scan_website() result for url, or None (never fetches)"""
+        return self.cache.get(self._cache_key(url)) or None
+    
+    def scan_website(self, url: str, use_cache: bool = True) -> Dict:
+        """
+        Scan website and generate analysis.
+        
+        Only public addresses are fetched (redirects included) and at most
+        max_bytes of the page is read.
+        
+        Args:
+            url: Website URL (scheme optional)
+            use_cache: Reuse a recent scan of the same URL
+        
+        Returns:
+            Dict with 'success' and 'analysis' (speed, SEO checks, tech stack, issues)
+        """
+        url = self._normalize(url)
+        cache_key = self._cache_key(url)
+        if use_cache:
+            cached = self.cache.get(cache_key)
+            if cached:
+                return cached
+        
         logger.info(f"Scanning website: {url}")
         
-        # Mock analysis
-        analysis = {
+        with self._host_slot(url):
+            try:
+                started = time.perf_counter()
+                response = self._fetch(url)
+                ttfb = time.perf_counter() - started
+                content = self._read(response)
+                load_time = time.perf_counter() - started
+            except Exception as e:
+                logger.warning(f"Website scan failed for {url}: {e}")
+                return {
+                    'success': False,
+                    'error': str(e),
+                    'analysis': self._offline_analysis(url)
+                }
+        
+        analysis = self._analyze(url, response, content, ttfb, load_time)
+        result = {'success': True, 'analysis': analysis}
+        if response.status_code < 400:
+            self.cache.set(cache_key, result, ttl=self.cache_ttl)
+        elif response.status_code < 500:
+            self.cache.set(cache_key, result, ttl=self.error_cache_ttl)
+        # 5xx is usually transient - rescan next time
+        return result
+    
+    def scan_websites(self, urls: List[str], use_cache: bool = True) -> Dict[str, Dict]:
+        """
+        Scan many websites concurrently (per-host limits and timeouts apply).
+        
+        Args:
+            urls: Website URLs (duplicates are scanned once)
+            use_cache: Reuse recent scans
+        
+        Returns:
+            Dict mapping each URL to its scan_website() result
+        """
+        unique = list(dict.fromkeys(u for u in urls if u))
+        if not unique:
+            return {}
+        
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            results = pool.map(lambda u: self.scan_website(u, use_cache=use_cache), unique)
+            return dict(zip(unique, results))
+    
+    def _analyze(self, url: str, response, content: bytes, ttfb: float, load_time: float) -> Dict:
+        """Turn one fetched page into speed, SEO and tech-stack findings"""
+        html = content.decode(response.encoding or 'utf-8', errors='replace')
+        soup = BeautifulSoup(html, 'html.parser')
+        
+        description = soup.find('meta', attrs={'name': 'description'})
+        has_meta_description = bool(description and description.get('content', '').strip())
+        mobile_friendly = soup.find('meta', attrs={'name': 'viewport'}) is not None
+        has_ssl = response.url.startswith('https://')
+        has_structured_data = bool(soup.find('script', attrs={'type': 'application/ld+json'})
+                                   or soup.find(attrs={'itemscope': True}))
+        title = soup.title.get_text(strip=True) if soup.title else ''
+        
+        images = soup.find_all('img')
+        with_alt = sum(1 for img in images if img.get('alt', '').strip())
+        alt_coverage = round(with_alt / len(images), 2) if images else 1.0
+        
+        issues = []
+        opportunities = []
+        if response.status_code >= 400:
+            issues.append(f"Website returns HTTP {response.status_code}")
+        if load_time > self.SLOW_LOAD_SECONDS:
+            issues.append(f"Slow load time ({load_time:.1f}s)")
+            opportunities.append('Improve page speed')
+        if ttfb > self.SLOW_TTFB_SECONDS:
+            issues.append(f"Slow server response ({ttfb:.1f}s to first byte)")
+        if not has_ssl:
+            issues.append('No SSL (site not served over HTTPS)')
+        if not has_meta_description:
+            issues.append('No meta description')
+        if not mobile_friendly:
+            issues.append('Not mobile optimized')
+            opportunities.append('Optimize for mobile')
+        if alt_coverage < 0.8:
+            issues.append(f"Missing alt tags on images ({int(alt_coverage * 100)}% covered)")
+        if not has_structured_data:
+            issues.append('No structured data')
+        if not title:
+            issues.append('Missing page title')
+        
+        opportunities.extend([
+            'Add blog for content marketing',
+            'Implement live chat',
+            'Add customer testimonials'
+        ])
+        
+        # Start from 100 and deduct per failed check
+        seo_score = 100
+        seo_score -= 20 if not has_meta_description else 0
+        seo_score -= 15 if not mobile_friendly else 0
+        seo_score -= 15 if not has_ssl else 0
+        seo_score -= 10 if not has_structured_data else 0
+        seo_score -= 10 if not title else 0
+        seo_score -= int(10 * (1 - alt_coverage))
+        seo_score -= 10 if load_time > self.SLOW_LOAD_SECONDS else 0
+        seo_score -= 10 if response.status_code >= 400 else 0
+        
+        return {
             'url': url,
-            'status': 'online',
-            'load_time': 2.5,
-            'mobile_friendly': False,
-            'has_ssl': True,
-            'seo_score': 65,
-            'issues': [
-                'No meta description',
-                'Slow load time (>2s)',
-                'Not mobile optimized',
-                'Missing alt tags on images',
-                'No structured data'
-            ],
-            'opportunities': [
-                'Add blog for content marketing',
-                'Implement live chat',
-                'Add customer testimonials',
-                'Optimize for mobile',
-                'Improve page speed'
-            ],
-            'tech_stack': ['WordPress', 'PHP', 'MySQL'],
-            'estimated_traffic': 5000,
-            'estimated_revenue_increase': '30-50%'
+            'final_url': response.url,
+            'status': 'online' if response.status_code < 400 else 'error',
+            'status_code': response.status_code,
+            'ttfb': round(ttfb, 3),
+            'load_time': round(load_time, 3),
+            'page_size_kb': round(len(content) / 1024, 1),
+            'mobile_friendly': mobile_friendly,
+            'has_ssl': has_ssl,
+            'has_meta_description': has_meta_description,
+            'has_structured_data': has_structured_data,
+            'alt_coverage': alt_coverage,
+            'title': title,
+            'seo_score': max(seo_score, 0),
+            'issues': issues,
+            'opportunities': opportunities,
+            'tech_stack': self._detect_tech_stack(response.headers, html),
+            'estimated_revenue_increase': '30-50%' if len(issues) >= 4 else '20-30%' if issues else '10-20%',
+            'scanned_at': datetime.now().isoformat()
         }
+    
+    def _detect_tech_stack(self, headers, html: str) -> List[str]:
+        """Match response headers and HTML against known technology signatures"""
+        header_text = ' '.join(
+            headers.get(name, '') for name in ('Server', 'X-Powered-By', 'X-AspNet-Version', 'Set-Cookie')
+        ).lower()
+        if 'phpsessid' in header_text:
+            header_text += ' php'
+        html_text = html.lower()
         
+        stack = []
+        for tech, source, signature in self.TECH_SIGNATURES:
+            text = html_text if source == 'html' else header_text
+            if signature in text and tech not in stack:
+                stack.append(tech)
+        return stack
+    
+    def _offline_analysis(self, url: str) -> Dict:
         return {
-            'success': True,
-            'analysis': analysis
+            'url': url,
+            'status': 'offline',
+            'load_time': None,
+            'mobile_friendly': False,
+            'has_ssl': False,
+            'seo_score': 0,
+            'issues': ['Website unreachable'],
+            'opportunities': ['Build a reliable, fast website'],
+            'tech_stack': [],
+            'estimated_revenue_increase': '30-50%'
         }
     
     def generate_personalized_pitch(self, analysis: Dict, business_name: str) -> str:
@@ -423,8 +703,8 @@ def create_whitelabel_manager():
 def create_linkedin_integration():
     return LinkedInIntegration()
 
-def create_website_scanner():
-    return WebsiteScanner()
+def create_website_scanner(**kwargs):
+    return WebsiteScanner(**kwargs)
 
 def create_multichannel_outreach():
     return MultiChannelOutreach()
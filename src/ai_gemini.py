@@ -1,17 +1,42 @@
 """FREE AI integration using Google Gemini for pitch generation."""
 
 import logging
-import google.generativeai as genai
+import threading
 import time
+from datetime import datetime
+from typing import Callable, Dict, Iterator, Optional
 
 logger = logging.getLogger(__name__)
 
 
+class StreamInterrupted(Exception):
+    """A streamed generation failed after part of the text was sent"""
+    pass
+
+
+def _genai():
+    """google.generativeai, imported on first use (it takes ~0.6s to import)"""
+    import google.generativeai as genai
+    return genai
+
+
 class GeminiAI:
     """FREE AI assistant using Google Gemini."""
     
-    def __init__(self, api_key: str):
-        """Initialize Gemini AI with API key."""
+    def __init__(self, api_key: str, model=None):
+        """
+        Initialize Gemini AI with API key.
+        
+        Args:
+            api_key: Google Gemini API key
+            model: Already configured model to use (the client registry passes
+                   its shared one; configure() is then skipped)
+        """
+        if model is not None:
+            self.model = model
+            return
+        
+        genai = _genai()
         try:
             genai.configure(api_key=api_key)
             # Use gemini-2.5-flash for latest and fastest model
@@ -27,23 +52,9 @@ class GeminiAI:
                 logger.error("❌ All Gemini models failed to initialize")
                 self.model = None
     
-    def generate_cold_email(self, business_name: str, business_type: str, 
-                           city: str, rating: float, reviews: int, owner_name: str = None, custom_prompt: str = None) -> str:
-        """
-        Generate personalized cold email using professional template or custom prompt.
-        
-        Args:
-            business_name: Name of the business
-            business_type: Type/category of business
-            city: City location
-            rating: Google rating
-            reviews: Number of reviews
-            owner_name: Owner name (optional, defaults to "Team")
-            custom_prompt: Custom AI prompt template (NEW - optional)
-        
-        Returns:
-            Personalized email content
-        """
+    def _cold_email_prompt(self, business_name: str, business_type: str, city: str,
+                           rating: float, reviews: int, owner_name: str = None, custom_prompt: str = None) -> str:
+        """Prompt for a cold email (custom template with placeholders, or the default one)"""
         # Use owner name or default
         owner = owner_name if owner_name else f"{business_name} Team"
         
@@ -150,7 +161,28 @@ Track Record:
 - Contact: +918700048490 | raghav@ragspro.com
 
 Write ONLY the email body (no subject line):"""
-
+        return prompt
+    
+    def generate_cold_email(self, business_name: str, business_type: str, 
+                           city: str, rating: float, reviews: int, owner_name: str = None, custom_prompt: str = None) -> str:
+        """
+        Generate personalized cold email using professional template or custom prompt.
+        
+        Args:
+            business_name: Name of the business
+            business_type: Type/category of business
+            city: City location
+            rating: Google rating
+            reviews: Number of reviews
+            owner_name: Owner name (optional, defaults to "Team")
+            custom_prompt: Custom AI prompt template (NEW - optional)
+        
+        Returns:
+            Personalized email content
+        """
+        prompt = self._cold_email_prompt(business_name, business_type, city, rating, reviews,
+                                         owner_name, custom_prompt)
+        
         # Retry logic with exponential backoff
         max_retries = 3
         for attempt in range(max_retries):
@@ -161,7 +193,7 @@ Write ONLY the email body (no subject line):"""
                 
                 response = self.model.generate_content(
                     prompt,
-                    generation_config=genai.types.GenerationConfig(
+                    generation_config=_genai().types.GenerationConfig(
                         temperature=0.7,
                         max_output_tokens=500,
                     ),
@@ -239,7 +271,7 @@ Write ONLY the complete call script (150-200 words):"""
                 
                 response = self.model.generate_content(
                     prompt,
-                    generation_config=genai.types.GenerationConfig(temperature=0.7, max_output_tokens=400),
+                    generation_config=_genai().types.GenerationConfig(temperature=0.7, max_output_tokens=400),
                     request_options={'timeout': 30}
                 )
                 script = response.text.strip()
@@ -286,17 +318,8 @@ CLOSING:
 📧 Email: ragsproai@gmail.com
 🌐 Portfolio: ragspro.com"""
     
-    def generate_whatsapp_message(self, business_name: str, business_type: str) -> str:
-        """
-        Generate WhatsApp intro message using Gemini AI.
-        
-        Args:
-            business_name: Name of the business
-            business_type: Type/category of business
-        
-        Returns:
-            WhatsApp message text
-        """
+    def _whatsapp_prompt(self, business_name: str, business_type: str) -> str:
+        """Prompt for a WhatsApp intro message"""
         prompt = f"""You are Raghav Shah from Ragspro.com - premium software development agency. Write a SHORT WhatsApp message (80-90 words) that gets response.
 
 Business: {business_name} ({business_type})
@@ -334,7 +357,21 @@ Examples of GOOD style:
 - "Want a FREE roadmap? Reply YES ✅"
 
 Write the message:"""
-
+        return prompt
+    
+    def generate_whatsapp_message(self, business_name: str, business_type: str) -> str:
+        """
+        Generate WhatsApp intro message using Gemini AI.
+        
+        Args:
+            business_name: Name of the business
+            business_type: Type/category of business
+        
+        Returns:
+            WhatsApp message text
+        """
+        prompt = self._whatsapp_prompt(business_name, business_type)
+        
         # Retry logic
         max_retries = 3
         for attempt in range(max_retries):
@@ -344,7 +381,7 @@ Write the message:"""
                 
                 response = self.model.generate_content(
                     prompt,
-                    generation_config=genai.types.GenerationConfig(temperature=0.7, max_output_tokens=300),
+                    generation_config=_genai().types.GenerationConfig(temperature=0.7, max_output_tokens=300),
                     request_options={'timeout': 30}
                 )
                 message = response.text.strip()
@@ -357,6 +394,71 @@ Write the message:"""
                 else:
                     return self._fallback_whatsapp(business_name, business_type)
     
+    def stream_text(self, prompt: str, fallback: Callable[[], str], temperature: float = 0.7,
+                    max_output_tokens: int = 500) -> Iterator[str]:
+        """
+        Stream a generation as text chunks (generate_content(stream=True)).
+        
+        Retries with backoff until the first chunk arrives; if every attempt
+        fails (or there is no model) the fallback text is yielded instead.
+        
+        Raises:
+            StreamInterrupted: If the stream fails after chunks were yielded
+        """
+        max_retries = 3
+        for attempt in range(max_retries):
+            if self.model is None:
+                logger.warning("⚠️ Model not initialized, using fallback")
+                yield fallback()
+                return
+            
+            produced = False
+            try:
+                response = self.model.generate_content(
+                    prompt,
+                    generation_config=_genai().types.GenerationConfig(
+                        temperature=temperature,
+                        max_output_tokens=max_output_tokens,
+                    ),
+                    request_options={'timeout': 30},
+                    stream=True
+                )
+                for chunk in response:
+                    try:
+                        text = chunk.text
+                    except ValueError:
+                        continue  # Chunk without text parts (e.g. finish reason only)
+                    if text:
+                        produced = True
+                        yield text
+                if produced:
+                    return
+                raise ValueError("Empty response")
+            except Exception as e:
+                if produced:
+                    raise StreamInterrupted(str(e)) from e
+                logger.warning(f"⚠️ Stream attempt {attempt + 1}/{max_retries} failed: {str(e)[:100]}")
+                if attempt < max_retries - 1:
+                    time.sleep(2 ** attempt)
+        
+        logger.error("❌ All stream attempts failed, using fallback")
+        yield fallback()
+    
+    def stream_cold_email(self, business_name: str, business_type: str, city: str,
+                          rating: float, reviews: int, owner_name: str = None,
+                          custom_prompt: str = None) -> Iterator[str]:
+        """generate_cold_email(), yielding the email as it is generated"""
+        prompt = self._cold_email_prompt(business_name, business_type, city, rating, reviews,
+                                         owner_name, custom_prompt)
+        return self.stream_text(prompt, lambda: self._fallback_email(business_name, business_type, rating, reviews),
+                                max_output_tokens=500)
+    
+    def stream_whatsapp_message(self, business_name: str, business_type: str) -> Iterator[str]:
+        """generate_whatsapp_message(), yielding the message as it is generated"""
+        prompt = self._whatsapp_prompt(business_name, business_type)
+        return self.stream_text(prompt, lambda: self._fallback_whatsapp(business_name, business_type),
+                                max_output_tokens=300)
+    
     def analyze_business(self, business_name: str, business_type: str, 
                         rating: float, reviews: int, address: str) -> str:
         """
@@ -410,7 +512,8 @@ Keep it short and actionable."""
             'service': 'outdated website and poor SEO'
         }
         
-        problem = problems.get(business_type.lower().split()[0], 'limited online presence')
+        words = (business_type or '').lower().split()
+        problem = problems.get(words[0] if words else '', 'limited online presence')
         
         return f"""Hi,
 
@@ -472,7 +575,8 @@ Connect with me:
             'service': 'weak online presence - not getting leads'
         }
         
-        problem = problems.get(business_type.lower().split()[0], 'limited digital presence')
+        words = (business_type or '').lower().split()
+        problem = problems.get(words[0] if words else '', 'limited digital presence')
         
         return f"""Hey! 👋 Raghav from RagsPro.com (Delhi)
 
@@ -502,3 +606,222 @@ def create_ai_assistant(api_key: str) -> GeminiAI:
         GeminiAI instance
     """
     return GeminiAI(api_key)
+
+
+# Preferred model first; later ones are used when the health probe fails it
+MODEL_NAMES = ('gemini-2.5-flash', 'gemini-1.5-flash')
+
+
+class TimedModel:
+    """GenerativeModel wrapper that records each call's latency in the registry"""
+    
+    def __init__(self, model, name: str, registry: 'GeminiClientRegistry'):
+        self._model = model
+        self.name = name
+        self._registry = registry
+    
+    def generate_content(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = self._model.generate_content(*args, **kwargs)
+        except Exception:
+            self._registry.record(self.name, time.perf_counter() - started, error=True)
+            raise
+        if kwargs.get('stream'):
+            return self._timed_stream(response, started)
+        self._registry.record(self.name, time.perf_counter() - started)
+        return response
+    
+    def _timed_stream(self, response, started: float):
+        """Iterate a streamed response, recording the latency once it is consumed"""
+        try:
+            for chunk in response:
+                yield chunk
+        except Exception:
+            self._registry.record(self.name, time.perf_counter() - started, error=True)
+            raise
+        self._registry.record(self.name, time.perf_counter() - started)
+    
+    def __getattr__(self, name):
+        return getattr(self._model, name)
+
+
+class GeminiClientRegistry:
+    """
+    Process-wide Gemini clients.
+    
+    genai.configure() is global and resets the SDK's cached transport, so it
+    runs once per API key here instead of once per request; models are built
+    once and shared, which keeps the underlying connection open between
+    requests. A background warm-up imports the SDK, opens the connection with
+    a cheap count_tokens probe and falls back to the next model if the
+    preferred one is unhealthy.
+    """
+    
+    def __init__(self, model_names=MODEL_NAMES, probe_timeout: float = 10.0):
+        self.model_names = tuple(model_names)
+        self.probe_timeout = probe_timeout
+        self.lock = threading.RLock()
+        
+        self._api_key = None
+        self._models = {}  # model name -> TimedModel
+        self._assistants = {}  # api key -> GeminiAI
+        self._health = {}  # model name -> {'healthy', 'checked_at', 'probe_ms', 'error'}
+        self._latency = {}  # model name -> call counters
+        self._warmup = None
+        self._warmed_key = None
+    
+    def _configure(self, api_key: str):
+        """Point the SDK at api_key (caller holds the lock); a new key drops old clients"""
+        if api_key == self._api_key:
+            return
+        _genai().configure(api_key=api_key)
+        self._api_key = api_key
+        self._models.clear()
+        self._assistants.clear()
+    
+    def _model(self, name: str) -> TimedModel:
+        if name not in self._models:
+            self._models[name] = TimedModel(_genai().GenerativeModel(name), name, self)
+        return self._models[name]
+    
+    def _preferred_model(self) -> str:
+        """First model not known to be unhealthy (the last one if all are)"""
+        for name in self.model_names:
+            if self._health.get(name, {}).get('healthy', True):
+                return name
+        return self.model_names[-1]
+    
+    def get_assistant(self, api_key: str) -> GeminiAI:
+        """
+        Shared assistant for an API key, using the preferred healthy model.
+        
+        Returns:
+            GeminiAI instance reused across requests
+        """
+        with self.lock:
+            try:
+                self._configure(api_key)
+                if api_key not in self._assistants:
+                    self._assistants[api_key] = GeminiAI(api_key, model=self._model(self._preferred_model()))
+                return self._assistants[api_key]
+            except Exception as e:
+                logger.error(f"❌ Failed to initialize shared Gemini client: {e}")
+                return GeminiAI(api_key)
+    
+    def probe(self, api_key: str) -> Optional[str]:
+        """
+        Check models in preference order with count_tokens until one answers.
+        
+        Returns:
+            Name of the healthy model now in use, or None if none answered
+        """
+        with self.lock:
+            self._configure(api_key)
+        
+        healthy = None
+        for name in self.model_names:
+            with self.lock:
+                model = self._model(name)
+            started = time.perf_counter()
+            try:
+                model.count_tokens('ping', request_options={'timeout': self.probe_timeout})
+                result = {'healthy': True, 'error': None}
+            except Exception as e:
+                result = {'healthy': False, 'error': str(e)[:200]}
+            result.update(checked_at=datetime.now().isoformat(),
+                          probe_ms=round((time.perf_counter() - started) * 1000, 1))
+            
+            with self.lock:
+                self._health[name] = result
+            if result['healthy']:
+                healthy = name
+                break
+            logger.warning(f"⚠️ Gemini model {name} failed health probe: {result['error']}")
+        
+        with self.lock:
+            if self._api_key == api_key:
+                # Point existing assistants at the model that answered
+                model = self._model(self._preferred_model())
+                for assistant in self._assistants.values():
+                    assistant.model = model
+        if healthy:
+            logger.info(f"✅ Gemini warmed up - using {healthy}")
+        return healthy
+    
+    def warm_up(self, api_key: str) -> threading.Thread:
+        """Probe in the background (once per key); returns the warm-up thread"""
+        with self.lock:
+            if self._warmup is not None and (self._warmup.is_alive() or self._warmed_key == api_key):
+                return self._warmup
+            self._warmed_key = api_key
+            self._warmup = threading.Thread(target=self._warm_up, args=(api_key,),
+                                            name='gemini-warmup', daemon=True)
+            self._warmup.start()
+            return self._warmup
+    
+    def _warm_up(self, api_key: str):
+        try:
+            self.probe(api_key)
+        except Exception as e:
+            logger.error(f"❌ Gemini warm-up failed: {e}")
+    
+    def record(self, name: str, seconds: float, error: bool = False):
+        """Add one call's latency to a model's counters"""
+        ms = seconds * 1000
+        with self.lock:
+            stats = self._latency.setdefault(name, {'calls': 0, 'errors': 0, 'total_ms': 0.0,
+                                                    'max_ms': 0.0, 'last_ms': 0.0})
+            stats['calls'] += 1
+            stats['errors'] += int(error)
+            stats['total_ms'] += ms
+            stats['max_ms'] = max(stats['max_ms'], ms)
+            stats['last_ms'] = ms
+    
+    def get_stats(self) -> Dict:
+        """Model in use, per-model health and call latency"""
+        with self.lock:
+            models = {}
+            for name in self.model_names:
+                latency = self._latency.get(name, {'calls': 0, 'errors': 0, 'total_ms': 0.0,
+                                                   'max_ms': 0.0, 'last_ms': 0.0})
+                models[name] = {
+                    **self._health.get(name, {'healthy': None}),
+                    'calls': latency['calls'],
+                    'errors': latency['errors'],
+                    'avg_ms': round(latency['total_ms'] / latency['calls'], 1) if latency['calls'] else None,
+                    'max_ms': round(latency['max_ms'], 1),
+                    'last_ms': round(latency['last_ms'], 1),
+                }
+            return {
+                'configured': self._api_key is not None,
+                'active_model': self._preferred_model(),
+                'warming_up': bool(self._warmup and self._warmup.is_alive()),
+                'models': models,
+            }
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_client_registry() -> GeminiClientRegistry:
+    """Shared Gemini client registry"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = GeminiClientRegistry()
+        return _registry
+
+
+def get_ai_assistant(api_key: str) -> GeminiAI:
+    """
+    Shared Gemini AI assistant for an API key, built on first use.
+    
+    Args:
+        api_key: Google Gemini API key
+    
+    Returns:
+        GeminiAI instance reused across requests
+    """
+    return get_client_registry().get_assistant(api_key)
@@ -3,9 +3,13 @@ User Authentication System - LEVEL 3
 JWT-based authentication with role-based access control
 """
 
+import hashlib
 import logging
+import threading
+import time
 import jwt
 import bcrypt
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from functools import wraps
 from flask import request, jsonify
@@ -18,6 +22,112 @@ SECRET_KEY = "ragspro_secret_key_2024_change_in_production"
 ALGORITHM = "HS256"
 TOKEN_EXPIRY_HOURS = 24
 
+# Verified tokens kept (LRU) so repeat requests skip signature checks
+TOKEN_CACHE_SIZE = 10000
+# Seconds a looked-up user record is reused before hitting the database again
+USER_CACHE_TTL_SECONDS = 60
+
+
+class _TokenCache:
+    """LRU of verified token payloads keyed by token hash; entries die at the token's expiry"""
+    
+    def __init__(self, max_size: int = TOKEN_CACHE_SIZE):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'expired': 0}
+    
+    @staticmethod
+    def key(token: str) -> str:
+        # Hash so raw bearer tokens never sit in memory longer than the request
+        return hashlib.sha256(token.encode('utf-8')).hexdigest()
+    
+    def get(self, token: str):
+        """(payload, expired): payload is None on a miss"""
+        key = self.key(token)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.stats['misses'] += 1
+                return None, False
+            payload, expires_at = entry
+            if expires_at <= time.time():
+                del self.entries[key]
+                self.stats['expired'] += 1
+                return None, True
+            self.entries.move_to_end(key)
+            self.stats['hits'] += 1
+            return payload, False
+    
+    def put(self, token: str, payload: dict):
+        expires_at = payload.get('exp')
+        if expires_at is None:
+            return  # Never cache tokens without an expiry
+        with self.lock:
+            self.entries[self.key(token)] = (payload, float(expires_at))
+            self.entries.move_to_end(self.key(token))
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+    
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.stats = dict.fromkeys(self.stats, 0)
+
+
+class _UserCache:
+    """Short-TTL cache of (detached) User records by id"""
+    
+    def __init__(self, ttl: float = USER_CACHE_TTL_SECONDS):
+        self.ttl = ttl
+        self.entries = {}
+        self.lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'invalidations': 0}
+    
+    def get(self, user_id: int):
+        with self.lock:
+            entry = self.entries.get(user_id)
+            if entry is None or entry[1] <= time.monotonic():
+                self.entries.pop(user_id, None)
+                self.stats['misses'] += 1
+                return None
+            self.stats['hits'] += 1
+            return entry[0]
+    
+    def put(self, user_id: int, user):
+        with self.lock:
+            self.entries[user_id] = (user, time.monotonic() + self.ttl)
+    
+    def invalidate(self, user_id: int):
+        with self.lock:
+            if self.entries.pop(user_id, None) is not None:
+                self.stats['invalidations'] += 1
+    
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.stats = dict.fromkeys(self.stats, 0)
+
+
+# Shared by every AuthManager (require_auth creates one per request)
+_token_cache = _TokenCache()
+_user_cache = _UserCache()
+
+
+def get_auth_cache_stats() -> dict:
+    """Hit/miss counters and sizes of the token and user caches"""
+    with _token_cache.lock, _user_cache.lock:
+        return {
+            'tokens': {**_token_cache.stats, 'size': len(_token_cache.entries)},
+            'users': {**_user_cache.stats, 'size': len(_user_cache.entries)},
+        }
+
+
+def clear_auth_caches():
+    """Drop all cached tokens and users and reset their counters"""
+    _token_cache.clear()
+    _user_cache.clear()
+
 
 class AuthManager:
     """Manage user authentication and authorization"""
@@ -136,9 +246,16 @@ class AuthManager:
         return token
     
     def verify_token(self, token: str) -> dict:
-        """Verify JWT token"""
+        """Verify JWT token (cached until the token expires)"""
+        payload, expired = _token_cache.get(token)
+        if payload is not None:
+            return {'success': True, 'payload': payload}
+        if expired:
+            return {'error': 'Token expired'}
+        
         try:
             payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+            _token_cache.put(token, payload)
             return {'success': True, 'payload': payload}
         except jwt.ExpiredSignatureError:
             return {'error': 'Token expired'}
@@ -152,9 +269,17 @@ class AuthManager:
         if 'error' in result:
             return None
         
+        user_id = result['payload']['user_id']
+        user = _user_cache.get(user_id)
+        if user is not None:
+            return user
+        
         session = get_db()
         try:
-            user = session.query(User).get(result['payload']['user_id'])
+            user = session.get(User, user_id)
+            if user is not None:
+                # Detached after close; loaded attributes stay readable
+                _user_cache.put(user_id, user)
             return user
         finally:
             session.close()
@@ -175,6 +300,7 @@ class AuthManager:
                     setattr(user, field, updates[field])
             
             session.commit()
+            _user_cache.invalidate(user_id)
             
             return {'success': True, 'message': 'User updated'}
             
@@ -200,6 +326,7 @@ class AuthManager:
             # Hash new password
             user.password_hash = self.hash_password(new_password)
             session.commit()
+            _user_cache.invalidate(user_id)
             
             return {'success': True, 'message': 'Password changed'}
             
@@ -0,0 +1,272 @@
+"""
+Browser Pool - Reusable headless Chrome sessions for scraping
+Keeps browsers warm across queries, loads several pages at once in tabs,
+waits on page conditions instead of fixed sleeps, and recycles browsers after N pages
+"""
+
+import atexit
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Marks the current document so a finished navigation can be told apart from the old page
+_MARK_STALE = "window.__browserPoolStale = true; window.location.href = arguments[0];"
+_PAGE_READY = "return !window.__browserPoolStale && document.readyState === 'complete';"
+
+
+def create_headless_chrome():
+    """Start a headless Chrome WebDriver (requires selenium + Chrome)"""
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+    
+    chrome_options = Options()
+    chrome_options.add_argument('--headless=new')
+    chrome_options.add_argument('--no-sandbox')
+    chrome_options.add_argument('--disable-dev-shm-usage')
+    chrome_options.add_argument('--blink-settings=imagesEnabled=false')
+    return webdriver.Chrome(options=chrome_options)
+
+
+class _BrowserSession:
+    """A running browser, its open tabs and pages served"""
+    
+    def __init__(self, driver):
+        self.driver = driver
+        self.tabs = [driver.current_window_handle]
+        self.pages_loaded = 0
+    
+    def ensure_tabs(self, count: int) -> List[str]:
+        while len(self.tabs) < count:
+            self.driver.switch_to.new_window('tab')
+            self.tabs.append(self.driver.current_window_handle)
+        return self.tabs[:count]
+
+
+class BrowserPool:
+    """Thread-safe pool of headless browser sessions with tab-level parallelism"""
+    
+    def __init__(self, max_browsers: int = 2, tabs_per_browser: int = 3,
+                 recycle_after: int = 50, page_timeout: int = 10,
+                 driver_factory: Optional[Callable] = None):
+        """
+        Initialize browser pool.
+        
+        Args:
+            max_browsers: Max concurrent browser processes
+            tabs_per_browser: Pages loaded in parallel per browser
+            recycle_after: Restart a browser after this many pages (bounds memory growth)
+            page_timeout: Seconds to wait for a page (and its wait_for selector)
+            driver_factory: Callable returning a new WebDriver (default: headless Chrome)
+        """
+        self.max_browsers = max_browsers
+        self.tabs_per_browser = tabs_per_browser
+        self.recycle_after = recycle_after
+        self.page_timeout = page_timeout
+        self.driver_factory = driver_factory or create_headless_chrome
+        
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(max_browsers)
+        self._lock = threading.Lock()
+        self.stats = {
+            'browsers_started': 0,
+            'browsers_recycled': 0,
+            'pages_loaded': 0,
+            'page_errors': 0,
+        }
+        
+        logger.info(f"Browser pool initialized (max {max_browsers} browsers x {tabs_per_browser} tabs)")
+    
+    def _bump(self, key: str, amount: int = 1):
+        with self._lock:
+            self.stats[key] += amount
+    
+    def _quit(self, session: _BrowserSession):
+        try:
+            session.driver.quit()
+        except Exception as e:
+            logger.debug(f"Error closing browser: {e}")
+    
+    @contextmanager
+    def session(self):
+        """Lease a warm browser (starting one if none is idle)"""
+        self._slots.acquire()
+        session = None
+        try:
+            try:
+                session = self._idle.get_nowait()
+            except queue.Empty:
+                session = _BrowserSession(self.driver_factory())
+                self._bump('browsers_started')
+            yield session
+        except Exception:
+            # A browser that errored outside page loads may be wedged; don't reuse it
+            if session is not None:
+                self._quit(session)
+                session = None
+            raise
+        finally:
+            if session is not None:
+                if session.pages_loaded >= self.recycle_after:
+                    self._quit(session)
+                    self._bump('browsers_recycled')
+                else:
+                    self._idle.put(session)
+            self._slots.release()
+    
+    def _load_tabs(self, session: _BrowserSession, urls: List[str],
+                   extract: Callable[[Any], Any], wait_for: Optional[str]) -> List[Any]:
+        """Start every URL in its own tab, then collect each once it is ready"""
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support.ui import WebDriverWait
+        from selenium.webdriver.support import expected_conditions as EC
+        
+        driver = session.driver
+        handles = session.ensure_tabs(len(urls))
+        
+        # Navigation is asynchronous, so all tabs load concurrently
+        for handle, url in zip(handles, urls):
+            driver.switch_to.window(handle)
+            driver.execute_script(_MARK_STALE, url)
+        
+        results = []
+        for handle, url in zip(handles, urls):
+            driver.switch_to.window(handle)
+            try:
+                wait = WebDriverWait(driver, self.page_timeout)
+                wait.until(lambda d: d.execute_script(_PAGE_READY))
+                if wait_for:
+                    wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, wait_for)))
+                results.append(extract(driver))
+            except Exception as e:
+                logger.warning(f"Browser page failed for {url}: {e}")
+                self._bump('page_errors')
+                results.append(None)
+            session.pages_loaded += 1
+            self._bump('pages_loaded')
+        
+        return results
+    
+    def fetch_pages(self, urls: List[str], extract: Callable[[Any], Any],
+                    wait_for: Optional[str] = None) -> List[Any]:
+        """
+        Load pages across the pool and run extract(driver) on each.
+        
+        Args:
+            urls: Page URLs
+            extract: Called with the driver switched to the loaded tab
+            wait_for: CSS selector that must be present before extract runs
+        
+        Returns:
+            extract() results in URL order (None for pages that failed)
+        """
+        batches = [urls[i:i + self.tabs_per_browser] for i in range(0, len(urls), self.tabs_per_browser)]
+        
+        def run(batch):
+            with self.session() as session:
+                return self._load_tabs(session, batch, extract, wait_for)
+        
+        if len(batches) == 1:
+            return run(batches[0])
+        
+        with ThreadPoolExecutor(max_workers=self.max_browsers) as workers:
+            return [result for batch in workers.map(run, batches) for result in batch]
+    
+    def fetch_page(self, url: str, extract: Callable[[Any], Any], wait_for: Optional[str] = None) -> Any:
+        """Load a single page on a warm browser (see fetch_pages)"""
+        return self.fetch_pages([url], extract, wait_for)[0]
+    
+    def close(self):
+        """Quit all idle browsers"""
+        while True:
+            try:
+                self._quit(self._idle.get_nowait())
+            except queue.Empty:
+                break
+    
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return dict(self.stats)
+
+
+def benchmark(pool: BrowserPool, fixture_url: str, pages: int = 30,
+              extract: Optional[Callable[[Any], Any]] = None,
+              wait_for: Optional[str] = None) -> Dict:
+    """
+    Measure pool throughput by scraping a local static HTML fixture repeatedly.
+    
+    Args:
+        pool: BrowserPool to measure
+        fixture_url: file:// or http://localhost URL of the fixture
+        pages: Number of page loads
+        extract: Extraction run per page (default: page title)
+        wait_for: CSS selector to wait for
+    
+    Returns:
+        Dict with pages, seconds, pages_per_second and pool stats
+    """
+    extract = extract or (lambda driver: driver.title)
+    
+    # Warm up one browser so start-up cost isn't counted
+    pool.fetch_page(fixture_url, extract, wait_for)
+    
+    started = time.perf_counter()
+    results = pool.fetch_pages([fixture_url] * pages, extract, wait_for)
+    elapsed = time.perf_counter() - started
+    
+    return {
+        'pages': pages,
+        'succeeded': sum(1 for r in results if r is not None),
+        'seconds': round(elapsed, 2),
+        'pages_per_second': round(pages / elapsed, 2) if elapsed else 0.0,
+        'stats': pool.get_stats(),
+    }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_browser_pool(**options) -> BrowserPool:
+    """Shared browser pool (options apply only when it is first created)"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = BrowserPool(**options)
+        return _pool
+
+
+def close_browser_pools():
+    """Quit the shared pool's browsers (registered at exit)"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+
+atexit.register(close_browser_pools)
+
+
+if __name__ == "__main__":
+    # Benchmark mode: python src/browser_pool.py [fixture.html] [pages]
+    import sys
+    from pathlib import Path
+    
+    logging.basicConfig(level=logging.INFO)
+    fixture = Path(sys.argv[1] if len(sys.argv) > 1 else
+                   Path(__file__).resolve().parent.parent / 'tests' / 'fixtures' / 'maps_results.html')
+    pages = int(sys.argv[2]) if len(sys.argv) > 2 else 30
+    
+    pool = BrowserPool()
+    try:
+        report = benchmark(pool, fixture.resolve().as_uri(), pages, wait_for="div[role='feed']")
+    finally:
+        pool.close()
+    print(f"{report['pages']} pages in {report['seconds']}s: {report['pages_per_second']} pages/sec")
+    print(report['stats'])
@@ -1,9 +1,15 @@
 """Configuration module for Lead Generation Bot."""
 
 import json
+import logging
 import os
+import threading
+import time
 from pathlib import Path
-from typing import Any
+from types import MappingProxyType
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
 
 
 class ConfigurationError(Exception):
@@ -11,36 +17,45 @@ class ConfigurationError(Exception):
     pass
 
 
-def load_config(config_path: str = "config/settings.json") -> dict[str, Any]:
-    """
-    Load configuration from environment variables (priority) or JSON file (fallback).
-    
-    Args:
-        config_path: Path to the configuration JSON file (fallback)
-        
-    Returns:
-        Dictionary containing all configuration values
-        
-    Raises:
-        ConfigurationError: If configuration is missing or incomplete
-    """
-    # Start with empty config
-    config = {}
-    
-    # Try to load from JSON file (fallback)
-    if os.path.exists(config_path):
-        try:
-            with open(config_path, 'r') as f:
-                config = json.load(f)
-        except json.JSONDecodeError as e:
-            raise ConfigurationError(f"Invalid JSON in {config_path}: {str(e)}")
-        except Exception as e:
-            raise ConfigurationError(f"Failed to read {config_path}: {str(e)}")
-    
-    # Load JSON file
+# Environment variables that override the JSON file
+ENV_KEYS = [
+    "SERPAPI_KEY", "GEMINI_API_KEY", "GMAIL_ADDRESS", "GMAIL_APP_PASSWORD",
+    "GOOGLE_SHEET_ID", "GOOGLE_SERVICE_ACCOUNT_JSON",
+    "MIN_RATING", "MIN_REVIEWS", "MAX_LEADS_PER_RUN",
+    "SECRET_KEY", "DATABASE_URL", "RATE_LIMIT_ENABLED", "RATE_LIMIT_PER_MINUTE"
+]
+NUMERIC_KEYS = ["MIN_RATING", "MIN_REVIEWS", "MAX_LEADS_PER_RUN", "RATE_LIMIT_PER_MINUTE"]
+
+# Define required fields
+REQUIRED_FIELDS = {
+    "MIN_RATING": (int, float),
+    "MIN_REVIEWS": int,
+    "MAX_LEADS_PER_RUN": int
+}
+
+# Optional but recommended fields
+OPTIONAL_FIELDS = {
+    "SERPAPI_KEY": str,
+    "GEMINI_API_KEY": str,
+    "GMAIL_ADDRESS": str,
+    "GMAIL_APP_PASSWORD": str,
+    "GOOGLE_SHEET_ID": str,
+    "GOOGLE_SERVICE_ACCOUNT_JSON": str,
+    "SECRET_KEY": str,
+    "DATABASE_URL": str
+}
+
+
+def _read_config_file(config_path: str) -> dict[str, Any]:
+    """Parse the JSON configuration file (once)."""
     try:
         with open(config_path, 'r') as f:
-            config = json.load(f)
+            return json.load(f)
+    except FileNotFoundError:
+        raise ConfigurationError(
+            f"Configuration file not found: {config_path}\n"
+            f"Copy config/settings.example.json to {config_path} and fill it in"
+        )
     except json.JSONDecodeError as e:
         raise ConfigurationError(
             f"Invalid JSON syntax in configuration file: {config_path}\n"
@@ -51,65 +66,33 @@ def load_config(config_path: str = "config/settings.json") -> dict[str, Any]:
             f"Failed to read configuration file: {config_path}\n"
             f"Error: {str(e)}"
         )
-    
-    # Priority: Environment variables override JSON config
-    # Load all environment variables
-    env_keys = [
-        "SERPAPI_KEY", "GEMINI_API_KEY", "GMAIL_ADDRESS", "GMAIL_APP_PASSWORD",
-        "GOOGLE_SHEET_ID", "GOOGLE_SERVICE_ACCOUNT_JSON",
-        "MIN_RATING", "MIN_REVIEWS", "MAX_LEADS_PER_RUN",
-        "SECRET_KEY", "DATABASE_URL", "RATE_LIMIT_ENABLED", "RATE_LIMIT_PER_MINUTE"
-    ]
-    
-    for key in env_keys:
+
+
+def _apply_env_overrides(config: dict[str, Any]) -> dict[str, Any]:
+    """Priority: Environment variables override JSON config."""
+    for key in ENV_KEYS:
         env_value = os.getenv(key)
-        if env_value is not None:
-            # Convert numeric values
-            if key in ["MIN_RATING", "MIN_REVIEWS", "MAX_LEADS_PER_RUN", "RATE_LIMIT_PER_MINUTE"]:
-                try:
-                    config[key] = float(env_value) if '.' in env_value else int(env_value)
-                except ValueError:
-                    pass
-            elif key == "RATE_LIMIT_ENABLED":
-                config[key] = env_value.lower() in ['true', '1', 'yes']
-            else:
-                config[key] = env_value
-    
-    # Define required fields
-    required_fields = {
-        "MIN_RATING": (int, float),
-        "MIN_REVIEWS": int,
-        "MAX_LEADS_PER_RUN": int
-    }
-    
-    # Optional but recommended fields
-    optional_fields = {
-        "SERPAPI_KEY": str,
-        "GEMINI_API_KEY": str,
-        "GMAIL_ADDRESS": str,
-        "GMAIL_APP_PASSWORD": str,
-        "GOOGLE_SHEET_ID": str,
-        "GOOGLE_SERVICE_ACCOUNT_JSON": str,
-        "SECRET_KEY": str,
-        "DATABASE_URL": str
-    }
-    
-    # Validate required fields
-    for field, expected_type in required_fields.items():
-        # Check environment variable first
-        env_value = os.getenv(field)
-        if env_value is not None:
-            # Try to convert env value to appropriate type
-            if expected_type == int or expected_type == (int, float):
-                try:
-                    config[field] = int(env_value) if '.' not in env_value else float(env_value)
-                except ValueError:
+        if env_value is None:
+            continue
+        # Convert numeric values
+        if key in NUMERIC_KEYS:
+            try:
+                config[key] = float(env_value) if '.' in env_value else int(env_value)
+            except ValueError:
+                if key in REQUIRED_FIELDS:
                     raise ConfigurationError(
-                        f"Invalid value for {field} in environment variable: {env_value}"
+                        f"Invalid value for {key} in environment variable: {env_value}"
                     )
-            else:
-                config[field] = env_value
-        
+        elif key == "RATE_LIMIT_ENABLED":
+            config[key] = env_value.lower() in ['true', '1', 'yes']
+        else:
+            config[key] = env_value
+    return config
+
+
+def _validate(config: dict[str, Any], config_path: str) -> dict[str, Any]:
+    """Check required fields and ranges, and default optional fields to None."""
+    for field, expected_type in REQUIRED_FIELDS.items():
         # Check if field exists in config
         if field not in config:
             raise ConfigurationError(
@@ -126,15 +109,9 @@ def load_config(config_path: str = "config/settings.json") -> dict[str, Any]:
                 f"Expected {expected_type}, got {type(value).__name__}"
             )
     
-    # Load optional fields
-    for field, expected_type in optional_fields.items():
-        # Check environment variable first
-        env_value = os.getenv(field)
-        if env_value is not None:
-            config[field] = env_value
-        # If not in config, set to None
-        if field not in config:
-            config[field] = None
+    # If not in config, set to None
+    for field in OPTIONAL_FIELDS:
+        config.setdefault(field, None)
     
     # Additional validation
     if config["MIN_RATING"] < 0 or config["MIN_RATING"] > 5:
@@ -155,16 +132,156 @@ def load_config(config_path: str = "config/settings.json") -> dict[str, Any]:
     return config
 
 
-# Global configuration (loaded on import)
-_config = None
+def load_config(config_path: str = "config/settings.json") -> dict[str, Any]:
+    """
+    Load configuration from environment variables (priority) or JSON file (fallback).
+    
+    Parses the file on every call; request handlers should use get_settings().
+    
+    Args:
+        config_path: Path to the configuration JSON file (fallback)
+        
+    Returns:
+        Dictionary containing all configuration values
+        
+    Raises:
+        ConfigurationError: If configuration is missing or incomplete
+    """
+    config = _read_config_file(config_path)
+    return _validate(_apply_env_overrides(config), config_path)
+
+
+def _freeze(value: Any) -> Any:
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _thaw(value: Any) -> Any:
+    if isinstance(value, MappingProxyType):
+        return {k: _thaw(v) for k, v in value.items()}
+    if isinstance(value, tuple):
+        return [_thaw(v) for v in value]
+    return value
+
+
+class Settings:
+    """
+    Validated, read-only configuration.
+    
+    Supports the dict-style access existing callers use (settings['KEY'],
+    settings.get('KEY')) plus typed attributes for the common fields.
+    """
+    
+    __slots__ = ('_values', 'path', 'mtime')
+    
+    def __init__(self, values: dict[str, Any], path: Optional[str] = None, mtime: Optional[float] = None):
+        object.__setattr__(self, '_values', _freeze(dict(values)))
+        object.__setattr__(self, 'path', path)
+        object.__setattr__(self, 'mtime', mtime)
+    
+    def __setattr__(self, name, value):
+        raise AttributeError("Settings are read-only")
+    
+    def __getitem__(self, key: str) -> Any:
+        return self._values[key]
+    
+    def __contains__(self, key: str) -> bool:
+        return key in self._values
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        return self._values.get(key, default)
+    
+    def as_dict(self) -> dict[str, Any]:
+        """Mutable copy, shaped like load_config()'s result"""
+        return _thaw(self._values)
+    
+    @property
+    def serpapi_key(self) -> Optional[str]:
+        return self._values.get('SERPAPI_KEY')
+    
+    @property
+    def gemini_api_key(self) -> Optional[str]:
+        return self._values.get('GEMINI_API_KEY')
+    
+    @property
+    def min_rating(self) -> float:
+        return self._values['MIN_RATING']
+    
+    @property
+    def min_reviews(self) -> int:
+        return self._values['MIN_REVIEWS']
+    
+    @property
+    def max_leads_per_run(self) -> int:
+        return self._values['MAX_LEADS_PER_RUN']
+    
+    def __repr__(self):
+        return f"Settings(path={self.path!r}, keys={sorted(self._values)})"
+
+
+# How often get_settings() looks at the file's mtime
+RELOAD_CHECK_INTERVAL = 1.0
+
+_settings = {}  # config_path -> Settings
+_settings_checked = {}  # config_path -> monotonic time of the last mtime check
+_settings_lock = threading.Lock()
+
+
+def _file_mtime(config_path: str) -> Optional[float]:
+    try:
+        return os.path.getmtime(config_path)
+    except OSError:
+        return None
+
+
+def get_settings(config_path: str = "config/settings.json") -> Settings:
+    """
+    Process-wide settings, loaded once and reloaded when the file changes.
+    
+    Environment overrides are applied when the file is (re)loaded, not per
+    call, and the file's mtime is checked at most every RELOAD_CHECK_INTERVAL
+    seconds, so per-request access is a dict lookup.
+    
+    If a reload fails (bad edit), the previous settings stay in use.
+    
+    Raises:
+        ConfigurationError: If the first load fails
+    """
+    now = time.monotonic()
+    settings = _settings.get(config_path)
+    if settings is not None and now - _settings_checked.get(config_path, 0) < RELOAD_CHECK_INTERVAL:
+        return settings
+    
+    with _settings_lock:
+        settings = _settings.get(config_path)
+        mtime = _file_mtime(config_path)
+        if settings is None or mtime != settings.mtime:
+            try:
+                settings = Settings(load_config(config_path), config_path, mtime)
+                if config_path in _settings:
+                    logger.info(f"Reloaded configuration from {config_path}")
+                _settings[config_path] = settings
+            except ConfigurationError as e:
+                if settings is None:
+                    raise
+                logger.error(f"Keeping previous configuration, reload failed: {e}")
+        _settings_checked[config_path] = now
+        return settings
+
+
+def reset_settings():
+    """Drop cached settings (tests, or after changing environment overrides)"""
+    with _settings_lock:
+        _settings.clear()
+        _settings_checked.clear()
 
 
 def get_config() -> dict[str, Any]:
     """Get the loaded configuration."""
-    global _config
-    if _config is None:
-        _config = load_config()
-    return _config
+    return get_settings().as_dict()
 
 
 # Export configuration constants
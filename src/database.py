@@ -5,8 +5,8 @@ Supports both SQLite (dev) and PostgreSQL (production)
 
 import os
 from datetime import datetime
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, Boolean, Text, ForeignKey, JSON
-from sqlalchemy.orm import declarative_base, sessionmaker, relationship, scoped_session
+from sqlalchemy import create_engine, event, inspect, text, UniqueConstraint, Column, Integer, String, Float, DateTime, Boolean, Text, ForeignKey, JSON
+from sqlalchemy.orm import declarative_base, sessionmaker, relationship, scoped_session, selectinload, joinedload
 from contextlib import contextmanager
 import logging
 
@@ -92,7 +92,7 @@ class FollowUp(Base):
     sequence_number = Column(Integer, default=1)  # 1st, 2nd, 3rd follow-up
     scheduled_at = Column(DateTime, nullable=False)
     sent_at = Column(DateTime)
-    status = Column(String(50), default='Pending')  # Pending, Sent, Skipped
+    status = Column(String(50), default='Pending')  # Pending, Sent, Skipped, Failed
     
     channel = Column(String(50))  # Email, WhatsApp, SMS
     subject = Column(String(500))
@@ -104,6 +104,11 @@ class FollowUp(Base):
     reply_content = Column(Text)
     reply_sentiment = Column(String(50))  # Positive, Neutral, Negative
     
+    # Dispatcher lease (set while a worker is sending this follow-up)
+    claimed_by = Column(String(64), index=True)
+    lease_expires_at = Column(DateTime)
+    attempts = Column(Integer, default=0)  # Failed sends so far
+    
     created_at = Column(DateTime, default=datetime.utcnow)
     
     # Relationships
@@ -130,6 +135,8 @@ class Interaction(Base):
     # AI Classification
     sentiment = Column(String(50))  # Positive, Neutral, Negative
     intent = Column(String(50))  # Interested, NotNow, Budget, SendDetails, Spam
+    classification_method = Column(String(20))  # ai, ai_fallback, model, keyword, fallback, human
+    classification_confidence = Column(Float)
     
     created_at = Column(DateTime, default=datetime.utcnow)
     
@@ -209,6 +216,41 @@ class Campaign(Base):
     created_by = Column(Integer)  # User ID (for multi-user support)
 
 
+class ABAssignment(Base):
+    """Variant assigned to a lead within an A/B test"""
+    __tablename__ = 'ab_assignments'
+    __table_args__ = (UniqueConstraint('test_id', 'lead_id', name='uq_ab_assignment_test_lead'),)
+    
+    id = Column(Integer, primary_key=True)
+    test_id = Column(Integer, ForeignKey('campaigns.id'), nullable=False, index=True)
+    lead_id = Column(Integer, ForeignKey('leads.id'), nullable=False, index=True)
+    
+    variant = Column(String(10), nullable=False)  # A, B
+    replied = Column(Boolean, default=False)
+    
+    assigned_at = Column(DateTime, default=datetime.utcnow)
+    replied_at = Column(DateTime)
+
+
+class ABTestStats(Base):
+    """Running totals and sequential-test state per A/B test (updated per event)"""
+    __tablename__ = 'ab_test_stats'
+    
+    test_id = Column(Integer, ForeignKey('campaigns.id'), primary_key=True)
+    
+    assigned_a = Column(Integer, default=0)
+    assigned_b = Column(Integer, default=0)
+    replied_a = Column(Integer, default=0)
+    replied_b = Column(Integer, default=0)
+    
+    # SPRT log-likelihood ratios ("A beats B" / "B beats A")
+    llr_a = Column(Float, default=0.0)
+    llr_b = Column(Float, default=0.0)
+    decision = Column(String(50))  # Variant A, Variant B, No clear winner
+    
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
 class Template(Base):
     """Email/WhatsApp templates"""
     __tablename__ = 'templates'
@@ -270,6 +312,54 @@ class User(Base):
     last_login_at = Column(DateTime)
 
 
+class Usage(Base):
+    """Metered usage per user, month and metric (leads, emails, ai_requests)"""
+    __tablename__ = 'usage'
+    __table_args__ = (UniqueConstraint('user_id', 'period', 'metric', name='uq_usage_user_period_metric'),)
+    
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False, index=True)
+    period = Column(String(7), nullable=False)  # YYYY-MM
+    metric = Column(String(50), nullable=False)
+    count = Column(Integer, default=0, nullable=False)
+    
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class GenerationRun(Base):
+    """Lead generation run with a per-query checkpoint so it can resume after a restart"""
+    __tablename__ = 'generation_runs'
+    
+    id = Column(Integer, primary_key=True)
+    status = Column(String(50), default='running', index=True)  # running, completed, stopped, failed, interrupted
+    message = Column(Text)
+    
+    # Request parameters and the planned queries (query, city, category)
+    parameters = Column(JSON)
+    queries = Column(JSON)
+    
+    # Checkpoint: queries[:completed_queries] are done
+    completed_queries = Column(Integer, default=0)
+    searches = Column(Integer, default=0)
+    errors = Column(Integer, default=0)
+    places_found = Column(Integer, default=0)
+    leads_found = Column(Integer, default=0)
+    results = Column(JSON)  # Premium leads found so far
+    
+    # Seconds spent searching (excludes time the run was down between resumes)
+    active_seconds = Column(Float, default=0.0)
+    resumes = Column(Integer, default=0)
+    
+    # Who started the run (None for the anonymous dashboard) and which process executes it
+    user_id = Column(Integer, index=True)
+    worker = Column(String(255))  # host:pid
+    heartbeat_at = Column(DateTime)  # Refreshed at every checkpoint
+    
+    started_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    finished_at = Column(DateTime)
+
+
 # Database Connection Management
 
 class DatabaseManager:
@@ -298,8 +388,24 @@ class DatabaseManager:
     def create_tables(self):
         """Create all tables"""
         Base.metadata.create_all(self.engine)
+        self._add_missing_columns()
         logger.info("Database tables created")
     
+    def _add_missing_columns(self):
+        """Add nullable columns introduced after a table was created (create_all skips existing tables)"""
+        inspector = inspect(self.engine)
+        with self.engine.begin() as conn:
+            for table in Base.metadata.sorted_tables:
+                if not inspector.has_table(table.name):
+                    continue
+                existing = {column['name'] for column in inspector.get_columns(table.name)}
+                for column in table.columns:
+                    if column.name in existing or not column.nullable:
+                        continue
+                    column_type = column.type.compile(dialect=self.engine.dialect)
+                    conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+                    logger.info(f"Added column {table.name}.{column.name}")
+    
     def drop_tables(self):
         """Drop all tables (use with caution!)"""
         Base.metadata.drop_all(self.engine)
@@ -343,6 +449,50 @@ def get_db():
     return db_manager.get_session()
 
 
+# Query helpers
+
+def eager_load(query, *relationships, joined: bool = False):
+    """
+    Attach eager-loading options so related rows arrive with the parent query.
+    
+    Args:
+        query: SQLAlchemy query to extend
+        relationships: Relationship attributes to load (e.g. FollowUp.lead)
+        joined: Use a single JOIN (many-to-one) instead of one SELECT ... IN per relationship
+    
+    Returns:
+        Query with loader options applied
+    """
+    loader = joinedload if joined else selectinload
+    return query.options(*(loader(rel) for rel in relationships))
+
+
+@contextmanager
+def count_queries(engine=None):
+    """
+    Count SQL statements executed on an engine inside the block.
+    
+    Yields a dict with 'count' and 'statements' that is updated live,
+    so tests can assert a bounded number of round trips per call.
+    """
+    if engine is None:
+        if db_manager is None:
+            init_database()
+        engine = db_manager.engine
+    
+    counter = {'count': 0, 'statements': []}
+    
+    def _before_execute(conn, cursor, statement, parameters, context, executemany):
+        counter['count'] += 1
+        counter['statements'].append(statement)
+    
+    event.listen(engine, 'before_cursor_execute', _before_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, 'before_cursor_execute', _before_execute)
+
+
 # Migration utilities
 
 def migrate_json_to_db(json_file='data/premium_leads.json'):
@@ -5,8 +5,11 @@ Provides RagsPro solutions for each company
 """
 
 import logging
+import threading
 import time
-from typing import Dict, List, Optional
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, List
 import json
 
 logger = logging.getLogger(__name__)
@@ -15,10 +18,31 @@ logger = logging.getLogger(__name__)
 class DeepResearchEngine:
     """Deep research engine for company analysis"""
     
-    def __init__(self, ai_assistant=None):
+    # Max seconds an AI insight waits for the Gemini rate limiter
+    RATE_LIMIT_WAIT = 60
+    
+    def __init__(self, ai_assistant=None, rate_limiter=None, rate_limit_wait=None):
+        """
+        Args:
+            ai_assistant: Gemini assistant for AI insights (None: rules only)
+            rate_limiter: Limiter for the 'gemini' service (default the global one)
+            rate_limit_wait: Max seconds an insight waits for a Gemini slot
+                (default RATE_LIMIT_WAIT; 0 never waits, the insight is skipped)
+        """
         self.ai = ai_assistant
+        self._limiter = rate_limiter
+        self.rate_limit_wait = self.RATE_LIMIT_WAIT if rate_limit_wait is None else rate_limit_wait
+        self.ai_calls = 0  # Gemini requests made (for usage metering)
+        self._calls_lock = threading.Lock()
         logger.info("Deep Research Engine initialized")
     
+    @property
+    def limiter(self):
+        if self._limiter is None:
+            from src.rate_limiter import get_rate_limiter
+            self._limiter = get_rate_limiter()
+        return self._limiter
+    
     def analyze_company(self, lead: Dict) -> Dict:
         """
         Deep analysis of a company
@@ -29,42 +53,78 @@ class DeepResearchEngine:
         Returns:
             Dict with detailed analysis and RagsPro solutions
         """
+        analysis = self._analyze_rules(lead)
+        
+        # Add AI-generated insights if available
+        if self.ai and 'error' not in analysis:
+            analysis['ai_insights'] = self._get_ai_insights(lead, analysis)
+        
+        return analysis
+    
+    def analyze_companies(self, leads: Iterable[Dict], max_workers: int = 4) -> Iterator[Dict]:
+        """
+        Deep analysis of many companies.
+        
+        Rule-based analysis runs inline from one feature extraction per lead;
+        AI insights are fetched concurrently under the Gemini rate limiter.
+        Results are yielded in input order as they become ready, so a large
+        batch never has to be held in memory.
+        
+        Args:
+            leads: Lead dicts (any iterable, consumed lazily)
+            max_workers: Concurrent AI insight requests
+            
+        Yields:
+            Analysis dict per lead (same shape as analyze_company)
+        """
+        window = max(1, max_workers) * 2
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+            pending = deque()
+            for lead in leads:
+                analysis = self._analyze_rules(lead)
+                future = None
+                if self.ai and 'error' not in analysis:
+                    future = pool.submit(self._get_ai_insights, lead, analysis)
+                pending.append((analysis, future))
+                
+                if len(pending) >= window:
+                    yield self._finish(*pending.popleft())
+            
+            while pending:
+                yield self._finish(*pending.popleft())
+    
+    @staticmethod
+    def _finish(analysis: Dict, future) -> Dict:
+        if future is not None:
+            analysis['ai_insights'] = future.result()
+        return analysis
+    
+    def _analyze_rules(self, lead: Dict) -> Dict:
+        """Run every rule-based analyzer over one shared feature extraction"""
         try:
             logger.info(f"🔍 Analyzing: {lead.get('title', 'Unknown')}")
-            
-            # Extract company info
-            company_name = lead.get('title', '')
-            business_type = lead.get('type', '')
-            address = lead.get('address', '')
-            website = lead.get('website', '')
-            rating = lead.get('rating', 0)
-            reviews = lead.get('reviews', 0)
-            phone = lead.get('phone', '')
+            features = self._extract_features(lead)
             
             # Analyze different aspects
             analysis = {
-                'company_name': company_name,
-                'business_type': business_type,
-                'location': address,
+                'company_name': features['company_name'],
+                'business_type': features['business_type'],
+                'location': lead.get('address', ''),
                 'contact': {
-                    'phone': phone,
-                    'website': website
+                    'phone': features['phone'],
+                    'website': features['website']
                 },
-                'online_presence': self._analyze_online_presence(lead),
-                'business_health': self._analyze_business_health(lead),
-                'pain_points': self._identify_pain_points(lead),
-                'opportunities': self._identify_opportunities(lead),
-                'ragspro_solutions': self._generate_ragspro_solutions(lead),
-                'estimated_budget': self._estimate_budget(lead),
-                'priority_score': self._calculate_priority(lead),
-                'next_steps': self._suggest_next_steps(lead)
+                'online_presence': self._analyze_online_presence(features),
+                'business_health': self._analyze_business_health(features),
+                'pain_points': self._identify_pain_points(features),
+                'opportunities': self._identify_opportunities(features),
+                'ragspro_solutions': self._generate_ragspro_solutions(features),
+                'estimated_budget': self._estimate_budget(features),
+                'priority_score': self._calculate_priority(features),
+                'next_steps': self._suggest_next_steps(features)
             }
             
-            # Add AI-generated insights if available
-            if self.ai:
-                analysis['ai_insights'] = self._get_ai_insights(lead, analysis)
-            
-            logger.info(f"✅ Analysis complete for {company_name}")
+            logger.info(f"✅ Analysis complete for {features['company_name']}")
             return analysis
             
         except Exception as e:
@@ -74,16 +134,45 @@ class DeepResearchEngine:
                 'company_name': lead.get('title', 'Unknown')
             }
     
-    def _analyze_online_presence(self, lead: Dict) -> Dict:
-        """Analyze company's online presence"""
+    @staticmethod
+    def _tier(value: float, thresholds) -> int:
+        """Number of thresholds reached (thresholds ascending)"""
+        return sum(1 for threshold in thresholds if value >= threshold)
+    
+    def _extract_features(self, lead: Dict) -> Dict:
+        """Read the lead once and precompute the signals every analyzer shares"""
         website = lead.get('website', '')
-        rating = lead.get('rating', 0)
-        reviews = lead.get('reviews', 0)
+        business_type = lead.get('type', '') or ''
+        rating = lead.get('rating', 0) or 0
+        reviews = lead.get('reviews', 0) or 0
+        quality_score = lead.get('quality_score', 0) or 0
+        type_lower = business_type.lower()
         
-        presence = {
+        return {
+            'company_name': lead.get('title', ''),
+            'business_type': business_type,
+            'phone': lead.get('phone', ''),
+            'website': website,
+            'rating': rating,
+            'reviews': reviews,
+            'quality_score': quality_score,
+            # 'None' strings come from exported sheets
             'has_website': bool(website and website != 'None'),
-            'google_rating': rating,
-            'google_reviews': reviews,
+            'website_missing': not website,
+            'outdated_website': bool(website) and ('old' in website.lower() or 'blogspot' in website.lower()),
+            'rating_tier': self._tier(rating, (3.5, 4.0, 4.5)),
+            'review_tier': self._tier(reviews, (50, 100, 200)),
+            'quality_tier': self._tier(quality_score, (70, 80, 90)),
+            'restaurant_or_retail': 'restaurant' in type_lower or 'retail' in type_lower,
+            'shop': 'shop' in type_lower,
+        }
+    
+    def _analyze_online_presence(self, features: Dict) -> Dict:
+        """Analyze company's online presence"""
+        presence = {
+            'has_website': features['has_website'],
+            'google_rating': features['rating'],
+            'google_reviews': features['reviews'],
             'social_media': {
                 'instagram': 'Unknown',  # Would need API
                 'facebook': 'Unknown',
@@ -97,15 +186,10 @@ class DeepResearchEngine:
         score = 0
         if presence['has_website']:
             score += 30
-        if rating >= 4.0:
+        if features['rating_tier'] >= 2:
             score += 20
-        if reviews >= 50:
-            score += 20
-        if reviews >= 100:
-            score += 10
-        if reviews >= 200:
-            score += 10
-        if rating >= 4.5:
+        score += (0, 20, 30, 40)[features['review_tier']]
+        if features['rating_tier'] >= 3:
             score += 10
         
         presence['score'] = min(score, 100)
@@ -113,42 +197,20 @@ class DeepResearchEngine:
         
         return presence
     
-    def _analyze_business_health(self, lead: Dict) -> Dict:
+    def _analyze_business_health(self, features: Dict) -> Dict:
         """Analyze business health indicators"""
-        rating = lead.get('rating', 0)
-        reviews = lead.get('reviews', 0)
-        quality_score = lead.get('quality_score', 0)
-        
         health = {
-            'rating': rating,
-            'reviews': reviews,
-            'quality_score': quality_score,
+            'rating': features['rating'],
+            'reviews': features['reviews'],
+            'quality_score': features['quality_score'],
             'health_score': 0,
             'status': 'Unknown'
         }
         
         # Calculate health score
-        score = 0
-        if rating >= 4.5:
-            score += 40
-        elif rating >= 4.0:
-            score += 30
-        elif rating >= 3.5:
-            score += 20
-        
-        if reviews >= 200:
-            score += 30
-        elif reviews >= 100:
-            score += 20
-        elif reviews >= 50:
-            score += 10
-        
-        if quality_score >= 90:
-            score += 30
-        elif quality_score >= 80:
-            score += 20
-        elif quality_score >= 70:
-            score += 10
+        score = (0, 20, 30, 40)[features['rating_tier']]
+        score += (0, 10, 20, 30)[features['review_tier']]
+        score += (0, 10, 20, 30)[features['quality_tier']]
         
         health['health_score'] = min(score, 100)
         
@@ -164,30 +226,26 @@ class DeepResearchEngine:
         
         return health
     
-    def _identify_pain_points(self, lead: Dict) -> List[str]:
+    def _identify_pain_points(self, features: Dict) -> List[str]:
         """Identify potential pain points"""
         pain_points = []
         
-        website = lead.get('website', '')
-        rating = lead.get('rating', 0)
-        reviews = lead.get('reviews', 0)
-        
         # Website issues
-        if not website or website == 'None':
+        if not features['has_website']:
             pain_points.append("❌ No website - Missing online presence")
-        elif 'old' in website.lower() or 'blogspot' in website.lower():
+        elif features['outdated_website']:
             pain_points.append("⚠️ Outdated website - Needs modernization")
         
         # Rating issues
-        if rating < 4.0:
-            pain_points.append(f"⚠️ Low rating ({rating}/5) - Reputation management needed")
+        if features['rating_tier'] < 2:
+            pain_points.append(f"⚠️ Low rating ({features['rating']}/5) - Reputation management needed")
         
         # Review issues
-        if reviews < 50:
+        if features['review_tier'] == 0:
             pain_points.append("⚠️ Few reviews - Need review generation strategy")
         
         # Digital presence
-        if not website:
+        if features['website_missing']:
             pain_points.append("❌ No digital marketing - Missing online visibility")
         
         # Mobile presence
@@ -198,27 +256,22 @@ class DeepResearchEngine:
         
         return pain_points
     
-    def _identify_opportunities(self, lead: Dict) -> List[str]:
+    def _identify_opportunities(self, features: Dict) -> List[str]:
         """Identify business opportunities"""
         opportunities = []
         
-        website = lead.get('website', '')
-        rating = lead.get('rating', 0)
-        reviews = lead.get('reviews', 0)
-        business_type = lead.get('type', '')
-        
         # Website opportunities
-        if not website:
+        if features['website_missing']:
             opportunities.append("🌐 Build professional website - Increase credibility & leads")
         else:
             opportunities.append("🚀 Website optimization - Improve SEO & conversions")
         
         # Mobile app
-        if 'restaurant' in business_type.lower() or 'retail' in business_type.lower():
+        if features['restaurant_or_retail']:
             opportunities.append("📱 Mobile app - Online ordering & loyalty program")
         
         # E-commerce
-        if not website or 'shop' in business_type.lower():
+        if features['website_missing'] or features['shop']:
             opportunities.append("🛒 E-commerce platform - Sell online 24/7")
         
         # Marketing
@@ -231,18 +284,13 @@ class DeepResearchEngine:
         opportunities.append("📊 Analytics dashboard - Data-driven decisions")
         
         # Customer engagement
-        if reviews < 100:
+        if features['review_tier'] < 2:
             opportunities.append("💬 Review generation - Build trust & credibility")
         
         return opportunities
     
-    def _generate_ragspro_solutions(self, lead: Dict) -> Dict:
+    def _generate_ragspro_solutions(self, features: Dict) -> Dict:
         """Generate specific RagsPro solutions"""
-        website = lead.get('website', '')
-        business_type = lead.get('type', '')
-        rating = lead.get('rating', 0)
-        reviews = lead.get('reviews', 0)
-        
         solutions = {
             'immediate': [],
             'short_term': [],
@@ -251,7 +299,7 @@ class DeepResearchEngine:
         }
         
         # Immediate solutions (1-2 weeks)
-        if not website:
+        if features['website_missing']:
             solutions['immediate'].append({
                 'title': '🌐 Professional Website',
                 'description': 'Modern, mobile-responsive website with SEO',
@@ -286,7 +334,7 @@ class DeepResearchEngine:
         })
         
         # Long-term solutions (3-6 months)
-        if 'restaurant' in business_type.lower() or 'retail' in business_type.lower():
+        if features['restaurant_or_retail']:
             solutions['long_term'].append({
                 'title': '📱 Mobile App',
                 'description': 'iOS + Android app for ordering & loyalty',
@@ -313,34 +361,10 @@ class DeepResearchEngine:
         
         return solutions
     
-    def _estimate_budget(self, lead: Dict) -> Dict:
+    def _estimate_budget(self, features: Dict) -> Dict:
         """Estimate company's potential budget"""
-        rating = lead.get('rating', 0)
-        reviews = lead.get('reviews', 0)
-        quality_score = lead.get('quality_score', 0)
-        
         # Calculate budget tier
-        score = 0
-        if rating >= 4.5:
-            score += 3
-        elif rating >= 4.0:
-            score += 2
-        elif rating >= 3.5:
-            score += 1
-        
-        if reviews >= 200:
-            score += 3
-        elif reviews >= 100:
-            score += 2
-        elif reviews >= 50:
-            score += 1
-        
-        if quality_score >= 90:
-            score += 3
-        elif quality_score >= 80:
-            score += 2
-        elif quality_score >= 70:
-            score += 1
+        score = features['rating_tier'] + features['review_tier'] + features['quality_tier']
         
         # Determine budget tier
         if score >= 7:
@@ -366,48 +390,28 @@ class DeepResearchEngine:
             'score': score
         }
     
-    def _calculate_priority(self, lead: Dict) -> int:
+    def _calculate_priority(self, features: Dict) -> int:
         """Calculate lead priority (0-100)"""
-        quality_score = lead.get('quality_score', 0)
-        rating = lead.get('rating', 0)
-        reviews = lead.get('reviews', 0)
-        website = lead.get('website', '')
-        
-        priority = quality_score * 0.4  # 40% weight
-        
-        if rating >= 4.5:
-            priority += 20
-        elif rating >= 4.0:
-            priority += 15
-        elif rating >= 3.5:
-            priority += 10
-        
-        if reviews >= 200:
-            priority += 20
-        elif reviews >= 100:
-            priority += 15
-        elif reviews >= 50:
-            priority += 10
+        priority = features['quality_score'] * 0.4  # 40% weight
+        priority += (0, 10, 15, 20)[features['rating_tier']]
+        priority += (0, 10, 15, 20)[features['review_tier']]
         
-        if not website or website == 'None':
+        if not features['has_website']:
             priority += 20  # Higher priority - more opportunity
         
         return min(int(priority), 100)
     
-    def _suggest_next_steps(self, lead: Dict) -> List[str]:
+    def _suggest_next_steps(self, features: Dict) -> List[str]:
         """Suggest next steps for outreach"""
         steps = []
         
-        phone = lead.get('phone', '')
-        website = lead.get('website', '')
-        
-        if phone:
+        if features['phone']:
             steps.append("📞 Call to introduce RagsPro services")
             steps.append("💬 Send WhatsApp with case studies")
         
         steps.append("📧 Send personalized email with solutions")
         
-        if website:
+        if not features['website_missing']:
             steps.append("🔍 Audit their website and send report")
         else:
             steps.append("🎁 Offer free website mockup")
@@ -420,7 +424,9 @@ class DeepResearchEngine:
     def _get_ai_insights(self, lead: Dict, analysis: Dict) -> str:
         """Get AI-generated insights"""
         try:
-            if not self.ai:
+            model = getattr(self.ai, 'model', None)
+            if model is None:
+                # No Gemini model to call - don't spend a rate limit slot
                 return "AI insights not available"
             
             prompt = f"""
@@ -442,7 +448,18 @@ Provide:
 Keep it concise (3-4 sentences).
 """
             
-            insights = self.ai.generate_content(prompt)
+            try:
+                if self.rate_limit_wait > 0:
+                    self.limiter.wait_if_needed('gemini', self.rate_limit_wait)
+                elif self.limiter.try_acquire('gemini') > 0:
+                    raise Exception("Rate limit exceeded for gemini")
+            except Exception as e:
+                logger.warning(f"AI insights skipped: {e}")
+                return "AI insights temporarily unavailable"
+            
+            with self._calls_lock:
+                self.ai_calls += 1
+            insights = model.generate_content(prompt).text.strip()
             return insights if insights else "AI analysis in progress..."
             
         except Exception as e:
@@ -461,6 +478,6 @@ Keep it concise (3-4 sentences).
             return 'Poor'
 
 
-def create_deep_research_engine(ai_assistant=None):
+def create_deep_research_engine(ai_assistant=None, rate_limiter=None, rate_limit_wait=None):
     """Factory function to create deep research engine"""
-    return DeepResearchEngine(ai_assistant)
+    return DeepResearchEngine(ai_assistant, rate_limiter, rate_limit_wait)
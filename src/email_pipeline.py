@@ -0,0 +1,209 @@
+"""
+Async Email Pipeline - Pre-rendered MIME, bounded concurrency, per-domain limits
+Renders messages ahead of the send path and reports per-message latency and failures
+"""
+
+import asyncio
+import logging
+import smtplib
+import time
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def classify_failure(error: Exception) -> Tuple[str, bool]:
+    """
+    Map a send exception to a failure reason and whether retrying can help.
+    
+    Returns:
+        (reason, retryable)
+    """
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return 'recipient_refused', False
+    if isinstance(error, smtplib.SMTPSenderRefused):
+        return 'sender_refused', False
+    if isinstance(error, smtplib.SMTPAuthenticationError):
+        return 'auth_failed', False
+    if isinstance(error, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError)):
+        return 'connection', True
+    if isinstance(error, smtplib.SMTPResponseException):
+        # 4xx = temporary (greylisting, quota), 5xx = permanent
+        return f"smtp_{error.smtp_code}", 400 <= error.smtp_code < 500
+    if isinstance(error, (TimeoutError, OSError)):
+        return 'network', True
+    return 'error', False
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return round(ordered[index], 1)
+
+
+class EmailPipeline:
+    """Producer/consumer email sender on asyncio"""
+    
+    def __init__(self, sender, max_concurrency: int = 3, per_domain_limit: int = 1,
+                 max_messages: Optional[int] = None, min_interval: float = 0.0,
+                 rate_limiter=None, rate_limit_service: str = 'gmail',
+                 rate_limit_wait: int = 30):
+        """
+        Initialize email pipeline.
+        
+        Args:
+            sender: GmailSender (provides render_message() and a pooled send)
+            max_concurrency: Messages in flight at once (across all domains)
+            per_domain_limit: Messages in flight at once per recipient domain
+            max_messages: Global quota for this run; the rest are deferred
+            min_interval: Minimum seconds between any two sends (spam safety)
+            rate_limiter: Optional RateLimiter consulted before each send
+            rate_limit_service: Rate limiter service name
+            rate_limit_wait: Max seconds to wait for the rate limiter
+        """
+        self.sender = sender
+        self.max_concurrency = max_concurrency
+        self.per_domain_limit = per_domain_limit
+        self.max_messages = max_messages
+        self.min_interval = min_interval
+        self.rate_limiter = rate_limiter
+        self.rate_limit_service = rate_limit_service
+        self.rate_limit_wait = rate_limit_wait
+    
+    def _render(self, recipient: Dict, subject_template: str, body_template: str):
+        """Personalize and build the MIME message for one recipient"""
+        name = recipient.get('name', 'there')
+        business_name = recipient.get('business_name', '')
+        custom_body = recipient.get('body', body_template)
+        
+        subject = subject_template.format(name=name, business_name=business_name)
+        body = custom_body.format(name=name, business_name=business_name)
+        return self.sender.render_message(recipient['email'], subject, body)
+    
+    async def run(self, recipients: List[Dict], subject_template: str, body_template: str) -> Dict:
+        """
+        Render and send all recipients.
+        
+        Args:
+            recipients: List of dicts with 'email', 'name', 'business_name', optional 'body'
+            subject_template: Subject line template
+            body_template: Email body template (use {name}, {business_name} placeholders)
+        
+        Returns:
+            Report dict with counts, per-message results, latency percentiles and retry list
+        """
+        queue = asyncio.Queue(maxsize=self.max_concurrency * 4)
+        results = []
+        domain_slots = {}
+        state = {'reserved': 0, 'last_send': 0.0}
+        pace_lock = asyncio.Lock()
+        
+        async def produce():
+            for recipient in recipients:
+                email = recipient.get('email')
+                business_name = recipient.get('business_name', '')
+                if not email:
+                    logger.warning(f"Skipping recipient with no email: {business_name}")
+                    results.append(self._result(email, business_name, 'failed', reason='no_email'))
+                    continue
+                try:
+                    msg = self._render(recipient, subject_template, body_template)
+                except (KeyError, IndexError, ValueError) as e:
+                    results.append(self._result(email, business_name, 'failed',
+                                                reason=f"render_error: {e}"))
+                    continue
+                await queue.put((email, business_name, msg))
+            
+            for _ in range(self.max_concurrency):
+                await queue.put(None)
+        
+        async def consume():
+            while True:
+                item = await queue.get()
+                if item is None:
+                    return
+                email, business_name, msg = item
+                
+                # Global quota is reserved before waiting for a slot
+                if self.max_messages is not None and state['reserved'] >= self.max_messages:
+                    results.append(self._result(email, business_name, 'deferred',
+                                                reason='quota_exhausted', retryable=True))
+                    continue
+                state['reserved'] += 1
+                
+                domain = email.rsplit('@', 1)[-1].lower()
+                slot = domain_slots.setdefault(domain, asyncio.Semaphore(self.per_domain_limit))
+                async with slot:
+                    results.append(await self._send(email, business_name, msg, state, pace_lock))
+        
+        await asyncio.gather(produce(), *(consume() for _ in range(self.max_concurrency)))
+        return self._report(recipients, results)
+    
+    async def _send(self, email: str, business_name: str, msg, state: Dict, pace_lock) -> Dict:
+        """Send one pre-rendered message and time it"""
+        if self.rate_limiter is not None:
+            try:
+                await asyncio.to_thread(self.rate_limiter.wait_if_needed,
+                                        self.rate_limit_service, self.rate_limit_wait)
+            except Exception:
+                state['reserved'] -= 1
+                return self._result(email, business_name, 'deferred',
+                                    reason='rate_limited', retryable=True)
+        
+        if self.min_interval > 0:
+            async with pace_lock:
+                wait = state['last_send'] + self.min_interval - time.monotonic()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                state['last_send'] = time.monotonic()
+        
+        started = time.perf_counter()
+        try:
+            await asyncio.to_thread(self.sender.pool.send_message, msg)
+        except Exception as e:
+            reason, retryable = classify_failure(e)
+            latency = (time.perf_counter() - started) * 1000
+            logger.error(f"Failed to send email to {email}: {e}")
+            return self._result(email, business_name, 'failed', latency, reason, retryable, str(e))
+        
+        latency = (time.perf_counter() - started) * 1000
+        logger.info(f"Email sent to {email} ({business_name or 'Unknown'}) in {latency:.0f}ms")
+        return self._result(email, business_name, 'sent', latency)
+    
+    def _result(self, email, business_name, status, latency_ms=None, reason=None,
+                retryable=False, error=None) -> Dict:
+        return {
+            'email': email,
+            'business_name': business_name,
+            'status': status,
+            'latency_ms': round(latency_ms, 1) if latency_ms is not None else None,
+            'reason': reason,
+            'retryable': retryable,
+            'error': error,
+        }
+    
+    def _report(self, recipients: List[Dict], results: List[Dict]) -> Dict:
+        latencies = [r['latency_ms'] for r in results if r['status'] == 'sent']
+        report = {
+            'sent': sum(1 for r in results if r['status'] == 'sent'),
+            'failed': sum(1 for r in results if r['status'] == 'failed'),
+            'deferred': sum(1 for r in results if r['status'] == 'deferred'),
+            'total': len(recipients),
+            'latency_ms': {
+                'p50': _percentile(latencies, 50),
+                'p95': _percentile(latencies, 95),
+                'max': round(max(latencies), 1) if latencies else 0.0,
+            },
+            'retry': [r['email'] for r in results if r['retryable']],
+            'results': results,
+        }
+        logger.info(f"Bulk email complete: {report['sent']}/{report['total']} sent")
+        return report
+
+
+def send_bulk(sender, recipients: List[Dict], subject_template: str, body_template: str,
+              **options) -> Dict:
+    """Run the pipeline to completion from synchronous code"""
+    return asyncio.run(EmailPipeline(sender, **options).run(recipients, subject_template, body_template))
@@ -1,10 +1,10 @@
 """FREE email sending using Gmail SMTP (500 emails/day free)."""
 
-import smtplib
 import logging
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from typing import Optional
+from src.smtp_pool import get_smtp_pool
 
 logger = logging.getLogger(__name__)
 
@@ -12,7 +12,9 @@ logger = logging.getLogger(__name__)
 class GmailSender:
     """FREE email sender using Gmail SMTP."""
     
-    def __init__(self, gmail_address: str, gmail_app_password: str):
+    def __init__(self, gmail_address: str, gmail_app_password: str,
+                 smtp_server: str = "smtp.gmail.com", smtp_port: int = 587,
+                 use_tls: bool = True):
         """
         Initialize Gmail sender.
         
@@ -20,30 +22,19 @@ class GmailSender:
             gmail_address: Your Gmail address
             gmail_app_password: Gmail App Password (not regular password)
                 Generate at: https://myaccount.google.com/apppasswords
+            smtp_server: SMTP host (override for a local test server)
+            smtp_port: SMTP port
+            use_tls: Upgrade with STARTTLS
         """
         self.gmail_address = gmail_address
         self.gmail_app_password = gmail_app_password
-        self.smtp_server = "smtp.gmail.com"
-        self.smtp_port = 587
+        self.smtp_server = smtp_server
+        self.smtp_port = smtp_port
+        self.use_tls = use_tls
         logger.info(f"Gmail sender initialized: {gmail_address}")
     
-    def send_email(self, to_email: str, subject: str, body: str, 
-                   business_name: Optional[str] = None) -> bool:
-        """
-        Send email via Gmail SMTP (FREE - 500/day limit).
-        
-        Args:
-            to_email: Recipient email address
-            subject: Email subject
-            body: Email body (can be HTML or plain text)
-            business_name: Optional business name for logging
-        
-        Returns:
-            True if sent successfully, False otherwise
-        """
-        try:
-            # Add professional signature
-            signature = """
+    # Professional signature appended to every email
+    SIGNATURE = """
 
 Best regards,
 Raghav Shah
@@ -61,23 +52,52 @@ Connect with me:
 🎥 YouTube: youtube.com/@raghavshahhh
 🐦 Twitter: x.com/raghavshahhhh
 💼 Fiverr: fiverr.com/s/WEpRvR7"""
+    
+    @property
+    def pool(self):
+        """Shared SMTP session pool for this account (one login reused across messages)"""
+        return get_smtp_pool(self.smtp_server, self.smtp_port,
+                             self.gmail_address, self.gmail_app_password,
+                             use_tls=self.use_tls)
+    
+    def render_message(self, to_email: str, subject: str, body: str) -> MIMEMultipart:
+        """
+        Build the ready-to-send MIME message (body + signature).
+        
+        Args:
+            to_email: Recipient email address
+            subject: Email subject
+            body: Email body (plain text)
+        
+        Returns:
+            MIME message
+        """
+        msg = MIMEMultipart('alternative')
+        msg['From'] = f"Raghav Shah - Ragspro.com <{self.gmail_address}>"
+        msg['To'] = to_email
+        msg['Subject'] = subject
+        msg.attach(MIMEText(body + self.SIGNATURE, 'plain'))
+        return msg
+    
+    def send_email(self, to_email: str, subject: str, body: str, 
+                   business_name: Optional[str] = None) -> bool:
+        """
+        Send email via Gmail SMTP (FREE - 500/day limit).
+        
+        Args:
+            to_email: Recipient email address
+            subject: Email subject
+            body: Email body (can be HTML or plain text)
+            business_name: Optional business name for logging
+        
+        Returns:
+            True if sent successfully, False otherwise
+        """
+        try:
+            msg = self.render_message(to_email, subject, body)
             
-            full_body = body + signature
-            
-            # Create message
-            msg = MIMEMultipart('alternative')
-            msg['From'] = f"Raghav Shah - Ragspro.com <{self.gmail_address}>"
-            msg['To'] = to_email
-            msg['Subject'] = subject
-            
-            # Add body
-            msg.attach(MIMEText(full_body, 'plain'))
-            
-            # Connect to Gmail SMTP
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                server.starttls()
-                server.login(self.gmail_address, self.gmail_app_password)
-                server.send_message(msg)
+            # Send over a pooled, already-authenticated Gmail SMTP session
+            self.pool.send_message(msg)
             
             logger.info(f"Email sent to {to_email} ({business_name or 'Unknown'})")
             return True
@@ -87,63 +107,49 @@ Connect with me:
             return False
     
     def send_bulk_emails(self, recipients: list[dict], subject_template: str, 
-                        body_template: str, delay_seconds: int = 2) -> dict:
+                        body_template: str, delay_seconds: int = 2,
+                        max_concurrency: int = 3, per_domain_limit: int = 1,
+                        max_messages: Optional[int] = None) -> dict:
         """
         Send bulk emails with rate limiting (FREE Gmail limit: 500/day).
         
+        Messages are pre-rendered and sent through the async pipeline
+        (see src/email_pipeline.py) over pooled SMTP sessions.
+        
         Args:
             recipients: List of dicts with 'email', 'name', 'body' keys
             subject_template: Subject line template
             body_template: Email body template (use {name}, {business_name} placeholders)
-            delay_seconds: Delay between emails to avoid spam detection
+            delay_seconds: Minimum delay between emails to avoid spam detection
+            max_concurrency: Messages in flight at once
+            per_domain_limit: Messages in flight at once per recipient domain
+            max_messages: Quota for this run (the rest are deferred)
         
         Returns:
-            Dict with 'sent', 'failed', 'total' counts
+            Dict with 'sent', 'failed', 'deferred', 'total' counts, per-message
+            'results' (latency, failure reason) and 'retry' addresses
         """
-        import time
-        
-        results = {'sent': 0, 'failed': 0, 'total': len(recipients)}
-        
-        for recipient in recipients:
-            email = recipient.get('email')
-            name = recipient.get('name', 'there')
-            business_name = recipient.get('business_name', '')
-            custom_body = recipient.get('body', body_template)
-            
-            if not email:
-                logger.warning(f"Skipping recipient with no email: {business_name}")
-                results['failed'] += 1
-                continue
-            
-            # Personalize subject and body
-            subject = subject_template.format(name=name, business_name=business_name)
-            body = custom_body.format(name=name, business_name=business_name)
-            
-            # Send email
-            success = self.send_email(email, subject, body, business_name)
-            
-            if success:
-                results['sent'] += 1
-            else:
-                results['failed'] += 1
-            
-            # Rate limiting delay
-            if delay_seconds > 0:
-                time.sleep(delay_seconds)
+        from src.email_pipeline import send_bulk
         
-        logger.info(f"Bulk email complete: {results['sent']}/{results['total']} sent")
-        return results
+        return send_bulk(
+            self, recipients, subject_template, body_template,
+            max_concurrency=max_concurrency,
+            per_domain_limit=per_domain_limit,
+            max_messages=max_messages,
+            min_interval=delay_seconds
+        )
 
 
-def create_gmail_sender(gmail_address: str, gmail_app_password: str) -> GmailSender:
+def create_gmail_sender(gmail_address: str, gmail_app_password: str, **kwargs) -> GmailSender:
     """
     Create Gmail sender instance.
     
     Args:
         gmail_address: Your Gmail address
         gmail_app_password: Gmail App Password
+        kwargs: smtp_server / smtp_port / use_tls overrides
     
     Returns:
         GmailSender instance
     """
-    return GmailSender(gmail_address, gmail_app_password)
+    return GmailSender(gmail_address, gmail_app_password, **kwargs)
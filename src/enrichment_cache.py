@@ -0,0 +1,134 @@
+"""
+Enrichment Cache - Per-URL extracted results with conditional revalidation
+Stores what was parsed from a page (not the page) plus its ETag/Last-Modified,
+so re-enrichment after the TTL is a cheap conditional GET (304 Not Modified)
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+import requests
+
+from src.cache_manager import CacheManager
+
+logger = logging.getLogger(__name__)
+
+
+class EnrichmentCache:
+    """URL -> extracted result cache with ETag/Last-Modified revalidation"""
+    
+    def __init__(self, cache_dir: str = "data/cache/enrichment",
+                 revalidate_after: int = 7 * 24 * 3600,
+                 max_age: int = 90 * 24 * 3600):
+        """
+        Initialize enrichment cache.
+        
+        Args:
+            cache_dir: Directory for cache entries
+            revalidate_after: Seconds a result is served without contacting the site
+            max_age: Seconds an entry is kept at all (validators included)
+        """
+        self.store = CacheManager(cache_dir=cache_dir, default_ttl=max_age)
+        self.revalidate_after = revalidate_after
+        self._lock = threading.Lock()
+        self.stats = {
+            'hits': 0,
+            'not_modified': 0,
+            'downloaded': 0,
+            'errors': 0,
+            'bytes_downloaded': 0,
+            'bytes_saved': 0,
+        }
+    
+    def _count(self, **increments):
+        with self._lock:
+            for key, value in increments.items():
+                self.stats[key] += value
+    
+    def fetch(self, url: str, extract: Callable, session=None,
+              timeout: int = 5, headers: Optional[Dict] = None, stream: bool = False) -> Any:
+        """
+        Get the extracted result for a URL, downloading only when it changed.
+        
+        Args:
+            url: Page URL
+            extract: Parser turning page text into the result to cache, or with
+                stream=True, the open response into (result, bytes read)
+            session: Optional requests.Session (pooled connections)
+            timeout: Request timeout in seconds
+            headers: Extra request headers
+            stream: Let extract read the body incrementally (and stop early)
+        
+        Returns:
+            Extracted result, or None if the page could not be fetched
+            (a stale cached result is returned instead when available)
+        """
+        entry = self.store.get(f"enrichment:{url}")
+        
+        if entry and time.time() - entry['checked_at'] < self.revalidate_after:
+            self._count(hits=1, bytes_saved=entry['bytes'])
+            return entry['result']
+        
+        request_headers = dict(headers or {})
+        if entry and entry.get('etag'):
+            request_headers['If-None-Match'] = entry['etag']
+        if entry and entry.get('last_modified'):
+            request_headers['If-Modified-Since'] = entry['last_modified']
+        
+        client = session or requests
+        try:
+            response = client.get(url, timeout=timeout, headers=request_headers, stream=stream)
+        except Exception as e:
+            logger.debug(f"Could not fetch {url}: {e}")
+            self._count(errors=1)
+            return entry['result'] if entry else None
+        
+        if response.status_code != 200 and stream:
+            response.close()
+        
+        if response.status_code == 304 and entry:
+            entry['checked_at'] = time.time()
+            self.store.set(f"enrichment:{url}", entry)
+            self._count(not_modified=1, bytes_saved=entry['bytes'])
+            return entry['result']
+        
+        if response.status_code != 200:
+            self._count(errors=1)
+            return entry['result'] if entry else None
+        
+        if stream:
+            result, size = extract(response)
+        else:
+            result = extract(response.text)
+            size = len(response.content)
+        self.store.set(f"enrichment:{url}", {
+            'url': url,
+            'result': result,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'bytes': size,
+            'checked_at': time.time(),
+        })
+        self._count(downloaded=1, bytes_downloaded=size)
+        return result
+    
+    def invalidate(self, url: str) -> bool:
+        """Forget the cached result for a URL"""
+        return self.store.delete(f"enrichment:{url}")
+    
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return dict(self.stats)
+
+
+_enrichment_cache = None
+
+
+def get_enrichment_cache() -> EnrichmentCache:
+    """Get global enrichment cache instance"""
+    global _enrichment_cache
+    if _enrichment_cache is None:
+        _enrichment_cache = EnrichmentCache()
+    return _enrichment_cache
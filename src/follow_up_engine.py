@@ -4,12 +4,13 @@ Increases close rate by 3x
 """
 
 import logging
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional
-from src.database import get_db, Lead, FollowUp, Interaction
-from src.ai_gemini import create_ai_assistant
-from src.email_sender import create_gmail_sender
-from src.whatsapp_sender import create_whatsapp_sender
+from sqlalchemy import select, or_
+from src.database import get_db, eager_load, Lead, FollowUp, Interaction
+from src.rate_limiter import get_rate_limiter
 
 logger = logging.getLogger(__name__)
 
@@ -24,11 +25,24 @@ class FollowUpEngine:
         3: 7,   # Third follow-up after 7 days (total 13 days)
     }
     
-    def __init__(self, ai_assistant, email_sender, whatsapp_sender):
+    # Dispatcher settings
+    CHUNK_SIZE = 50           # Follow-ups claimed (and committed) per chunk
+    MAX_WORKERS = 4           # Concurrent sends per chunk
+    LEASE_SECONDS = 600       # Failed sends are retried after this
+    MAX_ATTEMPTS = 3          # Failed sends before a follow-up is marked Failed
+    
+    # Rate limiter service per channel
+    CHANNEL_SERVICES = {
+        'Email': 'gmail',
+        'WhatsApp': 'whatsapp',
+    }
+    
+    def __init__(self, ai_assistant, email_sender, whatsapp_sender, rate_limiter=None):
         """Initialize follow-up engine"""
         self.ai = ai_assistant
         self.email = email_sender
         self.whatsapp = whatsapp_sender
+        self.limiter = rate_limiter or get_rate_limiter()
         logger.info("Follow-up engine initialized")
     
     def schedule_follow_ups(self, lead_id: int, channel: str = 'Email') -> List[FollowUp]:
@@ -201,134 +215,234 @@ Raghav Shah
         
         return templates.get(sequence, templates[1])
     
-    def process_due_follow_ups(self) -> Dict[str, int]:
+    def process_due_follow_ups(self, chunk_size: Optional[int] = None,
+                               max_workers: Optional[int] = None) -> Dict[str, int]:
         """
         Process all due follow-ups.
         Should be run daily via cron/scheduler.
         
+        Due follow-ups are claimed in chunks with a lease, sent concurrently
+        and committed per chunk. Several workers can run at once, and a
+        crashed run only re-sends its last open chunk (once the lease expires).
+        
+        Each send takes a rate limiter slot before it is handed to a worker.
+        When a channel's budget runs out its remaining follow-ups are left
+        for the next run, while other channels keep sending.
+        
+        Args:
+            chunk_size: Follow-ups claimed per chunk (default CHUNK_SIZE)
+            max_workers: Concurrent sends per chunk (default MAX_WORKERS)
+        
         Returns:
-            Stats dict with sent/failed counts
+            Stats dict with sent/failed/skipped/deferred counts
         """
-        session = get_db()
-        stats = {'sent': 0, 'failed': 0, 'skipped': 0}
+        chunk_size = chunk_size or self.CHUNK_SIZE
+        max_workers = max_workers or self.MAX_WORKERS
+        stats = {'sent': 0, 'failed': 0, 'skipped': 0, 'deferred': 0, 'chunks': 0}
+        exhausted = set()  # Channels whose rate limit ran out during this run
         
-        try:
-            # Get all pending follow-ups that are due
-            now = datetime.utcnow()
-            due_follow_ups = session.query(FollowUp).filter(
-                FollowUp.status == 'Pending',
-                FollowUp.scheduled_at <= now
-            ).all()
-            
-            logger.info(f"Processing {len(due_follow_ups)} due follow-ups")
-            
-            for follow_up in due_follow_ups:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            while True:
+                session = get_db()
                 try:
-                    # Check if lead has replied (skip if yes)
-                    if follow_up.lead.email_replied:
-                        follow_up.status = 'Skipped'
-                        stats['skipped'] += 1
-                        continue
-                    
-                    # Send follow-up
-                    if follow_up.channel == 'Email':
-                        success = self._send_email_follow_up(follow_up)
-                    elif follow_up.channel == 'WhatsApp':
-                        success = self._send_whatsapp_follow_up(follow_up)
-                    else:
-                        success = False
+                    chunk = self._claim_due_follow_ups(session, chunk_size, exclude_channels=exhausted)
+                    if not chunk:
+                        break
                     
-                    if success:
-                        follow_up.status = 'Sent'
-                        follow_up.sent_at = datetime.utcnow()
-                        stats['sent'] += 1
-                        
-                        # Update lead
-                        follow_up.lead.last_contacted = datetime.utcnow()
-                    else:
-                        stats['failed'] += 1
+                    stats['chunks'] += 1
+                    self._process_chunk(session, chunk, pool, stats, exhausted)
+                    session.commit()
                     
                 except Exception as e:
-                    logger.error(f"Error processing follow-up {follow_up.id}: {e}")
-                    stats['failed'] += 1
+                    session.rollback()
+                    logger.error(f"Error processing follow-ups: {e}")
+                    break
+                finally:
+                    session.close()
+        
+        logger.info(f"Follow-up processing complete: {stats}")
+        return stats
+    
+    def _claim_due_follow_ups(self, session, chunk_size: int, exclude_channels=()) -> List[FollowUp]:
+        """
+        Claim up to chunk_size due follow-ups for this worker and load them with their leads.
+        
+        Follow-ups on exclude_channels (rate limited for the rest of this run) are not claimed.
+        
+        PostgreSQL uses SELECT ... FOR UPDATE SKIP LOCKED so concurrent workers
+        never block on or double-claim rows. Other databases (SQLite) claim
+        with one atomic UPDATE ... WHERE id IN (SELECT ...).
+        """
+        now = datetime.utcnow()
+        token = uuid.uuid4().hex
+        claimable = (
+            FollowUp.status == 'Pending',
+            FollowUp.scheduled_at <= now,
+            or_(FollowUp.lease_expires_at.is_(None), FollowUp.lease_expires_at < now)
+        )
+        if exclude_channels:
+            claimable += (or_(FollowUp.channel.is_(None), FollowUp.channel.notin_(list(exclude_channels))),)
+        lease = {
+            FollowUp.claimed_by: token,
+            FollowUp.lease_expires_at: now + timedelta(seconds=self.LEASE_SECONDS)
+        }
+        
+        if session.bind.dialect.name == 'postgresql':
+            ids = [row.id for row in session.query(FollowUp.id).filter(*claimable)
+                   .order_by(FollowUp.scheduled_at).limit(chunk_size)
+                   .with_for_update(skip_locked=True).all()]
+            if not ids:
+                session.commit()
+                return []
+            session.query(FollowUp).filter(FollowUp.id.in_(ids)).update(
+                lease, synchronize_session=False
+            )
+        else:
+            due_ids = select(FollowUp.id).where(*claimable).order_by(
+                FollowUp.scheduled_at
+            ).limit(chunk_size)
+            session.query(FollowUp).filter(
+                FollowUp.id.in_(due_ids), *claimable
+            ).update(lease, synchronize_session=False)
+        
+        session.commit()
+        
+        return eager_load(
+            session.query(FollowUp), FollowUp.lead, joined=True
+        ).filter(FollowUp.claimed_by == token).all()
+    
+    def _process_chunk(self, session, chunk: List[FollowUp], pool, stats: Dict[str, int], exhausted: set):
+        """
+        Send one claimed chunk concurrently and record the outcomes.
+        
+        Rate limiter slots are taken here, before sends reach the workers, so
+        workers never wait on the limiter. Follow-ups whose channel is out of
+        budget are released for the next run and the channel is added to
+        exhausted.
+        """
+        jobs = []
+        for follow_up in chunk:
+            # Check if lead has replied (skip if yes)
+            if follow_up.lead.email_replied:
+                follow_up.status = 'Skipped'
+                self._release(follow_up)
+                stats['skipped'] += 1
+                continue
             
-            session.commit()
-            logger.info(f"Follow-up processing complete: {stats}")
-            return stats
+            service = self.CHANNEL_SERVICES.get(follow_up.channel)
+            if service is None:
+                logger.warning(f"Unknown follow-up channel: {follow_up.channel}")
+                follow_up.status = 'Failed'
+                self._release(follow_up)
+                stats['failed'] += 1
+                continue
+            
+            if follow_up.channel in exhausted or self.limiter.try_acquire(service) > 0:
+                # Not attempted - claimable again by the next run
+                exhausted.add(follow_up.channel)
+                self._release(follow_up)
+                stats['deferred'] += 1
+                continue
             
+            jobs.append((follow_up, self._build_job(follow_up)))
+        
+        logger.info(f"Processing chunk of {len(chunk)} due follow-ups ({len(jobs)} sends)")
+        
+        # Workers only see plain dicts; all ORM changes stay on this thread
+        outcomes = pool.map(self._dispatch, [job for _, job in jobs])
+        
+        for (follow_up, job), outcome in zip(jobs, outcomes):
+            if outcome == 'sent':
+                now = datetime.utcnow()
+                follow_up.status = 'Sent'
+                follow_up.sent_at = now
+                follow_up.lead.last_contacted = now
+                self._release(follow_up)
+                session.add(Interaction(
+                    lead_id=job['lead_id'],
+                    type=job['channel'],
+                    direction='Outbound',
+                    subject=job['subject'] if job['channel'] == 'Email' else None,
+                    content=job['content']
+                ))
+                stats['sent'] += 1
+            else:
+                follow_up.attempts = (follow_up.attempts or 0) + 1
+                if follow_up.attempts >= self.MAX_ATTEMPTS:
+                    logger.error(f"Follow-up {follow_up.id} failed {follow_up.attempts} times, giving up")
+                    follow_up.status = 'Failed'
+                    self._release(follow_up)
+                # Otherwise keep the lease so it is retried once it expires, not this run
+                stats['failed'] += 1
+    
+    def _release(self, follow_up: FollowUp):
+        """Drop this worker's lease on a follow-up"""
+        follow_up.claimed_by = None
+        follow_up.lease_expires_at = None
+    
+    def _build_job(self, follow_up: FollowUp) -> Dict:
+        """Snapshot what a worker needs to send a follow-up"""
+        lead = follow_up.lead
+        return {
+            'follow_up_id': follow_up.id,
+            'lead_id': lead.id,
+            'channel': follow_up.channel,
+            'email': lead.email,
+            'phone': lead.phone,
+            'business_name': lead.title,
+            'subject': follow_up.subject,
+            'content': follow_up.content,
+        }
+    
+    def _dispatch(self, job: Dict) -> str:
+        """
+        Send one follow-up (runs in a worker thread, no DB access).
+        
+        Returns:
+            'sent' or 'failed'
+        """
+        try:
+            if job['channel'] == 'Email':
+                success = self._send_email_follow_up(job)
+            else:
+                success = self._send_whatsapp_follow_up(job)
         except Exception as e:
-            session.rollback()
-            logger.error(f"Error processing follow-ups: {e}")
-            return stats
-        finally:
-            session.close()
+            logger.error(f"Error processing follow-up {job['follow_up_id']}: {e}")
+            success = False
+        
+        return 'sent' if success else 'failed'
     
-    def _send_email_follow_up(self, follow_up: FollowUp) -> bool:
+    def _send_email_follow_up(self, job: Dict) -> bool:
         """Send email follow-up"""
         try:
-            lead = follow_up.lead
-            
-            if not lead.email:
-                logger.warning(f"No email for lead {lead.id}")
+            if not job['email']:
+                logger.warning(f"No email for lead {job['lead_id']}")
                 return False
             
-            success = self.email.send_email(
-                to_email=lead.email,
-                subject=follow_up.subject,
-                body=follow_up.content,
-                business_name=lead.title
+            return self.email.send_email(
+                to_email=job['email'],
+                subject=job['subject'],
+                body=job['content'],
+                business_name=job['business_name']
             )
             
-            if success:
-                # Track interaction
-                session = get_db()
-                interaction = Interaction(
-                    lead_id=lead.id,
-                    type='Email',
-                    direction='Outbound',
-                    subject=follow_up.subject,
-                    content=follow_up.content
-                )
-                session.add(interaction)
-                session.commit()
-                session.close()
-            
-            return success
-            
         except Exception as e:
             logger.error(f"Error sending email follow-up: {e}")
             return False
     
-    def _send_whatsapp_follow_up(self, follow_up: FollowUp) -> bool:
+    def _send_whatsapp_follow_up(self, job: Dict) -> bool:
         """Send WhatsApp follow-up"""
         try:
-            lead = follow_up.lead
-            
-            if not lead.phone:
-                logger.warning(f"No phone for lead {lead.id}")
+            if not job['phone']:
+                logger.warning(f"No phone for lead {job['lead_id']}")
                 return False
             
-            success = self.whatsapp.send_message(
-                phone_number=lead.phone,
-                message=follow_up.content,
-                business_name=lead.title
+            return self.whatsapp.send_message(
+                to_number=job['phone'],
+                message=job['content'],
+                business_name=job['business_name']
             )
             
-            if success:
-                # Track interaction
-                session = get_db()
-                interaction = Interaction(
-                    lead_id=lead.id,
-                    type='WhatsApp',
-                    direction='Outbound',
-                    content=follow_up.content
-                )
-                session.add(interaction)
-                session.commit()
-                session.close()
-            
-            return success
-            
         except Exception as e:
             logger.error(f"Error sending WhatsApp follow-up: {e}")
             return False
@@ -370,6 +484,9 @@ Raghav Shah
 def create_follow_up_engine(config: dict):
     """Create follow-up engine instance"""
     from src.config import load_config
+    from src.ai_gemini import create_ai_assistant
+    from src.email_sender import create_gmail_sender
+    from src.whatsapp_sender import create_whatsapp_sender
     
     if not config:
         config = load_config()
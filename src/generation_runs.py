@@ -0,0 +1,326 @@
+"""
+Generation Runs - Persisted, resumable lead generation runs
+Each run keeps its parameters, planned queries, a checkpoint of completed
+queries and the premium leads found so far, so a restart picks up where it stopped
+"""
+
+import logging
+import os
+import socket
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from src.database import get_db, GenerationRun
+
+logger = logging.getLogger(__name__)
+
+# Statuses a run can be resumed from
+RESUMABLE = ('interrupted', 'stopped', 'failed')
+
+# Seconds without a heartbeat after which a running run's worker is presumed dead
+RUN_LEASE_SECONDS = 600
+
+
+class LeaseLost(Exception):
+    """The run was claimed by another worker (after this one was presumed dead)"""
+
+
+def worker_id() -> str:
+    """This thread as 'host:pid:thread', recorded on the runs it executes"""
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+
+def _worker_alive(worker: Optional[str]) -> Optional[bool]:
+    """Whether a run's worker process still exists (None if it can't be checked from this host)"""
+    host, _, pid = (worker or '').partition(':')
+    pid = pid.partition(':')[0]
+    if os.name != 'posix' or host != socket.gethostname() or not pid.isdigit():
+        return None
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass  # Exists, owned by another user
+    return True
+
+
+def _owned_by(user_id: Optional[int]):
+    """Filter for one user's runs (user_id None: the anonymous dashboard's)"""
+    if user_id is None:
+        return GenerationRun.user_id.is_(None)
+    return GenerationRun.user_id == user_id
+
+
+def _run_to_dict(run: GenerationRun, include_results: bool = False) -> Dict:
+    """Run summary with throughput metrics"""
+    total = len(run.queries or [])
+    minutes = (run.active_seconds or 0) / 60
+    summary = {
+        'id': run.id,
+        'status': run.status,
+        'message': run.message,
+        'parameters': run.parameters or {},
+        'total_queries': total,
+        'completed_queries': run.completed_queries,
+        'progress': round(run.completed_queries / total * 100, 1) if total else 0.0,
+        'searches': run.searches,
+        'errors': run.errors,
+        'places_found': run.places_found,
+        'leads_found': run.leads_found,
+        'resumes': run.resumes,
+        'user_id': run.user_id,
+        'active_seconds': round(run.active_seconds or 0, 1),
+        'queries_per_minute': round(run.searches / minutes, 2) if minutes else 0.0,
+        'leads_per_minute': round(run.leads_found / minutes, 2) if minutes else 0.0,
+        'leads_per_query': round(run.leads_found / run.searches, 2) if run.searches else 0.0,
+        'started_at': run.started_at.isoformat() if run.started_at else None,
+        'updated_at': run.updated_at.isoformat() if run.updated_at else None,
+        'finished_at': run.finished_at.isoformat() if run.finished_at else None,
+    }
+    if include_results:
+        summary['queries'] = run.queries or []
+        summary['results'] = run.results or []
+    return summary
+
+
+class GenerationRunStore:
+    """
+    Create, checkpoint, resume and list generation runs.
+    
+    A run is leased to the worker thread executing it (its worker column):
+    checkpoint() and finish() only write while the caller still holds the
+    lease and raise LeaseLost otherwise, and the executing worker keeps the
+    lease alive with heartbeat() so recover_orphaned() leaves it alone.
+    """
+    
+    def create_run(self, parameters: Dict, queries: List[Dict], user_id: Optional[int] = None) -> int:
+        """
+        Persist a new run before its first search, leased to the calling thread.
+        
+        Args:
+            parameters: Request parameters (filters, num_leads, quality_threshold)
+            queries: Planned queries in order ({'query', 'city', 'category'})
+            user_id: User who started the run (None for the anonymous dashboard)
+        
+        Returns:
+            Run id
+        """
+        session = get_db()
+        
+        try:
+            run = GenerationRun(
+                status='running',
+                parameters=parameters,
+                queries=[{key: entry[key] for key in ('query', 'city', 'category')} for entry in queries],
+                completed_queries=0,
+                searches=0,
+                errors=0,
+                places_found=0,
+                leads_found=0,
+                results=[],
+                active_seconds=0.0,
+                resumes=0,
+                user_id=user_id,
+                worker=worker_id(),
+                heartbeat_at=datetime.utcnow(),
+            )
+            session.add(run)
+            session.commit()
+            logger.info(f"Generation run {run.id} created ({len(queries)} queries)")
+            return run.id
+        finally:
+            session.close()
+    
+    def checkpoint(self, run_id: int, completed_queries: int, places: int = 0,
+                   new_leads: Optional[List[Dict]] = None, error: bool = False,
+                   seconds: float = 0.0):
+        """
+        Mark the run's queries up to completed_queries as done.
+        
+        Args:
+            run_id: Run id
+            completed_queries: Number of planned queries finished (the resume point)
+            places: Places the last query returned
+            new_leads: Premium leads the last query found
+            error: The last query raised
+            seconds: Time the last query took
+        
+        Raises:
+            LeaseLost: Another worker claimed the run; this one must stop
+        """
+        values = {
+            GenerationRun.status: 'running',  # Undo a recovery that presumed this worker dead
+            GenerationRun.completed_queries: completed_queries,
+            GenerationRun.searches: GenerationRun.searches + 1,
+            GenerationRun.errors: GenerationRun.errors + (1 if error else 0),
+            GenerationRun.places_found: GenerationRun.places_found + places,
+            GenerationRun.active_seconds: GenerationRun.active_seconds + seconds,
+            GenerationRun.heartbeat_at: datetime.utcnow(),
+        }
+        session = get_db()
+        
+        try:
+            if new_leads:
+                run = session.get(GenerationRun, run_id)
+                results = (run.results if run else None) or []
+                values[GenerationRun.results] = results + new_leads
+                values[GenerationRun.leads_found] = len(results) + len(new_leads)
+            self._update_leased(session, run_id, values)
+        finally:
+            session.close()
+    
+    def heartbeat(self, run_id: int, worker: Optional[str] = None) -> bool:
+        """
+        Renew the lease of a run between checkpoints (long searches, waits for a search slot).
+        
+        Args:
+            run_id: Run id
+            worker: Lease holder (default the calling thread)
+        
+        Returns:
+            False if another worker claimed the run
+        """
+        session = get_db()
+        
+        try:
+            self._update_leased(session, run_id, {GenerationRun.heartbeat_at: datetime.utcnow()}, worker)
+            return True
+        except LeaseLost:
+            return False
+        finally:
+            session.close()
+    
+    def finish(self, run_id: int, status: str, message: str = '', results: Optional[List[Dict]] = None):
+        """
+        Close a run as completed, stopped or failed.
+        
+        Raises:
+            LeaseLost: Another worker claimed the run
+        """
+        values = {
+            GenerationRun.status: status,
+            GenerationRun.message: message,
+            GenerationRun.finished_at: datetime.utcnow(),
+        }
+        if results is not None:
+            values[GenerationRun.results] = results
+            values[GenerationRun.leads_found] = len(results)
+        session = get_db()
+        
+        try:
+            self._update_leased(session, run_id, values)
+            logger.info(f"Generation run {run_id} {status}: {message}")
+        finally:
+            session.close()
+    
+    def _update_leased(self, session, run_id: int, values: Dict, worker: Optional[str] = None):
+        """UPDATE the run only while worker (default the calling thread) holds its lease"""
+        updated = session.query(GenerationRun).filter(
+            GenerationRun.id == run_id,
+            GenerationRun.worker == (worker or worker_id())
+        ).update(values, synchronize_session=False)
+        session.commit()
+        if not updated:
+            raise LeaseLost(f"Generation run {run_id} is no longer leased to this worker")
+    
+    def recover_orphaned(self, lease_seconds: float = RUN_LEASE_SECONDS) -> int:
+        """
+        Flag 'running' runs whose worker is gone as interrupted (resumable).
+        
+        A run is orphaned when its worker process on this host no longer
+        exists, or when it hasn't sent a heartbeat for lease_seconds (workers on
+        other hosts, or a pid that was reused). Runs live in other workers
+        are left alone.
+        
+        Returns:
+            Number of runs flagged
+        """
+        session = get_db()
+        
+        try:
+            cutoff = datetime.utcnow() - timedelta(seconds=lease_seconds)
+            orphaned = []
+            for run in session.query(GenerationRun).filter(GenerationRun.status == 'running'):
+                heartbeat = run.heartbeat_at or run.updated_at or run.started_at
+                if _worker_alive(run.worker) is False or heartbeat < cutoff:
+                    run.status = 'interrupted'
+                    run.message = f'Interrupted after {run.completed_queries}/{len(run.queries or [])} queries'
+                    orphaned.append(run.id)
+            session.commit()
+            if orphaned:
+                logger.info(f"Marked generation run(s) {orphaned} as interrupted (worker gone)")
+            return len(orphaned)
+        finally:
+            session.close()
+    
+    def start_resume(self, run_id: int) -> Optional[Dict]:
+        """
+        Claim a resumable run for another pass, leased to the calling thread.
+        
+        The claim is one conditional UPDATE, so of concurrent resumes of the
+        same run (on any worker) exactly one succeeds.
+        
+        Returns:
+            Full run (parameters, queries, checkpoint, results) or None if it
+            doesn't exist, isn't resumable or another worker claimed it first
+        """
+        worker = worker_id()
+        session = get_db()
+        
+        try:
+            claimed = session.query(GenerationRun).filter(
+                GenerationRun.id == run_id,
+                GenerationRun.status.in_(RESUMABLE)
+            ).update({
+                GenerationRun.status: 'running',
+                GenerationRun.resumes: GenerationRun.resumes + 1,
+                GenerationRun.finished_at: None,
+                GenerationRun.worker: worker,
+                GenerationRun.heartbeat_at: datetime.utcnow(),
+            }, synchronize_session=False)
+            session.commit()
+            if not claimed:
+                return None
+            
+            run = session.get(GenerationRun, run_id)
+            run.message = f'Resumed at query {run.completed_queries + 1}/{len(run.queries or [])}'
+            session.commit()
+            logger.info(f"Generation run {run_id}: {run.message}")
+            return _run_to_dict(run, include_results=True)
+        finally:
+            session.close()
+    
+    def latest_resumable(self, user_id: Optional[int] = None) -> Optional[int]:
+        """Id of the user's most recent run that can be resumed"""
+        session = get_db()
+        
+        try:
+            run = session.query(GenerationRun).filter(
+                GenerationRun.status.in_(RESUMABLE),
+                _owned_by(user_id)
+            ).order_by(GenerationRun.id.desc()).first()
+            return run.id if run else None
+        finally:
+            session.close()
+    
+    def get_run(self, run_id: int, include_results: bool = False) -> Optional[Dict]:
+        session = get_db()
+        
+        try:
+            run = session.get(GenerationRun, run_id)
+            return _run_to_dict(run, include_results) if run else None
+        finally:
+            session.close()
+    
+    def list_runs(self, limit: int = 20, user_id: Optional[int] = None) -> List[Dict]:
+        """The user's most recent runs first, with throughput metrics"""
+        session = get_db()
+        
+        try:
+            runs = session.query(GenerationRun).filter(_owned_by(user_id)).order_by(
+                GenerationRun.id.desc()
+            ).limit(limit).all()
+            return [_run_to_dict(run) for run in runs]
+        finally:
+            session.close()
@@ -0,0 +1,306 @@
+"""
+History Store - Compact lead history with per-day deltas
+Lead bodies are stored once per distinct version in an append-only file, each
+day records only the lead ids it added or changed, and a small index keeps a
+per-day summary so listing history never opens the lead data
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+DATE_PATTERN = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+LEGACY_SNAPSHOT = re.compile(r'^leads_(?:.*_)?(\d{4}-\d{2}-\d{2})\.json$')
+
+
+def lead_id(lead: Dict) -> str:
+    """Stable id from the (title, address) key save_premium_leads deduplicates on"""
+    key = f"{lead.get('title', '')}\x1f{lead.get('address', '')}"
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+
+
+def _version(lead: Dict) -> str:
+    """Content hash of one lead body"""
+    body = json.dumps(lead, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(body.encode('utf-8')).hexdigest()
+
+
+class HistoryStore:
+    """
+    Append-only lead history under one directory:
+        
+        leads.jsonl          one line per distinct lead version {"id", "v", "lead"}
+        deltas/<date>.jsonl  one line per save {"at", "added": [[id, v]], "changed": [[id, v]]}
+        index.json           per-day summary (total, added, changed, saves, timestamp)
+    
+    Several processes (gunicorn workers) may share a directory: every operation
+    holds an fcntl lock on history.lock and first catches up on what other
+    processes wrote (the index when it changed, and the new tail of
+    leads.jsonl). Without fcntl (Windows) only threads of one process are safe.
+    
+    Legacy leads_<date>.json snapshots found in the directory are imported once.
+    """
+    
+    def __init__(self, history_dir: str = "data/history"):
+        self.history_dir = history_dir
+        self.leads_path = os.path.join(history_dir, 'leads.jsonl')
+        self.deltas_dir = os.path.join(history_dir, 'deltas')
+        self.index_path = os.path.join(history_dir, 'index.json')
+        self.lock_path = os.path.join(history_dir, 'history.lock')
+        self.lock = threading.RLock()
+        
+        self._legacy_checked = False
+        self._index = {'days': {}, 'imported': {}}
+        self._index_stamp = None  # (mtime_ns, size) of the index last read
+        self._latest = {}  # lead id -> current version
+        self._offsets = {}  # version -> byte offset in leads.jsonl
+        self._leads_read = 0  # Bytes of leads.jsonl already indexed
+    
+    @contextmanager
+    def _locked(self, exclusive: bool = False):
+        """Hold the thread lock and the cross-process file lock, with state refreshed from disk"""
+        with self.lock:
+            os.makedirs(self.deltas_dir, exist_ok=True)
+            if not self._legacy_checked and not exclusive:
+                # First use: legacy import writes, so take the exclusive lock once
+                with self._locked(exclusive=True):
+                    pass
+            
+            with open(self.lock_path, 'a') as handle:
+                if fcntl is not None:
+                    fcntl.flock(handle, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+                self._refresh()
+                if exclusive and not self._legacy_checked:
+                    self._import_legacy()
+                    self._legacy_checked = True
+                yield
+    
+    def _refresh(self):
+        """Catch up on the index and leads.jsonl as other processes left them (caller holds the lock)"""
+        try:
+            stat = os.stat(self.index_path)
+            stamp = (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            stamp = None
+        if stamp is not None and stamp != self._index_stamp:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                self._index = json.load(f)
+            self._index.setdefault('days', {})
+            self._index.setdefault('imported', {})
+        self._index_stamp = stamp
+        
+        if not os.path.exists(self.leads_path):
+            return
+        if os.path.getsize(self.leads_path) < self._leads_read:
+            # Replaced or truncated - index it again from the start
+            self._latest, self._offsets, self._leads_read = {}, {}, 0
+        
+        with open(self.leads_path, 'rb') as f:
+            f.seek(self._leads_read)
+            offset = self._leads_read
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break  # Partial line from a writer that died mid-append
+                try:
+                    entry = json.loads(line)
+                    self._offsets.setdefault(entry['v'], offset)
+                    self._latest[entry['id']] = entry['v']
+                except (ValueError, KeyError):
+                    logger.warning(f"Skipping unreadable history line at byte {offset}")
+                offset += len(line)
+        self._leads_read = offset
+    
+    def _import_legacy(self):
+        """Fold full-snapshot files (leads_<date>.json, written by older code and seed scripts) into deltas"""
+        snapshots = []
+        for filename in os.listdir(self.history_dir):
+            match = LEGACY_SNAPSHOT.match(filename)
+            if not match:
+                continue
+            path = os.path.join(self.history_dir, filename)
+            mtime = os.path.getmtime(path)
+            if self._index['imported'].get(filename) == mtime:
+                continue
+            snapshots.append((match.group(1), mtime, filename, path))
+        
+        for date, mtime, filename, path in sorted(snapshots):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                leads = data.get('leads', []) if isinstance(data, dict) else data
+                self._record(leads, when=data.get('timestamp') if isinstance(data, dict) else None, date=date)
+                self._index['imported'][filename] = mtime
+                self._save_index()
+                logger.info(f"Imported {len(leads)} leads from legacy history {filename}")
+            except Exception as e:
+                logger.error(f"Could not import legacy history {filename}: {e}")
+    
+    def _save_index(self):
+        """Atomically rewrite the (small) day index (caller holds the exclusive lock)"""
+        temp_path = self.index_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._index, f, indent=2, sort_keys=True)
+        os.replace(temp_path, self.index_path)
+        stat = os.stat(self.index_path)
+        self._index_stamp = (stat.st_mtime_ns, stat.st_size)
+    
+    def _read_version(self, handle, version: str) -> Optional[Dict]:
+        offset = self._offsets.get(version)
+        if offset is None:
+            return None
+        handle.seek(offset)
+        return json.loads(handle.readline())['lead']
+    
+    def record(self, leads: List[Dict], when: Optional[str] = None, date: Optional[str] = None) -> Dict:
+        """
+        Record the current lead list, storing only what is new or changed.
+        
+        Args:
+            leads: Full current lead list (as saved to premium_leads.json)
+            when: ISO timestamp of the save (default: now)
+            date: Day to file the delta under (default: today)
+        
+        Returns:
+            That day's summary after this save
+        """
+        with self._locked(exclusive=True):
+            return self._record(leads, when, date)
+    
+    def _record(self, leads: List[Dict], when: Optional[str] = None, date: Optional[str] = None) -> Dict:
+        """record() body (caller holds the exclusive lock with state refreshed)"""
+        now = datetime.now()
+        when = when or now.isoformat()
+        date = date or now.strftime('%Y-%m-%d')
+        
+        added, changed, lines = [], [], []
+        pending = {}
+        
+        for lead in leads:
+            ident = lead_id(lead)
+            version = _version(lead)
+            current = pending.get(ident, self._latest.get(ident))
+            if current == version:
+                continue
+            (changed if current else added).append([ident, version])
+            pending[ident] = version
+            if version not in self._offsets:
+                lines.append((version, json.dumps({'id': ident, 'v': version, 'lead': lead},
+                                                  ensure_ascii=False, default=str) + '\n'))
+        
+        if lines:
+            with open(self.leads_path, 'a+b') as f:
+                offset = f.seek(0, os.SEEK_END)
+                if offset:
+                    f.seek(offset - 1)
+                    if f.read(1) != b'\n':
+                        # Terminate a partial line left by a writer that died mid-append
+                        offset += f.write(b'\n')
+                for version, line in lines:
+                    data = line.encode('utf-8')
+                    f.write(data)
+                    self._offsets.setdefault(version, offset)
+                    offset += len(data)
+            self._leads_read = offset
+        self._latest.update(pending)
+        
+        if added or changed:
+            with open(os.path.join(self.deltas_dir, f'{date}.jsonl'), 'a', encoding='utf-8') as f:
+                f.write(json.dumps({'at': when, 'added': added, 'changed': changed}) + '\n')
+        
+        day = self._index['days'].setdefault(date, {'added': 0, 'changed': 0, 'saves': 0})
+        day['added'] += len(added)
+        day['changed'] += len(changed)
+        day['saves'] += 1
+        day['total_leads'] = len(leads)
+        day['timestamp'] = when
+        self._save_index()
+        
+        return {'date': date, **day}
+    
+    def list_days(self, limit: Optional[int] = 30) -> List[Dict]:
+        """Per-day summaries, newest first (reads only the index)"""
+        with self._locked():
+            dates = sorted(self._index['days'], reverse=True)[:limit]
+            return [{'date': date, **self._index['days'][date]} for date in dates]
+    
+    def leads_for_day(self, date: str) -> Optional[List[Dict]]:
+        """
+        Leads added or changed on a day, as they were saved that day.
+        
+        Returns:
+            List of leads, or None if the day has no history
+        """
+        if not DATE_PATTERN.match(date or ''):
+            return None
+        
+        with self._locked():
+            if date not in self._index['days']:
+                return None
+            
+            versions = {}
+            path = os.path.join(self.deltas_dir, f'{date}.jsonl')
+            if os.path.exists(path):
+                with open(path, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        delta = json.loads(line)
+                        for ident, version in delta['added'] + delta['changed']:
+                            versions[ident] = version
+            
+            if not versions:
+                return []
+            with open(self.leads_path, 'rb') as handle:
+                leads = [self._read_version(handle, version) for version in versions.values()]
+            return [lead for lead in leads if lead is not None]
+    
+    def count_unique(self) -> int:
+        """Distinct leads ever recorded"""
+        with self._locked():
+            return len(self._latest)
+    
+    def iter_unique_leads(self) -> Iterator[Dict]:
+        """
+        Every lead ever recorded, once, in its latest version.
+        
+        Streams leads.jsonl in file order without holding the bodies in memory.
+        Only lines the index points at are parsed, so unreadable lines (left
+        by a writer that died mid-append) are skipped.
+        """
+        with self._locked():
+            wanted = {self._offsets[version] for version in self._latest.values() if version in self._offsets}
+            end = self._leads_read
+        if not wanted:
+            return
+        
+        with open(self.leads_path, 'rb') as f:
+            offset = 0
+            for line in f:
+                start, offset = offset, offset + len(line)
+                if offset > end:
+                    break  # Appended after this stream started
+                if start in wanted:
+                    yield json.loads(line)['lead']
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_history_store(history_dir: str = "data/history") -> HistoryStore:
+    """Shared history store for a directory"""
+    with _stores_lock:
+        if history_dir not in _stores:
+            _stores[history_dir] = HistoryStore(history_dir)
+        return _stores[history_dir]
@@ -16,11 +16,20 @@ logger = logging.getLogger(__name__)
 class LinkedInScraper:
     """Free LinkedIn scraper using public profiles"""
     
-    def __init__(self):
+    def __init__(self, cache=None):
+        """
+        Initialize scraper.
+        
+        Args:
+            cache: EnrichmentCache for company lookups (defaults to the shared on-disk cache)
+        """
+        from src.enrichment_cache import get_enrichment_cache
+        
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         })
+        self.cache = cache or get_enrichment_cache()
         logger.info("LinkedIn scraper initialized (free mode)")
     
     def search_profiles(self, keywords: str, location: str = '', limit: int = 10) -> List[Dict]:
@@ -100,25 +109,30 @@ class LinkedInScraper:
                 query += f' {location}'
             
             url = f'https://www.google.com/search?q={requests.utils.quote(query)}&num=3'
-            response = self.session.get(url, timeout=10)
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # Get first result
-            first_result = soup.select_one('.g')
-            if first_result:
-                link = first_result.select_one('a')
-                if link and 'linkedin.com/company/' in link.get('href', ''):
-                    return {
-                        'company_url': link['href'],
-                        'found': True
-                    }
-            
-            return None
+            # Cached per search URL; revalidated instead of re-searched after the TTL
+            return self.cache.fetch(url, self._parse_company_result, session=self.session, timeout=10)
             
         except Exception as e:
             logger.error(f"LinkedIn enrichment error: {e}")
             return None
     
+    @staticmethod
+    def _parse_company_result(html: str) -> Optional[Dict]:
+        """Pick the first LinkedIn company page out of a search results page"""
+        soup = BeautifulSoup(html, 'html.parser')
+        
+        # Get first result
+        first_result = soup.select_one('.g')
+        if first_result:
+            link = first_result.select_one('a')
+            if link and 'linkedin.com/company/' in link.get('href', ''):
+                return {
+                    'company_url': link['href'],
+                    'found': True
+                }
+        
+        return None
+    
     def extract_email_from_profile(self, profile_url: str) -> Optional[str]:
         """
         Try to extract email from LinkedIn profile (limited success).
@@ -1,5 +1,7 @@
 """Query generation module for Lead Generation Bot."""
 
+from typing import Optional
+
 # 🎯 RAGSPRO TARGET CITIES - WORLDWIDE HIGH-PAYING MARKETS
 # 200+ cities across all major countries for maximum lead coverage
 CITIES = [
@@ -264,13 +266,22 @@ CATEGORIES = [
 ]
 
 
-def generate_queries() -> list[str]:
+def generate_queries(planner=None, max_queries: Optional[int] = None) -> list[str]:
     """
     Generate all city × category query combinations.
     
+    Args:
+        planner: Optional QueryPlanner (src/query_planner.py); when given, queries
+            are ordered by expected yield and repeat zero-yield ones are dropped
+        max_queries: Query budget when planning (None = no limit)
+    
     Returns:
         List of search query strings in format "{category} in {city}"
     """
+    if planner is not None:
+        plan = planner.plan(CITIES, CATEGORIES, max_queries)
+        return [entry['query'] for entry in plan['queries']]
+    
     queries = []
     for city in CITIES:
         for category in CATEGORIES:
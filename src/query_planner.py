@@ -0,0 +1,249 @@
+"""
+Query Planner - Spend search quota on city × category combinations that pay off
+Records what every query yielded (results, premium leads, duplicates) and orders
+the next run with an upper-confidence-bound bandit: proven queries first, a share
+of untried ones for exploration, and repeat zero-yield queries skipped until a
+cooldown passes
+"""
+
+import json
+import logging
+import math
+import os
+import shutil
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def make_query(category: str, city: str) -> str:
+    """Search string for a city × category combination"""
+    return f"{category} in {city}"
+
+
+def _diagonal(cities: List[str], categories: List[str]):
+    """
+    City × category pairs walked diagonally, so leading pairs mix the first
+    cities with the first categories instead of one city's every category
+    """
+    for depth in range(len(cities) + len(categories) - 1):
+        for i in range(max(0, depth - len(categories) + 1), min(len(cities), depth + 1)):
+            yield cities[i], categories[depth - i]
+
+
+class QueryPlanner:
+    """Per-query yield history with explore/exploit ordering"""
+    
+    def __init__(self, stats_path: str = "data/query_stats.json", exploration: float = 1.0,
+                 skip_after: int = 3, prior_weight: float = 1.0, skip_cooldown_days: float = 14):
+        """
+        Initialize query planner.
+        
+        Args:
+            stats_path: JSON file holding per-query yield history
+            exploration: Weight of the confidence bonus (0 = pure exploitation)
+            skip_after: Runs with zero premium leads after which a query is skipped
+            prior_weight: Pseudo-runs given to the city/category estimate of a query
+            skip_cooldown_days: Days after its last run before a skipped query is tried again
+        """
+        self.stats_path = stats_path
+        self.exploration = exploration
+        self.skip_after = skip_after
+        self.prior_weight = prior_weight
+        self.skip_cooldown = timedelta(days=skip_cooldown_days)
+        self.lock = threading.Lock()
+        self.queries = self._load()
+    
+    def _load(self) -> Dict[str, Dict]:
+        if not os.path.exists(self.stats_path):
+            return {}
+        try:
+            with open(self.stats_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.error(f"Could not read query stats, starting fresh: {e}")
+            return {}
+    
+    def save(self) -> bool:
+        """Write yield history atomically"""
+        with self.lock:
+            data = json.dumps(self.queries, indent=2, ensure_ascii=False)
+        
+        temp_path = f"{self.stats_path}.tmp"
+        try:
+            directory = os.path.dirname(self.stats_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                f.write(data)
+            shutil.move(temp_path, self.stats_path)
+            return True
+        except Exception as e:
+            logger.error(f"Could not save query stats: {e}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return False
+    
+    def record(self, city: str, category: str, results: int, premium: int,
+               duplicates: int = 0, save: bool = True):
+        """
+        Record what one run of a query yielded.
+        
+        Args:
+            city: City searched
+            category: Category searched
+            results: Places returned by the search
+            premium: Leads that passed the quality threshold
+            duplicates: Premium leads already found earlier in the run
+            save: Persist the history immediately
+        """
+        query = make_query(category, city)
+        with self.lock:
+            entry = self.queries.setdefault(query, {
+                'city': city,
+                'category': category,
+                'runs': 0,
+                'results': 0,
+                'premium': 0,
+                'duplicates': 0,
+                'zero_runs': 0,
+            })
+            entry['runs'] += 1
+            entry['results'] += results
+            entry['premium'] += premium
+            entry['duplicates'] += duplicates
+            # Consecutive runs without a new premium lead
+            entry['zero_runs'] = entry['zero_runs'] + 1 if premium - duplicates <= 0 else 0
+            entry['last_run'] = datetime.now().isoformat()
+        
+        if save:
+            self.save()
+    
+    def _skipping(self, entry: Dict, now: datetime) -> bool:
+        """Repeat zero-yield query still inside its cooldown (afterwards it gets one more run)"""
+        if entry['zero_runs'] < self.skip_after:
+            return False
+        last_run = entry.get('last_run')
+        return not last_run or now - datetime.fromisoformat(last_run) < self.skip_cooldown
+    
+    def _group_means(self) -> Dict:
+        """Premium leads and results per run, pooled by city, by category and overall"""
+        totals = {'city': {}, 'category': {}}
+        overall = [0, 0, 0]
+        for entry in self.queries.values():
+            for group in ('city', 'category'):
+                bucket = totals[group].setdefault(entry[group], [0, 0, 0])
+                bucket[0] += entry['runs']
+                bucket[1] += entry['premium'] - entry['duplicates']
+                bucket[2] += entry['results']
+            overall[0] += entry['runs']
+            overall[1] += entry['premium'] - entry['duplicates']
+            overall[2] += entry['results']
+        
+        def means(bucket):
+            # One pseudo-run of zero yield keeps a single lucky run from
+            # inflating every combination that shares its city or category
+            runs, premium, results = bucket
+            return (premium / (runs + 1), results / (runs + 1)) if runs else None
+        
+        return {
+            'city': {name: means(bucket) for name, bucket in totals['city'].items()},
+            'category': {name: means(bucket) for name, bucket in totals['category'].items()},
+            'overall': means(overall) or (0.0, 0.0),
+            'total_runs': overall[0],
+        }
+    
+    def _estimate(self, city: str, category: str, groups: Dict, now: datetime) -> Dict:
+        """Expected new premium leads and results for one combination"""
+        # An unseen combination borrows from its city, category and overall track records
+        priors = [m for m in (groups['city'].get(city), groups['category'].get(category)) if m]
+        priors.append(groups['overall'])
+        prior_premium = sum(m[0] for m in priors) / len(priors)
+        prior_results = sum(m[1] for m in priors) / len(priors)
+        
+        entry = self.queries.get(make_query(category, city))
+        runs = entry['runs'] if entry else 0
+        premium = entry['premium'] - entry['duplicates'] if entry else 0
+        results = entry['results'] if entry else 0
+        weight = self.prior_weight
+        
+        expected_premium = (premium + weight * prior_premium) / (runs + weight)
+        expected_results = (results + weight * prior_results) / (runs + weight)
+        bonus = self.exploration * math.sqrt(math.log(groups['total_runs'] + 2) / (runs + 1))
+        
+        return {
+            'query': make_query(category, city),
+            'city': city,
+            'category': category,
+            'runs': runs,
+            'expected_premium': round(expected_premium, 3),
+            'expected_results': round(expected_results, 3),
+            'score': expected_premium + bonus,
+            'skip': bool(entry) and self._skipping(entry, now),
+        }
+    
+    def plan(self, cities: List[str], categories: List[str], max_queries: Optional[int] = None) -> Dict:
+        """
+        Order city × category queries for the next run.
+        
+        Args:
+            cities: Candidate cities
+            categories: Candidate categories
+            max_queries: Query budget (None = every query not skipped)
+        
+        Returns:
+            Dict with ordered 'queries', 'skipped' queries and the plan's
+            expected results and premium leads
+        """
+        now = datetime.now()
+        with self.lock:
+            groups = self._group_means()
+            estimates = [self._estimate(city, category, groups, now)
+                         for city, category in _diagonal(cities, categories)]
+        
+        skipped = [e for e in estimates if e['skip']]
+        # Stable sort keeps the diagonal order between equally scored (e.g. all unseen) queries
+        planned = sorted((e for e in estimates if not e['skip']), key=lambda e: -e['score'])
+        if max_queries is not None:
+            planned = planned[:max_queries]
+        
+        return {
+            'queries': planned,
+            'skipped': skipped,
+            'candidates': len(estimates),
+            'unexplored': sum(1 for e in planned if e['runs'] == 0),
+            'expected_results': round(sum(e['expected_results'] for e in planned), 1),
+            'expected_premium': round(sum(e['expected_premium'] for e in planned), 1),
+        }
+    
+    def get_stats(self, top: int = 10) -> Dict:
+        """Overall yield plus the best and worst queries so far"""
+        now = datetime.now()
+        with self.lock:
+            entries = [dict(entry, query=query) for query, entry in self.queries.items()]
+        ranked = sorted(entries, key=lambda e: (e['premium'] - e['duplicates']) / e['runs'], reverse=True)
+        return {
+            'queries_tracked': len(entries),
+            'runs': sum(e['runs'] for e in entries),
+            'results': sum(e['results'] for e in entries),
+            'premium': sum(e['premium'] for e in entries),
+            'duplicates': sum(e['duplicates'] for e in entries),
+            'skipping': sum(1 for e in entries if self._skipping(e, now)),
+            'best': ranked[:top],
+            'worst': ranked[-top:][::-1] if len(ranked) > top else [],
+        }
+
+
+_planner = None
+_planner_lock = threading.Lock()
+
+
+def get_query_planner() -> QueryPlanner:
+    """Shared query planner backed by data/query_stats.json"""
+    global _planner
+    with _planner_lock:
+        if _planner is None:
+            _planner = QueryPlanner()
+        return _planner
@@ -62,6 +62,39 @@ class RateLimiter:
             self.requests[service].append(now)
             return True
     
+    def try_acquire(self, service: str = 'default') -> float:
+        """
+        Record a request if the service has budget left, without logging a refusal.
+        
+        Args:
+            service: Service name
+        
+        Returns:
+            0.0 if the request was recorded, otherwise seconds until a slot frees
+        """
+        with self.lock:
+            now = datetime.now()
+            minute_ago = now - timedelta(minutes=1)
+            
+            self.requests[service] = [
+                req_time for req_time in self.requests[service]
+                if req_time > minute_ago
+            ]
+            
+            limit = self.limits.get(service, self.limits['default'])
+            if len(self.requests[service]) >= limit:
+                if not self.requests[service]:
+                    return 60.0
+                return max((self.requests[service][0] - minute_ago).total_seconds(), 0.01)
+            
+            self.requests[service].append(now)
+            return 0.0
+    
+    def set_limit(self, service: str, per_minute: int):
+        """Change a service's requests-per-minute budget"""
+        with self.lock:
+            self.limits[service] = per_minute
+    
     def wait_if_needed(self, service: str = 'default', max_wait: int = 60):
         """
         Wait if rate limit is reached.
@@ -7,7 +7,8 @@ import logging
 from typing import Dict, List
 from datetime import datetime, timedelta
 from sqlalchemy import func, and_, or_
-from src.database import get_db, Lead, Interaction, LeadAnalytics, Template
+from sqlalchemy.orm import contains_eager
+from src.database import get_db, eager_load, Lead, Interaction, LeadAnalytics, Template
 
 logger = logging.getLogger(__name__)
 
@@ -40,7 +41,10 @@ class RecommendationsEngine:
     def _get_high_conversion_leads(self, session) -> List[Dict]:
         """Find leads most likely to convert"""
         # Get leads with high engagement but not yet contacted
-        leads = session.query(Lead).join(LeadAnalytics).filter(
+        # Populate lead.analytics from the JOIN we already do (no lazy load per lead)
+        leads = session.query(Lead).join(LeadAnalytics).options(
+            contains_eager(Lead.analytics)
+        ).filter(
             and_(
                 Lead.quality_score >= 80,
                 Lead.email_sent == False,
@@ -150,11 +154,12 @@ class RecommendationsEngine:
     
     def _get_best_send_time(self, session) -> Dict:
         """Analyze best time to send emails"""
-        # Get interactions with timestamps
-        interactions = session.query(Interaction).filter(
+        # Get reply timestamps only (column projection, no Interaction objects)
+        interactions = session.query(Interaction.created_at).filter(
             Interaction.type == 'Email',
             Interaction.direction == 'Outbound',
-            Interaction.replied == True
+            Interaction.replied == True,
+            Interaction.created_at.isnot(None)
         ).all()
         
         if not interactions:
@@ -212,14 +217,20 @@ class RecommendationsEngine:
     
     def _get_priority_leads(self, session) -> List[Dict]:
         """Get leads that need immediate attention"""
+        # Only the columns we report are selected, so no Lead objects
+        # (or their relationships) are materialized
+        columns = (Lead.id, Lead.title, Lead.last_contacted)
+        
         # Leads that replied but not followed up
-        replied_leads = session.query(Lead).filter(
+        replied_leads = session.query(*columns).filter(
             Lead.email_replied == True,
             Lead.last_contacted < datetime.utcnow() - timedelta(days=2)
         ).order_by(Lead.last_contacted.asc()).limit(5).all()
         
         # Hot leads not contacted recently
-        hot_leads = session.query(Lead).join(LeadAnalytics).filter(
+        hot_leads = session.query(*columns).join(
+            LeadAnalytics, LeadAnalytics.lead_id == Lead.id
+        ).filter(
             LeadAnalytics.is_hot_lead == True,
             or_(
                 Lead.last_contacted.is_(None),
@@ -254,7 +265,9 @@ class RecommendationsEngine:
         session = get_db()
         
         try:
-            lead = session.query(Lead).get(lead_id)
+            lead = eager_load(
+                session.query(Lead), Lead.analytics, joined=True
+            ).filter(Lead.id == lead_id).first()
             if not lead:
                 return {'error': 'Lead not found'}
             
@@ -4,12 +4,24 @@ Converts 1 person into 5 salespeople
 """
 
 import logging
-from typing import Dict, Optional
+import re
+import threading
+import time
+from typing import Dict, List, Optional
 from src.database import get_db, Lead, Interaction
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+# Replies whose top category holds less than this share of the keyword score go to AI
+AMBIGUOUS_SHARE = 0.6
+
+# Replies sent to the AI per batched prompt
+AI_BATCH_SIZE = 40
+
+# Local model predictions below this confidence escalate to AI
+MODEL_CONFIDENCE = 0.7
+
 
 class ReplyClassifier:
     """Classify email/WhatsApp replies using AI"""
@@ -54,10 +66,138 @@ class ReplyClassifier:
         }
     }
     
-    def __init__(self, ai_assistant):
-        """Initialize classifier"""
+    def __init__(self, ai_assistant, model=None, model_threshold: float = MODEL_CONFIDENCE):
+        """
+        Initialize classifier.
+        
+        Args:
+            ai_assistant: Gemini assistant for replies nothing else can classify
+            model: Optional offline ReplyModel (src/reply_model.py) tried before AI
+            model_threshold: Minimum model confidence to skip the AI call
+        """
         self.ai = ai_assistant
-        logger.info("Reply classifier initialized")
+        self.model = model
+        self.model_threshold = model_threshold
+        self._keyword_category, self._keyword_pattern = self._compile_keywords()
+        self._lock = threading.Lock()
+        self.stats = {'replies': 0, 'keyword': 0, 'model': 0, 'ai': 0, 'ai_fallback': 0, 'fallback': 0,
+                      'ai_calls': 0, 'seconds': 0.0}
+        logger.info(f"Reply classifier initialized ({'with' if model else 'without'} local model)")
+    
+    @classmethod
+    def _compile_keywords(cls):
+        """One word-bounded alternation over every category's keywords"""
+        keyword_category = {}
+        for category, info in cls.CATEGORIES.items():
+            for keyword in info['keywords']:
+                keyword_category.setdefault(keyword, category)
+        
+        # Longest first, so "not interested" is consumed before "interested" can match
+        keywords = sorted(keyword_category, key=len, reverse=True)
+        pattern = re.compile(r'\b(?:' + '|'.join(re.escape(k) for k in keywords) + r')\b')
+        return keyword_category, pattern
+    
+    def _result(self, category: str, confidence: float, method: str, sentiment: Optional[str] = None) -> Dict:
+        info = self.CATEGORIES[category]
+        return {
+            'category': category,
+            'sentiment': sentiment or info['sentiment'],
+            'priority': info['priority'],
+            'action': info['action'],
+            'confidence': confidence,
+            'method': method
+        }
+    
+    def _fallback(self) -> Dict:
+        return {
+            'category': 'SendDetails',
+            'sentiment': 'Neutral',
+            'priority': 'Medium',
+            'action': 'Manual review needed',
+            'confidence': 0.3,
+            'method': 'fallback'
+        }
+    
+    def score_keywords(self, reply_text: str) -> Dict[str, int]:
+        """
+        Score every category in one pass over the reply.
+        
+        Each matched keyword adds its word count, so specific phrases
+        ("not interested") outweigh single words ("yes").
+        
+        Returns:
+            Dict of category -> score (only categories that matched)
+        """
+        scores = {}
+        for match in self._keyword_pattern.finditer(reply_text.lower()):
+            keyword = match.group(0)
+            category = self._keyword_category[keyword]
+            scores[category] = scores.get(category, 0) + len(keyword.split())
+        return scores
+    
+    def _classify_keywords(self, reply_text: str):
+        """
+        Keyword classification.
+        
+        Returns:
+            (result, ambiguous): result is None when nothing matched; ambiguous
+            is True when no category clearly leads and AI should decide
+        """
+        scores = self.score_keywords(reply_text)
+        if not scores:
+            return None, True
+        
+        # Ties go to the category listed first in CATEGORIES
+        category = max((c for c in self.CATEGORIES if c in scores), key=scores.get)
+        share = scores[category] / sum(scores.values())
+        result = self._result(category, round(0.8 * share, 2), 'keyword')
+        result['scores'] = scores
+        return result, share < AMBIGUOUS_SHARE
+    
+    def _classify_with_model(self, replies: List[str]) -> List[Optional[Dict]]:
+        """Local model results, None where it isn't confident enough"""
+        if self.model is None or not replies:
+            return [None] * len(replies)
+        try:
+            predictions = self.model.predict_many(replies)
+        except Exception as e:
+            logger.error(f"Local reply model failed: {e}")
+            return [None] * len(replies)
+        
+        results = []
+        for prediction in predictions:
+            if prediction['confidence'] < self.model_threshold or prediction['category'] not in self.CATEGORIES:
+                results.append(None)
+                continue
+            sentiment = None
+            if prediction['sentiment'] and prediction['sentiment_confidence'] >= self.model_threshold:
+                sentiment = prediction['sentiment']
+            results.append(self._result(prediction['category'], round(prediction['confidence'], 2),
+                                        'model', sentiment))
+        return results
+    
+    def _record(self, results: List[Dict], seconds: float, ai_calls: int):
+        with self._lock:
+            self.stats['replies'] += len(results)
+            for result in results:
+                self.stats[result['method']] += 1
+            self.stats['ai_calls'] += ai_calls
+            self.stats['seconds'] += seconds
+    
+    def get_stats(self) -> Dict:
+        """
+        Classification counts by method, AI-call reduction and latency.
+        
+        ai_call_reduction is the share of replies keywords couldn't settle
+        that the local model answered instead of the AI.
+        """
+        with self._lock:
+            stats = dict(self.stats)
+        escalated = stats['model'] + stats['ai'] + stats['ai_fallback'] + stats['fallback']
+        stats['ai_call_reduction'] = round(stats['model'] / escalated, 3) if escalated else 0.0
+        stats['ms_per_reply'] = round(stats['seconds'] * 1000 / stats['replies'], 3) if stats['replies'] else 0.0
+        stats['seconds'] = round(stats['seconds'], 3)
+        return stats
     
     def classify_reply(self, reply_text: str, lead_id: Optional[int] = None) -> Dict:
         """
@@ -70,41 +210,138 @@ class ReplyClassifier:
         Returns:
             Classification dict with category, sentiment, suggested_response
         """
-        reply_lower = reply_text.lower()
+        started = time.perf_counter()
+        ai_calls = 0
         
         # First try keyword matching (fast)
-        for category, info in self.CATEGORIES.items():
-            for keyword in info['keywords']:
-                if keyword in reply_lower:
-                    logger.info(f"Classified as {category} (keyword match)")
-                    return {
-                        'category': category,
-                        'sentiment': info['sentiment'],
-                        'priority': info['priority'],
-                        'action': info['action'],
-                        'confidence': 0.8,
-                        'method': 'keyword'
-                    }
-        
-        # If no keyword match, use AI
-        try:
-            classification = self._classify_with_ai(reply_text)
-            logger.info(f"Classified as {classification['category']} (AI)")
-            return classification
-        except Exception as e:
-            logger.error(f"AI classification failed: {e}")
-            # Default to neutral
-            return {
-                'category': 'SendDetails',
-                'sentiment': 'Neutral',
-                'priority': 'Medium',
-                'action': 'Manual review needed',
-                'confidence': 0.3,
-                'method': 'fallback'
-            }
+        keyword_result, ambiguous = self._classify_keywords(reply_text)
+        classification = None if ambiguous else keyword_result
+        if classification:
+            logger.info(f"Classified as {classification['category']} (keyword match)")
+        
+        # Then the local model (no API call)
+        if classification is None:
+            classification = self._classify_with_model([reply_text])[0]
+            if classification:
+                logger.info(f"Classified as {classification['category']} (local model)")
+        
+        # If still unsure, use AI
+        if classification is None:
+            ai_calls = 1
+            try:
+                classification = self._classify_with_ai(reply_text)
+                logger.info(f"Classified as {classification['category']} (AI)")
+            except Exception as e:
+                logger.error(f"AI classification failed: {e}")
+                # Best keyword guess, else default to neutral
+                classification = keyword_result or self._fallback()
+        
+        self._record([classification], time.perf_counter() - started, ai_calls)
+        return classification
+    
+    def classify_batch(self, replies: List[str], batch_size: int = AI_BATCH_SIZE) -> List[Dict]:
+        """
+        Classify many replies: keywords first, then the local model, then one
+        AI prompt per batch of the replies still ambiguous.
+        
+        Args:
+            replies: Reply texts
+            batch_size: Ambiguous replies per AI prompt
+        
+        Returns:
+            Classification dicts in the same order as replies
+        """
+        started = time.perf_counter()
+        results = [None] * len(replies)
+        ambiguous = []
+        
+        for index, reply_text in enumerate(replies):
+            keyword_result, is_ambiguous = self._classify_keywords(reply_text)
+            results[index] = keyword_result
+            if is_ambiguous:
+                ambiguous.append(index)
+        
+        model_results = self._classify_with_model([replies[i] for i in ambiguous])
+        unsure = []
+        for index, model_result in zip(ambiguous, model_results):
+            if model_result:
+                results[index] = model_result
+            else:
+                unsure.append(index)
+        
+        ai_calls = 0
+        for start in range(0, len(unsure), batch_size):
+            chunk = unsure[start:start + batch_size]
+            ai_calls += 1
+            try:
+                classified = self._classify_batch_with_ai([replies[i] for i in chunk])
+            except Exception as e:
+                logger.error(f"Batch AI classification failed: {e}")
+                classified = {}
+            
+            for position, index in enumerate(chunk):
+                if position in classified:
+                    results[index] = classified[position]
+        
+        for index, result in enumerate(results):
+            if result is None:
+                results[index] = self._fallback()
+        
+        self._record(results, time.perf_counter() - started, ai_calls)
+        logger.info(f"Classified {len(replies)} replies ({len(ambiguous) - len(unsure)} by local model, "
+                    f"{len(unsure)} sent to AI)")
+        return results
+    
+    def _classify_batch_with_ai(self, replies: List[str]) -> Dict[int, Dict]:
+        """Classify several replies with one Gemini prompt (position -> classification)"""
+        numbered = '\n'.join(
+            f'{number}. "{" ".join(reply.split())}"' for number, reply in enumerate(replies, 1)
+        )
+        
+        prompt = f"""Classify each business reply below into ONE category.
+
+Replies:
+{numbered}
+
+Categories:
+1. Interested - They want to know more, ready to talk
+2. SendDetails - They want more information, portfolio, pricing
+3. Budget - They're concerned about cost
+4. NotNow - They're busy, want to talk later
+5. NotInterested - They're not interested at all
+6. Spam - Spam or angry response
+
+Respond with ONE line per reply and nothing else.
+Format: Number|Category|Confidence|Sentiment
+
+Example: 1|Interested|0.9|Positive"""
+        
+        response = self.ai.model.generate_content(prompt).text.strip()
+        
+        classified = {}
+        for line in response.splitlines():
+            parts = [part.strip() for part in line.split('|')]
+            if len(parts) < 2:
+                continue
+            try:
+                position = int(parts[0].rstrip('.')) - 1
+                confidence = float(parts[2]) if len(parts) > 2 else 0.7
+            except ValueError:
+                continue
+            if not 0 <= position < len(replies) or parts[1] not in self.CATEGORIES:
+                continue
+            sentiment = parts[3] if len(parts) > 3 else None
+            classified[position] = self._result(parts[1], confidence, 'ai', sentiment)
+        
+        return classified
     
     def _classify_with_ai(self, reply_text: str) -> Dict:
-        """Classify using Gemini AI"""
+        """
+        Classify using Gemini AI.
+        
+        An answer naming no known category is coerced to SendDetails with
+        method 'ai_fallback', so it is never mistaken for an AI label.
+        """
         
         prompt = f"""Classify this business reply into ONE category:
 
@@ -134,18 +371,10 @@ Example: Interested|0.9|Positive"""
             
             # Validate category
             if category not in self.CATEGORIES:
-                category = 'SendDetails'
-            
-            info = self.CATEGORIES[category]
+                logger.warning(f"Unusable AI classification: {response[:100]!r}")
+                return self._result('SendDetails', 0.3, 'ai_fallback', 'Neutral')
             
-            return {
-                'category': category,
-                'sentiment': sentiment,
-                'priority': info['priority'],
-                'action': info['action'],
-                'confidence': confidence,
-                'method': 'ai'
-            }
+            return self._result(category, confidence, 'ai', sentiment)
             
         except Exception as e:
             logger.error(f"AI parsing error: {e}")
@@ -337,7 +566,9 @@ Raghav Shah"""
                 content=reply_text,
                 replied=True,
                 sentiment=classification['sentiment'],
-                intent=classification['category']
+                intent=classification['category'],
+                classification_method=classification['method'],
+                classification_confidence=classification['confidence']
             )
             session.add(interaction)
             
@@ -362,6 +593,11 @@ Raghav Shah"""
                     lead.analytics.is_cold_lead = False
             
             session.commit()
+            lead_status = lead.status
+            
+            # Feed the reply into any A/B tests this lead is enrolled in
+            from src.ab_testing import create_ab_testing_framework
+            create_ab_testing_framework().record_reply(lead_id)
             
             logger.info(f"Processed reply for lead {lead_id}: {classification['category']}")
             
@@ -369,7 +605,7 @@ Raghav Shah"""
                 'success': True,
                 'classification': classification,
                 'suggested_response': suggested_response,
-                'lead_status': lead.status
+                'lead_status': lead_status
             }
             
         except Exception as e:
@@ -378,11 +614,55 @@ Raghav Shah"""
             return {'error': str(e)}
         finally:
             session.close()
+    
+    def correct_classification(self, interaction_id: int, category: str,
+                               sentiment: Optional[str] = None) -> Dict:
+        """
+        Record a human-verified label for a saved reply (trusted as reply model training data).
+        
+        Args:
+            interaction_id: Inbound Interaction ID
+            category: Correct category (one of CATEGORIES)
+            sentiment: Correct sentiment (default: the category's usual sentiment)
+        
+        Returns:
+            Dict with success, or error
+        """
+        if category not in self.CATEGORIES:
+            return {'error': f'Unknown category: {category}'}
+        
+        session = get_db()
+        
+        try:
+            interaction = session.get(Interaction, interaction_id)
+            if not interaction or interaction.direction != 'Inbound':
+                return {'error': 'Reply not found'}
+            
+            interaction.intent = category
+            interaction.sentiment = sentiment or self.CATEGORIES[category]['sentiment']
+            interaction.classification_method = 'human'
+            interaction.classification_confidence = 1.0
+            session.commit()
+            return {'success': True}
+            
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Error correcting classification: {e}")
+            return {'error': str(e)}
+        finally:
+            session.close()
 
 
-def create_reply_classifier(ai_assistant):
-    """Create reply classifier instance"""
-    return ReplyClassifier(ai_assistant)
+def create_reply_classifier(ai_assistant, use_model: bool = True):
+    """Create reply classifier instance (with the trained local model, if any)"""
+    model = None
+    if use_model:
+        try:
+            from src.reply_model import load_reply_model
+            model = load_reply_model()
+        except ImportError:
+            logger.warning("NumPy not installed; local reply model disabled")
+    return ReplyClassifier(ai_assistant, model=model)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,327 @@
+"""
+Reply Model - Offline CPU classifier for reply intent and sentiment
+Hashed word/character n-grams + softmax regression in NumPy, trained from
+labelled Interaction rows, so most replies never need a Gemini call
+"""
+
+import logging
+import os
+import re
+import time
+import zlib
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL_PATH = "data/models/reply_model.npz"
+
+# Interaction.classification_method values trusted as training labels
+# ('ai_fallback' is an unusable AI answer coerced to a default, not a label)
+TRAINING_LABEL_METHODS = ('ai', 'human')
+
+# Feature hashing: 2^14 buckets keeps the weights ~0.5 MB per head
+N_FEATURES = 2 ** 14
+WORD_PATTERN = re.compile(r"[a-z0-9']+")
+
+
+def extract_features(text: str, n_features: int = N_FEATURES) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Hashed word 1-2 grams and character 3-grams of a reply.
+    
+    Returns:
+        (indices, values): bucket indices and L2-normalized counts; bucket 0
+        is a bias feature present in every reply
+    """
+    words = WORD_PATTERN.findall(text.lower())
+    grams = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    for word in words:
+        padded = f" {word} "
+        grams.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+    
+    counts = {}
+    for gram in grams:
+        # crc32 is stable across processes (str hash is salted per run)
+        bucket = 1 + zlib.crc32(gram.encode('utf-8')) % (n_features - 1)
+        counts[bucket] = counts.get(bucket, 0) + 1
+    
+    indices = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+    values = np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+    if len(values):
+        values /= np.linalg.norm(values)
+    return np.append(indices, 0), np.append(values, 1.0)
+
+
+class _SparseBatch:
+    """Rows of hashed features in CSR layout"""
+    
+    def __init__(self, texts: List[str], n_features: int):
+        rows = [extract_features(text, n_features) for text in texts]
+        self.indices = np.concatenate([r[0] for r in rows])
+        self.values = np.concatenate([r[1] for r in rows])
+        lengths = np.array([len(r[0]) for r in rows])
+        self.starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+        self.row_of = np.repeat(np.arange(len(rows)), lengths)
+        self.n_rows = len(rows)
+    
+    def dot(self, weights: np.ndarray) -> np.ndarray:
+        """Row-wise X @ weights"""
+        return np.add.reduceat(weights[self.indices] * self.values[:, None], self.starts, axis=0)
+    
+    def transpose_dot(self, errors: np.ndarray, n_features: int) -> np.ndarray:
+        """X.T @ errors"""
+        grad = np.zeros((n_features, errors.shape[1]))
+        np.add.at(grad, self.indices, errors[self.row_of] * self.values[:, None])
+        return grad
+
+
+def _softmax(logits: np.ndarray) -> np.ndarray:
+    logits = logits - logits.max(axis=1, keepdims=True)
+    exp = np.exp(logits)
+    return exp / exp.sum(axis=1, keepdims=True)
+
+
+def _train_head(batch: _SparseBatch, labels: List[str], n_features: int, epochs: int,
+                learning_rate: float, l2: float) -> Tuple[np.ndarray, List[str]]:
+    """Full-batch softmax regression with Adam"""
+    classes = sorted(set(labels))
+    targets = np.zeros((batch.n_rows, len(classes)))
+    targets[np.arange(batch.n_rows), [classes.index(label) for label in labels]] = 1.0
+    
+    weights = np.zeros((n_features, len(classes)))
+    m = np.zeros_like(weights)
+    v = np.zeros_like(weights)
+    beta1, beta2, eps = 0.9, 0.999, 1e-8
+    
+    for step in range(1, epochs + 1):
+        probs = _softmax(batch.dot(weights))
+        grad = batch.transpose_dot(probs - targets, n_features) / batch.n_rows + l2 * weights
+        m = beta1 * m + (1 - beta1) * grad
+        v = beta2 * v + (1 - beta2) * grad ** 2
+        m_hat = m / (1 - beta1 ** step)
+        v_hat = v / (1 - beta2 ** step)
+        weights -= learning_rate * m_hat / (np.sqrt(v_hat) + eps)
+    
+    return weights, classes
+
+
+class ReplyModel:
+    """Intent + sentiment softmax classifier over hashed n-grams"""
+    
+    def __init__(self, intent_weights: np.ndarray, intent_classes: List[str],
+                 sentiment_weights: Optional[np.ndarray] = None,
+                 sentiment_classes: Optional[List[str]] = None,
+                 n_features: int = N_FEATURES, metadata: Optional[Dict] = None):
+        self.intent_weights = intent_weights
+        self.intent_classes = list(intent_classes)
+        self.sentiment_weights = sentiment_weights
+        self.sentiment_classes = list(sentiment_classes or [])
+        self.n_features = n_features
+        self.metadata = metadata or {}
+    
+    @classmethod
+    def train(cls, texts: List[str], intents: List[str], sentiments: Optional[List[Optional[str]]] = None,
+              n_features: int = N_FEATURES, epochs: int = 150, learning_rate: float = 0.1,
+              l2: float = 1e-4) -> 'ReplyModel':
+        """
+        Fit intent (and sentiment, where labelled) heads.
+        
+        Args:
+            texts: Reply texts
+            intents: Intent label per reply
+            sentiments: Sentiment label per reply (None entries are skipped)
+            n_features: Hash buckets
+            epochs: Full-batch optimizer steps
+            learning_rate: Adam step size
+            l2: Weight decay
+        
+        Returns:
+            Trained ReplyModel
+        """
+        started = time.perf_counter()
+        batch = _SparseBatch(texts, n_features)
+        intent_weights, intent_classes = _train_head(batch, intents, n_features, epochs, learning_rate, l2)
+        
+        sentiment_weights, sentiment_classes = None, []
+        labelled = [i for i, label in enumerate(sentiments or []) if label]
+        if len({sentiments[i] for i in labelled}) > 1:
+            sentiment_batch = _SparseBatch([texts[i] for i in labelled], n_features)
+            sentiment_weights, sentiment_classes = _train_head(
+                sentiment_batch, [sentiments[i] for i in labelled], n_features, epochs, learning_rate, l2
+            )
+        
+        metadata = {
+            'trained_at': datetime.now().isoformat(),
+            'samples': len(texts),
+            'train_seconds': round(time.perf_counter() - started, 2),
+        }
+        return cls(intent_weights, intent_classes, sentiment_weights, sentiment_classes, n_features, metadata)
+    
+    def predict_many(self, texts: List[str]) -> List[Dict]:
+        """
+        Classify replies.
+        
+        Returns:
+            One dict per reply: category, confidence, sentiment (None without
+            a sentiment head) and sentiment_confidence
+        """
+        if not texts:
+            return []
+        batch = _SparseBatch(texts, self.n_features)
+        intent_probs = _softmax(batch.dot(self.intent_weights))
+        sentiment_probs = _softmax(batch.dot(self.sentiment_weights)) if self.sentiment_weights is not None else None
+        
+        predictions = []
+        for row in range(len(texts)):
+            best = int(intent_probs[row].argmax())
+            prediction = {
+                'category': self.intent_classes[best],
+                'confidence': float(intent_probs[row, best]),
+                'sentiment': None,
+                'sentiment_confidence': None,
+            }
+            if sentiment_probs is not None:
+                sentiment = int(sentiment_probs[row].argmax())
+                prediction['sentiment'] = self.sentiment_classes[sentiment]
+                prediction['sentiment_confidence'] = float(sentiment_probs[row, sentiment])
+            predictions.append(prediction)
+        return predictions
+    
+    def predict(self, text: str) -> Dict:
+        return self.predict_many([text])[0]
+    
+    def evaluate(self, texts: List[str], intents: List[str]) -> Dict:
+        """Intent accuracy overall and on predictions at or above each confidence level"""
+        predictions = self.predict_many(texts)
+        correct = [p['category'] == label for p, label in zip(predictions, intents)]
+        report = {'samples': len(texts), 'accuracy': round(sum(correct) / len(texts), 3) if texts else 0.0}
+        for threshold in (0.5, 0.7, 0.9):
+            confident = [c for p, c in zip(predictions, correct) if p['confidence'] >= threshold]
+            report[f'coverage@{threshold}'] = round(len(confident) / len(texts), 3) if texts else 0.0
+            report[f'accuracy@{threshold}'] = round(sum(confident) / len(confident), 3) if confident else None
+        return report
+    
+    def save(self, path: str = DEFAULT_MODEL_PATH):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        arrays = {
+            'intent_weights': self.intent_weights.astype(np.float32),
+            'intent_classes': np.array(self.intent_classes),
+            'n_features': np.array(self.n_features),
+            'trained_at': np.array(self.metadata.get('trained_at', '')),
+            'samples': np.array(self.metadata.get('samples', 0)),
+        }
+        if self.sentiment_weights is not None:
+            arrays['sentiment_weights'] = self.sentiment_weights.astype(np.float32)
+            arrays['sentiment_classes'] = np.array(self.sentiment_classes)
+        np.savez_compressed(path, **arrays)
+        logger.info(f"Reply model saved to {path}")
+    
+    @classmethod
+    def load(cls, path: str = DEFAULT_MODEL_PATH) -> 'ReplyModel':
+        with np.load(path) as data:
+            sentiment = 'sentiment_weights' in data
+            return cls(
+                intent_weights=data['intent_weights'].astype(np.float64),
+                intent_classes=[str(c) for c in data['intent_classes']],
+                sentiment_weights=data['sentiment_weights'].astype(np.float64) if sentiment else None,
+                sentiment_classes=[str(c) for c in data['sentiment_classes']] if sentiment else [],
+                n_features=int(data['n_features']),
+                metadata={'trained_at': str(data['trained_at']), 'samples': int(data['samples'])},
+            )
+
+
+def load_reply_model(path: str = DEFAULT_MODEL_PATH) -> Optional[ReplyModel]:
+    """Trained model, or None if none has been trained yet"""
+    if not os.path.exists(path):
+        return None
+    try:
+        return ReplyModel.load(path)
+    except Exception as e:
+        logger.error(f"Could not load reply model from {path}: {e}")
+        return None
+
+
+def load_training_data() -> Tuple[List[str], List[str], List[Optional[str]]]:
+    """
+    Inbound interactions with a trusted intent label (texts, intents, sentiments).
+    
+    Only AI-classified and human-verified replies are used; the model's own
+    predictions, keyword matches and fallbacks would teach it its own mistakes.
+    """
+    from src.database import get_db, Interaction
+    from src.reply_classifier import ReplyClassifier
+    
+    session = get_db()
+    
+    try:
+        rows = session.query(Interaction.content, Interaction.intent, Interaction.sentiment).filter(
+            Interaction.direction == 'Inbound',
+            Interaction.content.isnot(None),
+            Interaction.intent.in_(list(ReplyClassifier.CATEGORIES)),
+            Interaction.classification_method.in_(TRAINING_LABEL_METHODS),
+        ).all()
+    finally:
+        session.close()
+    
+    rows = [row for row in rows if row.content.strip()]
+    return [r.content for r in rows], [r.intent for r in rows], [r.sentiment for r in rows]
+
+
+def retrain_reply_model(path: str = DEFAULT_MODEL_PATH, min_samples: int = 50,
+                        max_age_days: Optional[float] = None, holdout: float = 0.2) -> Dict:
+    """
+    Retrain from the Interaction table and replace the saved model.
+    Should be run periodically (e.g. nightly via cron).
+    
+    Args:
+        path: Model file
+        min_samples: Labelled replies required before training
+        max_age_days: Skip if the saved model is younger than this
+        holdout: Share of replies held out to report accuracy/coverage
+    
+    Returns:
+        Dict with status and evaluation report
+    """
+    if max_age_days is not None and os.path.exists(path):
+        age = datetime.now() - datetime.fromtimestamp(os.path.getmtime(path))
+        if age < timedelta(days=max_age_days):
+            return {'status': 'skipped', 'reason': f'model is {age.days} days old'}
+    
+    texts, intents, sentiments = load_training_data()
+    if len(texts) < min_samples or len(set(intents)) < 2:
+        return {'status': 'skipped', 'reason': f'{len(texts)} labelled replies (need {min_samples})'}
+    
+    # Deterministic holdout for the report, then fit on everything
+    order = np.random.default_rng(0).permutation(len(texts))
+    cut = int(len(texts) * (1 - holdout))
+    train_idx, test_idx = order[:cut], order[cut:]
+    report = {}
+    if len(test_idx) and len({intents[i] for i in train_idx}) > 1:
+        probe = ReplyModel.train([texts[i] for i in train_idx], [intents[i] for i in train_idx])
+        report = probe.evaluate([texts[i] for i in test_idx], [intents[i] for i in test_idx])
+    
+    model = ReplyModel.train(texts, intents, sentiments)
+    model.save(path)
+    logger.info(f"Reply model retrained on {len(texts)} replies: {report}")
+    return {'status': 'trained', 'samples': len(texts), 'holdout': report, **model.metadata}
+
+
+if __name__ == '__main__':
+    import argparse
+    import json
+    from src.database import init_database
+    
+    parser = argparse.ArgumentParser(description='Retrain the offline reply classifier')
+    parser.add_argument('--path', default=DEFAULT_MODEL_PATH)
+    parser.add_argument('--min-samples', type=int, default=50)
+    parser.add_argument('--max-age-days', type=float, default=None,
+                        help='Only retrain when the saved model is older than this')
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO)
+    init_database()
+    print(json.dumps(retrain_reply_model(args.path, args.min_samples, args.max_age_days), indent=2))
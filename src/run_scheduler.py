@@ -0,0 +1,291 @@
+"""
+Run Scheduler - Concurrent lead generation runs for many users
+Each run gets its own status channel; runs are started and search slots from
+the shared API budget (the rate limiter) are handed out fair-share across
+users, so one user's 400-query run cannot starve anyone else's
+"""
+
+import itertools
+import logging
+import threading
+from collections import OrderedDict, defaultdict
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+from src.rate_limiter import get_rate_limiter
+
+logger = logging.getLogger(__name__)
+
+# Channel states; a run's 'running' flag stays true while it is queued or running
+QUEUED, RUNNING, FINISHED, CANCELLED = 'queued', 'running', 'finished', 'cancelled'
+ACTIVE_STATES = (QUEUED, RUNNING)
+
+
+class RunChannel:
+    """Status of one scheduled run (progress, message, leads) plus its stop flag"""
+    
+    def __init__(self, job_id: int, owner, on_cancel: Optional[Callable[[], None]] = None):
+        self.job_id = job_id
+        self.owner = owner
+        self.on_cancel = on_cancel
+        self.lock = threading.Lock()
+        self._stop = threading.Event()
+        self.status = {
+            'job_id': job_id,
+            'owner': owner,
+            'state': QUEUED,
+            'running': True,
+            'progress': 0,
+            'current_query': '',
+            'leads_found': 0,
+            'message': 'Queued',
+            'run_id': None,
+            'searches': 0,
+            'latest_leads': [],
+            'stop_signal': False,
+            'queued_at': datetime.now().isoformat(),
+            'started_at': None,
+            'finished_at': None,
+        }
+    
+    def update(self, **fields):
+        """Set status fields"""
+        with self.lock:
+            self.status.update(fields)
+    
+    def add_leads(self, leads: List[Dict], limit: int = 100):
+        """Append to the run's latest leads, keeping only the most recent"""
+        with self.lock:
+            self.status['latest_leads'] = (self.status['latest_leads'] + leads)[-limit:]
+    
+    def snapshot(self) -> Dict:
+        """Copy of the status that is safe to serialize"""
+        with self.lock:
+            return {**self.status, 'latest_leads': list(self.status['latest_leads'])}
+    
+    def request_stop(self):
+        with self.lock:
+            self.status['stop_signal'] = True
+        self._stop.set()
+    
+    @property
+    def stop_requested(self) -> bool:
+        return self._stop.is_set()
+    
+    @property
+    def active(self) -> bool:
+        with self.lock:
+            return self.status['state'] in ACTIVE_STATES
+
+
+class RunScheduler:
+    """
+    Start queued runs up to a global and per-user limit, and gate every search
+    through acquire() so API slots go to the user who has been served least.
+    
+    Fairness is per owner, not per run: a user with three runs gets the same
+    share of searches as a user with one.
+    """
+    
+    def __init__(self, max_active_runs: int = 4, max_active_per_user: int = 1,
+                 service: str = 'serpapi', rate_limiter=None, history: int = 50):
+        """
+        Args:
+            max_active_runs: Runs executing at once across all users
+            max_active_per_user: Runs executing at once for a single user (the rest queue)
+            service: Rate limiter service whose budget every search draws from
+            rate_limiter: RateLimiter to share (default: the global one)
+            history: Finished runs kept for status lookups
+        """
+        self.max_active_runs = max_active_runs
+        self.max_active_per_user = max_active_per_user
+        self.service = service
+        self.rate_limiter = rate_limiter or get_rate_limiter()
+        self.history = history
+        
+        self._cond = threading.Condition()
+        self._ids = itertools.count(1)
+        self._channels = OrderedDict()  # job_id -> RunChannel, oldest first
+        self._queue = []  # (channel, target, args, kwargs) waiting to start
+        self._active = defaultdict(int)  # owner -> runs executing
+        self._served = defaultdict(int)  # owner -> search slots granted while active
+        self._waiting = []  # channels blocked in acquire(), FIFO
+        
+        self.stats = {'submitted': 0, 'started': 0, 'finished': 0, 'cancelled': 0, 'slots_granted': 0}
+    
+    def submit(self, owner, target: Callable, *args, on_cancel: Optional[Callable[[], None]] = None,
+               **kwargs) -> RunChannel:
+        """
+        Queue a run; target(*args, channel=channel, **kwargs) executes on its own thread.
+        
+        Args:
+            on_cancel: Called instead of target if the run is stopped while still
+                queued (e.g. to release what was reserved for it)
+        
+        Returns:
+            The run's status channel
+        """
+        with self._cond:
+            channel = RunChannel(next(self._ids), owner, on_cancel)
+            self._channels[channel.job_id] = channel
+            self._queue.append((channel, target, args, kwargs))
+            self.stats['submitted'] += 1
+            self._start_ready()
+            self._prune()
+        
+        if channel.snapshot()['state'] == QUEUED:
+            position = self.queue_position(channel.job_id)
+            channel.update(message=f'Queued (position {position})')
+        return channel
+    
+    def _start_ready(self):
+        """Start queued runs while there is capacity (caller holds the condition)"""
+        while sum(self._active.values()) < self.max_active_runs:
+            ready = [entry for entry in self._queue if self._active.get(entry[0].owner, 0) < self.max_active_per_user]
+            if not ready:
+                return
+            
+            # Owners with fewer executing runs first, FIFO among equals
+            entry = min(ready, key=lambda e: self._active.get(e[0].owner, 0))
+            self._queue.remove(entry)
+            channel, target, args, kwargs = entry
+            
+            if not self._active.get(channel.owner):
+                # A newly active owner joins at the current minimum instead of
+                # catching up on every slot the others were granted
+                others = [self._served[owner] for owner, count in self._active.items() if count]
+                self._served[channel.owner] = min(others) if others else 0
+            self._active[channel.owner] += 1
+            self.stats['started'] += 1
+            
+            channel.update(state=RUNNING, message='Starting...', started_at=datetime.now().isoformat())
+            thread = threading.Thread(target=self._run, args=(channel, target, args, kwargs),
+                                      name=f'generation-run-{channel.job_id}')
+            thread.daemon = True
+            thread.start()
+    
+    def _run(self, channel: RunChannel, target: Callable, args, kwargs):
+        try:
+            target(*args, channel=channel, **kwargs)
+        except Exception as e:
+            logger.error(f"Run {channel.job_id} failed: {e}", exc_info=True)
+            channel.update(message=f'❌ Error: {e}')
+        finally:
+            with self._cond:
+                self._active[channel.owner] -= 1
+                if self._active[channel.owner] <= 0:
+                    del self._active[channel.owner]
+                    self._served.pop(channel.owner, None)
+                self.stats['finished'] += 1
+                channel.update(state=FINISHED, running=False, finished_at=datetime.now().isoformat())
+                self._start_ready()
+                self._cond.notify_all()
+    
+    def _next_waiter(self) -> Optional[RunChannel]:
+        """Waiting run whose owner has been served least (FIFO among equals)"""
+        if not self._waiting:
+            return None
+        return min(self._waiting, key=lambda channel: self._served[channel.owner])
+    
+    def acquire(self, channel: RunChannel, poll: float = 1.0) -> bool:
+        """
+        Block until it is this run's turn for a search and the shared budget allows it.
+        
+        Returns:
+            True when the run may search, False if it was asked to stop while waiting
+        """
+        with self._cond:
+            self._waiting.append(channel)
+            try:
+                while True:
+                    if channel.stop_requested:
+                        return False
+                    
+                    if self._next_waiter() is channel:
+                        wait = self.rate_limiter.try_acquire(self.service)
+                        if wait == 0:
+                            self._served[channel.owner] += 1
+                            self.stats['slots_granted'] += 1
+                            with channel.lock:
+                                channel.status['searches'] += 1
+                            return True
+                        self._cond.wait(timeout=min(wait, poll))
+                    else:
+                        self._cond.wait(timeout=poll)
+            finally:
+                self._waiting.remove(channel)
+                self._cond.notify_all()
+    
+    def stop(self, job_id: int) -> bool:
+        """Ask a run to stop; a queued run is cancelled without starting (and its on_cancel called)"""
+        cancelled = False
+        with self._cond:
+            channel = self._channels.get(job_id)
+            if channel is None or not channel.active:
+                return False
+            
+            channel.request_stop()
+            for entry in self._queue:
+                if entry[0] is channel:
+                    self._queue.remove(entry)
+                    self.stats['cancelled'] += 1
+                    channel.update(state=CANCELLED, running=False, message='🛑 Cancelled before starting',
+                                   finished_at=datetime.now().isoformat())
+                    cancelled = True
+                    break
+            else:
+                channel.update(message='🛑 Stopping...')
+            self._cond.notify_all()
+        
+        if cancelled and channel.on_cancel is not None:
+            try:
+                channel.on_cancel()
+            except Exception as e:
+                logger.error(f"Run {job_id} cancel callback failed: {e}", exc_info=True)
+        return True
+    
+    def get(self, job_id: int) -> Optional[RunChannel]:
+        with self._cond:
+            return self._channels.get(job_id)
+    
+    def latest(self, owner) -> Optional[RunChannel]:
+        """Owner's most recent run, preferring one that is still active"""
+        with self._cond:
+            channels = [channel for channel in self._channels.values() if channel.owner == owner]
+        for channel in reversed(channels):
+            if channel.active:
+                return channel
+        return channels[-1] if channels else None
+    
+    def list_runs(self, owner=None, active_only: bool = False) -> List[Dict]:
+        """Status snapshots, newest first"""
+        with self._cond:
+            channels = list(self._channels.values())
+        runs = [channel.snapshot() for channel in reversed(channels)
+                if (owner is None or channel.owner == owner) and (not active_only or channel.active)]
+        return runs
+    
+    def queue_position(self, job_id: int) -> Optional[int]:
+        """1-based position among queued runs, or None if not queued"""
+        with self._cond:
+            for position, entry in enumerate(self._queue, 1):
+                if entry[0].job_id == job_id:
+                    return position
+        return None
+    
+    def _prune(self):
+        """Forget the oldest finished runs beyond the history size (caller holds the condition)"""
+        finished = [job_id for job_id, channel in self._channels.items() if not channel.active]
+        for job_id in finished[:max(len(finished) - self.history, 0)]:
+            del self._channels[job_id]
+    
+    def get_stats(self) -> Dict:
+        """Scheduler counters, queue depth and per-user activity"""
+        with self._cond:
+            return {
+                **self.stats,
+                'active_runs': sum(self._active.values()),
+                'queued_runs': len(self._queue),
+                'waiting_for_budget': len(self._waiting),
+                'active_by_user': {str(owner): count for owner, count in self._active.items()},
+                'slots_by_user': {str(owner): count for owner, count in self._served.items()},
+            }
@@ -2,18 +2,52 @@
 
 import logging
 import time
+from typing import Callable, Dict, Iterator, List, Optional
+from urllib.parse import urlparse, parse_qs
+
 import serpapi
 
 logger = logging.getLogger(__name__)
 
+# Google Maps returns up to 20 local results per page
+PAGE_SIZE = 20
+
+
+class SearchError(Exception):
+    """A search failed (network, quota, bad key) rather than finding nothing"""
+
+
+def _check_error(data: dict):
+    """Raise SearchError for a SerpAPI error payload other than an empty result set"""
+    error = data.get('error')
+    if error and "hasn't returned any results" not in error:
+        raise SearchError(error)
+
+
+def _parse_place(place: dict) -> dict:
+    """Map one SerpAPI local result to our business dict"""
+    return {
+        'title': place.get('title', ''),
+        'rating': place.get('rating'),
+        'reviews': place.get('reviews', 0),
+        'address': place.get('address', ''),
+        'phone': place.get('phone'),
+        'website': place.get('website'),
+        'type': place.get('type', ''),
+        'place_id': place.get('place_id', ''),
+        'gps_coordinates': place.get('gps_coordinates', {})
+    }
+
 
-def search_places(query: str, api_key: str) -> list[dict]:
+def search_places(query: str, api_key: str, raise_errors: bool = False) -> list[dict]:
     """
     Search Google Maps via SerpAPI for REAL business data.
     
     Args:
         query: Search string (e.g., "baby care in Delhi, India")
         api_key: SerpAPI key
+        raise_errors: Raise SearchError when the search fails (after one retry)
+            instead of returning an empty list, so callers can tell it from no results
     
     Returns:
         List of REAL business dictionaries
@@ -34,6 +68,7 @@ def search_places(query: str, api_key: str) -> list[dict]:
         # Make API request using new serpapi client
         client = serpapi.Client(api_key=api_key)
         data = client.search(params)
+        _check_error(data)
         
         # Extract local results
         local_results = data.get("local_results", [])
@@ -41,17 +76,7 @@ def search_places(query: str, api_key: str) -> list[dict]:
         if local_results:
             for place in local_results:
                 try:
-                    business = {
-                        'title': place.get('title', ''),
-                        'rating': place.get('rating'),
-                        'reviews': place.get('reviews', 0),
-                        'address': place.get('address', ''),
-                        'phone': place.get('phone'),
-                        'website': place.get('website'),
-                        'type': place.get('type', ''),
-                        'place_id': place.get('place_id', ''),
-                        'gps_coordinates': place.get('gps_coordinates', {})
-                    }
+                    business = _parse_place(place)
                     results.append(business)
                     logger.info(f"✅ Found: {business['title']} ({business.get('rating', 'N/A')}★)")
                 except Exception as e:
@@ -72,27 +97,184 @@ def search_places(query: str, api_key: str) -> list[dict]:
             # Retry with new API
             client = serpapi.Client(api_key=api_key)
             data = client.search(params)
+            _check_error(data)
             local_results = data.get("local_results", [])
             
             for place in local_results:
                 try:
-                    business = {
-                        'title': place.get('title', ''),
-                        'rating': place.get('rating'),
-                        'reviews': place.get('reviews', 0),
-                        'address': place.get('address', ''),
-                        'phone': place.get('phone'),
-                        'website': place.get('website'),
-                        'type': place.get('type', ''),
-                        'place_id': place.get('place_id', ''),
-                        'gps_coordinates': place.get('gps_coordinates', {})
-                    }
-                    results.append(business)
+                    results.append(_parse_place(place))
                 except:
                     continue
                     
             logger.info(f"✅ Retry successful: {len(results)} businesses")
         except Exception as retry_error:
             logger.error(f"Retry failed: {str(retry_error)}")
+            if raise_errors:
+                raise SearchError(str(retry_error)) from retry_error
+    
+    return results
+
+
+def _next_start(data: dict, start: int, page_count: int) -> Optional[int]:
+    """Offset of the next page from serpapi_pagination, or None on the last page"""
+    next_url = data.get('serpapi_pagination', {}).get('next')
+    if not next_url:
+        return None
+    offsets = parse_qs(urlparse(next_url).query).get('start')
+    if offsets and offsets[0].isdigit():
+        return int(offsets[0])
+    return start + page_count
+
+
+def _place_key(place: dict) -> str:
+    return place.get('place_id') or f"{place.get('title', '')}|{place.get('address', '')}"
+
+
+def search_places_pages(query: str, api_key: str, max_pages: int = 5,
+                        stop_when: Optional[Callable[[Dict], bool]] = None) -> Iterator[Dict]:
+    """
+    Search Google Maps via SerpAPI page by page, following serpapi_pagination.
+    
+    Stops at the last page, after max_pages, when a page adds no new places,
+    when a page can't be fetched (twice), or when stop_when(page) returns True
+    for the page just yielded.
+    
+    Args:
+        query: Search string (e.g., "baby care in Delhi, India")
+        api_key: SerpAPI key
+        max_pages: Maximum pages (API calls, excluding retries) to fetch
+        stop_when: Early-stop predicate called with each page report
+    
+    Yields:
+        Page report dicts with 'page', 'start', 'places' (new unique places only),
+        'returned', 'new_unique', 'calls', 'total_unique' and 'unique_per_call'
+        (marginal: new_unique for this page per API call it took)
+    
+    Raises:
+        SearchError: SerpAPI answered a page (and its retry) with an error such
+            as a bad key or exhausted quota, which is not an empty page
+    """
+    client = serpapi.Client(api_key=api_key)
+    seen = set()
+    start = 0
+    total_calls = 0
+    
+    for page in range(1, max_pages + 1):
+        params = {
+            "engine": "google_maps",
+            "q": query,
+            "type": "search",
+            "start": start,
+            "api_key": api_key
+        }
+        
+        data = None
+        refused = None
+        calls = 0
+        for attempt in range(2):
+            calls += 1
+            try:
+                data = client.search(params)
+                _check_error(data)
+                refused = None
+                break
+            except SearchError as e:
+                refused = e
+                logger.error(f"SerpAPI error on page {page}: {str(e)}")
+            except Exception as e:
+                data = None
+                logger.error(f"SerpAPI error on page {page}: {str(e)}")
+            if attempt == 0:
+                logger.info("Retrying in 2 seconds...")
+                time.sleep(2)
+        total_calls += calls
+        if refused is not None:
+            raise refused
+        if data is None:
+            return
+        
+        local_results = data.get("local_results", [])
+        new_places = []
+        for place in local_results:
+            try:
+                business = _parse_place(place)
+            except Exception as e:
+                logger.warning(f"Error parsing business: {e}")
+                continue
+            key = _place_key(business)
+            if key not in seen:
+                seen.add(key)
+                new_places.append(business)
+        
+        report = {
+            'query': query,
+            'page': page,
+            'start': start,
+            'places': new_places,
+            'returned': len(local_results),
+            'new_unique': len(new_places),
+            'calls': total_calls,
+            'total_unique': len(seen),
+            'unique_per_call': round(len(new_places) / calls, 2),
+        }
+        logger.info(f"📄 Page {page} of '{query}': {len(new_places)} new / {len(local_results)} returned "
+                    f"({report['total_unique']} unique in {total_calls} calls)")
+        yield report
+        
+        if not new_places or (stop_when and stop_when(report)):
+            return
+        start = _next_start(data, start, len(local_results) or PAGE_SIZE)
+        if start is None:
+            return
+
+
+def stop_when_quality_below(min_share: float = 0.3, min_rating: float = 4.0,
+                            min_reviews: int = 10) -> Callable[[Dict], bool]:
+    """
+    Early-stop predicate: stop once too few of a page's new places are good leads.
+    
+    Args:
+        min_share: Minimum share of new places meeting the quality bar
+        min_rating: Rating a place needs to count as quality
+        min_reviews: Reviews a place needs to count as quality
+    
+    Returns:
+        Predicate for search_places_pages(stop_when=...)
+    """
+    def predicate(page: Dict) -> bool:
+        places = page['places']
+        if not places:
+            return True
+        good = sum(1 for p in places
+                   if (p.get('rating') or 0) >= min_rating and (p.get('reviews') or 0) >= min_reviews)
+        return good / len(places) < min_share
+    return predicate
+
+
+def search_places_deep(query: str, api_key: str, max_pages: int = 5,
+                       stop_when: Optional[Callable[[Dict], bool]] = None) -> List[dict]:
+    """
+    Collect unique places across pages (see search_places_pages).
+    
+    Args:
+        query: Search string
+        api_key: SerpAPI key
+        max_pages: Maximum pages to fetch
+        stop_when: Early-stop predicate called with each page report
+    
+    Returns:
+        List of unique business dictionaries
+    
+    Raises:
+        SearchError: SerpAPI answered with an error (see search_places_pages)
+    """
+    results = []
+    last = None
+    for page in search_places_pages(query, api_key, max_pages=max_pages, stop_when=stop_when):
+        results.extend(page['places'])
+        last = page
     
+    if last:
+        logger.info(f"✅ Scraped {len(results)} unique businesses in {last['calls']} SerpAPI calls "
+                    f"({len(results) / last['calls']:.1f} per call)")
     return results
@@ -10,7 +10,7 @@ logger = logging.getLogger(__name__)
 OUTSCRAPER_API_KEY = "your_key_here"  # Get from outscraper.com
 
 
-def scrape_google_maps_outscraper(query: str, max_results: int = 20) -> list[dict]:
+def scrape_google_maps_outscraper(query: str, max_results: int = 20, fallback: bool = True) -> list[dict]:
     """
     Scrape REAL Google Maps data using Outscraper API (FREE tier).
     
@@ -20,6 +20,7 @@ def scrape_google_maps_outscraper(query: str, max_results: int = 20) -> list[dic
     Args:
         query: Search query (e.g., "day care in Gurgaon")
         max_results: Maximum number of results
+        fallback: Fall back to Serper on errors (off when the provider registry decides)
     
     Returns:
         List of REAL business dictionaries
@@ -78,15 +79,21 @@ def scrape_google_maps_outscraper(query: str, max_results: int = 20) -> list[dic
         
         elif response.status_code == 402:
             logger.error("❌ Outscraper API: Out of credits. Using fallback...")
+            if not fallback:
+                raise RuntimeError("Outscraper API out of credits")
             return scrape_google_maps_serper(query, max_results)
         
         else:
             logger.error(f"❌ Outscraper API error: {response.status_code}")
+            if not fallback:
+                raise RuntimeError(f"Outscraper API error: {response.status_code}")
             logger.info("Trying fallback method...")
             return scrape_google_maps_serper(query, max_results)
             
     except Exception as e:
         logger.error(f"Error in Outscraper scraping: {str(e)}")
+        if not fallback:
+            raise
         logger.info("Trying fallback method...")
         return scrape_google_maps_serper(query, max_results)
     
@@ -162,13 +169,29 @@ def scrape_google_maps_serper(query: str, max_results: int = 20) -> list[dict]:
     return results
 
 
+_registry = None
+
+
+def get_provider_registry():
+    """Provider registry for this module (Outscraper first, Serper as fallback/hedge)"""
+    global _registry
+    if _registry is None:
+        from src.scraper_providers import ProviderRegistry
+        
+        registry = ProviderRegistry()
+        registry.register('Outscraper', lambda q, n: scrape_google_maps_outscraper(q, n, fallback=False))
+        registry.register('Serper', scrape_google_maps_serper)
+        _registry = registry
+    return _registry
+
+
 def search_places_free(query: str, max_results: int = 20) -> list[dict]:
     """
     Search for REAL businesses on Google Maps.
     
     Uses FREE APIs:
     1. Outscraper (100 requests/month)
-    2. Serper (2,500 searches/month) - fallback
+    2. Serper (2,500 searches/month) - fallback, or hedge when Outscraper is slow
     
     Args:
         query: Search string (e.g., "day care in Gurgaon")
@@ -181,13 +204,8 @@ def search_places_free(query: str, max_results: int = 20) -> list[dict]:
     logger.info("🚀 REAL DATA SCRAPING (No fake/demo data)")
     logger.info("=" * 80)
     
-    # Try Outscraper first (best quality)
-    results = scrape_google_maps_outscraper(query, max_results)
-    
-    # If no results, try Serper
-    if not results:
-        logger.info("Trying Serper API...")
-        results = scrape_google_maps_serper(query, max_results)
+    # Outscraper first (best quality), Serper on failure or when Outscraper is slow
+    results = get_provider_registry().search(query, max_results)
     
     # If still no results, log error
     if not results:
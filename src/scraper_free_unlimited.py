@@ -10,20 +10,20 @@ Methods used (in order):
 
 import logging
 import requests
-import time
 from typing import List, Dict
 import random
 
 logger = logging.getLogger(__name__)
 
 
-def scrape_google_maps_free(query: str, max_results: int = 20) -> List[Dict]:
+def scrape_google_maps_free(query: str, max_results: int = 20, fallback: bool = True) -> List[Dict]:
     """
     FREE scraping using Outscraper's free tier.
     
     Args:
         query: Search query (e.g., "restaurants in New York")
         max_results: Maximum results to return
+        fallback: Fall back to Selenium on errors (off when the provider registry decides)
     
     Returns:
         List of business dictionaries
@@ -72,17 +72,103 @@ def scrape_google_maps_free(query: str, max_results: int = 20) -> List[Dict]:
         
     except Exception as e:
         logger.error(f"FREE scraping error: {str(e)}")
+        if not fallback:
+            raise
         # Fallback to alternative method
         results = scrape_with_selenium_free(query, max_results)
     
     return results
 
 
+# Feed/article selectors on the Google Maps results page
+MAPS_FEED = "div[role='feed']"
+MAPS_ARTICLE = "div[role='article']"
+
+
+def _browser_pool():
+    try:
+        from src.browser_pool import get_browser_pool
+    except ImportError:
+        # Imported as a top-level module by main_premium_clients.py
+        from browser_pool import get_browser_pool
+    return get_browser_pool()
+
+
+def extract_maps_results(driver, max_results: int = 20, max_scrolls: int = 3,
+                         scroll_timeout: float = 5) -> List[Dict]:
+    """
+    Extract businesses from a loaded Google Maps results page.
+    
+    Scrolls the feed until enough results are present, waiting for new
+    articles to appear rather than sleeping a fixed time.
+    
+    Args:
+        driver: WebDriver switched to the results tab
+        max_results: Maximum results
+        max_scrolls: Maximum feed scrolls
+        scroll_timeout: Seconds to wait for a scroll to load more results
+    
+    Returns:
+        List of businesses
+    """
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.common.exceptions import TimeoutException
+    
+    scrollable_div = driver.find_element(By.CSS_SELECTOR, MAPS_FEED)
+    
+    # Scroll until enough results are loaded, or the feed stops growing
+    for _ in range(max_scrolls):
+        loaded = len(driver.find_elements(By.CSS_SELECTOR, MAPS_ARTICLE))
+        if loaded >= max_results:
+            break
+        driver.execute_script('arguments[0].scrollTop = arguments[0].scrollHeight', scrollable_div)
+        try:
+            WebDriverWait(driver, scroll_timeout).until(
+                lambda d: len(d.find_elements(By.CSS_SELECTOR, MAPS_ARTICLE)) > loaded
+            )
+        except TimeoutException:
+            break
+    
+    results = []
+    for element in driver.find_elements(By.CSS_SELECTOR, MAPS_ARTICLE)[:max_results]:
+        try:
+            name = element.find_element(By.CSS_SELECTOR, "div.fontHeadlineSmall").text
+            rating_text = element.find_element(By.CSS_SELECTOR, "span[role='img']").get_attribute('aria-label')
+            
+            # Parse rating
+            rating = float(rating_text.split()[0]) if rating_text else 0
+            
+            business = {
+                'title': name,
+                'rating': rating,
+                'reviews': 0,  # Will be extracted if available
+                'address': '',
+                'phone': None,
+                'website': None,
+                'type': '',  # Set by the caller from the query
+                'place_id': '',
+                'gps_coordinates': {}
+            }
+            
+            results.append(business)
+            logger.info(f"✅ Found: {name}")
+            
+        except Exception as e:
+            logger.debug(f"Error parsing element: {e}")
+            continue
+    
+    return results
+
+
 def scrape_with_selenium_free(query: str, max_results: int = 20) -> List[Dict]:
     """
     Alternative FREE scraping using Selenium (browser automation).
     This is completely FREE but slower.
     
+    Runs on the shared headless browser pool (src/browser_pool.py), so
+    browsers stay warm between queries.
+    
     Args:
         query: Search query
         max_results: Maximum results
@@ -90,73 +176,45 @@ def scrape_with_selenium_free(query: str, max_results: int = 20) -> List[Dict]:
     Returns:
         List of businesses
     """
-    results = []
+    return scrape_many_with_selenium_free([query], max_results).get(query, [])
+
+
+def scrape_many_with_selenium_free(queries: List[str], max_results: int = 20) -> Dict[str, List[Dict]]:
+    """
+    Scrape several queries at once, one browser tab per query.
+    
+    Args:
+        queries: Search queries
+        max_results: Maximum results per query
+    
+    Returns:
+        Dict of query -> list of businesses
+    """
+    results = {}
     
     try:
-        from selenium import webdriver
-        from selenium.webdriver.common.by import By
-        from selenium.webdriver.chrome.options import Options
-        from selenium.webdriver.support.ui import WebDriverWait
-        from selenium.webdriver.support import expected_conditions as EC
-        
-        logger.info(f"🆓 Using Selenium for FREE scraping: {query}")
-        
-        # Setup headless Chrome
-        chrome_options = Options()
-        chrome_options.add_argument('--headless')
-        chrome_options.add_argument('--no-sandbox')
-        chrome_options.add_argument('--disable-dev-shm-usage')
-        
-        driver = webdriver.Chrome(options=chrome_options)
-        
-        # Search Google Maps
-        search_url = f"https://www.google.com/maps/search/{query.replace(' ', '+')}"
-        driver.get(search_url)
-        
-        # Wait for results to load
-        time.sleep(3)
-        
-        # Scroll to load more results
-        scrollable_div = driver.find_element(By.CSS_SELECTOR, "div[role='feed']")
-        for _ in range(3):  # Scroll 3 times
-            driver.execute_script('arguments[0].scrollTop = arguments[0].scrollHeight', scrollable_div)
-            time.sleep(2)
-        
-        # Extract business data
-        business_elements = driver.find_elements(By.CSS_SELECTOR, "div[role='article']")
+        import selenium  # noqa: F401
+    except ImportError:
+        logger.warning("Selenium not installed. Install with: pip install selenium")
+        return results
+    
+    try:
+        logger.info(f"🆓 Using Selenium for FREE scraping: {', '.join(queries)}")
         
-        for element in business_elements[:max_results]:
-            try:
-                name = element.find_element(By.CSS_SELECTOR, "div.fontHeadlineSmall").text
-                rating_text = element.find_element(By.CSS_SELECTOR, "span[role='img']").get_attribute('aria-label')
-                
-                # Parse rating
-                rating = float(rating_text.split()[0]) if rating_text else 0
-                
-                business = {
-                    'title': name,
-                    'rating': rating,
-                    'reviews': 0,  # Will be extracted if available
-                    'address': '',
-                    'phone': None,
-                    'website': None,
-                    'type': query.split('in')[0].strip(),
-                    'place_id': '',
-                    'gps_coordinates': {}
-                }
-                
-                results.append(business)
-                logger.info(f"✅ Found: {name}")
-                
-            except Exception as e:
-                logger.debug(f"Error parsing element: {e}")
-                continue
+        urls = [f"https://www.google.com/maps/search/{query.replace(' ', '+')}" for query in queries]
+        pages = _browser_pool().fetch_pages(
+            urls,
+            lambda driver: extract_maps_results(driver, max_results),
+            wait_for=MAPS_FEED,
+        )
         
-        driver.quit()
-        logger.info(f"✅ Selenium scraped {len(results)} businesses (FREE)")
+        for query, businesses in zip(queries, pages):
+            businesses = businesses or []
+            for business in businesses:
+                business['type'] = query.split('in')[0].strip()
+            results[query] = businesses
+            logger.info(f"✅ Selenium scraped {len(businesses)} businesses for {query} (FREE)")
         
-    except ImportError:
-        logger.warning("Selenium not installed. Install with: pip install selenium")
     except Exception as e:
         logger.error(f"Selenium scraping error: {str(e)}")
     
@@ -230,10 +288,36 @@ def scrape_with_beautifulsoup_free(query: str, max_results: int = 20) -> List[Di
     return results
 
 
+_registry = None
+
+
+def get_provider_registry():
+    """Provider registry for this module, in order of reliability"""
+    global _registry
+    if _registry is None:
+        try:
+            from src.scraper_providers import ProviderRegistry
+        except ImportError:
+            # Imported as a top-level module by main_premium_clients.py
+            from scraper_providers import ProviderRegistry
+        
+        registry = ProviderRegistry()
+        registry.register('Outscraper Free', lambda q, n: scrape_google_maps_free(q, n, fallback=False))
+        # Browser start-up is slow; give it longer before hedging to the plain HTTP scrape
+        registry.register('Selenium', scrape_with_selenium_free, hedge_after=15.0)
+        registry.register('BeautifulSoup', scrape_with_beautifulsoup_free)
+        _registry = registry
+    return _registry
+
+
 def search_places_free(query: str, max_results: int = 20) -> List[Dict]:
     """
     Main FREE scraping function that tries multiple methods.
     
+    Methods are tried in order of reliability; a failing method hands over
+    immediately, a slow one is hedged with the next, and methods that keep
+    failing are skipped for a while (see src/scraper_providers.py).
+    
     Args:
         query: Search query
         max_results: Maximum results
@@ -243,30 +327,10 @@ def search_places_free(query: str, max_results: int = 20) -> List[Dict]:
     """
     logger.info(f"🆓 Starting FREE scraping for: {query}")
     
-    # Try methods in order of reliability
-    methods = [
-        ('Outscraper Free', scrape_google_maps_free),
-        ('Selenium', scrape_with_selenium_free),
-        ('BeautifulSoup', scrape_with_beautifulsoup_free),
-    ]
-    
-    for method_name, method_func in methods:
-        try:
-            logger.info(f"Trying {method_name}...")
-            results = method_func(query, max_results)
-            
-            if results:
-                logger.info(f"✅ {method_name} successful: {len(results)} results")
-                return results
-            else:
-                logger.warning(f"{method_name} returned no results")
-                
-        except Exception as e:
-            logger.warning(f"{method_name} failed: {str(e)}")
-            continue
-    
-    logger.error("All FREE scraping methods failed")
-    return []
+    results = get_provider_registry().search(query, max_results)
+    if not results:
+        logger.error("All FREE scraping methods failed")
+    return results
 
 
 # Install instructions
@@ -0,0 +1,268 @@
+"""
+Scraper Providers - Registry of place-search backends with hedged fan-out
+Tries providers in priority order, fires a backup when the current one is slower
+than its usual p95, and skips providers whose circuit breaker is open
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Common result schema every provider is normalized to
+PLACE_FIELDS = {
+    'title': '',
+    'rating': None,
+    'reviews': 0,
+    'address': '',
+    'phone': None,
+    'website': None,
+    'type': '',
+    'place_id': '',
+    'gps_coordinates': {},
+}
+
+
+def normalize_place(place: Dict, source: str) -> Dict:
+    """Fill missing schema fields and tag the provider that returned the place"""
+    normalized = {key: place.get(key, default) for key, default in PLACE_FIELDS.items()}
+    normalized['reviews'] = normalized['reviews'] or 0
+    normalized['source'] = source
+    return normalized
+
+
+def _percentile(values, pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class CircuitBreaker:
+    """Opens after consecutive failures; lets one trial call through after a cool-down"""
+    
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 300):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+    
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return 'half_open'
+        return 'open'
+    
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half_open' and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+    
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+    
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+class Provider:
+    """One place-search backend with its health and latency stats"""
+    
+    # Latency samples needed before the observed p95 replaces the default hedge delay
+    MIN_SAMPLES = 5
+    
+    def __init__(self, name: str, search: Callable[[str, int], List[Dict]],
+                 hedge_after: float = 3.0, failure_threshold: int = 3,
+                 reset_timeout: float = 300):
+        """
+        Initialize provider.
+        
+        Args:
+            name: Provider name (also stored as each place's 'source')
+            search: Function (query, max_results) -> list of place dicts
+            hedge_after: Seconds before a backup fires, until enough latency samples exist
+            failure_threshold: Consecutive failures that open the circuit breaker
+            reset_timeout: Seconds the breaker stays open before a trial call
+        """
+        self.name = name
+        self.search = search
+        self.hedge_after = hedge_after
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.latencies = deque(maxlen=100)
+        self.stats = {'calls': 0, 'successes': 0, 'empty': 0, 'errors': 0, 'wins': 0, 'skipped': 0}
+        self._lock = threading.Lock()
+    
+    def hedge_delay(self) -> float:
+        """Seconds to wait for this provider before firing the next one"""
+        with self._lock:
+            if len(self.latencies) < self.MIN_SAMPLES:
+                return self.hedge_after
+            return _percentile(self.latencies, 95)
+    
+    def call(self, query: str, max_results: int) -> Optional[List[Dict]]:
+        """Run the search, recording latency and health; None means no usable answer"""
+        with self._lock:
+            self.stats['calls'] += 1
+        
+        started = time.perf_counter()
+        try:
+            places = self.search(query, max_results)
+        except Exception as e:
+            logger.warning(f"{self.name} failed: {e}")
+            places = None
+            outcome = 'errors'
+        else:
+            outcome = 'successes' if places else 'empty'
+        latency = time.perf_counter() - started
+        
+        with self._lock:
+            self.stats[outcome] += 1
+            if outcome == 'successes':
+                self.latencies.append(latency)
+        
+        # Providers in this repo swallow their own errors and return [], so
+        # repeated empty answers count against the breaker too
+        if outcome == 'successes':
+            self.breaker.record_success()
+            return [normalize_place(place, self.name) for place in places[:max_results]]
+        self.breaker.record_failure()
+        return None
+    
+    def get_stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self.stats)
+            latencies = list(self.latencies)
+        stats['p50_seconds'] = _percentile(latencies, 50)
+        stats['p95_seconds'] = _percentile(latencies, 95)
+        stats['breaker'] = self.breaker.state
+        return stats
+
+
+class ProviderRegistry:
+    """Priority-ordered providers searched with hedging and circuit breakers"""
+    
+    def __init__(self, max_workers: int = 8):
+        self.providers: List[Provider] = []
+        self.max_workers = max_workers
+        self._pool = None
+        self._lock = threading.Lock()
+        self.stats = {'searches': 0, 'hedges': 0, 'exhausted': 0}
+    
+    def register(self, name: str, search: Callable[[str, int], List[Dict]], **options) -> Provider:
+        """
+        Add a provider (earlier registrations are tried first).
+        
+        Args:
+            name: Provider name
+            search: Function (query, max_results) -> list of place dicts
+            options: Provider options (hedge_after, failure_threshold, reset_timeout)
+        
+        Returns:
+            The registered Provider
+        """
+        provider = Provider(name, search, **options)
+        self.providers.append(provider)
+        return provider
+    
+    @property
+    def pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                thread_name_prefix='scraper-provider')
+            return self._pool
+    
+    def search(self, query: str, max_results: int = 20) -> List[Dict]:
+        """
+        Search places with the first provider that answers.
+        
+        The next provider starts immediately when one fails or returns nothing,
+        and also as a hedge when the current one runs past its p95 latency.
+        Slower in-flight calls finish in the background and only update stats.
+        
+        Args:
+            query: Search string (e.g., "day care in Gurgaon")
+            max_results: Maximum results to return
+        
+        Returns:
+            List of places in the common schema (empty if every provider failed)
+        """
+        self.stats['searches'] += 1
+        candidates = list(self.providers)
+        in_flight = {}
+        next_index = 0
+        deadline = None
+        latest = None
+        
+        def launch():
+            """Start the next provider whose breaker admits a call (half-open trials are only taken here)"""
+            nonlocal next_index, deadline, latest
+            while next_index < len(candidates):
+                provider = candidates[next_index]
+                next_index += 1
+                if not provider.breaker.allow():
+                    provider.stats['skipped'] += 1
+                    logger.info(f"Skipping {provider.name} (circuit open)")
+                    continue
+                logger.info(f"Trying {provider.name}...")
+                in_flight[self.pool.submit(provider.call, query, max_results)] = provider
+                deadline = time.monotonic() + provider.hedge_delay()
+                latest = provider
+                return
+        
+        launch()
+        
+        while in_flight:
+            can_hedge = next_index < len(candidates)
+            timeout = max(0.0, deadline - time.monotonic()) if can_hedge else None
+            done, _ = wait(list(in_flight), timeout=timeout, return_when=FIRST_COMPLETED)
+            
+            failed = 0
+            for future in done:
+                provider = in_flight.pop(future)
+                places = future.result()
+                if places:
+                    provider.stats['wins'] += 1
+                    logger.info(f"✅ {provider.name} successful: {len(places)} results")
+                    return places
+                failed += 1
+            
+            if not done and can_hedge:
+                self.stats['hedges'] += 1
+                logger.info(f"Hedging: {latest.name} slower than its p95")
+                launch()
+            for _ in range(failed):
+                if next_index < len(candidates):
+                    launch()
+        
+        self.stats['exhausted'] += 1
+        logger.error("All scraping providers failed")
+        return []
+    
+    def get_stats(self) -> Dict:
+        """Registry counters plus per-provider health and latency"""
+        return {
+            **self.stats,
+            'providers': {provider.name: provider.get_stats() for provider in self.providers}
+        }
@@ -4,10 +4,10 @@ No Twilio needed for basic SMS
 """
 
 import logging
-import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from typing import Optional
+from src.smtp_pool import get_smtp_pool
 
 logger = logging.getLogger(__name__)
 
@@ -81,11 +81,8 @@ class SMSSender:
             
             msg.attach(MIMEText(message, 'plain'))
             
-            # Send via Gmail SMTP
-            with smtplib.SMTP('smtp.gmail.com', 587) as server:
-                server.starttls()
-                server.login(self.gmail_address, self.gmail_password)
-                server.send_message(msg)
+            # Send via Gmail SMTP (pooled session shared with GmailSender)
+            get_smtp_pool('smtp.gmail.com', 587, self.gmail_address, self.gmail_password).send_message(msg)
             
             logger.info(f"✅ SMS sent to {phone} via {carrier}")
             return True
@@ -0,0 +1,238 @@
+"""
+SMTP Connection Pool - Reuse authenticated SMTP sessions across messages
+Avoids a TCP connect + STARTTLS + LOGIN handshake for every single email
+"""
+
+import atexit
+import logging
+import queue
+import smtplib
+import threading
+import time
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def _is_connection_error(error: Exception) -> bool:
+    """True if the session is gone and a fresh connection should be tried.
+    
+    SMTPException subclasses OSError, so protocol refusals (bad recipient,
+    rejected data) are excluded explicitly - those sessions are still usable.
+    """
+    if isinstance(error, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError)):
+        return True
+    return isinstance(error, OSError) and not isinstance(error, smtplib.SMTPException)
+
+
+class _PooledConnection:
+    """An open SMTP session plus bookkeeping"""
+    
+    def __init__(self, server: smtplib.SMTP):
+        self.server = server
+        self.last_used = time.monotonic()
+        self.messages_sent = 0
+
+
+class SMTPConnectionPool:
+    """Thread-safe pool of authenticated SMTP sessions"""
+    
+    def __init__(self, host: str, port: int, username: Optional[str] = None,
+                 password: Optional[str] = None, use_tls: bool = True,
+                 max_connections: int = 3, keepalive_seconds: int = 30,
+                 max_idle_seconds: int = 240, max_messages_per_connection: int = 100,
+                 timeout: int = 30):
+        """
+        Initialize SMTP pool.
+        
+        Args:
+            host: SMTP server host
+            port: SMTP server port
+            username: Login username (skip login if no password)
+            password: Login password / app password
+            use_tls: Upgrade with STARTTLS when the server offers it
+            max_connections: Max concurrent sessions
+            keepalive_seconds: Idle time after which a session is checked with NOOP before reuse
+            max_idle_seconds: Idle time after which a session is dropped instead of reused
+            max_messages_per_connection: Recycle a session after this many messages
+            timeout: Socket timeout in seconds
+        """
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.keepalive_seconds = keepalive_seconds
+        self.max_idle_seconds = max_idle_seconds
+        self.max_messages_per_connection = max_messages_per_connection
+        self.timeout = timeout
+        
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(max_connections)
+        self._lock = threading.Lock()
+        self.stats = {
+            'connections_opened': 0,
+            'reconnects': 0,
+            'messages_sent': 0,
+            'noop_checks': 0,
+        }
+        
+        logger.info(f"SMTP pool initialized: {host}:{port} (max {max_connections} connections)")
+    
+    def _bump(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+    
+    def _connect(self) -> _PooledConnection:
+        """Open, secure and authenticate a new session"""
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            server.ehlo()
+            if self.use_tls:
+                # Unconditional: raises if STARTTLS isn't offered, rather than logging in in cleartext
+                server.starttls()
+                server.ehlo()
+            if self.username and self.password:
+                server.login(self.username, self.password)
+        except Exception:
+            self._quit(server)
+            raise
+        
+        self._bump('connections_opened')
+        return _PooledConnection(server)
+    
+    def _quit(self, server: smtplib.SMTP):
+        """Close a session, ignoring errors from already-dead sockets"""
+        try:
+            server.quit()
+        except Exception:
+            try:
+                server.close()
+            except Exception:
+                pass
+    
+    def _is_alive(self, conn: _PooledConnection) -> bool:
+        """Check an idle session before reuse (NOOP only once it has been idle a while)"""
+        idle = time.monotonic() - conn.last_used
+        if idle > self.max_idle_seconds:
+            return False
+        if conn.messages_sent >= self.max_messages_per_connection:
+            return False
+        if idle <= self.keepalive_seconds:
+            return True
+        
+        self._bump('noop_checks')
+        try:
+            code, _ = conn.server.noop()
+            return code == 250
+        except OSError:
+            return False
+    
+    def _checkout(self) -> _PooledConnection:
+        """Get a live idle session or open a new one"""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                return self._connect()
+            
+            if self._is_alive(conn):
+                return conn
+            self._quit(conn.server)
+    
+    def _checkin(self, conn: _PooledConnection):
+        conn.last_used = time.monotonic()
+        self._idle.put(conn)
+    
+    def send_message(self, msg, from_addr: Optional[str] = None, to_addrs=None) -> Dict:
+        """
+        Send a message over a pooled session.
+        
+        Reconnects once if the session was dropped by the server.
+        
+        Returns:
+            Refused recipients dict from smtplib (empty if all accepted)
+        """
+        self._slots.acquire()
+        try:
+            conn = self._checkout()
+            try:
+                refused = conn.server.send_message(msg, from_addr, to_addrs)
+            except OSError as e:
+                if not _is_connection_error(e):
+                    # Protocol-level refusal (recipient, sender, data) - session still usable
+                    self._checkin(conn)
+                    raise
+                
+                logger.warning(f"SMTP session dropped ({e}), reconnecting")
+                self._quit(conn.server)
+                self._bump('reconnects')
+                conn = self._connect()
+                try:
+                    refused = conn.server.send_message(msg, from_addr, to_addrs)
+                except OSError as retry_error:
+                    if _is_connection_error(retry_error):
+                        self._quit(conn.server)
+                    else:
+                        self._checkin(conn)
+                    raise
+                except BaseException:
+                    self._quit(conn.server)
+                    raise
+            except BaseException:
+                # Unknown state mid-transaction (e.g. an encoding error) - don't reuse it
+                self._quit(conn.server)
+                raise
+            
+            conn.messages_sent += 1
+            self._bump('messages_sent')
+            self._checkin(conn)
+            return refused
+        finally:
+            self._slots.release()
+    
+    def close(self):
+        """Close all idle sessions"""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._quit(conn.server)
+    
+    def get_stats(self) -> Dict:
+        """Get pool stats"""
+        with self._lock:
+            stats = dict(self.stats)
+        stats['idle_connections'] = self._idle.qsize()
+        return stats
+
+
+# Process-wide pools, shared by every sender using the same account
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_smtp_pool(host: str, port: int, username: Optional[str] = None,
+                  password: Optional[str] = None, use_tls: bool = True, **kwargs) -> SMTPConnectionPool:
+    """Get (or create) the shared pool for an SMTP account"""
+    key = (host, port, username, use_tls)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None or pool.password != password:
+            if pool is not None:
+                pool.close()
+            pool = SMTPConnectionPool(host, port, username, password, use_tls=use_tls, **kwargs)
+            _pools[key] = pool
+        return pool
+
+
+def close_smtp_pools():
+    """Close every pooled SMTP session (called at interpreter exit)"""
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close()
+        _pools.clear()
+
+
+atexit.register(close_smtp_pools)
@@ -1,14 +1,208 @@
 """Social Media Finder - Extract social media links from business data"""
 
+import codecs
 import logging
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from html.parser import HTMLParser
+from typing import List, Tuple
+from urllib.parse import urlparse
+
 import requests
-from bs4 import BeautifulSoup
 
 logger = logging.getLogger(__name__)
 
 
-def find_social_media_links(business_name: str, website: str = None, phone: str = None) -> dict:
+# Browser-like headers for website requests
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+}
+
+EMAIL_PATTERN = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b')
+
+# Domain markers per social network (checked in this order)
+SOCIAL_DOMAINS = [
+    ('linkedin', ('linkedin.com',)),
+    ('facebook', ('facebook.com',)),
+    ('instagram', ('instagram.com',)),
+    ('twitter', ('twitter.com', 'x.com')),
+    ('youtube', ('youtube.com',)),
+]
+
+
+def _empty_social_links() -> dict:
+    return {name: None for name, _ in SOCIAL_DOMAINS}
+
+
+# Stop reading a page after this many bytes (social links/email are near the top or footer)
+MAX_ENRICHMENT_BYTES = 512 * 1024
+CHUNK_SIZE = 16 * 1024
+
+
+def _is_business_email(email: str) -> bool:
+    # Filter out common non-business emails
+    return not any(x in email.lower() for x in ['example', 'test', 'noreply', 'admin'])
+
+
+class EnrichmentParser(HTMLParser):
+    """
+    Incremental parser collecting social links and an email address.
+    
+    Feed it chunks as they arrive; ``done`` turns True once an email and every
+    social network have been found, so the caller can stop reading.
+    """
+    
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.social_links = _empty_social_links()
+        self.email = None
+        # Text nodes can be split across feed() calls; match emails once a node is complete
+        self._text = []
+    
+    @property
+    def done(self) -> bool:
+        return self.email is not None and all(self.social_links.values())
+    
+    def result(self) -> dict:
+        self._flush_text()
+        return {'social_media': dict(self.social_links), 'email': self.email}
+    
+    def handle_starttag(self, tag, attrs):
+        self._flush_text()
+        if tag != 'a':
+            return
+        href = dict(attrs).get('href')
+        if not href:
+            return
+        
+        lower = href.lower()
+        if lower.startswith('mailto:'):
+            self._find_email(href[7:].split('?')[0])
+            return
+        for name, domains in SOCIAL_DOMAINS:
+            if any(domain in lower for domain in domains):
+                if not self.social_links[name]:
+                    self.social_links[name] = href
+                break
+    
+    def handle_endtag(self, tag):
+        self._flush_text()
+    
+    def handle_data(self, data):
+        if self.email is None:
+            self._text.append(data)
+    
+    def _flush_text(self):
+        if self._text:
+            self._find_email(''.join(self._text))
+            self._text = []
+    
+    def _find_email(self, text: str):
+        if self.email is not None:
+            return
+        for email in EMAIL_PATTERN.findall(text):
+            if _is_business_email(email):
+                self.email = email
+                return
+
+
+def parse_social_links(html: str) -> dict:
+    """
+    Extract social media profile links from a page's HTML.
+    
+    Args:
+        html: Page HTML
+    
+    Returns:
+        Dictionary with social media links (None where not found)
+    """
+    return extract_enrichment(html)['social_media']
+
+
+def parse_email(text: str) -> str:
+    """
+    Extract the first business-looking email address from page text.
+    
+    Args:
+        text: Page text/HTML
+    
+    Returns:
+        Email address or None
+    """
+    for email in EMAIL_PATTERN.findall(text):
+        if _is_business_email(email):
+            return email
+    return None
+
+
+def _guess_social_links(business_name: str) -> dict:
+    """Generate likely social media URLs from the business name (may or may not exist)"""
+    clean_name = re.sub(r'[^a-zA-Z0-9]', '', business_name.lower())
+    links = _empty_social_links()
+    links['linkedin'] = f"https://linkedin.com/company/{clean_name}"
+    links['facebook'] = f"https://facebook.com/{clean_name}"
+    links['instagram'] = f"https://instagram.com/{clean_name}"
+    links['twitter'] = f"https://twitter.com/{clean_name}"
+    return links
+
+
+def stream_enrichment(response, max_bytes: int = MAX_ENRICHMENT_BYTES) -> Tuple[dict, int]:
+    """
+    Parse a streamed response incrementally, stopping as soon as everything is found.
+    
+    Args:
+        response: requests response opened with stream=True (closed here)
+        max_bytes: Stop reading after this many bytes
+    
+    Returns:
+        (result dict with 'social_media' and 'email', bytes read)
+    """
+    parser = EnrichmentParser()
+    try:
+        decoder = codecs.getincrementaldecoder(response.encoding or 'utf-8')(errors='replace')
+    except LookupError:
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    
+    read = 0
+    try:
+        for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+            read += len(chunk)
+            parser.feed(decoder.decode(chunk))
+            if parser.done or read >= max_bytes:
+                break
+    finally:
+        response.close()
+    
+    return parser.result(), read
+
+
+def fetch_enrichment(website: str, session=None, timeout: int = 5,
+                     max_bytes: int = MAX_ENRICHMENT_BYTES):
+    """
+    Fetch a website once for enrichment, parsing it while it downloads.
+    
+    Args:
+        website: Business website URL
+        session: Optional requests.Session (pooled connections)
+        timeout: Request timeout in seconds
+        max_bytes: Stop reading after this many bytes
+    
+    Returns:
+        Dictionary with 'social_media' and 'email', or None if the page could not be fetched
+    """
+    client = session or requests
+    response = client.get(website, timeout=timeout, headers=HEADERS, stream=True)
+    if response.status_code != 200:
+        response.close()
+        return None
+    result, _ = stream_enrichment(response, max_bytes)
+    return result
+
+
+def find_social_media_links(business_name: str, website: str = None, phone: str = None,
+                            html: str = None) -> dict:
     """
     Find social media links for a business.
     
@@ -16,76 +210,37 @@ def find_social_media_links(business_name: str, website: str = None, phone: str
         business_name: Name of the business
         website: Business website URL
         phone: Business phone number
+        html: Already-fetched website HTML (skips the request)
     
     Returns:
         Dictionary with social media links
     """
-    social_links = {
-        'linkedin': None,
-        'facebook': None,
-        'instagram': None,
-        'twitter': None,
-        'youtube': None
-    }
+    social_links = _empty_social_links()
     
     try:
         # If website exists, try to scrape social links from it
-        if website:
+        if website or html:
             try:
                 logger.info(f"🔍 Searching social media for: {business_name}")
                 
-                # Add timeout and headers
-                headers = {
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-                }
-                response = requests.get(website, timeout=5, headers=headers)
+                if html is None:
+                    result = fetch_enrichment(website)
+                    if result:
+                        social_links = result['social_media']
+                elif html:
+                    social_links = parse_social_links(html)
                 
-                if response.status_code == 200:
-                    soup = BeautifulSoup(response.text, 'html.parser')
-                    
-                    # Find all links
-                    for link in soup.find_all('a', href=True):
-                        href = link['href'].lower()
-                        
-                        # LinkedIn
-                        if 'linkedin.com' in href and not social_links['linkedin']:
-                            social_links['linkedin'] = link['href']
-                        
-                        # Facebook
-                        elif 'facebook.com' in href and not social_links['facebook']:
-                            social_links['facebook'] = link['href']
-                        
-                        # Instagram
-                        elif 'instagram.com' in href and not social_links['instagram']:
-                            social_links['instagram'] = link['href']
-                        
-                        # Twitter/X
-                        elif ('twitter.com' in href or 'x.com' in href) and not social_links['twitter']:
-                            social_links['twitter'] = link['href']
-                        
-                        # YouTube
-                        elif 'youtube.com' in href and not social_links['youtube']:
-                            social_links['youtube'] = link['href']
+                if any(social_links.values()):
                     
                     found_count = sum(1 for v in social_links.values() if v)
-                    if found_count > 0:
-                        logger.info(f"✅ Found {found_count} social media links")
+                    logger.info(f"✅ Found {found_count} social media links")
                 
             except Exception as e:
                 logger.debug(f"Could not scrape website: {e}")
         
-        # Generate likely social media URLs based on business name
-        # Clean business name for URL
-        clean_name = re.sub(r'[^a-zA-Z0-9]', '', business_name.lower())
-        
         # If no links found, generate likely URLs
         if not any(social_links.values()):
-            # These are guesses - may or may not exist
-            social_links['linkedin'] = f"https://linkedin.com/company/{clean_name}"
-            social_links['facebook'] = f"https://facebook.com/{clean_name}"
-            social_links['instagram'] = f"https://instagram.com/{clean_name}"
-            social_links['twitter'] = f"https://twitter.com/{clean_name}"
-            
+            social_links = _guess_social_links(business_name)
             logger.info(f"💡 Generated likely social media URLs")
     
     except Exception as e:
@@ -94,33 +249,27 @@ def find_social_media_links(business_name: str, website: str = None, phone: str
     return social_links
 
 
-def extract_email_from_website(website: str) -> str:
+def extract_email_from_website(website: str, html: str = None) -> str:
     """
     Try to extract email from website.
     
     Args:
         website: Business website URL
+        html: Already-fetched website HTML (skips the request)
     
     Returns:
         Email address or None
     """
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        }
-        response = requests.get(website, timeout=5, headers=headers)
-        
-        if response.status_code == 200:
-            # Find email patterns
-            email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-            emails = re.findall(email_pattern, response.text)
-            
-            if emails:
-                # Filter out common non-business emails
-                filtered = [e for e in emails if not any(x in e.lower() for x in ['example', 'test', 'noreply', 'admin'])]
-                if filtered:
-                    logger.info(f"✅ Found email: {filtered[0]}")
-                    return filtered[0]
+        if html is None:
+            result = fetch_enrichment(website)
+            email = result['email'] if result else None
+        else:
+            email = parse_email(html)
+        
+        if email:
+            logger.info(f"✅ Found email: {email}")
+            return email
     
     except Exception as e:
         logger.debug(f"Could not extract email: {e}")
@@ -128,42 +277,184 @@ def extract_email_from_website(website: str) -> str:
     return None
 
 
-def enrich_lead_with_social_media(lead: dict) -> dict:
+def extract_enrichment(html: str) -> dict:
+    """
+    Parse everything enrichment needs from one page (cacheable result).
+    
+    Args:
+        html: Page HTML
+    
+    Returns:
+        Dictionary with 'social_media' links and 'email'
+    """
+    parser = EnrichmentParser()
+    for start in range(0, len(html), CHUNK_SIZE):
+        parser.feed(html[start:start + CHUNK_SIZE])
+        if parser.done:
+            break
+    return parser.result()
+
+
+def _apply_enrichment(lead: dict, result: dict) -> dict:
+    """Copy an extracted result onto a lead (guessed profiles if the site had none)"""
+    social_links = result['social_media'] if result else _empty_social_links()
+    if not any(social_links.values()):
+        social_links = _guess_social_links(lead.get('title', ''))
+    lead['social_media'] = social_links
+    
+    # Only fill email if not present
+    if not lead.get('email') and result and result.get('email'):
+        lead['email'] = result['email']
+    return lead
+
+
+def enrich_lead_with_social_media(lead: dict, html: str = None, cache=None) -> dict:
     """
     Enrich lead with social media links and email.
     
+    The website is fetched once and both links and email are parsed
+    from the same response while it streams in.
+    
     Args:
         lead: Lead dictionary
+        html: Already-fetched website HTML (skips the request)
+        cache: Optional EnrichmentCache (revalidates instead of re-downloading)
     
     Returns:
         Enriched lead with social media
     """
     try:
-        # Find social media links
-        social_links = find_social_media_links(
-            lead.get('title', ''),
-            lead.get('website'),
-            lead.get('phone')
-        )
-        
-        lead['social_media'] = social_links
-        
-        # Try to extract email if not present
-        if not lead.get('email') and lead.get('website'):
-            email = extract_email_from_website(lead['website'])
-            if email:
-                lead['email'] = email
+        website = lead.get('website')
+        result = None
+        if html is not None:
+            result = extract_enrichment(html) if html else None
+        elif website:
+            try:
+                if cache is not None:
+                    result = cache.fetch(website, stream_enrichment, headers=HEADERS, stream=True)
+                else:
+                    result = fetch_enrichment(website)
+            except Exception as e:
+                logger.debug(f"Could not fetch website: {e}")
         
+        _apply_enrichment(lead, result)
         logger.info(f"✅ Enriched: {lead.get('title')} with social media")
         
     except Exception as e:
         logger.error(f"Error enriching lead: {e}")
-        lead['social_media'] = {
-            'linkedin': None,
-            'facebook': None,
-            'instagram': None,
-            'twitter': None,
-            'youtube': None
-        }
+        lead['social_media'] = _empty_social_links()
     
     return lead
+
+
+class EnrichmentCrawler:
+    """Batch enrichment: one fetch per site, pooled connections, per-host concurrency caps"""
+    
+    def __init__(self, max_workers: int = 16, per_host_limit: int = 2, timeout: int = 5,
+                 cache=None, max_bytes: int = MAX_ENRICHMENT_BYTES):
+        """
+        Initialize crawler.
+        
+        Args:
+            max_workers: Concurrent fetches overall
+            per_host_limit: Concurrent fetches per host
+            timeout: Request timeout in seconds
+            cache: EnrichmentCache (defaults to the shared on-disk cache)
+            max_bytes: Stop reading a page after this many bytes
+        """
+        from src.enrichment_cache import get_enrichment_cache
+        
+        self.max_workers = max_workers
+        self.per_host_limit = per_host_limit
+        self.timeout = timeout
+        self.cache = cache or get_enrichment_cache()
+        self.extract = partial(stream_enrichment, max_bytes=max_bytes)
+        
+        self.session = requests.Session()
+        self.session.headers.update(HEADERS)
+        adapter = requests.adapters.HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        
+        self._host_slots = {}
+        self._lock = threading.Lock()
+        self.stats = {'leads': 0, 'fetched': 0, 'failed': 0, 'emails_found': 0}
+    
+    def _host_slot(self, url: str) -> threading.BoundedSemaphore:
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            if host not in self._host_slots:
+                self._host_slots[host] = threading.BoundedSemaphore(self.per_host_limit)
+            return self._host_slots[host]
+    
+    def _fetch(self, url: str):
+        """Fetch (or revalidate) one site under its host's concurrency cap"""
+        with self._host_slot(url):
+            try:
+                result = self.cache.fetch(url, self.extract, session=self.session,
+                                          timeout=self.timeout, stream=True)
+            except Exception as e:
+                logger.debug(f"Could not fetch {url}: {e}")
+                result = None
+        
+        with self._lock:
+            self.stats['fetched' if result is not None else 'failed'] += 1
+        return result
+    
+    def enrich(self, leads: List[dict]) -> List[dict]:
+        """
+        Enrich many leads in parallel (in place).
+        
+        Leads sharing a website trigger a single fetch.
+        
+        Args:
+            leads: Lead dictionaries
+        
+        Returns:
+            The same leads, enriched with social_media (and email where found)
+        """
+        urls = list(dict.fromkeys(lead['website'] for lead in leads if lead.get('website')))
+        
+        results = {}
+        if urls:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                for url, result in zip(urls, pool.map(self._fetch, urls)):
+                    results[url] = result
+        
+        for lead in leads:
+            had_email = bool(lead.get('email'))
+            _apply_enrichment(lead, results.get(lead.get('website')))
+            if lead.get('email') and not had_email:
+                self.stats['emails_found'] += 1
+        
+        self.stats['leads'] += len(leads)
+        logger.info(f"✅ Enriched {len(leads)} leads from {len(urls)} websites: {self.stats}, "
+                    f"cache: {self.cache.get_stats()}")
+        return leads
+    
+    def close(self):
+        self.session.close()
+
+
+def enrich_leads_with_social_media(leads: List[dict], max_workers: int = 16,
+                                   per_host_limit: int = 2, timeout: int = 5,
+                                   cache=None) -> List[dict]:
+    """
+    Enrich a batch of leads concurrently (one fetch per website).
+    
+    Args:
+        leads: Lead dictionaries
+        max_workers: Concurrent fetches overall
+        per_host_limit: Concurrent fetches per host
+        timeout: Request timeout in seconds
+        cache: EnrichmentCache (defaults to the shared on-disk cache)
+    
+    Returns:
+        Enriched leads
+    """
+    crawler = EnrichmentCrawler(max_workers=max_workers, per_host_limit=per_host_limit,
+                                timeout=timeout, cache=cache)
+    try:
+        return crawler.enrich(leads)
+    finally:
+        crawler.close()
@@ -0,0 +1,127 @@
+"""
+Startup Profile - Import-time budget for the dashboard
+Imports a module in a fresh interpreter with -X importtime and reports the
+total, the slowest imports, and any heavy optional subsystem that was pulled
+in at startup instead of on first use
+"""
+
+import os
+import subprocess
+import sys
+from typing import Dict, List, Optional
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Import budget for `import dashboard_ragspro` (Flask + flask_limiter is ~150ms)
+STARTUP_BUDGET_MS = 400
+
+# Subsystems the dashboard only needs for some requests; importing any of
+# them at startup is a regression
+DEFERRED_MODULES = (
+    'google.generativeai',
+    'sqlalchemy',
+    'serpapi',
+    'jwt',
+    'bcrypt',
+    'numpy',
+    'reportlab',
+    'openpyxl',
+    'selenium',
+    'gspread',
+)
+
+
+def parse_importtime(output: str) -> List[Dict]:
+    """
+    Parse -X importtime stderr lines ("import time: self | cumulative | name").
+    
+    Returns:
+        List of {'module', 'self_ms', 'cumulative_ms', 'depth'} in import order
+    """
+    entries = []
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # Column header
+        name = fields[2].rstrip()
+        entries.append({
+            'module': name.strip(),
+            'self_ms': int(fields[0]) / 1000,
+            'cumulative_ms': int(fields[1]) / 1000,
+            'depth': (len(name) - len(name.lstrip())) // 2,
+        })
+    return entries
+
+
+def profile_imports(module: str = 'dashboard_ragspro', runs: int = 3) -> Dict:
+    """
+    Import a module in fresh interpreters and measure it.
+    
+    Args:
+        module: Module to import (from the repository root)
+        runs: Interpreters to start; the fastest run is reported
+    
+    Returns:
+        Dict with total_ms, budget_ms, within_budget, slowest (top-level
+        imports by cumulative time) and deferred_loaded (heavy modules imported)
+    """
+    best = None
+    for _ in range(max(runs, 1)):
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+            cwd=ROOT_DIR, capture_output=True, text=True,
+            env={**os.environ, 'PYTHONDONTWRITEBYTECODE': '1'},
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"import {module} failed: {result.stderr.strip().splitlines()[-1:]}")
+        
+        entries = parse_importtime(result.stderr)
+        end = next((i for i, e in enumerate(entries) if e['module'] == module and e['depth'] == 0), None)
+        if end is None:
+            continue
+        # Children are reported before their parent: walk back to the previous top-level import
+        start = end
+        while start > 0 and entries[start - 1]['depth'] > 0:
+            start -= 1
+        if best is None or entries[end]['cumulative_ms'] < best[0]:
+            best = (entries[end]['cumulative_ms'], entries[start:end])
+    
+    if best is None:
+        raise RuntimeError(f"No import time reported for {module}")
+    total, entries = best
+    loaded = {e['module'] for e in entries}
+    top_level = [e for e in entries if e['depth'] == 1]
+    
+    return {
+        'module': module,
+        'total_ms': round(total, 1),
+        'budget_ms': STARTUP_BUDGET_MS,
+        'within_budget': total <= STARTUP_BUDGET_MS,
+        'slowest': [(e['module'], round(e['cumulative_ms'], 1))
+                    for e in sorted(top_level, key=lambda e: e['cumulative_ms'], reverse=True)[:10]],
+        'deferred_loaded': [name for name in DEFERRED_MODULES if name in loaded],
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Print the profile; exit status 1 when over budget or a deferred module loaded"""
+    argv = sys.argv[1:] if argv is None else argv
+    module = argv[0] if argv else 'dashboard_ragspro'
+    
+    report = profile_imports(module)
+    print(f"import {module}: {report['total_ms']}ms (budget {report['budget_ms']}ms)")
+    for name, ms in report['slowest']:
+        print(f"  {ms:8.1f}ms  {name}")
+    if report['deferred_loaded']:
+        print(f"❌ Loaded at startup, should be deferred: {', '.join(report['deferred_loaded'])}")
+    if not report['within_budget']:
+        print("❌ Over the startup budget")
+    
+    return 0 if report['within_budget'] and not report['deferred_loaded'] else 1
+
+
+if __name__ == '__main__':
+    # Benchmark mode: python src/startup_profile.py [module]
+    sys.exit(main())
@@ -7,6 +7,7 @@ import logging
 from datetime import datetime, timedelta
 from typing import Dict
 from src.database import get_db, User
+from src.usage_meter import get_usage_meter
 
 logger = logging.getLogger(__name__)
 
@@ -99,6 +100,7 @@ class SubscriptionManager:
             user.monthly_emails_limit = plan_info['monthly_emails_limit']
             
             session.commit()
+            get_usage_meter().invalidate_limits(user_id)
             
             logger.info(f"User {user_id} upgraded to {new_plan}")
             
@@ -145,28 +147,26 @@ class SubscriptionManager:
             session.close()
     
     def check_usage_limits(self, user_id: int) -> Dict:
-        """Check if user is within usage limits"""
-        session = get_db()
+        """Check if user is within usage limits (served from the usage meter's counters)"""
+        usage = get_usage_meter().get_usage(user_id)
+        if usage is None:
+            return {'error': 'User not found'}
         
-        try:
-            user = session.query(User).get(user_id)
-            if not user:
-                return {'error': 'User not found'}
-            
-            # In real implementation, track actual usage
-            # For now, return limits
-            
-            return {
-                'success': True,
-                'leads_limit': user.monthly_leads_limit,
-                'emails_limit': user.monthly_emails_limit,
-                'leads_used': 0,  # TODO: Track actual usage
-                'emails_used': 0,  # TODO: Track actual usage
-                'within_limits': True
-            }
-            
-        finally:
-            session.close()
+        leads = usage['leads']
+        emails = usage['emails']
+        
+        return {
+            'success': True,
+            'period': usage['period'],
+            'leads_limit': leads['limit'],
+            'emails_limit': emails['limit'],
+            'leads_used': leads['used'],
+            'emails_used': emails['used'],
+            'leads_remaining': leads['remaining'],
+            'emails_remaining': emails['remaining'],
+            'ai_requests_used': usage['ai_requests']['used'],
+            'within_limits': all(m['remaining'] is None or m['remaining'] > 0 for m in (leads, emails))
+        }
     
     def create_stripe_checkout(self, user_id: int, plan: str) -> Dict:
         """Create Stripe checkout session (placeholder)"""
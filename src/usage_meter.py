@@ -0,0 +1,314 @@
+"""
+Usage Metering - Per-user, per-month counters behind the plan limits
+Counters live in memory so limit checks are dictionary reads; increments are
+queued and written to the usage table in batches
+"""
+
+import atexit
+import logging
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Optional
+from src.database import get_db, User, Usage
+
+logger = logging.getLogger(__name__)
+
+# Metered actions and the User column holding each one's monthly limit (None = unlimited)
+METRICS = {
+    'leads': 'monthly_leads_limit',
+    'emails': 'monthly_emails_limit',
+    'ai_requests': None,
+}
+
+FLUSH_EVERY = 100  # Pending increments that trigger a write
+FLUSH_INTERVAL = 30.0  # Seconds before pending increments are written regardless
+
+
+def current_period(now: Optional[datetime] = None) -> str:
+    """Billing period key: the calendar month in UTC (YYYY-MM)"""
+    return (now or datetime.utcnow()).strftime('%Y-%m')
+
+
+class UsageMeter:
+    """
+    Atomic usage counters per user and month.
+    
+    A user's limits and the month's persisted counts are loaded once; after
+    that reserve/increment/check are lock-guarded dictionary operations. Deltas
+    are written as count = count + delta, so several processes can share the
+    table, but each process only sees the others' usage when it next loads.
+    """
+    
+    def __init__(self, flush_every: int = FLUSH_EVERY, flush_interval: float = FLUSH_INTERVAL):
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._counts = {}  # (user_id, period) -> {metric: count}
+        self._limits = {}  # user_id -> {metric: limit or None}
+        self._pending = defaultdict(int)  # (user_id, period, metric) -> delta not yet written
+        self._pending_ops = 0
+        self._last_flush = time.monotonic()
+        
+        self.stats = {'increments': 0, 'reservations': 0, 'denied': 0, 'loads': 0, 'flushes': 0, 'rows_written': 0}
+    
+    def _fetch(self, user_id: int, period: str):
+        """Read a user's limits and the period's persisted counts"""
+        session = get_db()
+        
+        try:
+            user = session.get(User, user_id)
+            if user is None:
+                return None, None
+            
+            limits = {metric: getattr(user, column) if column else None for metric, column in METRICS.items()}
+            counts = dict.fromkeys(METRICS, 0)
+            rows = session.query(Usage.metric, Usage.count).filter_by(user_id=user_id, period=period).all()
+            counts.update({metric: count for metric, count in rows if metric in counts})
+            return limits, counts
+        finally:
+            session.close()
+    
+    def _ensure_loaded(self, user_id: int, period: str) -> bool:
+        """Load the user's counters on first use; False if the user does not exist"""
+        with self._lock:
+            if (user_id, period) in self._counts and user_id in self._limits:
+                return True
+        
+        limits, counts = self._fetch(user_id, period)
+        if limits is None:
+            return False
+        
+        with self._lock:
+            # Another thread may have loaded (and counted) meanwhile; keep its counters
+            self._limits.setdefault(user_id, limits)
+            self._counts.setdefault((user_id, period), counts)
+            self.stats['loads'] += 1
+        return True
+    
+    def _queue(self, user_id: int, period: str, metric: str, amount: int):
+        """Apply a delta in memory and queue it for the next flush (caller holds the lock)"""
+        self._counts[(user_id, period)][metric] += amount
+        self._pending[(user_id, period, metric)] += amount
+        self._pending_ops += 1
+    
+    def _flush_if_due(self):
+        with self._lock:
+            due = (self._pending_ops >= self.flush_every or
+                   time.monotonic() - self._last_flush >= self.flush_interval)
+        if due:
+            self.flush(wait=False)
+    
+    @staticmethod
+    def _check_metric(metric: str):
+        if metric not in METRICS:
+            raise ValueError(f"Unknown usage metric: {metric}")
+    
+    def increment(self, user_id: int, metric: str, amount: int = 1) -> Optional[int]:
+        """
+        Record usage that already happened (never refused).
+        
+        Returns:
+            The month's new count, or None if the user does not exist
+        """
+        self._check_metric(metric)
+        period = current_period()
+        if not self._ensure_loaded(user_id, period):
+            return None
+        
+        with self._lock:
+            self._queue(user_id, period, metric, amount)
+            self.stats['increments'] += 1
+            count = self._counts[(user_id, period)][metric]
+        
+        self._flush_if_due()
+        return count
+    
+    def reserve(self, user_id: int, metric: str, amount: int) -> Dict:
+        """
+        Reserve quota for a whole batch up front (check and count in one step).
+        
+        Release whatever the batch did not use with release(), passing the
+        returned period so a batch that runs into the next month gives the
+        quota back to the month it was taken from.
+        
+        Returns:
+            Dict with used/limit/remaining and the billing period, plus 'error'
+            if the limit would be exceeded
+        """
+        self._check_metric(metric)
+        period = current_period()
+        if not self._ensure_loaded(user_id, period):
+            return {'error': 'User not found'}
+        
+        with self._lock:
+            used = self._counts[(user_id, period)][metric]
+            limit = self._limits[user_id].get(metric)
+            
+            if limit is not None and used + amount > limit:
+                self.stats['denied'] += 1
+                return {
+                    'error': f'Monthly {metric} limit reached ({used}/{limit} used)',
+                    'used': used,
+                    'limit': limit,
+                    'remaining': max(limit - used, 0)
+                }
+            
+            self._queue(user_id, period, metric, amount)
+            self.stats['reservations'] += 1
+            used += amount
+        
+        self._flush_if_due()
+        return {
+            'success': True,
+            'reserved': amount,
+            'period': period,
+            'used': used,
+            'limit': limit,
+            'remaining': None if limit is None else limit - used
+        }
+    
+    def release(self, user_id: int, metric: str, amount: int, period: Optional[str] = None):
+        """Give back the unused part of a reservation made in period (default this month)"""
+        self._check_metric(metric)
+        period = period or current_period()
+        if amount <= 0 or not self._ensure_loaded(user_id, period):
+            return
+        
+        with self._lock:
+            amount = min(amount, self._counts[(user_id, period)][metric])
+            self._queue(user_id, period, metric, -amount)
+        
+        self._flush_if_due()
+    
+    def check(self, user_id: int, metric: str, amount: int = 1) -> bool:
+        """Whether amount more fits within the user's monthly limit"""
+        usage = self.get_usage(user_id)
+        if usage is None:
+            return False
+        remaining = usage[metric]['remaining']
+        return remaining is None or amount <= remaining
+    
+    def get_usage(self, user_id: int) -> Optional[Dict]:
+        """This month's used/limit/remaining per metric, or None if the user does not exist"""
+        period = current_period()
+        if not self._ensure_loaded(user_id, period):
+            return None
+        
+        with self._lock:
+            counts = self._counts[(user_id, period)]
+            limits = self._limits[user_id]
+            usage = {'period': period}
+            for metric in METRICS:
+                limit = limits.get(metric)
+                usage[metric] = {
+                    'used': counts[metric],
+                    'limit': limit,
+                    'remaining': None if limit is None else max(limit - counts[metric], 0)
+                }
+            return usage
+    
+    def invalidate_limits(self, user_id: int):
+        """Re-read the user's limits on next use (after a plan change)"""
+        with self._lock:
+            self._limits.pop(user_id, None)
+    
+    def flush(self, wait: bool = True) -> int:
+        """
+        Write pending deltas to the usage table in one transaction.
+        
+        Args:
+            wait: Block until a concurrent flush finishes (otherwise skip)
+        
+        Returns:
+            Number of usage rows written
+        """
+        if not self._flush_lock.acquire(blocking=wait):
+            return 0
+        
+        try:
+            period = current_period()
+            with self._lock:
+                pending, self._pending = self._pending, defaultdict(int)
+                self._pending_ops = 0
+                self._last_flush = time.monotonic()
+                # Counters from past months are no longer read
+                for key in [key for key in self._counts if key[1] != period]:
+                    del self._counts[key]
+            
+            pending = {key: delta for key, delta in pending.items() if delta}
+            if not pending:
+                return 0
+            
+            session = get_db()
+            try:
+                existing = {
+                    (row.user_id, row.period, row.metric): row
+                    for row in session.query(Usage).filter(
+                        Usage.user_id.in_({key[0] for key in pending}),
+                        Usage.period.in_({key[1] for key in pending})
+                    )
+                }
+                for (user_id, key_period, metric), delta in pending.items():
+                    row = existing.get((user_id, key_period, metric))
+                    if row is None:
+                        session.add(Usage(user_id=user_id, period=key_period, metric=metric, count=max(delta, 0)))
+                    else:
+                        row.count = Usage.count + delta
+                
+                session.commit()
+            
+            except Exception as e:
+                session.rollback()
+                logger.error(f"Error flushing usage, will retry: {e}")
+                with self._lock:
+                    for key, delta in pending.items():
+                        self._pending[key] += delta
+                    self._pending_ops += len(pending)
+                return 0
+            finally:
+                session.close()
+            
+            with self._lock:
+                self.stats['flushes'] += 1
+                self.stats['rows_written'] += len(pending)
+            return len(pending)
+        
+        finally:
+            self._flush_lock.release()
+    
+    def get_stats(self) -> Dict:
+        """Counter activity and what is waiting to be written"""
+        with self._lock:
+            return {
+                **self.stats,
+                'pending': len(self._pending),
+                'users': len(self._limits),
+            }
+
+
+_meter = None
+_meter_lock = threading.Lock()
+
+
+def get_usage_meter() -> UsageMeter:
+    """Shared usage meter"""
+    global _meter
+    with _meter_lock:
+        if _meter is None:
+            _meter = UsageMeter()
+        return _meter
+
+
+def flush_usage():
+    """Write the shared meter's pending usage (registered at exit)"""
+    with _meter_lock:
+        meter = _meter
+    if meter is not None:
+        meter.flush()
+
+
+atexit.register(flush_usage)
@@ -0,0 +1,96 @@
+"""
+Unit tests for A/B test assignment and sequential results
+"""
+
+import unittest
+import os
+import sys
+import tempfile
+import shutil
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src import database
+from src.database import init_database, get_db, Lead, Campaign, ABAssignment
+from src.ab_testing import ABTestingFramework
+
+
+class TestABTesting(unittest.TestCase):
+    """Test assignment table and SPRT-backed results"""
+    
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.previous_manager = database.db_manager
+        self.manager = init_database(f"sqlite:///{os.path.join(self.test_dir, 'test.db')}")
+        self.framework = ABTestingFramework()
+        
+        session = get_db()
+        campaign = Campaign(name='A/B Test: subject lines', status='Active')
+        session.add(campaign)
+        leads = [Lead(title=f"Business {i}") for i in range(400)]
+        session.add_all(leads)
+        session.commit()
+        self.test_id = campaign.id
+        self.lead_ids = [lead.id for lead in leads]
+        session.close()
+    
+    def tearDown(self):
+        self.manager.Session.remove()
+        self.manager.engine.dispose()
+        database.db_manager = self.previous_manager
+        shutil.rmtree(self.test_dir)
+    
+    def test_assignment_is_deterministic_and_stored_once(self):
+        first = [self.framework.assign_variant(self.test_id, lead_id) for lead_id in self.lead_ids[:50]]
+        second = [self.framework.assign_variant(self.test_id, lead_id) for lead_id in self.lead_ids[:50]]
+        
+        self.assertEqual(first, second)
+        self.assertEqual(set(first), {'A', 'B'})
+        
+        session = get_db()
+        self.assertEqual(session.query(ABAssignment).filter_by(test_id=self.test_id).count(), 50)
+        session.close()
+    
+    def test_results_from_assignments(self):
+        variants = {lead_id: self.framework.assign_variant(self.test_id, lead_id)
+                    for lead_id in self.lead_ids[:100]}
+        replied = [lead_id for lead_id, variant in variants.items() if variant == 'A'][:5]
+        for lead_id in replied:
+            self.assertEqual(self.framework.record_reply(lead_id), 1)
+        # Replies are only counted once per assignment
+        self.assertEqual(self.framework.record_reply(replied[0]), 0)
+        
+        results = self.framework.get_test_results(self.test_id)
+        self.assertEqual(results['variant_a']['sent'], list(variants.values()).count('A'))
+        self.assertEqual(results['variant_b']['sent'], list(variants.values()).count('B'))
+        self.assertEqual(results['variant_a']['replied'], 5)
+        self.assertEqual(results['variant_b']['replied'], 0)
+    
+    def test_sequential_test_declares_clear_winner(self):
+        variants = {lead_id: self.framework.assign_variant(self.test_id, lead_id)
+                    for lead_id in self.lead_ids}
+        b_leads = [lead_id for lead_id, variant in variants.items() if variant == 'B']
+        a_leads = [lead_id for lead_id, variant in variants.items() if variant == 'A']
+        
+        # B replies at ~30%, A at ~5%
+        for lead_id in b_leads[::3]:
+            self.framework.record_reply(lead_id)
+        for lead_id in a_leads[::20]:
+            self.framework.record_reply(lead_id)
+        
+        results = self.framework.get_test_results(self.test_id)
+        self.assertEqual(results['sequential_test']['decision'], 'Variant B')
+        self.assertEqual(results['winner'], 'Variant B')
+        self.assertEqual(results['confidence'], 'high')
+    
+    def test_no_replies_is_insufficient_data(self):
+        for lead_id in self.lead_ids[:10]:
+            self.framework.assign_variant(self.test_id, lead_id)
+        
+        results = self.framework.get_test_results(self.test_id)
+        self.assertEqual(results['winner'], 'Insufficient data')
+        self.assertIsNone(results['sequential_test']['decision'])
+
+
+if __name__ == '__main__':
+    unittest.main()
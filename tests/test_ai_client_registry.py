@@ -0,0 +1,114 @@
+"""
+Unit tests for the shared Gemini client registry
+"""
+
+import unittest
+import os
+import sys
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src import ai_gemini
+from src.ai_gemini import GeminiClientRegistry
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeGenAI:
+    """Stand-in for google.generativeai that records configure/model calls"""
+    
+    def __init__(self, unhealthy=()):
+        self.configured = []
+        self.built = []
+        self.unhealthy = set(unhealthy)
+        sdk = self
+        
+        class GenerativeModel:
+            def __init__(self, name):
+                self.name = name
+                sdk.built.append(name)
+            
+            def count_tokens(self, contents, request_options=None):
+                if self.name in sdk.unhealthy:
+                    raise RuntimeError(f'{self.name} unavailable')
+                return {'total_tokens': 1}
+            
+            def generate_content(self, prompt, **kwargs):
+                if prompt == 'fail':
+                    raise RuntimeError('quota')
+                return FakeResponse(f'{self.name}: {prompt}')
+        
+        self.GenerativeModel = GenerativeModel
+    
+    def configure(self, api_key):
+        self.configured.append(api_key)
+
+
+class TestGeminiClientRegistry(unittest.TestCase):
+    """Test client reuse, health-probe fallback and latency tracking"""
+    
+    def use_sdk(self, sdk):
+        patcher = patch.object(ai_gemini, '_genai', lambda: sdk)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return sdk
+    
+    def test_configures_once_and_shares_assistant(self):
+        sdk = self.use_sdk(FakeGenAI())
+        registry = GeminiClientRegistry()
+        
+        first = registry.get_assistant('key-a')
+        second = registry.get_assistant('key-a')
+        
+        self.assertIs(first, second)
+        self.assertEqual(sdk.configured, ['key-a'])
+        self.assertEqual(sdk.built, ['gemini-2.5-flash'])
+        
+        registry.get_assistant('key-b')
+        self.assertEqual(sdk.configured, ['key-a', 'key-b'])
+    
+    def test_probe_falls_back_to_healthy_model(self):
+        self.use_sdk(FakeGenAI(unhealthy={'gemini-2.5-flash'}))
+        registry = GeminiClientRegistry()
+        assistant = registry.get_assistant('key')
+        
+        self.assertEqual(registry.probe('key'), 'gemini-1.5-flash')
+        
+        self.assertEqual(assistant.model.name, 'gemini-1.5-flash')
+        stats = registry.get_stats()
+        self.assertEqual(stats['active_model'], 'gemini-1.5-flash')
+        self.assertFalse(stats['models']['gemini-2.5-flash']['healthy'])
+        self.assertIn('unavailable', stats['models']['gemini-2.5-flash']['error'])
+    
+    def test_records_latency_per_model(self):
+        self.use_sdk(FakeGenAI())
+        registry = GeminiClientRegistry()
+        model = registry.get_assistant('key').model
+        
+        self.assertEqual(model.generate_content('hello').text, 'gemini-2.5-flash: hello')
+        with self.assertRaises(RuntimeError):
+            model.generate_content('fail')
+        
+        stats = registry.get_stats()['models']['gemini-2.5-flash']
+        self.assertEqual(stats['calls'], 2)
+        self.assertEqual(stats['errors'], 1)
+        self.assertIsNotNone(stats['avg_ms'])
+    
+    def test_warm_up_runs_once_per_key(self):
+        sdk = self.use_sdk(FakeGenAI())
+        registry = GeminiClientRegistry()
+        
+        thread = registry.warm_up('key')
+        thread.join(5)
+        
+        self.assertIs(registry.warm_up('key'), thread)
+        self.assertTrue(registry.get_stats()['models']['gemini-2.5-flash']['healthy'])
+        self.assertEqual(sdk.configured, ['key'])
+
+
+if __name__ == '__main__':
+    unittest.main()
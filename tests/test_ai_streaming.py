@@ -0,0 +1,102 @@
+"""
+Unit tests for streamed Gemini generation
+"""
+
+import unittest
+import os
+import sys
+from types import SimpleNamespace
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src import ai_gemini
+from src.ai_gemini import GeminiAI, GeminiClientRegistry, StreamInterrupted, TimedModel
+
+FAKE_SDK = SimpleNamespace(types=SimpleNamespace(GenerationConfig=lambda **kwargs: kwargs))
+
+
+class Chunk:
+    def __init__(self, text=None):
+        self._text = text
+    
+    @property
+    def text(self):
+        if self._text is None:
+            raise ValueError('No text parts')
+        return self._text
+
+
+class StreamingModel:
+    """Model whose streamed responses are scripted per call"""
+    
+    def __init__(self, *scripts):
+        self.scripts = list(scripts)
+        self.calls = []
+    
+    def generate_content(self, prompt, **kwargs):
+        self.calls.append(kwargs)
+        script = self.scripts.pop(0)
+        if isinstance(script, Exception):
+            raise script
+        
+        def chunks():
+            for item in script:
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        return chunks()
+
+
+class TestGeminiStreaming(unittest.TestCase):
+    """Test chunked output, retries before the first chunk and latency of streams"""
+    
+    def setUp(self):
+        patcher = patch.object(ai_gemini, '_genai', lambda: FAKE_SDK)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        sleep = patch.object(ai_gemini.time, 'sleep')
+        sleep.start()
+        self.addCleanup(sleep.stop)
+    
+    def test_stream_yields_text_chunks(self):
+        model = StreamingModel([Chunk('Hey! '), Chunk(), Chunk('Raghav here')])
+        ai = GeminiAI('key', model=model)
+        
+        chunks = list(ai.stream_whatsapp_message('Cafe X', 'cafe'))
+        
+        self.assertEqual(chunks, ['Hey! ', 'Raghav here'])
+        self.assertTrue(model.calls[0]['stream'])
+    
+    def test_retries_then_falls_back_before_first_chunk(self):
+        model = StreamingModel(RuntimeError('quota'), [RuntimeError('reset')], [])
+        ai = GeminiAI('key', model=model)
+        
+        chunks = list(ai.stream_cold_email('Cafe X', 'cafe', 'Delhi', 4.5, 120))
+        
+        self.assertEqual(len(model.calls), 3)
+        self.assertEqual(len(chunks), 1)
+        self.assertIn('Cafe X', chunks[0])
+    
+    def test_failure_after_first_chunk_raises(self):
+        model = StreamingModel([Chunk('Hi Cafe X,'), RuntimeError('connection reset')])
+        ai = GeminiAI('key', model=model)
+        stream = ai.stream_cold_email('Cafe X', 'cafe', 'Delhi', 4.5, 120)
+        
+        self.assertEqual(next(stream), 'Hi Cafe X,')
+        with self.assertRaises(StreamInterrupted):
+            next(stream)
+    
+    def test_stream_latency_recorded_when_consumed(self):
+        registry = GeminiClientRegistry()
+        model = TimedModel(StreamingModel([Chunk('a'), Chunk('b')]), 'gemini-2.5-flash', registry)
+        
+        response = model.generate_content('prompt', stream=True)
+        self.assertEqual(registry.get_stats()['models']['gemini-2.5-flash']['calls'], 0)
+        
+        self.assertEqual([chunk.text for chunk in response], ['a', 'b'])
+        self.assertEqual(registry.get_stats()['models']['gemini-2.5-flash']['calls'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
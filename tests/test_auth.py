@@ -0,0 +1,114 @@
+"""
+Unit tests for the auth token and user caches
+"""
+
+import unittest
+import os
+import sys
+import tempfile
+import shutil
+import time
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import jwt
+
+from src import auth, database
+from src.auth import AuthManager, clear_auth_caches, get_auth_cache_stats, SECRET_KEY, ALGORITHM
+from src.database import init_database, count_queries
+
+
+class TestAuthCaches(unittest.TestCase):
+    """Test that repeat requests skip JWT verification and user lookups"""
+    
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.previous_manager = database.db_manager
+        self.manager = init_database(f"sqlite:///{os.path.join(self.test_dir, 'test.db')}")
+        clear_auth_caches()
+        
+        self.auth = AuthManager()
+        created = self.auth.create_user('owner@example.com', 'secret123', 'Owner', role='admin')
+        self.user_id = created['user_id']
+        self.token = self.auth.authenticate('owner@example.com', 'secret123')['token']
+    
+    def tearDown(self):
+        clear_auth_caches()
+        self.manager.Session.remove()
+        self.manager.engine.dispose()
+        database.db_manager = self.previous_manager
+        shutil.rmtree(self.test_dir)
+    
+    def test_repeat_verification_skips_signature_check(self):
+        with patch('src.auth.jwt.decode', wraps=jwt.decode) as decode:
+            for _ in range(5):
+                result = AuthManager().verify_token(self.token)
+        
+        self.assertEqual(result['payload']['user_id'], self.user_id)
+        self.assertEqual(decode.call_count, 1)
+        self.assertEqual(get_auth_cache_stats()['tokens']['hits'], 4)
+    
+    def test_repeat_user_lookup_skips_database(self):
+        first = self.auth.get_current_user(self.token)
+        
+        with count_queries(self.manager.engine) as counter:
+            second = self.auth.get_current_user(self.token)
+        
+        self.assertEqual(counter['count'], 0)
+        self.assertEqual(first.email, 'owner@example.com')
+        self.assertEqual(second.full_name, 'Owner')
+    
+    def test_update_user_invalidates_cached_record(self):
+        self.auth.get_current_user(self.token)
+        
+        self.auth.update_user(self.user_id, {'full_name': 'New Name'})
+        
+        self.assertEqual(self.auth.get_current_user(self.token).full_name, 'New Name')
+    
+    def test_change_password_invalidates_cached_record(self):
+        before = self.auth.get_current_user(self.token).password_hash
+        
+        self.auth.change_password(self.user_id, 'secret123', 'changed456')
+        
+        self.assertNotEqual(self.auth.get_current_user(self.token).password_hash, before)
+    
+    def test_user_cache_expires_after_ttl(self):
+        self.auth.get_current_user(self.token)
+        
+        with patch.object(auth._user_cache, 'ttl', 0):
+            auth._user_cache.clear()
+            self.auth.get_current_user(self.token)
+            with count_queries(self.manager.engine) as counter:
+                self.auth.get_current_user(self.token)
+        
+        self.assertGreater(counter['count'], 0)
+    
+    def test_cached_token_still_expires(self):
+        token = jwt.encode({'user_id': self.user_id, 'role': 'user',
+                            'exp': datetime.utcnow() + timedelta(seconds=1)}, SECRET_KEY, algorithm=ALGORITHM)
+        
+        self.assertIn('success', self.auth.verify_token(token))
+        time.sleep(1.1)
+        
+        self.assertEqual(self.auth.verify_token(token), {'error': 'Token expired'})
+    
+    def test_invalid_tokens_are_not_cached(self):
+        for _ in range(2):
+            self.assertEqual(self.auth.verify_token('not-a-token'), {'error': 'Invalid token'})
+        
+        self.assertEqual(get_auth_cache_stats()['tokens']['size'], 0)
+    
+    def test_token_cache_is_bounded(self):
+        with patch.object(auth._token_cache, 'max_size', 3):
+            for i in range(5):
+                token = jwt.encode({'user_id': i, 'exp': datetime.utcnow() + timedelta(hours=1)},
+                                   SECRET_KEY, algorithm=ALGORITHM)
+                self.auth.verify_token(token)
+            
+            self.assertEqual(get_auth_cache_stats()['tokens']['size'], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,140 @@
+"""
+Tests for the headless browser pool (page loads need selenium + Chrome)
+"""
+
+import unittest
+import os
+import sys
+import threading
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    import selenium  # noqa: F401
+    HAS_SELENIUM = True
+except ImportError:
+    HAS_SELENIUM = False
+
+from src.browser_pool import BrowserPool, benchmark
+
+FIXTURE_URL = (Path(__file__).resolve().parent / 'fixtures' / 'maps_results.html').as_uri()
+
+
+class FakeDriver:
+    """Stands in for a WebDriver where only the pool bookkeeping is under test"""
+    
+    def __init__(self):
+        self.current_window_handle = 'tab-0'
+        self.quit_calls = 0
+    
+    def quit(self):
+        self.quit_calls += 1
+
+
+class TestBrowserPoolSessions(unittest.TestCase):
+    """Test browser reuse, recycling and the concurrency limit"""
+    
+    def setUp(self):
+        self.drivers = []
+        
+        def factory():
+            driver = FakeDriver()
+            self.drivers.append(driver)
+            return driver
+        
+        self.pool = BrowserPool(max_browsers=2, recycle_after=3, driver_factory=factory)
+    
+    def test_reuses_idle_browser(self):
+        for _ in range(3):
+            with self.pool.session() as session:
+                session.pages_loaded += 1
+        
+        self.assertEqual(len(self.drivers), 1)
+        self.assertEqual(self.pool.get_stats()['browsers_started'], 1)
+    
+    def test_recycles_after_n_pages(self):
+        with self.pool.session() as session:
+            session.pages_loaded = 3
+        with self.pool.session():
+            pass
+        
+        self.assertEqual(len(self.drivers), 2)
+        self.assertEqual(self.drivers[0].quit_calls, 1)
+        self.assertEqual(self.pool.get_stats()['browsers_recycled'], 1)
+    
+    def test_discards_browser_after_error(self):
+        with self.assertRaises(RuntimeError):
+            with self.pool.session():
+                raise RuntimeError("browser crashed")
+        with self.pool.session():
+            pass
+        
+        self.assertEqual(self.drivers[0].quit_calls, 1)
+        self.assertEqual(len(self.drivers), 2)
+    
+    def test_limits_concurrent_browsers(self):
+        leased = threading.Event()
+        release = threading.Event()
+        
+        def hold():
+            with self.pool.session():
+                leased.set()
+                release.wait(5)
+        
+        holders = [threading.Thread(target=hold) for _ in range(2)]
+        for holder in holders:
+            holder.start()
+        leased.wait(5)
+        
+        # Both slots are taken, so a third lease has to wait
+        self.assertFalse(self.pool._slots.acquire(timeout=0.1))
+        release.set()
+        for holder in holders:
+            holder.join()
+        self.assertEqual(len(self.drivers), 2)
+    
+    def test_close_quits_idle_browsers(self):
+        with self.pool.session():
+            pass
+        self.pool.close()
+        
+        self.assertEqual(self.drivers[0].quit_calls, 1)
+
+
+@unittest.skipUnless(HAS_SELENIUM, "selenium not installed")
+class TestBrowserPoolPages(unittest.TestCase):
+    """Load the static Google Maps fixture in real headless Chrome"""
+    
+    def setUp(self):
+        self.pool = BrowserPool(max_browsers=2, tabs_per_browser=3, recycle_after=10)
+    
+    def tearDown(self):
+        self.pool.close()
+    
+    def test_extracts_fixture_in_every_tab(self):
+        from src.scraper_free_unlimited import extract_maps_results, MAPS_FEED
+        
+        pages = self.pool.fetch_pages(
+            [FIXTURE_URL] * 6,
+            lambda driver: extract_maps_results(driver, max_results=5),
+            wait_for=MAPS_FEED,
+        )
+        
+        self.assertEqual(len(pages), 6)
+        for businesses in pages:
+            self.assertEqual([b['title'] for b in businesses][:2], ['Sunrise Dental', 'Maple Day Care'])
+            self.assertEqual(len(businesses), 5)
+        self.assertEqual(self.pool.get_stats()['browsers_started'], 2)
+    
+    def test_benchmark_reports_pages_per_second(self):
+        report = benchmark(self.pool, FIXTURE_URL, pages=12, wait_for="div[role='feed']")
+        
+        self.assertEqual(report['succeeded'], 12)
+        self.assertGreater(report['pages_per_second'], 0)
+        # 13 pages with recycle_after=10 across two browsers
+        self.assertEqual(report['stats']['pages_loaded'], 13)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -8,7 +8,8 @@ from pathlib import Path
 import pytest
 from hypothesis import given, strategies as st
 
-from src.config import load_config, ConfigurationError
+from src import config as config_module
+from src.config import load_config, get_settings, reset_settings, ConfigurationError
 
 
 # Feature: lead-generation-bot, Property 19: Configuration loads all required fields
@@ -228,3 +229,82 @@ def test_zero_max_leads():
         assert "MAX_LEADS_PER_RUN" in str(exc_info.value)
     finally:
         os.unlink(temp_path)
+
+
+VALID_CONFIG = {
+    "SERPAPI_KEY": "test_key_12345678901234567890",
+    "GOOGLE_SHEET_ID": "test_sheet_id_1234567890123456789012345678901234567890",
+    "GOOGLE_SERVICE_ACCOUNT_JSON": "config/service_account.json",
+    "MIN_RATING": 4.0,
+    "MIN_REVIEWS": 20,
+    "MAX_LEADS_PER_RUN": 50
+}
+
+
+@pytest.fixture
+def settings_file(tmp_path, monkeypatch):
+    """Config file for get_settings() with the mtime check on every call"""
+    monkeypatch.setattr(config_module, "RELOAD_CHECK_INTERVAL", 0)
+    path = tmp_path / "settings.json"
+    path.write_text(json.dumps(VALID_CONFIG))
+    reset_settings()
+    yield path
+    reset_settings()
+
+
+def rewrite(path, data, mtime_step=10):
+    """Rewrite the file and move its mtime forward (filesystem mtimes can be coarse)"""
+    mtime = os.path.getmtime(path)
+    path.write_text(data if isinstance(data, str) else json.dumps(data))
+    os.utime(path, (mtime + mtime_step, mtime + mtime_step))
+
+
+def test_settings_are_cached_and_read_only(settings_file):
+    """Test that repeated get_settings() calls return the same immutable object."""
+    settings = get_settings(str(settings_file))
+    
+    assert get_settings(str(settings_file)) is settings
+    assert settings["MIN_REVIEWS"] == 20
+    assert settings.get("GEMINI_API_KEY") is None
+    assert settings.max_leads_per_run == 50
+    with pytest.raises(AttributeError):
+        settings.path = "other.json"
+    with pytest.raises(TypeError):
+        settings["MIN_REVIEWS"] = 0
+    
+    as_dict = settings.as_dict()
+    as_dict["MIN_REVIEWS"] = 0
+    assert settings["MIN_REVIEWS"] == 20
+
+
+def test_settings_reload_when_file_changes(settings_file):
+    """Test that an edited file is picked up without a restart."""
+    first = get_settings(str(settings_file))
+    rewrite(settings_file, {**VALID_CONFIG, "MIN_REVIEWS": 35})
+    
+    second = get_settings(str(settings_file))
+    
+    assert second is not first
+    assert second.min_reviews == 35
+
+
+def test_failed_reload_keeps_previous_settings(settings_file):
+    """Test that a broken edit does not replace working settings."""
+    first = get_settings(str(settings_file))
+    rewrite(settings_file, "{broken")
+    
+    assert get_settings(str(settings_file)) is first
+
+
+def test_environment_overrides_applied_at_load(settings_file, monkeypatch):
+    """Test that environment overrides are read when settings load, not per call."""
+    monkeypatch.setattr(config_module, "RELOAD_CHECK_INTERVAL", 60)
+    monkeypatch.setenv("SERPAPI_KEY", "env_key")
+    settings = get_settings(str(settings_file))
+    monkeypatch.setenv("SERPAPI_KEY", "changed_key")
+    
+    assert settings.serpapi_key == "env_key"
+    assert get_settings(str(settings_file)).serpapi_key == "env_key"
+    
+    reset_settings()
+    assert get_settings(str(settings_file)).serpapi_key == "changed_key"
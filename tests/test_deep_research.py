@@ -0,0 +1,148 @@
+"""
+Unit tests for batch deep research
+"""
+
+import unittest
+import os
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.deep_research import DeepResearchEngine
+
+
+class SlowAI:
+    """Fake Gemini model that tracks peak concurrent calls"""
+    
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.active = 0
+        self.peak = 0
+        self.calls = 0
+    
+    def generate_content(self, prompt):
+        with self.lock:
+            self.active += 1
+            self.calls += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(self.delay)
+        with self.lock:
+            self.active -= 1
+        return SimpleNamespace(text=f"Insight for {prompt.split('Company: ')[1].splitlines()[0]}")
+
+
+def _assistant(model):
+    """GeminiAI stand-in exposing the model like the real assistant"""
+    return SimpleNamespace(model=model)
+
+
+class CountingRateLimiter:
+    """Allows a fixed number of calls per service"""
+    
+    def __init__(self, budget=1000):
+        self.budget = budget
+        self.services = []
+        self.lock = threading.Lock()
+    
+    def wait_if_needed(self, service='default', max_wait=60):
+        with self.lock:
+            self.services.append(service)
+            if self.budget <= 0:
+                raise Exception(f"Rate limit exceeded for {service}")
+            self.budget -= 1
+    
+    def try_acquire(self, service='default'):
+        with self.lock:
+            self.services.append(service)
+            if self.budget <= 0:
+                return 30.0
+            self.budget -= 1
+            return 0.0
+
+
+def _leads(count):
+    return [{'title': f"Business {i}", 'type': 'Restaurant' if i % 2 else 'Dentist',
+             'website': '' if i % 3 == 0 else f"https://biz{i}.com", 'rating': 3.5 + (i % 4) * 0.5,
+             'reviews': i * 20, 'quality_score': 60 + i % 40, 'phone': '9876543210'}
+            for i in range(count)]
+
+
+class TestDeepResearchBatch(unittest.TestCase):
+    """Test analyze_companies against analyze_company"""
+    
+    def test_batch_matches_single_analysis(self):
+        engine = DeepResearchEngine()
+        leads = _leads(12)
+        
+        batch = list(engine.analyze_companies(leads))
+        
+        self.assertEqual(batch, [engine.analyze_company(lead) for lead in leads])
+    
+    def test_ai_insights_run_concurrently_in_order(self):
+        ai = SlowAI()
+        limiter = CountingRateLimiter()
+        engine = DeepResearchEngine(_assistant(ai), rate_limiter=limiter)
+        
+        results = list(engine.analyze_companies(_leads(10), max_workers=4))
+        
+        self.assertEqual([r['company_name'] for r in results], [f"Business {i}" for i in range(10)])
+        self.assertEqual(results[3]['ai_insights'], 'Insight for Business 3')
+        self.assertEqual(ai.calls, 10)
+        self.assertGreater(ai.peak, 1)
+        self.assertLessEqual(ai.peak, 4)
+        self.assertEqual(limiter.services, ['gemini'] * 10)
+    
+    def test_results_stream_lazily(self):
+        ai = SlowAI(delay=0)
+        engine = DeepResearchEngine(_assistant(ai), rate_limiter=CountingRateLimiter())
+        
+        def endless():
+            i = 0
+            while True:
+                yield {'title': f"Business {i}", 'rating': 4.2, 'reviews': 80}
+                i += 1
+        
+        results = engine.analyze_companies(endless(), max_workers=2)
+        first = [next(results) for _ in range(3)]
+        results.close()
+        
+        self.assertEqual(first[2]['company_name'], 'Business 2')
+        self.assertLessEqual(ai.calls, 3 + 2 * 2)
+    
+    def test_assistant_without_model_takes_no_rate_limit_slot(self):
+        limiter = CountingRateLimiter()
+        engine = DeepResearchEngine(_assistant(None), rate_limiter=limiter)
+        
+        analysis = engine.analyze_company(_leads(1)[0])
+        
+        self.assertEqual(analysis['ai_insights'], 'AI insights not available')
+        self.assertEqual(limiter.services, [])
+    
+    def test_rate_limited_insights_degrade(self):
+        engine = DeepResearchEngine(_assistant(SlowAI(delay=0)), rate_limiter=CountingRateLimiter(budget=2))
+        
+        results = list(engine.analyze_companies(_leads(4), max_workers=1))
+        
+        self.assertEqual(sum(r['ai_insights'] == 'AI insights temporarily unavailable' for r in results), 2)
+        self.assertNotIn('error', results[0])
+        self.assertEqual(engine.ai_calls, 2)
+    
+    def test_zero_wait_never_blocks_on_the_limiter(self):
+        ai = SlowAI(delay=0)
+        limiter = CountingRateLimiter(budget=3)
+        limiter.wait_if_needed = None  # Must not be used
+        engine = DeepResearchEngine(_assistant(ai), rate_limiter=limiter, rate_limit_wait=0)
+        
+        results = list(engine.analyze_companies(_leads(5), max_workers=1))
+        
+        self.assertEqual([r['ai_insights'] for r in results][3:], ['AI insights temporarily unavailable'] * 2)
+        self.assertEqual(ai.calls, 3)
+        self.assertEqual(engine.ai_calls, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
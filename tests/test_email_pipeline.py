@@ -0,0 +1,143 @@
+"""
+Unit tests for the async email pipeline
+"""
+
+import unittest
+import os
+import sys
+import smtplib
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.email_sender import GmailSender
+from src.email_pipeline import classify_failure, send_bulk
+
+
+class FakePool:
+    """Pretends to send, tracking peak concurrency overall and per recipient domain"""
+    
+    def __init__(self, delay=0.02, errors=None):
+        self.delay = delay
+        self.errors = errors or {}
+        self.lock = threading.Lock()
+        self.active = {}
+        self.peak = {}
+        self.active_total = 0
+        self.peak_total = 0
+        self.sent = []
+    
+    def send_message(self, msg):
+        recipient = msg['To']
+        domain = recipient.split('@')[1]
+        with self.lock:
+            self.active[domain] = self.active.get(domain, 0) + 1
+            self.peak[domain] = max(self.peak.get(domain, 0), self.active[domain])
+            self.active_total += 1
+            self.peak_total = max(self.peak_total, self.active_total)
+        try:
+            time.sleep(self.delay)
+            if recipient in self.errors:
+                raise self.errors[recipient]
+            with self.lock:
+                self.sent.append(recipient)
+            return {}
+        finally:
+            with self.lock:
+                self.active[domain] -= 1
+                self.active_total -= 1
+
+
+class FakeGmailSender(GmailSender):
+    """GmailSender with the SMTP pool swapped for a FakePool"""
+    
+    def __init__(self, pool):
+        super().__init__('me@example.com', 'app-password')
+        self._fake_pool = pool
+    
+    @property
+    def pool(self):
+        return self._fake_pool
+
+
+def _recipients(count, domains=('alpha.com', 'beta.com', 'gamma.com')):
+    return [{'email': f"owner{i}@{domains[i % len(domains)]}", 'business_name': f"Biz {i}"}
+            for i in range(count)]
+
+
+class TestEmailPipeline(unittest.TestCase):
+    """Test concurrency limits, quota and failure reporting"""
+    
+    def test_sends_concurrently_within_domain_limits(self):
+        pool = FakePool()
+        sender = FakeGmailSender(pool)
+        
+        report = send_bulk(sender, _recipients(30), 'Hi {business_name}', 'Hello {name}',
+                           max_concurrency=6, per_domain_limit=2)
+        
+        self.assertEqual(report['sent'], 30)
+        self.assertEqual(len(pool.sent), 30)
+        self.assertLessEqual(pool.peak_total, 6)
+        self.assertGreater(pool.peak_total, 1)
+        for domain, peak in pool.peak.items():
+            self.assertLessEqual(peak, 2, domain)
+        self.assertTrue(all(r['latency_ms'] is not None for r in report['results']))
+        self.assertGreater(report['latency_ms']['p95'], 0)
+    
+    def test_messages_are_prerendered_with_signature(self):
+        pool = FakePool(delay=0)
+        captured = []
+        original = pool.send_message
+        pool.send_message = lambda msg: (captured.append(msg), original(msg))[1]
+        
+        send_bulk(FakeGmailSender(pool), _recipients(1), 'Hi {business_name}', 'Hello {name}')
+        
+        body = captured[0].get_payload()[0].get_payload(decode=True).decode('utf-8')
+        self.assertTrue(body.startswith('Hello there'))
+        self.assertIn('Ragspro.com', body)
+        self.assertEqual(captured[0]['Subject'], 'Hi Biz 0')
+    
+    def test_quota_defers_the_rest(self):
+        pool = FakePool(delay=0)
+        report = send_bulk(FakeGmailSender(pool), _recipients(10), 'Hi', 'Hello',
+                           max_messages=4)
+        
+        self.assertEqual(report['sent'], 4)
+        self.assertEqual(report['deferred'], 6)
+        self.assertEqual(len(report['retry']), 6)
+    
+    def test_failure_reasons_and_retry_list(self):
+        refused = smtplib.SMTPRecipientsRefused({'owner0@alpha.com': (550, b'No such user')})
+        greylisted = smtplib.SMTPDataError(451, b'Try again later')
+        pool = FakePool(delay=0, errors={
+            'owner0@alpha.com': refused,
+            'owner1@beta.com': greylisted,
+        })
+        recipients = _recipients(3) + [{'business_name': 'No Email'}]
+        
+        report = send_bulk(FakeGmailSender(pool), recipients, 'Hi', 'Hello')
+        by_email = {r['email']: r for r in report['results']}
+        
+        self.assertEqual(report['sent'], 1)
+        self.assertEqual(report['failed'], 3)
+        self.assertEqual(by_email['owner0@alpha.com']['reason'], 'recipient_refused')
+        self.assertFalse(by_email['owner0@alpha.com']['retryable'])
+        self.assertEqual(by_email['owner1@beta.com']['reason'], 'smtp_451')
+        self.assertEqual(report['retry'], ['owner1@beta.com'])
+        self.assertEqual(by_email[None]['reason'], 'no_email')
+    
+    def test_classify_failure(self):
+        self.assertEqual(classify_failure(smtplib.SMTPServerDisconnected()), ('connection', True))
+        self.assertEqual(classify_failure(smtplib.SMTPDataError(554, b'Rejected')), ('smtp_554', False))
+        self.assertEqual(classify_failure(ConnectionResetError()), ('network', True))
+    
+    def test_send_bulk_emails_keeps_count_keys(self):
+        pool = FakePool(delay=0)
+        results = FakeGmailSender(pool).send_bulk_emails(_recipients(3), 'Hi', 'Hello', delay_seconds=0)
+        
+        self.assertEqual((results['sent'], results['failed'], results['total']), (3, 0, 3))
+
+
+if __name__ == '__main__':
+    unittest.main()
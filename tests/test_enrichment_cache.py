@@ -0,0 +1,144 @@
+"""
+Tests for the enrichment cache's conditional revalidation against a local HTTP server
+"""
+
+import unittest
+import os
+import sys
+import tempfile
+import shutil
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.enrichment_cache import EnrichmentCache
+from src.social_media_finder import enrich_leads_with_social_media
+
+PAGE = '<a href="https://facebook.com/acme">Facebook</a> hello@acme.com ' + 'x' * 5000
+
+
+class ValidatingHandler(BaseHTTPRequestHandler):
+    """Serves one page with an ETag (or only Last-Modified) and honours conditional GETs"""
+    
+    etag = '"v1"'
+    last_modified = 'Mon, 05 Oct 2026 10:00:00 GMT'
+    statuses = []
+    
+    def do_GET(self):
+        cls = type(self)
+        use_etag = not self.path.startswith('/dated')
+        if use_etag and self.headers.get('If-None-Match') == cls.etag:
+            return self._not_modified()
+        if not use_etag and self.headers.get('If-Modified-Since') == cls.last_modified:
+            return self._not_modified()
+        
+        body = PAGE.encode('utf-8')
+        cls.statuses.append(200)
+        self.send_response(200)
+        if use_etag:
+            self.send_header('ETag', cls.etag)
+        else:
+            self.send_header('Last-Modified', cls.last_modified)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def _not_modified(self):
+        type(self).statuses.append(304)
+        self.send_response(304)
+        self.end_headers()
+    
+    def log_message(self, *args):
+        pass
+
+
+class TestEnrichmentCache(unittest.TestCase):
+    """Test TTL hits, 304 revalidation and re-extraction on change"""
+    
+    def setUp(self):
+        ValidatingHandler.etag = '"v1"'
+        ValidatingHandler.statuses = []
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), ValidatingHandler)
+        self.base = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.cache_dir = tempfile.mkdtemp()
+        self.extracted = []
+    
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.cache_dir)
+    
+    def _extract(self, html):
+        self.extracted.append(len(html))
+        return {'length': len(html)}
+    
+    def test_fresh_entry_skips_the_network(self):
+        cache = EnrichmentCache(cache_dir=self.cache_dir)
+        
+        first = cache.fetch(f"{self.base}/acme", self._extract)
+        second = cache.fetch(f"{self.base}/acme", self._extract)
+        
+        self.assertEqual(first, second)
+        self.assertEqual(ValidatingHandler.statuses, [200])
+        self.assertEqual(len(self.extracted), 1)
+        self.assertEqual(cache.get_stats()['hits'], 1)
+        self.assertGreater(cache.get_stats()['bytes_saved'], 5000)
+    
+    def test_expired_entry_revalidates_with_etag(self):
+        cache = EnrichmentCache(cache_dir=self.cache_dir, revalidate_after=0)
+        
+        cache.fetch(f"{self.base}/acme", self._extract)
+        result = cache.fetch(f"{self.base}/acme", self._extract)
+        
+        self.assertEqual(result, {'length': len(PAGE)})
+        self.assertEqual(ValidatingHandler.statuses, [200, 304])
+        self.assertEqual(len(self.extracted), 1)
+        stats = cache.get_stats()
+        self.assertEqual(stats['not_modified'], 1)
+        self.assertEqual(stats['bytes_saved'], stats['bytes_downloaded'])
+    
+    def test_revalidates_with_last_modified(self):
+        cache = EnrichmentCache(cache_dir=self.cache_dir, revalidate_after=0)
+        
+        cache.fetch(f"{self.base}/dated", self._extract)
+        cache.fetch(f"{self.base}/dated", self._extract)
+        
+        self.assertEqual(ValidatingHandler.statuses, [200, 304])
+    
+    def test_changed_page_is_extracted_again(self):
+        cache = EnrichmentCache(cache_dir=self.cache_dir, revalidate_after=0)
+        
+        cache.fetch(f"{self.base}/acme", self._extract)
+        ValidatingHandler.etag = '"v2"'
+        cache.fetch(f"{self.base}/acme", self._extract)
+        
+        self.assertEqual(ValidatingHandler.statuses, [200, 200])
+        self.assertEqual(len(self.extracted), 2)
+    
+    def test_stale_result_served_when_site_is_down(self):
+        cache = EnrichmentCache(cache_dir=self.cache_dir, revalidate_after=0)
+        cache.fetch(f"{self.base}/acme", self._extract)
+        self.server.shutdown()
+        self.server.server_close()
+        
+        self.assertEqual(cache.fetch(f"{self.base}/acme", self._extract, timeout=1),
+                         {'length': len(PAGE)})
+        self.assertEqual(cache.get_stats()['errors'], 1)
+    
+    def test_re_enrichment_is_mostly_not_modified(self):
+        cache = EnrichmentCache(cache_dir=self.cache_dir, revalidate_after=0)
+        leads = [{'title': f"Biz {i}", 'website': f"{self.base}/biz{i}"} for i in range(5)]
+        
+        enrich_leads_with_social_media(leads, cache=cache)
+        again = [{'title': f"Biz {i}", 'website': f"{self.base}/biz{i}"} for i in range(5)]
+        enrich_leads_with_social_media(again, cache=cache)
+        
+        self.assertEqual(ValidatingHandler.statuses.count(304), 5)
+        self.assertEqual(again[0]['email'], 'hello@acme.com')
+        self.assertEqual(again[0]['social_media']['facebook'], 'https://facebook.com/acme')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,218 @@
+"""
+Unit tests for the chunked follow-up dispatcher
+"""
+
+import unittest
+import os
+import sys
+import tempfile
+import shutil
+import threading
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src import database
+from src.database import init_database, get_db, Lead, FollowUp, Interaction
+from src.follow_up_engine import FollowUpEngine
+
+
+class RecordingSender:
+    """Thread-safe channel sender that records recipients"""
+    
+    def __init__(self, fail_for=()):
+        self.sent = []
+        self.fail_for = set(fail_for)
+        self.lock = threading.Lock()
+    
+    def send_email(self, to_email, subject, body, business_name=None):
+        if to_email in self.fail_for:
+            return False
+        with self.lock:
+            self.sent.append(to_email)
+        return True
+    
+    def send_message(self, to_number, message, business_name=None):
+        with self.lock:
+            self.sent.append(to_number)
+        return True
+
+
+class BudgetRateLimiter:
+    """Allows a fixed number of sends, then reports the limit as exhausted"""
+    
+    def __init__(self, budget, per_service=None):
+        self.budget = budget
+        self.per_service = dict(per_service or {})
+        self.lock = threading.Lock()
+    
+    def try_acquire(self, service='default'):
+        with self.lock:
+            if self.budget <= 0 or self.per_service.get(service, 1) <= 0:
+                return 60.0
+            self.budget -= 1
+            if service in self.per_service:
+                self.per_service[service] -= 1
+            return 0.0
+
+
+class TestFollowUpDispatcher(unittest.TestCase):
+    """Test claiming, chunked commits and restartability"""
+    
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.previous_manager = database.db_manager
+        self.manager = init_database(f"sqlite:///{os.path.join(self.test_dir, 'test.db')}")
+        
+        session = get_db()
+        past = datetime.utcnow() - timedelta(days=1)
+        for i in range(25):
+            lead = Lead(title=f"Business {i}", email=f"owner{i}@example.com", phone=f"98765{i:05d}")
+            session.add(lead)
+            session.add(FollowUp(lead=lead, scheduled_at=past, status='Pending',
+                                 channel='WhatsApp' if i % 5 == 0 else 'Email',
+                                 subject='Following up', content='Hi there'))
+        # Not due yet
+        future_lead = Lead(title="Future", email="future@example.com")
+        session.add(future_lead)
+        session.add(FollowUp(lead=future_lead, scheduled_at=datetime.utcnow() + timedelta(days=3),
+                             status='Pending', channel='Email', subject='Later', content='Later'))
+        session.commit()
+        session.close()
+    
+    def tearDown(self):
+        self.manager.Session.remove()
+        self.manager.engine.dispose()
+        database.db_manager = self.previous_manager
+        shutil.rmtree(self.test_dir)
+    
+    def _count(self, **filters):
+        session = get_db()
+        count = session.query(FollowUp).filter_by(**filters).count()
+        session.close()
+        return count
+    
+    def test_sends_all_due_in_chunks(self):
+        sender = RecordingSender()
+        engine = FollowUpEngine(None, sender, sender, rate_limiter=BudgetRateLimiter(1000))
+        
+        stats = engine.process_due_follow_ups(chunk_size=7, max_workers=3)
+        
+        self.assertEqual(stats['sent'], 25)
+        self.assertEqual(stats['chunks'], 4)
+        self.assertEqual(len(sender.sent), 25)
+        self.assertEqual(len(set(sender.sent)), 25)
+        self.assertEqual(self._count(status='Sent'), 25)
+        self.assertEqual(self._count(status='Pending'), 1)
+        
+        session = get_db()
+        self.assertEqual(session.query(Interaction).count(), 25)
+        self.assertEqual(session.query(FollowUp).filter(FollowUp.claimed_by.isnot(None)).count(), 0)
+        session.close()
+    
+    def test_rate_limited_run_is_resumable(self):
+        sender = RecordingSender()
+        engine = FollowUpEngine(None, sender, sender, rate_limiter=BudgetRateLimiter(10))
+        
+        first = engine.process_due_follow_ups(chunk_size=5, max_workers=2)
+        self.assertEqual(first['sent'], 10)
+        self.assertEqual(self._count(status='Sent'), 10)
+        
+        engine.limiter = BudgetRateLimiter(1000)
+        second = engine.process_due_follow_ups(chunk_size=5, max_workers=2)
+        
+        self.assertEqual(first['sent'] + second['sent'], 25)
+        # Nothing was sent twice
+        self.assertEqual(len(sender.sent), len(set(sender.sent)))
+    
+    def test_failed_sends_keep_lease_until_expiry(self):
+        sender = RecordingSender(fail_for={'owner1@example.com'})
+        engine = FollowUpEngine(None, sender, sender, rate_limiter=BudgetRateLimiter(1000))
+        
+        stats = engine.process_due_follow_ups(chunk_size=10)
+        self.assertEqual(stats['failed'], 1)
+        self.assertEqual(stats['sent'], 24)
+        
+        # Same run or an immediate re-run does not hammer the failing address
+        again = engine.process_due_follow_ups(chunk_size=10)
+        self.assertEqual(again['failed'], 0)
+        
+        # Once the lease expires the follow-up is claimable again
+        session = get_db()
+        session.query(FollowUp).filter(FollowUp.status == 'Pending', FollowUp.claimed_by.isnot(None)).update(
+            {FollowUp.lease_expires_at: datetime.utcnow() - timedelta(seconds=1)}
+        )
+        session.commit()
+        session.close()
+        
+        sender.fail_for.clear()
+        retry = engine.process_due_follow_ups(chunk_size=10)
+        self.assertEqual(retry['sent'], 1)
+    
+    def test_exhausted_channel_does_not_end_run(self):
+        sender = RecordingSender()
+        limiter = BudgetRateLimiter(1000, per_service={'gmail': 1, 'whatsapp': 3})
+        engine = FollowUpEngine(None, sender, sender, rate_limiter=limiter)
+        
+        stats = engine.process_due_follow_ups(chunk_size=5)
+        
+        # Email runs out in the first chunk; WhatsApp keeps sending in later chunks
+        self.assertEqual(stats['sent'], 4)
+        self.assertEqual(self._count(status='Sent', channel='WhatsApp'), 3)
+        self.assertEqual(self._count(status='Sent', channel='Email'), 1)
+        
+        # Deferred follow-ups are left unclaimed for the next run
+        session = get_db()
+        self.assertEqual(session.query(FollowUp).filter(FollowUp.claimed_by.isnot(None)).count(), 0)
+        session.close()
+        
+        engine.limiter = BudgetRateLimiter(1000)
+        self.assertEqual(engine.process_due_follow_ups()['sent'], 21)
+    
+    def test_repeated_failures_mark_follow_up_failed(self):
+        sender = RecordingSender(fail_for={'owner1@example.com'})
+        engine = FollowUpEngine(None, sender, sender, rate_limiter=BudgetRateLimiter(1000))
+        
+        for attempt in range(1, FollowUpEngine.MAX_ATTEMPTS + 1):
+            stats = engine.process_due_follow_ups()
+            self.assertEqual(stats['failed'], 1)
+            session = get_db()
+            follow_up = session.query(FollowUp).join(Lead).filter(Lead.email == 'owner1@example.com').one()
+            self.assertEqual(follow_up.attempts, attempt)
+            # Expire the lease so the next run retries it
+            follow_up.lease_expires_at = datetime.utcnow() - timedelta(seconds=1)
+            session.commit()
+            session.close()
+        
+        self.assertEqual(self._count(status='Failed'), 1)
+        self.assertEqual(engine.process_due_follow_ups()['failed'], 0)
+    
+    def test_unknown_channel_fails_without_retry(self):
+        session = get_db()
+        session.query(FollowUp).filter(FollowUp.channel == 'WhatsApp').update({FollowUp.channel: 'Fax'})
+        session.commit()
+        session.close()
+        engine = FollowUpEngine(None, RecordingSender(), RecordingSender(), rate_limiter=BudgetRateLimiter(1000))
+        
+        stats = engine.process_due_follow_ups()
+        
+        self.assertEqual(stats['failed'], 5)
+        self.assertEqual(self._count(status='Failed', channel='Fax'), 5)
+    
+    def test_concurrent_claims_do_not_overlap(self):
+        engine = FollowUpEngine(None, RecordingSender(), RecordingSender(), rate_limiter=BudgetRateLimiter(1000))
+        
+        session_a = get_db()
+        first = {f.id for f in engine._claim_due_follow_ups(session_a, 10)}
+        second = {f.id for f in engine._claim_due_follow_ups(session_a, 10)}
+        third = {f.id for f in engine._claim_due_follow_ups(session_a, 10)}
+        session_a.close()
+        
+        self.assertEqual(len(first), 10)
+        self.assertEqual(len(second), 10)
+        self.assertEqual(len(third), 5)
+        self.assertFalse(first & second or first & third or second & third)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,203 @@
+"""
+Unit tests for persisted, resumable generation runs
+"""
+
+import unittest
+import os
+import sys
+import tempfile
+import shutil
+import subprocess
+import threading
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src import database
+from src.database import init_database, get_db, GenerationRun
+from src.generation_runs import GenerationRunStore, LeaseLost, worker_id
+
+QUERIES = [
+    {'query': f'law firm in City {i}', 'city': f'City {i}', 'category': 'law firm', 'score': 1.0}
+    for i in range(5)
+]
+PARAMETERS = {'countries': [], 'cities': [], 'business_types': [], 'num_leads': 50, 'quality_threshold': 70}
+
+
+class TestGenerationRuns(unittest.TestCase):
+    """Test checkpoints, interruption, resume and throughput metrics"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.previous_manager = database.db_manager
+        self.manager = init_database(f"sqlite:///{os.path.join(self.test_dir, 'test.db')}")
+        self.store = GenerationRunStore()
+
+    def tearDown(self):
+        self.manager.Session.remove()
+        self.manager.engine.dispose()
+        database.db_manager = self.previous_manager
+        shutil.rmtree(self.test_dir)
+
+    def test_checkpoint_records_progress_and_results(self):
+        run_id = self.store.create_run(PARAMETERS, QUERIES)
+        self.store.checkpoint(run_id, 1, places=20, new_leads=[{'title': 'A'}], seconds=2.0)
+        self.store.checkpoint(run_id, 2, places=0, error=True, seconds=1.0)
+
+        run = self.store.get_run(run_id, include_results=True)
+
+        self.assertEqual(run['status'], 'running')
+        self.assertEqual(run['completed_queries'], 2)
+        self.assertEqual(run['searches'], 2)
+        self.assertEqual(run['errors'], 1)
+        self.assertEqual(run['places_found'], 20)
+        self.assertEqual(run['results'], [{'title': 'A'}])
+        self.assertEqual(run['queries'][0], {'query': 'law firm in City 0', 'city': 'City 0', 'category': 'law firm'})
+        self.assertEqual(run['queries_per_minute'], 40.0)
+        self.assertEqual(run['leads_per_query'], 0.5)
+
+    def test_restart_resumes_from_last_completed_query(self):
+        run_id = self.store.create_run(PARAMETERS, QUERIES)
+        self.store.checkpoint(run_id, 1, new_leads=[{'title': 'A'}])
+        self.store.checkpoint(run_id, 2, new_leads=[{'title': 'B'}])
+
+        # Another process finds the run still marked running after its worker died
+        self._set_owner(run_id, worker=f"{worker_id().split(':')[0]}:{self._dead_pid()}")
+        self.assertEqual(GenerationRunStore().recover_orphaned(), 1)
+        self.assertEqual(self.store.latest_resumable(), run_id)
+
+        run = self.store.start_resume(run_id)
+
+        self.assertEqual(run['status'], 'running')
+        self.assertEqual(run['completed_queries'], 2)
+        self.assertEqual(run['queries'][run['completed_queries']]['query'], 'law firm in City 2')
+        self.assertEqual([lead['title'] for lead in run['results']], ['A', 'B'])
+        self.assertEqual(run['parameters'], PARAMETERS)
+        self.assertEqual(run['resumes'], 1)
+
+    def test_runs_of_live_workers_are_not_interrupted(self):
+        local = self.store.create_run(PARAMETERS, QUERIES)
+        remote = self.store.create_run(PARAMETERS, QUERIES)
+        self._set_owner(remote, worker='other-host:4242')
+
+        # Every worker checks on startup; live runs (here or elsewhere) are left alone
+        self.assertEqual(GenerationRunStore().recover_orphaned(), 0)
+        self.assertEqual(self.store.get_run(local)['status'], 'running')
+        self.assertIsNone(self.store.latest_resumable())
+
+    def test_expired_lease_interrupts_run(self):
+        run_id = self.store.create_run(PARAMETERS, QUERIES)
+        self._set_owner(run_id, worker='other-host:4242', heartbeat_at=datetime.utcnow() - timedelta(seconds=601))
+
+        self.assertEqual(self.store.recover_orphaned(lease_seconds=600), 1)
+        self.assertEqual(self.store.get_run(run_id)['status'], 'interrupted')
+
+        # A checkpoint renews the lease after a resume
+        self.store.start_resume(run_id)
+        self.store.checkpoint(run_id, 1)
+        self.assertEqual(self.store.recover_orphaned(lease_seconds=600), 0)
+
+    def test_concurrent_resumes_claim_the_run_once(self):
+        run_id = self.store.create_run(PARAMETERS, QUERIES)
+        self.store.finish(run_id, 'stopped', 'Stopped with 0 premium leads')
+        claims = []
+        barrier = threading.Barrier(4)
+
+        def resume():
+            barrier.wait()
+            claims.append(GenerationRunStore().start_resume(run_id))
+
+        threads = [threading.Thread(target=resume) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sum(1 for claim in claims if claim is not None), 1)
+        self.assertEqual(self.store.get_run(run_id)['resumes'], 1)
+
+    def test_worker_that_lost_its_lease_cannot_write(self):
+        run_id = self.store.create_run(PARAMETERS, QUERIES)
+        self.store.checkpoint(run_id, 1, new_leads=[{'title': 'A'}])
+
+        # Presumed dead, then resumed by another worker
+        self._set_owner(run_id, status='interrupted', heartbeat_at=datetime.utcnow() - timedelta(seconds=601))
+        resumed = []
+        thread = threading.Thread(target=lambda: resumed.append(self.store.start_resume(run_id)))
+        thread.start()
+        thread.join()
+        self.assertIsNotNone(resumed[0])
+
+        with self.assertRaises(LeaseLost):
+            self.store.checkpoint(run_id, 2, new_leads=[{'title': 'B'}])
+        with self.assertRaises(LeaseLost):
+            self.store.finish(run_id, 'completed', 'Generated 1 premium leads', [{'title': 'A'}])
+        self.assertFalse(self.store.heartbeat(run_id))
+
+        run = self.store.get_run(run_id, include_results=True)
+        self.assertEqual(run['status'], 'running')
+        self.assertEqual(run['completed_queries'], 1)
+        self.assertEqual(run['results'], [{'title': 'A'}])
+
+    def test_heartbeat_renews_lease_between_checkpoints(self):
+        run_id = self.store.create_run(PARAMETERS, QUERIES)
+        self._set_owner(run_id, heartbeat_at=datetime.utcnow() - timedelta(seconds=601))
+        worker = worker_id()
+
+        # Renewed from another thread on behalf of the run's thread
+        beat = []
+        thread = threading.Thread(target=lambda: beat.append(self.store.heartbeat(run_id, worker)))
+        thread.start()
+        thread.join()
+
+        self.assertEqual(beat, [True])
+        self.assertEqual(self.store.recover_orphaned(lease_seconds=600), 0)
+
+    def test_runs_are_scoped_to_their_user(self):
+        mine = self.store.create_run(PARAMETERS, QUERIES, user_id=1)
+        theirs = self.store.create_run(PARAMETERS, QUERIES, user_id=2)
+        anonymous = self.store.create_run(PARAMETERS, QUERIES)
+        for run_id in (mine, theirs, anonymous):
+            self.store.finish(run_id, 'stopped', 'Stopped with 0 premium leads')
+
+        self.assertEqual([run['id'] for run in self.store.list_runs(user_id=1)], [mine])
+        self.assertEqual([run['id'] for run in self.store.list_runs()], [anonymous])
+        self.assertEqual(self.store.latest_resumable(1), mine)
+        self.assertEqual(self.store.latest_resumable(2), theirs)
+        self.assertEqual(self.store.get_run(mine)['user_id'], 1)
+
+    def test_completed_run_cannot_resume(self):
+        run_id = self.store.create_run(PARAMETERS, QUERIES)
+        self.store.finish(run_id, 'completed', 'Generated 0 premium leads', [])
+
+        self.assertIsNone(self.store.start_resume(run_id))
+        self.assertIsNone(self.store.latest_resumable())
+        self.assertIsNotNone(self.store.get_run(run_id)['finished_at'])
+
+    def test_list_runs_newest_first(self):
+        first = self.store.create_run(PARAMETERS, QUERIES)
+        second = self.store.create_run(PARAMETERS, QUERIES[:2])
+        self.store.finish(first, 'stopped', 'Stopped with 0 premium leads')
+
+        runs = self.store.list_runs()
+
+        self.assertEqual([run['id'] for run in runs], [second, first])
+        self.assertEqual(runs[0]['total_queries'], 2)
+        self.assertEqual(runs[1]['status'], 'stopped')
+        self.assertNotIn('results', runs[0])
+
+    def _set_owner(self, run_id, **columns):
+        session = get_db()
+        session.query(GenerationRun).filter(GenerationRun.id == run_id).update(columns)
+        session.commit()
+        session.close()
+
+    @staticmethod
+    def _dead_pid():
+        process = subprocess.Popen([sys.executable, '-c', 'pass'])
+        process.wait()
+        return process.pid
+
+
+if __name__ == '__main__':
+    unittest.main()
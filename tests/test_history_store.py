@@ -0,0 +1,157 @@
+"""
+Unit tests for the delta-based lead history store
+"""
+
+import unittest
+import os
+import sys
+import json
+import tempfile
+import shutil
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.history_store import HistoryStore
+
+
+def make_leads(count, start=0, **extra):
+    return [{'title': f'Business {i}', 'address': f'{i} Main St', 'rating': 4.5, **extra}
+            for i in range(start, start + count)]
+
+
+class TestHistoryStore(unittest.TestCase):
+    """Test deltas, deduplicated bodies, the day index and streaming"""
+    
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.store = HistoryStore(self.test_dir)
+    
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+    
+    def test_repeat_saves_store_only_deltas(self):
+        leads = make_leads(50)
+        self.store.record(leads, date='2025-01-01')
+        size = os.path.getsize(self.store.leads_path)
+        
+        # The same list saved again, plus two new leads and one edit
+        leads = leads + make_leads(2, start=50)
+        leads[0] = {**leads[0], 'status': 'Email Sent'}
+        summary = self.store.record(leads, date='2025-01-01')
+        
+        self.assertEqual(summary['added'], 52)
+        self.assertEqual(summary['changed'], 1)
+        self.assertEqual(summary['saves'], 2)
+        self.assertEqual(summary['total_leads'], 52)
+        self.assertLess(os.path.getsize(self.store.leads_path), size * 1.2)
+    
+    def test_list_days_reads_summaries_newest_first(self):
+        self.store.record(make_leads(3), date='2025-01-01')
+        self.store.record(make_leads(5), date='2025-01-02')
+        
+        days = self.store.list_days()
+        
+        self.assertEqual([day['date'] for day in days], ['2025-01-02', '2025-01-01'])
+        self.assertEqual(days[0]['total_leads'], 5)
+        self.assertEqual(days[0]['added'], 2)
+    
+    def test_leads_for_day_returns_that_days_versions(self):
+        self.store.record(make_leads(3), date='2025-01-01')
+        self.store.record(make_leads(3, status='Called'), date='2025-01-02')
+        
+        first = self.store.leads_for_day('2025-01-01')
+        second = self.store.leads_for_day('2025-01-02')
+        
+        self.assertEqual(len(first), 3)
+        self.assertNotIn('status', first[0])
+        self.assertEqual({lead['status'] for lead in second}, {'Called'})
+        self.assertIsNone(self.store.leads_for_day('2025-02-30'))
+        self.assertIsNone(self.store.leads_for_day('../../etc/passwd'))
+    
+    def test_all_history_streams_unique_latest_leads(self):
+        for day in range(1, 6):
+            self.store.record(make_leads(10 * day, status=f'day {day}'), date=f'2025-01-0{day}')
+        
+        leads = list(self.store.iter_unique_leads())
+        
+        self.assertEqual(len(leads), 50)
+        self.assertEqual(self.store.count_unique(), 50)
+        self.assertEqual({lead['status'] for lead in leads}, {'day 5'})
+    
+    def test_torn_append_is_skipped_when_streaming(self):
+        self.store.record(make_leads(3), date='2025-01-01')
+        with open(self.store.leads_path, 'ab') as f:
+            f.write(b'{"id": "tru')  # A writer died mid-append
+        
+        self.store.record(make_leads(2, start=3), date='2025-01-02')
+        
+        leads = list(self.store.iter_unique_leads())
+        self.assertEqual([lead['title'] for lead in leads], [f'Business {i}' for i in range(5)])
+        self.assertEqual(self.store.count_unique(), 5)
+    
+    def test_reopened_store_keeps_state(self):
+        self.store.record(make_leads(4), date='2025-01-01')
+        
+        reopened = HistoryStore(self.test_dir)
+        summary = reopened.record(make_leads(4), date='2025-01-02')
+        
+        self.assertEqual(summary['added'], 0)
+        self.assertEqual(reopened.count_unique(), 4)
+        self.assertEqual(len(reopened.leads_for_day('2025-01-01')), 4)
+    
+    def test_stores_sharing_a_directory_see_each_others_writes(self):
+        # Two workers, each with its own in-memory state
+        other = HistoryStore(self.test_dir)
+        self.store.record(make_leads(5), date='2025-01-01')
+        size = os.path.getsize(self.store.leads_path)
+        
+        summary = other.record(make_leads(6), date='2025-01-02')
+        
+        # The other worker knew the first five versions, so only one body was appended
+        self.assertEqual(summary['added'], 1)
+        self.assertEqual(len(other.leads_for_day('2025-01-02')), 1)
+        self.assertGreater(os.path.getsize(self.store.leads_path), size)
+        
+        # And neither worker's index save dropped the other's day
+        self.store.record(make_leads(6), date='2025-01-03')
+        self.assertEqual([day['date'] for day in other.list_days()], ['2025-01-03', '2025-01-02', '2025-01-01'])
+        self.assertEqual(len(self.store.leads_for_day('2025-01-02')), 1)
+        self.assertEqual(self.store.count_unique(), 6)
+    
+    @unittest.skipUnless(hasattr(os, 'fork'), "needs fork")
+    def test_concurrent_processes_keep_every_save(self):
+        pids = []
+        for worker in range(3):
+            pid = os.fork()
+            if pid == 0:
+                store = HistoryStore(self.test_dir)
+                for n in range(5):
+                    store.record(make_leads(4, start=worker * 100 + n * 4), date='2025-01-01')
+                os._exit(0)
+            pids.append(pid)
+        for pid in pids:
+            self.assertEqual(os.waitpid(pid, 0)[1], 0)
+        
+        day = self.store.list_days()[0]
+        self.assertEqual(day['saves'], 15)
+        self.assertEqual(day['added'], 60)
+        self.assertEqual(self.store.count_unique(), 60)
+        with open(self.store.leads_path, 'rb') as f:
+            self.assertEqual(sum(1 for _ in f), 60)
+    
+    def test_imports_legacy_snapshots_once(self):
+        for date, count in (('2025-01-01', 3), ('2025-01-02', 6)):
+            with open(os.path.join(self.test_dir, f'leads_{date}.json'), 'w', encoding='utf-8') as f:
+                json.dump({'date': date, 'timestamp': f'{date}T10:00:00', 'total_leads': count,
+                           'leads': make_leads(count)}, f)
+        
+        days = self.store.list_days()
+        HistoryStore(self.test_dir).list_days()
+        
+        self.assertEqual([(day['date'], day['added'], day['total_leads']) for day in days],
+                         [('2025-01-02', 3, 6), ('2025-01-01', 3, 3)])
+        self.assertEqual(HistoryStore(self.test_dir).list_days()[0]['saves'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
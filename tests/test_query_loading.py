@@ -0,0 +1,136 @@
+"""
+Query-count tests for ORM consumers (N+1 regressions)
+"""
+
+import unittest
+import os
+import sys
+import tempfile
+import shutil
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src import database
+from src.database import init_database, get_db, count_queries, Lead, FollowUp, Interaction, LeadAnalytics
+
+
+class FakeSender:
+    """Channel sender that always succeeds without touching the network"""
+    
+    def __init__(self):
+        self.sent = []
+    
+    def send_email(self, to_email, subject, body, business_name=None):
+        self.sent.append(to_email)
+        return True
+    
+    def send_message(self, to_number, message, business_name=None):
+        self.sent.append(to_number)
+        return True
+
+
+class UnlimitedRateLimiter:
+    """Rate limiter stand-in that never blocks"""
+    
+    def try_acquire(self, service='default'):
+        return 0.0
+
+
+class TestQueryCounts(unittest.TestCase):
+    """Per-call SQL statement count must not grow with the number of rows"""
+    
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.previous_manager = database.db_manager
+        self.manager = init_database(f"sqlite:///{os.path.join(self.test_dir, 'test.db')}")
+    
+    def tearDown(self):
+        self.manager.Session.remove()
+        self.manager.engine.dispose()
+        database.db_manager = self.previous_manager
+        shutil.rmtree(self.test_dir)
+    
+    def _seed(self, count):
+        session = get_db()
+        past = datetime.utcnow() - timedelta(days=5)
+        for i in range(count):
+            lead = Lead(
+                title=f"Business {i}",
+                email=f"owner{i}@example.com",
+                quality_score=90,
+                rating=4.8,
+                reviews=150,
+                email_replied=(i % 3 == 0),
+                last_contacted=past
+            )
+            session.add(lead)
+            session.add(LeadAnalytics(lead=lead, is_hot_lead=True, conversion_probability=0.8))
+            session.add(FollowUp(lead=lead, scheduled_at=past, channel='Email',
+                                 subject='Hi', content='Following up', status='Pending'))
+            session.add(Interaction(lead=lead, type='Email', direction='Outbound',
+                                    replied=(i % 2 == 0)))
+        session.commit()
+        session.close()
+    
+    def test_process_due_follow_ups_query_count_is_bounded(self):
+        from src.follow_up_engine import FollowUpEngine
+        
+        self._seed(30)
+        sender = FakeSender()
+        engine = FollowUpEngine(None, sender, sender, rate_limiter=UnlimitedRateLimiter())
+        
+        with count_queries(self.manager.engine) as counter:
+            stats = engine.process_due_follow_ups()
+        
+        self.assertEqual(stats['sent'] + stats['skipped'], 30)
+        self.assertEqual(len(sender.sent), stats['sent'])
+        # Per chunk: one claiming UPDATE and one SELECT for follow-ups + leads,
+        # plus the final empty claim. 30 rows must not mean 30 lead SELECTs.
+        selects = [s for s in counter['statements'] if s.lstrip().upper().startswith('SELECT')]
+        self.assertLessEqual(len(selects), 2)
+        
+        session = get_db()
+        self.assertEqual(session.query(FollowUp).filter_by(status='Pending').count(), 0)
+        session.close()
+    
+    def test_ab_test_results_query_count_is_bounded(self):
+        from src.ab_testing import ABTestingFramework
+        from src.database import Campaign
+        
+        self._seed(20)
+        session = get_db()
+        campaign = Campaign(name='A/B Test: subject', status='Active')
+        session.add(campaign)
+        session.commit()
+        test_id = campaign.id
+        lead_ids = [lead_id for (lead_id,) in session.query(Lead.id).all()]
+        session.close()
+        
+        framework = ABTestingFramework()
+        for lead_id in lead_ids:
+            framework.assign_variant(test_id, lead_id)
+        
+        with count_queries(self.manager.engine) as counter:
+            results = framework.get_test_results(test_id)
+        
+        self.assertEqual(results['variant_a']['sent'] + results['variant_b']['sent'], 20)
+        # Campaign, grouped totals, sequential-test state
+        self.assertLessEqual(counter['count'], 3)
+    
+    def test_daily_recommendations_query_count_is_bounded(self):
+        from src.recommendations import RecommendationsEngine
+        
+        self._seed(5)
+        with count_queries(self.manager.engine) as small:
+            RecommendationsEngine().get_daily_recommendations()
+        
+        self._seed(40)
+        with count_queries(self.manager.engine) as large:
+            RecommendationsEngine().get_daily_recommendations()
+        
+        self.assertEqual(small['count'], large['count'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+"""
+Tests for the yield-based query planner
+"""
+
+import unittest
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.query_planner import QueryPlanner
+from src.queries import generate_queries, CITIES, CATEGORIES
+
+
+class TestQueryPlanner(unittest.TestCase):
+    """Test yield recording, ordering, skipping and persistence"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.stats_path = os.path.join(self.tmp.name, 'query_stats.json')
+        self.planner = QueryPlanner(stats_path=self.stats_path)
+        self.cities = ['Austin, USA', 'Dubai, UAE', 'Leeds, UK']
+        self.categories = ['dental clinic', 'law firm', 'car wash']
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_cold_start_covers_every_combination(self):
+        plan = self.planner.plan(self.cities, self.categories)
+
+        self.assertEqual(plan['candidates'], 9)
+        self.assertEqual(len({e['query'] for e in plan['queries']}), 9)
+        self.assertEqual(plan['unexplored'], 9)
+        # Leading queries mix cities and categories rather than one city's whole list
+        first_three = plan['queries'][:3]
+        self.assertEqual(len({e['city'] for e in first_three}), 2)
+        self.assertEqual(len({e['category'] for e in first_three}), 2)
+
+    def test_high_yield_query_planned_first(self):
+        self.planner.record('Dubai, UAE', 'law firm', results=20, premium=8, save=False)
+        self.planner.record('Austin, USA', 'dental clinic', results=20, premium=1, save=False)
+
+        plan = self.planner.plan(self.cities, self.categories)
+
+        self.assertEqual(plan['queries'][0]['query'], 'law firm in Dubai, UAE')
+        self.assertGreater(plan['expected_premium'], 0)
+
+    def test_unseen_combination_borrows_city_and_category_yield(self):
+        self.planner.record('Dubai, UAE', 'car wash', results=20, premium=6, save=False)
+        self.planner.record('Leeds, UK', 'law firm', results=20, premium=6, save=False)
+        self.planner.record('Leeds, UK', 'car wash', results=20, premium=0, save=False)
+        self.planner.record('Austin, USA', 'dental clinic', results=20, premium=0, save=False)
+
+        estimates = {e['query']: e for e in self.planner.plan(self.cities, self.categories)['queries']}
+
+        self.assertGreater(estimates['law firm in Dubai, UAE']['expected_premium'],
+                           estimates['dental clinic in Leeds, UK']['expected_premium'])
+
+    def test_skips_repeat_zero_yield_queries(self):
+        for _ in range(3):
+            self.planner.record('Leeds, UK', 'car wash', results=15, premium=0, save=False)
+
+        plan = self.planner.plan(self.cities, self.categories)
+
+        self.assertEqual([e['query'] for e in plan['skipped']], ['car wash in Leeds, UK'])
+        self.assertNotIn('car wash in Leeds, UK', [e['query'] for e in plan['queries']])
+
+    def test_skipped_query_retried_after_cooldown(self):
+        for _ in range(3):
+            self.planner.record('Leeds, UK', 'car wash', results=15, premium=0, save=False)
+        entry = self.planner.queries['car wash in Leeds, UK']
+        entry['last_run'] = (datetime.now() - timedelta(days=15)).isoformat()
+
+        plan = self.planner.plan(self.cities, self.categories)
+
+        self.assertEqual(plan['skipped'], [])
+        self.assertIn('car wash in Leeds, UK', [e['query'] for e in plan['queries']])
+
+        # Another empty run starts a new cooldown
+        self.planner.record('Leeds, UK', 'car wash', results=15, premium=0, save=False)
+        plan = self.planner.plan(self.cities, self.categories)
+        self.assertEqual([e['query'] for e in plan['skipped']], ['car wash in Leeds, UK'])
+
+    def test_duplicates_do_not_count_as_yield(self):
+        for _ in range(3):
+            self.planner.record('Austin, USA', 'law firm', results=10, premium=4, duplicates=4, save=False)
+
+        plan = self.planner.plan(self.cities, self.categories)
+
+        self.assertIn('law firm in Austin, USA', [e['query'] for e in plan['skipped']])
+
+    def test_budget_limits_plan(self):
+        plan = self.planner.plan(self.cities, self.categories, max_queries=4)
+
+        self.assertEqual(len(plan['queries']), 4)
+
+    def test_history_persists(self):
+        self.planner.record('Dubai, UAE', 'law firm', results=20, premium=5, duplicates=1)
+
+        reloaded = QueryPlanner(stats_path=self.stats_path)
+        stats = reloaded.get_stats()
+
+        self.assertEqual(stats['runs'], 1)
+        self.assertEqual(stats['premium'], 5)
+        self.assertEqual(stats['duplicates'], 1)
+        self.assertEqual(stats['best'][0]['query'], 'law firm in Dubai, UAE')
+
+    def test_generate_queries_with_planner(self):
+        self.planner.record(CITIES[5], CATEGORIES[7], results=20, premium=9, save=False)
+
+        queries = generate_queries(planner=self.planner, max_queries=50)
+
+        self.assertEqual(len(queries), 50)
+        self.assertEqual(queries[0], f"{CATEGORIES[7]} in {CITIES[5]}")
+
+
+if __name__ == '__main__':
+    unittest.main()
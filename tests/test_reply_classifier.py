@@ -0,0 +1,129 @@
+"""
+Unit tests for keyword scoring and batched reply classification
+"""
+
+import unittest
+import os
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.reply_classifier import ReplyClassifier
+
+
+class _Response:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeModel:
+    """Answers classification prompts with a fixed category, counting calls"""
+
+    def __init__(self, category='NotNow'):
+        self.category = category
+        self.prompts = []
+
+    def generate_content(self, prompt):
+        self.prompts.append(prompt)
+        if 'Number|Category' in prompt:
+            count = prompt.split('Replies:\n', 1)[1].split('\n\nCategories:', 1)[0].count('\n') + 1
+            return _Response('\n'.join(f'{n}|{self.category}|0.75|Neutral' for n in range(1, count + 1)))
+        return _Response(f'{self.category}|0.85|Neutral')
+
+
+class FakeAI:
+    def __init__(self, category='NotNow'):
+        self.model = FakeModel(category)
+
+
+class TestReplyClassifier(unittest.TestCase):
+    """Test one-pass keyword scoring and AI batching"""
+
+    def setUp(self):
+        self.ai = FakeAI()
+        self.classifier = ReplyClassifier(self.ai)
+
+    def test_scores_all_categories_instead_of_first_match(self):
+        result = self.classifier.classify_reply("Not interested, yes stop emailing me")
+
+        self.assertEqual(result['category'], 'NotInterested')
+        self.assertEqual(result['method'], 'keyword')
+        self.assertEqual(self.ai.model.prompts, [])
+
+    def test_phrase_consumes_its_words(self):
+        scores = self.classifier.score_keywords("We are not interested")
+
+        self.assertEqual(scores, {'NotInterested': 2})
+
+    def test_word_boundaries(self):
+        # "yes" inside "yesterday" and "later" inside "translator" are not keywords
+        self.assertEqual(self.classifier.score_keywords("I saw it yesterday, our translator agreed"), {})
+
+    def test_ambiguous_reply_goes_to_ai(self):
+        result = self.classifier.classify_reply("Not interested right now, maybe next month")
+
+        self.assertEqual(result['method'], 'ai')
+        self.assertEqual(len(self.ai.model.prompts), 1)
+
+    def test_ai_failure_falls_back_to_best_keyword_guess(self):
+        classifier = ReplyClassifier(ai_assistant=None)
+
+        ambiguous = classifier.classify_reply("Interested, but the price is a concern")
+        unmatched = classifier.classify_reply("Who is this?")
+
+        self.assertEqual(ambiguous['category'], 'Interested')
+        self.assertEqual(ambiguous['method'], 'keyword')
+        self.assertEqual(unmatched['method'], 'fallback')
+
+    def test_unusable_ai_answer_is_not_an_ai_label(self):
+        self.ai.model.generate_content = lambda prompt: _Response("I'm not sure what this reply means")
+
+        result = self.classifier.classify_reply("Not interested right now, maybe next month")
+
+        self.assertEqual(result['category'], 'SendDetails')
+        self.assertEqual(result['method'], 'ai_fallback')
+        self.assertEqual(self.classifier.get_stats()['ai_fallback'], 1)
+
+    def test_batch_sends_only_ambiguous_replies_in_one_prompt(self):
+        replies = [
+            "Yes, I'm interested! Can we schedule a call?",
+            "Who is this?",
+            "Please unsubscribe me",
+            "Hmm, let me think about it",
+        ]
+
+        results = self.classifier.classify_batch(replies)
+
+        self.assertEqual([r['category'] for r in results], ['Interested', 'NotNow', 'NotInterested', 'NotNow'])
+        self.assertEqual([r['method'] for r in results], ['keyword', 'ai', 'keyword', 'ai'])
+        self.assertEqual(len(self.ai.model.prompts), 1)
+        self.assertIn('1. "Who is this?"', self.ai.model.prompts[0])
+        self.assertNotIn('unsubscribe', self.ai.model.prompts[0])
+
+    def test_batch_ignores_malformed_ai_lines(self):
+        self.ai.model.generate_content = lambda prompt: _Response("1|Bogus|0.9|Positive\nnot a line\n7|Budget|0.8|Neutral")
+
+        results = self.classifier.classify_batch(["Who is this?"])
+
+        self.assertEqual(results[0]['method'], 'fallback')
+
+    def test_thousands_of_replies_in_seconds(self):
+        random.seed(7)
+        phrases = ["yes lets talk", "send details please", "too expensive", "busy until next quarter",
+                   "no thanks", "this is spam", "who are you", "ok"]
+        replies = [f"Hi, {random.choice(phrases)}. Regards, Team {i}" for i in range(5000)]
+
+        started = time.perf_counter()
+        results = self.classifier.classify_batch(replies, batch_size=40)
+        elapsed = time.perf_counter() - started
+
+        ambiguous = sum(1 for r in results if r['method'] == 'ai')
+        self.assertEqual(len(results), 5000)
+        self.assertEqual(len(self.ai.model.prompts), -(-ambiguous // 40))
+        self.assertLess(elapsed, 5.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,212 @@
+"""
+Unit tests for the offline NumPy reply classifier
+"""
+
+import unittest
+import os
+import sys
+import random
+import tempfile
+import shutil
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    import numpy  # noqa: F401
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+from src import database
+from src.database import init_database, get_db, Lead, Interaction
+from src.reply_classifier import ReplyClassifier
+
+# Phrasings with no classifier keywords, so only the model (or AI) can place them
+TEMPLATES = {
+    'Interested': ["can you hop on a zoom {day}", "happy to chat {day}, what time works",
+                   "let's set up a meeting {day}", "we'd love to move forward, ring us {day}"],
+    'NotInterested': ["we already have an agency, please don't email again", "we handle this in house, no need",
+                      "not for us, take us off your list", "we're all set with our current vendor"],
+    'NotNow': ["circle back after {event}", "we're swamped until {event}", "ping me again after {event}",
+               "revisit this after {event}"],
+    'SendDetails': ["what have you built for {industry}", "share some examples of {industry} work",
+                    "do you have references from {industry}", "can you share samples for {industry}"],
+}
+SENTIMENT = {'Interested': 'Positive', 'NotInterested': 'Negative', 'NotNow': 'Neutral', 'SendDetails': 'Neutral'}
+FILLERS = {
+    'day': ['monday', 'tuesday', 'thursday', 'next week', 'tomorrow afternoon'],
+    'event': ['diwali', 'the holidays', 'our launch', 'tax season', 'the audit'],
+    'industry': ['clinics', 'restaurants', 'law firms', 'gyms', 'schools'],
+}
+
+
+def synthetic_replies(count, seed=0):
+    rng = random.Random(seed)
+    texts, intents, sentiments = [], [], []
+    for _ in range(count):
+        intent = rng.choice(list(TEMPLATES))
+        text = rng.choice(TEMPLATES[intent]).format(**{k: rng.choice(v) for k, v in FILLERS.items()})
+        texts.append(f"Hi, {text}. Thanks")
+        intents.append(intent)
+        sentiments.append(SENTIMENT[intent])
+    return texts, intents, sentiments
+
+
+class _Response:
+    def __init__(self, text):
+        self.text = text
+
+
+class CountingModel:
+    def __init__(self):
+        self.prompts = []
+    
+    def generate_content(self, prompt):
+        self.prompts.append(prompt)
+        if 'Number|Category' in prompt:
+            return _Response('1|SendDetails|0.6|Neutral')
+        return _Response('SendDetails|0.6|Neutral')
+
+
+class CountingAI:
+    def __init__(self):
+        self.model = CountingModel()
+
+
+@unittest.skipUnless(HAS_NUMPY, "numpy not installed")
+class TestReplyModel(unittest.TestCase):
+    """Test training, prediction, persistence and AI offloading"""
+    
+    @classmethod
+    def setUpClass(cls):
+        from src.reply_model import ReplyModel
+        
+        texts, intents, sentiments = synthetic_replies(400)
+        cls.model = ReplyModel.train(texts, intents, sentiments)
+    
+    def test_learns_unseen_replies(self):
+        texts, intents, _ = synthetic_replies(200, seed=1)
+        
+        report = self.model.evaluate(texts, intents)
+        
+        self.assertGreaterEqual(report['accuracy'], 0.95)
+        self.assertGreaterEqual(report['coverage@0.7'], 0.8)
+    
+    def test_predicts_sentiment(self):
+        prediction = self.model.predict("Hi, we already have an agency, please don't email again. Thanks")
+        
+        self.assertEqual(prediction['category'], 'NotInterested')
+        self.assertEqual(prediction['sentiment'], 'Negative')
+    
+    def test_save_and_load_round_trip(self):
+        from src.reply_model import ReplyModel
+        
+        test_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(test_dir, 'reply_model.npz')
+            self.model.save(path)
+            loaded = ReplyModel.load(path)
+        finally:
+            shutil.rmtree(test_dir)
+        
+        text = "Hi, circle back after the audit. Thanks"
+        self.assertEqual(loaded.predict(text)['category'], self.model.predict(text)['category'])
+        self.assertAlmostEqual(loaded.predict(text)['confidence'], self.model.predict(text)['confidence'], places=4)
+        self.assertEqual(loaded.metadata['samples'], 400)
+    
+    def test_model_offloads_ai_calls(self):
+        texts, _, _ = synthetic_replies(300, seed=2)
+        texts.append("Who is this?")
+        
+        without_ai = CountingAI()
+        ReplyClassifier(without_ai).classify_batch(texts, batch_size=1)
+        with_ai = CountingAI()
+        classifier = ReplyClassifier(with_ai, model=self.model)
+        results = classifier.classify_batch(texts, batch_size=1)
+        
+        stats = classifier.get_stats()
+        self.assertEqual(len(without_ai.model.prompts), 301)
+        self.assertLess(len(with_ai.model.prompts), 30)
+        self.assertEqual(stats['ai_calls'], len(with_ai.model.prompts))
+        self.assertGreater(stats['ai_call_reduction'], 0.9)
+        self.assertGreater(stats['ms_per_reply'], 0)
+        self.assertEqual(results[-1]['method'], 'ai')
+    
+    def test_low_confidence_escalates_to_ai(self):
+        ai = CountingAI()
+        classifier = ReplyClassifier(ai, model=self.model, model_threshold=1.01)
+        
+        result = classifier.classify_reply("Hi, can you hop on a zoom monday. Thanks")
+        
+        self.assertEqual(result['method'], 'ai')
+        self.assertEqual(len(ai.model.prompts), 1)
+
+
+@unittest.skipUnless(HAS_NUMPY, "numpy not installed")
+class TestRetrain(unittest.TestCase):
+    """Test retraining from labelled Interaction rows"""
+    
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.previous_manager = database.db_manager
+        self.manager = init_database(f"sqlite:///{os.path.join(self.test_dir, 'test.db')}")
+        self.model_path = os.path.join(self.test_dir, 'reply_model.npz')
+        
+        session = get_db()
+        lead = Lead(title="Business")
+        session.add(lead)
+        session.flush()
+        texts, intents, sentiments = synthetic_replies(120)
+        session.add_all([
+            Interaction(lead_id=lead.id, direction='Inbound', content=text, intent=intent, sentiment=sentiment,
+                        classification_method='ai')
+            for text, intent, sentiment in zip(texts, intents, sentiments)
+        ])
+        session.add(Interaction(lead_id=lead.id, direction='Outbound', content='Hello', intent='Interested'))
+        # Labels the classifier guessed itself are not training data
+        for method in ('model', 'ai_fallback', 'fallback', 'keyword', None):
+            session.add(Interaction(lead_id=lead.id, direction='Inbound', content='please share details',
+                                    intent='Spam', sentiment='Negative', classification_method=method))
+        session.commit()
+        self.guessed_id = session.query(Interaction).filter_by(classification_method='fallback').one().id
+        session.close()
+    
+    def tearDown(self):
+        self.manager.Session.remove()
+        self.manager.engine.dispose()
+        database.db_manager = self.previous_manager
+        shutil.rmtree(self.test_dir)
+    
+    def test_retrain_saves_model_and_reports_holdout(self):
+        from src.reply_model import retrain_reply_model, load_reply_model
+        
+        report = retrain_reply_model(self.model_path, min_samples=50)
+        
+        self.assertEqual(report['status'], 'trained')
+        self.assertEqual(report['samples'], 120)
+        self.assertGreaterEqual(report['holdout']['accuracy'], 0.9)
+        self.assertIsNotNone(load_reply_model(self.model_path))
+    
+    def test_human_corrections_become_training_data(self):
+        from src.reply_model import load_training_data
+        from src.reply_classifier import ReplyClassifier
+        
+        self.assertEqual(len(load_training_data()[0]), 120)
+        
+        result = ReplyClassifier(None).correct_classification(self.guessed_id, 'SendDetails')
+        
+        self.assertTrue(result['success'])
+        texts, intents, sentiments = load_training_data()
+        self.assertEqual(len(texts), 121)
+        self.assertIn(('please share details', 'SendDetails'), list(zip(texts, intents)))
+    
+    def test_retrain_skips_fresh_model_and_small_data(self):
+        from src.reply_model import retrain_reply_model
+        
+        self.assertEqual(retrain_reply_model(self.model_path, min_samples=500)['status'], 'skipped')
+        retrain_reply_model(self.model_path, min_samples=50)
+        self.assertEqual(retrain_reply_model(self.model_path, max_age_days=7)['status'], 'skipped')
+
+
+if __name__ == '__main__':
+    unittest.main()
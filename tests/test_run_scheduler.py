@@ -0,0 +1,185 @@
+"""
+Unit tests for the multi-user generation run scheduler
+"""
+
+import unittest
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.rate_limiter import RateLimiter
+from src.run_scheduler import RunScheduler, QUEUED, RUNNING, FINISHED, CANCELLED
+
+
+class TokenBudget:
+    """Stand-in for the rate limiter that only grants slots the test hands out"""
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.tokens = 0
+    
+    def give(self, count=1):
+        with self.lock:
+            self.tokens += count
+    
+    def try_acquire(self, service='default'):
+        with self.lock:
+            if self.tokens > 0:
+                self.tokens -= 1
+                return 0.0
+            return 0.02
+
+
+def wait_until(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.005)
+    return False
+
+
+class TestRunScheduler(unittest.TestCase):
+    """Test fair-share search slots, per-user queueing and stopping"""
+    
+    def setUp(self):
+        self.budget = TokenBudget()
+        self.granted = []
+        self.granted_lock = threading.Lock()
+    
+    def searches(self, scheduler, count):
+        """Run target that performs count searches, logging who got each slot"""
+        def target(channel):
+            for _ in range(count):
+                if not scheduler.acquire(channel, poll=0.02):
+                    return
+                with self.granted_lock:
+                    self.granted.append(channel.owner)
+        return target
+    
+    def hand_out(self, scheduler, slots, waiters):
+        """Release slots one at a time, each once every run is waiting for it"""
+        for _ in range(slots):
+            self.assertTrue(wait_until(lambda: scheduler.get_stats()['waiting_for_budget'] == waiters))
+            taken = len(self.granted)
+            self.budget.give()
+            self.assertTrue(wait_until(lambda: len(self.granted) > taken))
+    
+    def test_slots_are_shared_per_user_not_per_run(self):
+        scheduler = RunScheduler(max_active_runs=4, max_active_per_user=2, rate_limiter=self.budget)
+        heavy_a = scheduler.submit('alice', self.searches(scheduler, 100))
+        heavy_b = scheduler.submit('alice', self.searches(scheduler, 100))
+        light = scheduler.submit('bob', self.searches(scheduler, 100))
+        
+        self.hand_out(scheduler, 20, waiters=3)
+        
+        self.assertEqual(self.granted.count('alice'), 10)
+        self.assertEqual(self.granted.count('bob'), 10)
+        for channel in (heavy_a, heavy_b, light):
+            scheduler.stop(channel.job_id)
+    
+    def test_new_user_joins_at_current_share(self):
+        scheduler = RunScheduler(max_active_runs=4, rate_limiter=self.budget)
+        first = scheduler.submit('alice', self.searches(scheduler, 100))
+        self.hand_out(scheduler, 10, waiters=1)
+        
+        second = scheduler.submit('bob', self.searches(scheduler, 100))
+        self.hand_out(scheduler, 6, waiters=2)
+        
+        # Bob does not get all six slots to "catch up" on Alice's ten
+        self.assertEqual(self.granted[10:].count('bob'), 3)
+        scheduler.stop(first.job_id)
+        scheduler.stop(second.job_id)
+    
+    def test_runs_progress_concurrently_with_own_status(self):
+        scheduler = RunScheduler(max_active_runs=4, rate_limiter=self.budget)
+        self.budget.give(1000)
+        
+        def target(leads, channel):
+            for i in range(5):
+                scheduler.acquire(channel)
+                channel.update(leads_found=leads * (i + 1))
+        
+        channels = [scheduler.submit(f'user{n}', target, n) for n in range(1, 4)]
+        
+        self.assertTrue(wait_until(lambda: not any(channel.active for channel in channels)))
+        self.assertEqual([channel.snapshot()['leads_found'] for channel in channels], [5, 10, 15])
+        self.assertEqual([channel.snapshot()['searches'] for channel in channels], [5, 5, 5])
+        self.assertEqual({channel.snapshot()['state'] for channel in channels}, {FINISHED})
+    
+    def test_extra_runs_from_one_user_queue(self):
+        scheduler = RunScheduler(max_active_runs=4, max_active_per_user=1, rate_limiter=self.budget)
+        release = threading.Event()
+        
+        first = scheduler.submit('alice', lambda channel: release.wait(5))
+        second = scheduler.submit('alice', lambda channel: None)
+        other = scheduler.submit('bob', lambda channel: release.wait(5))
+        
+        self.assertEqual(first.snapshot()['state'], RUNNING)
+        self.assertEqual(second.snapshot()['state'], QUEUED)
+        self.assertEqual(other.snapshot()['state'], RUNNING)
+        self.assertEqual(scheduler.queue_position(second.job_id), 1)
+        
+        release.set()
+        self.assertTrue(wait_until(lambda: second.snapshot()['state'] == FINISHED))
+    
+    def test_stop_cancels_queued_run(self):
+        scheduler = RunScheduler(max_active_runs=1, rate_limiter=self.budget)
+        release = threading.Event()
+        calls = []
+        
+        scheduler.submit('alice', lambda channel: release.wait(5))
+        queued = scheduler.submit('bob', lambda channel: calls.append(channel))
+        
+        self.assertTrue(scheduler.stop(queued.job_id))
+        release.set()
+        
+        self.assertEqual(queued.snapshot()['state'], CANCELLED)
+        self.assertTrue(wait_until(lambda: scheduler.get_stats()['active_runs'] == 0))
+        self.assertEqual(calls, [])
+    
+    def test_cancelling_queued_run_calls_on_cancel(self):
+        scheduler = RunScheduler(max_active_runs=1, rate_limiter=self.budget)
+        release = threading.Event()
+        released = []
+        
+        running = scheduler.submit('alice', lambda channel: release.wait(5),
+                                   on_cancel=lambda: released.append('alice'))
+        queued = scheduler.submit('bob', lambda channel, leads: None, 50,
+                                  on_cancel=lambda: released.append('bob'))
+        
+        scheduler.stop(queued.job_id)
+        scheduler.stop(running.job_id)
+        release.set()
+        
+        # Only the run that never started gives back its reservation here
+        self.assertTrue(wait_until(lambda: scheduler.get_stats()['active_runs'] == 0))
+        self.assertEqual(released, ['bob'])
+    
+    def test_stop_releases_run_waiting_for_budget(self):
+        scheduler = RunScheduler(rate_limiter=self.budget)
+        results = []
+        channel = scheduler.submit('alice', lambda channel: results.append(scheduler.acquire(channel, poll=0.02)))
+        
+        self.assertTrue(wait_until(lambda: scheduler.get_stats()['waiting_for_budget'] == 1))
+        scheduler.stop(channel.job_id)
+        
+        self.assertTrue(wait_until(lambda: results == [False]))
+    
+    def test_rate_limiter_try_acquire_reports_wait(self):
+        limiter = RateLimiter()
+        limiter.set_limit('serpapi', 2)
+        
+        self.assertEqual(limiter.try_acquire('serpapi'), 0.0)
+        self.assertEqual(limiter.try_acquire('serpapi'), 0.0)
+        wait = limiter.try_acquire('serpapi')
+        
+        self.assertGreater(wait, 55)
+        self.assertLessEqual(wait, 60)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -9,7 +9,7 @@ from hypothesis import given, strategies as st, settings
 # Add parent directory to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from src.scraper import search_places
+from src.scraper import search_places, SearchError
 
 # Mock search_places_batch if it doesn't exist
 def search_places_batch(queries, api_key):
@@ -224,3 +224,138 @@ def test_empty_local_results():
         
         # Verify empty list returned
         assert results == []
+
+
+def test_raise_errors_separates_failures_from_no_results():
+    """Quota errors raise SearchError when asked; a real empty result set does not."""
+    with patch('serpapi.Client') as mock_client:
+        with patch('src.scraper.time.sleep'):
+            mock_instance = Mock()
+            mock_client.return_value = mock_instance
+            
+            mock_instance.search.return_value = {"error": "Your account has run out of searches."}
+            with pytest.raises(SearchError):
+                search_places("test query", "test_api_key", raise_errors=True)
+            assert search_places("test query", "test_api_key") == []
+            
+            mock_instance.search.return_value = {"error": "Google hasn't returned any results for this query."}
+            assert search_places("test query", "test_api_key", raise_errors=True) == []
+
+
+# Pagination
+def _page(start, count, next_start=None, rating=4.5, overlap=0):
+    """Fake SerpAPI google_maps page; the first `overlap` places repeat the previous page"""
+    first = start - overlap
+    data = {"local_results": [
+        {"title": f"Business {i}", "place_id": f"pid{i}", "rating": rating, "reviews": 50}
+        for i in range(first, first + count)
+    ]}
+    if next_start is not None:
+        data["serpapi_pagination"] = {
+            "next": f"https://serpapi.com/search.json?engine=google_maps&q=x&start={next_start}"
+        }
+    return data
+
+
+def test_pages_follow_serpapi_pagination():
+    """Pages are fetched with the start offset from serpapi_pagination.next."""
+    from src.scraper import search_places_pages
+    
+    with patch('serpapi.Client') as mock_client:
+        mock_instance = Mock()
+        mock_instance.search.side_effect = [_page(0, 20, 20), _page(20, 20, 40), _page(40, 7)]
+        mock_client.return_value = mock_instance
+        
+        pages = list(search_places_pages("dentist in Delhi", "key", max_pages=5))
+        
+        assert [p['start'] for p in pages] == [0, 20, 40]
+        assert [c[0][0]["start"] for c in mock_instance.search.call_args_list] == [0, 20, 40]
+        assert pages[-1]['total_unique'] == 47
+        assert pages[-1]['calls'] == 3
+
+
+def test_pages_report_marginal_unique_yield():
+    """Overlapping results count only once and lower the per-call ratio."""
+    from src.scraper import search_places_deep, search_places_pages
+    
+    with patch('serpapi.Client') as mock_client:
+        mock_instance = Mock()
+        mock_instance.search.side_effect = [_page(0, 20, 20), _page(20, 20, 40, overlap=15), _page(40, 20)]
+        mock_client.return_value = mock_instance
+        
+        pages = list(search_places_pages("dentist in Delhi", "key", max_pages=2))
+        
+        assert pages[1]['returned'] == 20
+        assert pages[1]['new_unique'] == 5
+        assert pages[1]['unique_per_call'] == 5.0
+        assert mock_instance.search.call_count == 2
+    
+    with patch('serpapi.Client') as mock_client:
+        mock_instance = Mock()
+        mock_instance.search.side_effect = [_page(0, 20, 20), _page(20, 20, 40, overlap=15)]
+        mock_client.return_value = mock_instance
+        
+        places = search_places_deep("dentist in Delhi", "key", max_pages=2)
+        
+        assert len(places) == 25
+        assert len({p['place_id'] for p in places}) == 25
+
+
+def test_pages_stop_when_quality_drops():
+    """The early-stop predicate ends pagination after a low-quality page."""
+    from src.scraper import search_places_pages, stop_when_quality_below
+    
+    with patch('serpapi.Client') as mock_client:
+        mock_instance = Mock()
+        mock_instance.search.side_effect = [
+            _page(0, 20, 20), _page(20, 20, 40, rating=3.2), _page(40, 20, 60)
+        ]
+        mock_client.return_value = mock_instance
+        
+        pages = list(search_places_pages("dentist in Delhi", "key", max_pages=5,
+                                         stop_when=stop_when_quality_below(0.5)))
+        
+        assert len(pages) == 2
+        assert mock_instance.search.call_count == 2
+
+
+def test_pages_retry_once_then_stop():
+    """A page that fails twice ends the generator without raising."""
+    from src.scraper import search_places_pages
+    
+    with patch('serpapi.Client') as mock_client, patch('src.scraper.time.sleep'):
+        mock_instance = Mock()
+        mock_instance.search.side_effect = [_page(0, 20, 20), Exception("Timeout"), Exception("Timeout")]
+        mock_client.return_value = mock_instance
+        
+        pages = list(search_places_pages("dentist in Delhi", "key", max_pages=5))
+        
+        assert len(pages) == 1
+        assert mock_instance.search.call_count == 3
+
+
+def test_pages_raise_on_error_payload():
+    """A quota or key error is a SearchError, not an empty last page; 'no results' still ends quietly."""
+    from src.scraper import search_places_pages
+    
+    quota = {"error": "Your account has run out of searches."}
+    with patch('serpapi.Client') as mock_client, patch('src.scraper.time.sleep'):
+        mock_instance = Mock()
+        mock_instance.search.side_effect = [_page(0, 20, 20), quota, quota]
+        mock_client.return_value = mock_instance
+        
+        pages = search_places_pages("dentist in Delhi", "key", max_pages=5)
+        assert len(next(pages)['places']) == 20
+        with pytest.raises(SearchError):
+            next(pages)
+        assert mock_instance.search.call_count == 3
+    
+    with patch('serpapi.Client') as mock_client:
+        mock_instance = Mock()
+        mock_instance.search.side_effect = [
+            _page(0, 20, 20), {"error": "Google hasn't returned any results for this query."}
+        ]
+        mock_client.return_value = mock_instance
+        
+        pages = list(search_places_pages("dentist in Delhi", "key", max_pages=5))
+        assert [p['new_unique'] for p in pages] == [20, 0]
@@ -0,0 +1,155 @@
+"""
+Unit tests for the scraper provider registry
+"""
+
+import unittest
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.scraper_providers import ProviderRegistry, CircuitBreaker, normalize_place
+
+
+class FakeProvider:
+    """Search function with a fixed delay, optional failure and call counting"""
+    
+    def __init__(self, name, delay=0.0, fail=False, empty=False):
+        self.name = name
+        self.delay = delay
+        self.fail = fail
+        self.empty = empty
+        self.calls = 0
+        self.lock = threading.Lock()
+    
+    def __call__(self, query, max_results):
+        with self.lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError(f"{self.name} is down")
+        if self.empty:
+            return []
+        return [{'title': f"{self.name} place {i}", 'rating': 4.5} for i in range(max_results)]
+
+
+class TestProviderRegistry(unittest.TestCase):
+    """Test fallback, hedging, circuit breaking and stats"""
+    
+    def test_first_healthy_provider_wins(self):
+        registry = ProviderRegistry()
+        primary = FakeProvider('Primary')
+        backup = FakeProvider('Backup')
+        registry.register('Primary', primary)
+        registry.register('Backup', backup)
+        
+        places = registry.search('dentist in Delhi', 3)
+        
+        self.assertEqual(len(places), 3)
+        self.assertEqual(places[0]['source'], 'Primary')
+        self.assertEqual(places[0]['reviews'], 0)
+        self.assertEqual(backup.calls, 0)
+    
+    def test_failure_hands_over_immediately(self):
+        registry = ProviderRegistry()
+        registry.register('Broken', FakeProvider('Broken', fail=True), hedge_after=10)
+        registry.register('Empty', FakeProvider('Empty', empty=True), hedge_after=10)
+        registry.register('Backup', FakeProvider('Backup'))
+        
+        started = time.monotonic()
+        places = registry.search('dentist in Delhi', 2)
+        
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual(places[0]['source'], 'Backup')
+        stats = registry.get_stats()['providers']
+        self.assertEqual(stats['Broken']['errors'], 1)
+        self.assertEqual(stats['Empty']['empty'], 1)
+    
+    def test_slow_provider_is_hedged(self):
+        registry = ProviderRegistry()
+        slow = FakeProvider('Slow', delay=1.0)
+        registry.register('Slow', slow, hedge_after=0.1)
+        registry.register('Fast', FakeProvider('Fast', delay=0.05))
+        
+        started = time.monotonic()
+        places = registry.search('dentist in Delhi', 2)
+        
+        self.assertLess(time.monotonic() - started, 0.6)
+        self.assertEqual(places[0]['source'], 'Fast')
+        self.assertEqual(registry.get_stats()['hedges'], 1)
+        self.assertEqual(registry.get_stats()['providers']['Fast']['wins'], 1)
+    
+    def test_hedge_delay_follows_observed_p95(self):
+        registry = ProviderRegistry()
+        provider = registry.register('Primary', FakeProvider('Primary', delay=0.01), hedge_after=5)
+        
+        for _ in range(provider.MIN_SAMPLES):
+            registry.search('q', 1)
+        
+        self.assertLess(provider.hedge_delay(), 1)
+        self.assertIsNotNone(registry.get_stats()['providers']['Primary']['p95_seconds'])
+    
+    def test_circuit_breaker_skips_failing_provider(self):
+        registry = ProviderRegistry()
+        broken = FakeProvider('Broken', fail=True)
+        registry.register('Broken', broken, failure_threshold=2, reset_timeout=60)
+        registry.register('Backup', FakeProvider('Backup'))
+        
+        for _ in range(5):
+            self.assertEqual(registry.search('q', 1)[0]['source'], 'Backup')
+        
+        self.assertEqual(broken.calls, 2)
+        stats = registry.get_stats()['providers']['Broken']
+        self.assertEqual(stats['breaker'], 'open')
+        self.assertEqual(stats['skipped'], 3)
+    
+    def test_half_open_trial_kept_when_backup_not_needed(self):
+        registry = ProviderRegistry()
+        registry.register('Primary', FakeProvider('Primary'))
+        backup = registry.register('Backup', FakeProvider('Backup', fail=True), failure_threshold=1, reset_timeout=0.05)
+        backup.breaker.record_failure()
+        time.sleep(0.06)
+        
+        self.assertEqual(registry.search('q', 1)[0]['source'], 'Primary')
+        
+        # The backup was never launched, so its half-open trial is still available
+        self.assertEqual(backup.breaker.state, 'half_open')
+        self.assertTrue(backup.breaker.allow())
+    
+    def test_all_providers_failing_returns_empty(self):
+        registry = ProviderRegistry()
+        registry.register('A', FakeProvider('A', fail=True))
+        registry.register('B', FakeProvider('B', empty=True))
+        
+        self.assertEqual(registry.search('q', 5), [])
+        self.assertEqual(registry.get_stats()['exhausted'], 1)
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    """Test breaker state transitions"""
+    
+    def test_half_open_allows_one_trial(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+        breaker.record_failure()
+        self.assertFalse(breaker.allow())
+        
+        time.sleep(0.06)
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+        
+        breaker.record_success()
+        self.assertEqual(breaker.state, 'closed')
+        self.assertTrue(breaker.allow())
+    
+    def test_normalize_place_fills_schema(self):
+        place = normalize_place({'title': 'Acme', 'reviews': None}, 'Serper')
+        
+        self.assertEqual(place['reviews'], 0)
+        self.assertEqual(place['gps_coordinates'], {})
+        self.assertEqual(place['source'], 'Serper')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,158 @@
+"""
+Tests for the pooled SMTP sender against a local SMTP server (aiosmtpd)
+"""
+
+import unittest
+import os
+import sys
+import smtplib
+import socket
+import time
+from email.mime.text import MIMEText
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    from aiosmtpd.controller import Controller
+    HAS_AIOSMTPD = True
+except ImportError:
+    HAS_AIOSMTPD = False
+
+from src.smtp_pool import SMTPConnectionPool, close_smtp_pools
+from src.email_sender import GmailSender
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class CountingHandler:
+    """Collects delivered messages and counts SMTP sessions (one EHLO per connection)"""
+    
+    def __init__(self):
+        self.messages = []
+        self.sessions = 0
+    
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        self.sessions += 1
+        session.host_name = hostname
+        return responses
+    
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append((envelope.mail_from, envelope.rcpt_tos))
+        return '250 Message accepted for delivery'
+
+
+@unittest.skipUnless(HAS_AIOSMTPD, "aiosmtpd not installed")
+class TestSMTPPool(unittest.TestCase):
+    """Test session reuse, keepalive and reconnects"""
+    
+    def setUp(self):
+        self.handler = CountingHandler()
+        self.port = _free_port()
+        self.controller = Controller(self.handler, hostname='127.0.0.1', port=self.port)
+        self.controller.start()
+    
+    def tearDown(self):
+        close_smtp_pools()
+        self.controller.stop()
+    
+    def test_bulk_send_reuses_one_session(self):
+        sender = GmailSender('me@example.com', None, smtp_server='127.0.0.1',
+                             smtp_port=self.port, use_tls=False)
+        recipients = [{'email': f"owner{i}@example.com", 'business_name': f"Biz {i}"} for i in range(20)]
+        
+        results = sender.send_bulk_emails(recipients, 'Hello {business_name}', 'Hi {business_name}',
+                                          delay_seconds=0)
+        
+        self.assertEqual(results['sent'], 20)
+        self.assertEqual(len(self.handler.messages), 20)
+        self.assertEqual(self.handler.sessions, 1)
+        self.assertEqual(sender.pool.get_stats()['connections_opened'], 1)
+    
+    def test_reconnects_after_server_drops_session(self):
+        sender = GmailSender('me@example.com', None, smtp_server='127.0.0.1',
+                             smtp_port=self.port, use_tls=False)
+        
+        self.assertTrue(sender.send_email('a@example.com', 'Hi', 'Body'))
+        
+        # Kill the pooled socket behind the pool's back
+        conn = sender.pool._idle.queue[0]
+        conn.server.sock.shutdown(socket.SHUT_RDWR)
+        
+        self.assertTrue(sender.send_email('b@example.com', 'Hi', 'Body'))
+        self.assertEqual(len(self.handler.messages), 2)
+        self.assertEqual(sender.pool.get_stats()['connections_opened'], 2)
+        self.assertEqual(sender.pool.get_stats()['reconnects'], 1)
+    
+    def test_noop_keepalive_before_reusing_idle_session(self):
+        pool = SMTPConnectionPool('127.0.0.1', self.port, use_tls=False, keepalive_seconds=0)
+        
+        for recipient in ('a@example.com', 'b@example.com'):
+            msg = MIMEText('Body')
+            msg['From'] = 'me@example.com'
+            msg['To'] = recipient
+            msg['Subject'] = 'Hi'
+            time.sleep(0.01)
+            pool.send_message(msg)
+        
+        stats = pool.get_stats()
+        self.assertEqual(stats['connections_opened'], 1)
+        self.assertEqual(stats['noop_checks'], 1)
+        self.assertEqual(len(self.handler.messages), 2)
+        pool.close()
+    
+    def test_recycles_after_max_messages(self):
+        pool = SMTPConnectionPool('127.0.0.1', self.port, use_tls=False, max_messages_per_connection=3)
+        
+        for i in range(7):
+            msg = MIMEText('Body')
+            msg['From'] = 'me@example.com'
+            msg['To'] = f"owner{i}@example.com"
+            pool.send_message(msg)
+        
+        self.assertEqual(pool.get_stats()['connections_opened'], 3)
+        self.assertEqual(len(self.handler.messages), 7)
+        pool.close()
+    
+    def test_unexpected_error_closes_session(self):
+        pool = SMTPConnectionPool('127.0.0.1', self.port, use_tls=False)
+        msg = MIMEText('Body')
+        msg['From'] = 'me@example.com'
+        msg['To'] = 'a@example.com'
+        pool.send_message(msg)
+        
+        conn = pool._idle.queue[0]
+        with patch.object(conn.server, 'send_message', side_effect=ValueError('bad header')):
+            with self.assertRaises(ValueError):
+                pool.send_message(msg)
+        
+        # The broken session is neither reused nor left open
+        self.assertEqual(pool.get_stats()['idle_connections'], 0)
+        self.assertIsNone(conn.server.sock)
+        pool.send_message(msg)
+        self.assertEqual(pool.get_stats()['connections_opened'], 2)
+        pool.close()
+    
+    def test_tls_required_when_server_lacks_starttls(self):
+        pool = SMTPConnectionPool('127.0.0.1', self.port, username='me@example.com',
+                                  password='app-password', use_tls=True)
+        msg = MIMEText('Body')
+        msg['From'] = 'me@example.com'
+        msg['To'] = 'a@example.com'
+        
+        with patch('smtplib.SMTP.login') as login:
+            with self.assertRaises(smtplib.SMTPNotSupportedError):
+                pool.send_message(msg)
+        
+        # The password never went out over the unencrypted session
+        login.assert_not_called()
+        self.assertEqual(self.handler.messages, [])
+        pool.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,237 @@
+"""
+Tests for social media enrichment against a local HTTP server
+"""
+
+import unittest
+import os
+import sys
+import tempfile
+import shutil
+import threading
+import time
+import tracemalloc
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup
+
+from src.social_media_finder import (
+    parse_social_links, parse_email, enrich_lead_with_social_media,
+    enrich_leads_with_social_media, extract_enrichment, fetch_enrichment,
+    EnrichmentCrawler, EnrichmentParser, SOCIAL_DOMAINS
+)
+from src.enrichment_cache import EnrichmentCache
+
+PAGE = """<html><body>
+<a href="https://www.facebook.com/{slug}">Facebook</a>
+<a href="https://x.com/{slug}">X</a>
+<p>Contact: noreply@{slug}.com or hello@{slug}.com</p>
+</body></html>"""
+
+# Social links and email in the header, followed by a heavy body
+HEAVY_PAGE = ("""<html><body><header>
+<a href="https://linkedin.com/company/heavy">in</a><a href="https://facebook.com/heavy">fb</a>
+<a href="https://instagram.com/heavy">ig</a><a href="https://x.com/heavy">x</a>
+<a href="https://youtube.com/@heavy">yt</a><a href="mailto:sales@heavy.com">Mail us</a>
+</header>""" + '<div class="row"><p>Lorem ipsum dolor sit amet</p><span>&amp; more</span></div>' * 4000
+              + "</body></html>")
+
+# Same page with the links in the footer: nothing to stop early on
+_body_start = HEAVY_PAGE.index('<div class="row">')
+FOOTER_PAGE = ('<html><body>' + HEAVY_PAGE[_body_start:].replace('</body></html>', '')
+               + HEAVY_PAGE[12:_body_start] + '</body></html>')
+
+
+class CountingHandler(BaseHTTPRequestHandler):
+    """Serves a business page per path, counting hits and peak concurrency"""
+    
+    hits = {}
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+    
+    def do_GET(self):
+        cls = type(self)
+        with cls.lock:
+            cls.hits[self.path] = cls.hits.get(self.path, 0) + 1
+            cls.active += 1
+            cls.peak = max(cls.peak, cls.active)
+        try:
+            time.sleep(0.02)
+            if self.path.startswith('/heavy'):
+                page = FOOTER_PAGE if self.path.startswith('/heavy-footer') else HEAVY_PAGE
+                body = page.encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                try:
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+                return
+            if self.path.startswith('/missing'):
+                self.send_response(404)
+                self.end_headers()
+                return
+            body = PAGE.format(slug=self.path.strip('/')).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        finally:
+            with cls.lock:
+                cls.active -= 1
+    
+    def log_message(self, *args):
+        pass
+
+
+class TestSocialMediaFinder(unittest.TestCase):
+    """Test single-fetch parsing and the batch crawler"""
+    
+    def setUp(self):
+        CountingHandler.hits = {}
+        CountingHandler.active = 0
+        CountingHandler.peak = 0
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), CountingHandler)
+        self.base = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.cache_dir = tempfile.mkdtemp()
+        self.cache = EnrichmentCache(cache_dir=self.cache_dir)
+    
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.cache_dir)
+    
+    def test_parsers(self):
+        links = parse_social_links(PAGE.format(slug='acme'))
+        self.assertEqual(links['facebook'], 'https://www.facebook.com/acme')
+        self.assertEqual(links['twitter'], 'https://x.com/acme')
+        self.assertIsNone(links['linkedin'])
+        self.assertEqual(parse_email(PAGE.format(slug='acme')), 'hello@acme.com')
+    
+    def test_single_lead_fetches_site_once(self):
+        lead = enrich_lead_with_social_media({'title': 'Acme', 'website': f"{self.base}/acme"})
+        
+        self.assertEqual(CountingHandler.hits, {'/acme': 1})
+        self.assertEqual(lead['email'], 'hello@acme.com')
+        self.assertEqual(lead['social_media']['facebook'], 'https://www.facebook.com/acme')
+    
+    def test_batch_fetches_each_site_once_within_host_limit(self):
+        leads = [{'title': f"Biz {i}", 'website': f"{self.base}/biz{i % 12}"} for i in range(24)]
+        leads.append({'title': 'Gone', 'website': f"{self.base}/missing"})
+        leads.append({'title': 'No Site'})
+        
+        crawler = EnrichmentCrawler(max_workers=8, per_host_limit=3, cache=self.cache)
+        crawler.enrich(leads)
+        crawler.close()
+        
+        self.assertEqual(len(CountingHandler.hits), 13)
+        self.assertTrue(all(count == 1 for count in CountingHandler.hits.values()))
+        self.assertLessEqual(CountingHandler.peak, 3)
+        self.assertEqual(crawler.stats['fetched'], 12)
+        self.assertEqual(crawler.stats['failed'], 1)
+        self.assertEqual(leads[13]['email'], 'hello@biz1.com')
+        self.assertEqual(leads[13]['social_media']['twitter'], 'https://x.com/biz1')
+        # Unreachable/missing sites fall back to guessed profile URLs
+        self.assertEqual(leads[-2]['social_media']['facebook'], 'https://facebook.com/gone')
+        self.assertNotIn('email', leads[-1])
+    
+    def test_batch_keeps_existing_email(self):
+        leads = [{'title': 'Acme', 'website': f"{self.base}/acme", 'email': 'owner@acme.com'}]
+        
+        enrich_leads_with_social_media(leads, cache=self.cache)
+        
+        self.assertEqual(leads[0]['email'], 'owner@acme.com')
+        self.assertEqual(leads[0]['social_media']['facebook'], 'https://www.facebook.com/acme')
+    
+    
+    def test_stream_stops_once_everything_is_found(self):
+        result = fetch_enrichment(f"{self.base}/heavy")
+        
+        self.assertEqual(result['email'], 'sales@heavy.com')
+        self.assertTrue(all(result['social_media'].values()))
+    
+    def test_stream_caps_download(self):
+        leads = [{'title': 'Capped Co', 'website': f"{self.base}/heavy-footer"}]
+        crawler = EnrichmentCrawler(cache=self.cache, max_bytes=64 * 1024)
+        crawler.enrich(leads)
+        crawler.close()
+        
+        self.assertLessEqual(self.cache.get_stats()['bytes_downloaded'], 64 * 1024 + 16 * 1024)
+        # Footer links were beyond the cap, so profiles are guessed
+        self.assertEqual(leads[0]['social_media']['facebook'], 'https://facebook.com/cappedco')
+
+
+class TestEnrichmentParser(unittest.TestCase):
+    """Test incremental parsing edge cases"""
+    
+    def test_email_split_across_chunks(self):
+        parser = EnrichmentParser()
+        for chunk in ('<p>Write to hel', 'lo@acme.co', 'm today</p>'):
+            parser.feed(chunk)
+        
+        self.assertEqual(parser.email, 'hello@acme.com')
+    
+    def test_skips_non_business_emails_and_uses_mailto(self):
+        result = extract_enrichment('<p>noreply@acme.com</p><a href="mailto:team@acme.com?subject=Hi">Mail</a>')
+        
+        self.assertEqual(result['email'], 'team@acme.com')
+    
+    def test_matches_legacy_parse(self):
+        self.assertEqual(extract_enrichment(PAGE.format(slug='acme')),
+                         _legacy_extract(PAGE.format(slug='acme')))
+
+
+def _legacy_extract(html):
+    """The previous BeautifulSoup + whole-page regex path, kept as the benchmark baseline"""
+    social_links = {name: None for name, _ in SOCIAL_DOMAINS}
+    for link in BeautifulSoup(html, 'html.parser').find_all('a', href=True):
+        href = link['href'].lower()
+        for name, domains in SOCIAL_DOMAINS:
+            if any(domain in href for domain in domains):
+                if not social_links[name]:
+                    social_links[name] = link['href']
+                break
+    return {'social_media': social_links, 'email': parse_email(html)}
+
+
+def _measure(func, html):
+    tracemalloc.start()
+    started = time.process_time()
+    result = func(html)
+    cpu = time.process_time() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, cpu, peak
+
+
+class TestEnrichmentParsingBenchmark(unittest.TestCase):
+    """Compare CPU time and peak memory of streaming vs. the BeautifulSoup path"""
+    
+    def _compare(self, html):
+        legacy, legacy_cpu, legacy_peak = _measure(_legacy_extract, html)
+        streamed, stream_cpu, stream_peak = _measure(extract_enrichment, html)
+        
+        self.assertEqual(streamed, legacy)
+        return legacy_cpu, legacy_peak, stream_cpu, stream_peak
+    
+    def test_heavy_page_with_early_stop(self):
+        legacy_cpu, legacy_peak, stream_cpu, stream_peak = self._compare(HEAVY_PAGE)
+        
+        self.assertLess(stream_cpu * 10, legacy_cpu)
+        self.assertLess(stream_peak * 10, legacy_peak)
+    
+    def test_full_page_scan(self):
+        legacy_cpu, legacy_peak, stream_cpu, stream_peak = self._compare(FOOTER_PAGE)
+        
+        self.assertLess(stream_cpu, legacy_cpu)
+        self.assertLess(stream_peak, legacy_peak)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+"""
+Unit tests for the dashboard startup profile and deferred imports
+"""
+
+import unittest
+import os
+import subprocess
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.startup_profile import ROOT_DIR, DEFERRED_MODULES, parse_importtime, profile_imports
+
+
+class TestStartupProfile(unittest.TestCase):
+    """Test import-time parsing and that heavy subsystems stay off the startup path"""
+    
+    def test_parse_importtime(self):
+        output = "\n".join([
+            "import time: self [us] | cumulative | imported package",
+            "import time:       120 |        120 |     json.decoder",
+            "import time:       300 |       1500 |   json",
+            "import time:      2000 |       3500 | app",
+        ])
+        
+        entries = parse_importtime(output)
+        
+        self.assertEqual([e['module'] for e in entries], ['json.decoder', 'json', 'app'])
+        self.assertEqual([e['depth'] for e in entries], [2, 1, 0])
+        self.assertEqual(entries[2]['cumulative_ms'], 3.5)
+    
+    def test_dashboard_startup_defers_optional_subsystems(self):
+        report = profile_imports('dashboard_ragspro', runs=1)
+        
+        self.assertEqual(report['deferred_loaded'], [])
+        self.assertGreater(report['total_ms'], 0)
+        self.assertTrue(report['slowest'])
+    
+    def test_ai_module_imports_without_gemini_sdk(self):
+        script = "import sys, src.ai_gemini; print('google.generativeai' in sys.modules)"
+        result = subprocess.run([sys.executable, '-c', script], cwd=ROOT_DIR,
+                                capture_output=True, text=True)
+        
+        self.assertEqual(result.stdout.strip(), 'False', result.stderr)
+        self.assertIn('google.generativeai', DEFERRED_MODULES)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,171 @@
+"""
+Unit tests for per-user, per-month usage metering
+"""
+
+import unittest
+import os
+import sys
+import tempfile
+import shutil
+import threading
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src import database
+from src.database import init_database, count_queries, get_db, User, Usage
+from src.usage_meter import UsageMeter, current_period
+from src.subscription import SubscriptionManager
+
+
+class TestUsageMeter(unittest.TestCase):
+    """Test reservations, O(1) limit checks and batched flushes"""
+    
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.previous_manager = database.db_manager
+        self.manager = init_database(f"sqlite:///{os.path.join(self.test_dir, 'test.db')}")
+        
+        session = get_db()
+        user = User(email='owner@example.com', monthly_leads_limit=100, monthly_emails_limit=10)
+        session.add(user)
+        session.commit()
+        self.user_id = user.id
+        session.close()
+        
+        self.meter = UsageMeter(flush_every=1000, flush_interval=3600)
+    
+    def tearDown(self):
+        self.manager.Session.remove()
+        self.manager.engine.dispose()
+        database.db_manager = self.previous_manager
+        shutil.rmtree(self.test_dir)
+    
+    def persisted(self):
+        session = get_db()
+        try:
+            return {row.metric: row.count for row in session.query(Usage).filter_by(user_id=self.user_id)}
+        finally:
+            session.close()
+    
+    def test_reserve_enforces_limit_for_whole_batch(self):
+        self.assertIn('success', self.meter.reserve(self.user_id, 'emails', 8))
+        
+        denied = self.meter.reserve(self.user_id, 'emails', 3)
+        
+        self.assertIn('error', denied)
+        self.assertEqual(denied['remaining'], 2)
+        self.assertEqual(self.meter.get_usage(self.user_id)['emails']['used'], 8)
+    
+    def test_release_returns_unused_quota(self):
+        self.meter.reserve(self.user_id, 'leads', 50)
+        self.meter.release(self.user_id, 'leads', 30)
+        
+        self.assertEqual(self.meter.get_usage(self.user_id)['leads']['used'], 20)
+        self.assertTrue(self.meter.check(self.user_id, 'leads', 80))
+        self.assertFalse(self.meter.check(self.user_id, 'leads', 81))
+    
+    def test_release_goes_back_to_the_reservation_month(self):
+        with patch('src.usage_meter.current_period', return_value='2026-01'):
+            reservation = self.meter.reserve(self.user_id, 'leads', 50)
+        self.meter.flush()
+        
+        with patch('src.usage_meter.current_period', return_value='2026-02'):
+            self.meter.reserve(self.user_id, 'leads', 10)
+            self.meter.release(self.user_id, 'leads', 40, period=reservation['period'])
+            self.meter.flush()
+            self.assertEqual(self.meter.get_usage(self.user_id)['leads']['used'], 10)
+        
+        session = get_db()
+        counts = {row.period: row.count for row in session.query(Usage).filter_by(user_id=self.user_id, metric='leads')}
+        session.close()
+        self.assertEqual(reservation['period'], '2026-01')
+        self.assertEqual(counts, {'2026-01': 10, '2026-02': 10})
+    
+    def test_checks_after_first_load_skip_database(self):
+        self.meter.get_usage(self.user_id)
+        
+        with count_queries(self.manager.engine) as counter:
+            for _ in range(50):
+                self.meter.reserve(self.user_id, 'leads', 1)
+                self.meter.increment(self.user_id, 'ai_requests')
+                self.meter.check(self.user_id, 'emails')
+        
+        self.assertEqual(counter['count'], 0)
+    
+    def test_flush_writes_batched_deltas(self):
+        for _ in range(5):
+            self.meter.increment(self.user_id, 'ai_requests')
+        self.meter.reserve(self.user_id, 'emails', 4)
+        self.assertEqual(self.persisted(), {})
+        
+        self.assertEqual(self.meter.flush(), 2)
+        self.meter.release(self.user_id, 'emails', 1)
+        self.meter.flush()
+        
+        self.assertEqual(self.persisted(), {'ai_requests': 5, 'emails': 3})
+        self.assertEqual(self.meter.get_stats()['flushes'], 2)
+    
+    def test_new_meter_resumes_from_persisted_counts(self):
+        self.meter.reserve(self.user_id, 'leads', 60)
+        self.meter.flush()
+        
+        usage = UsageMeter().get_usage(self.user_id)
+        
+        self.assertEqual(usage['period'], current_period())
+        self.assertEqual(usage['leads'], {'used': 60, 'limit': 100, 'remaining': 40})
+    
+    def test_concurrent_reservations_never_exceed_limit(self):
+        granted = []
+        
+        def worker():
+            for _ in range(20):
+                if 'success' in self.meter.reserve(self.user_id, 'leads', 1):
+                    granted.append(1)
+        
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(len(granted), 100)
+        self.assertEqual(self.meter.get_usage(self.user_id)['leads']['used'], 100)
+    
+    def test_flush_due_after_enough_increments(self):
+        meter = UsageMeter(flush_every=3, flush_interval=3600)
+        for _ in range(3):
+            meter.increment(self.user_id, 'ai_requests')
+        
+        self.assertEqual(self.persisted(), {'ai_requests': 3})
+    
+    def test_unknown_user_and_metric(self):
+        self.assertEqual(self.meter.reserve(999, 'leads', 1), {'error': 'User not found'})
+        self.assertIsNone(self.meter.get_usage(999))
+        with self.assertRaises(ValueError):
+            self.meter.increment(self.user_id, 'sms')
+    
+    def test_check_usage_limits_reports_real_counts(self):
+        with patch('src.subscription.get_usage_meter', return_value=self.meter):
+            self.meter.reserve(self.user_id, 'leads', 100)
+            self.meter.reserve(self.user_id, 'emails', 3)
+            
+            result = SubscriptionManager().check_usage_limits(self.user_id)
+        
+        self.assertEqual(result['leads_used'], 100)
+        self.assertEqual(result['emails_used'], 3)
+        self.assertEqual(result['emails_remaining'], 7)
+        self.assertFalse(result['within_limits'])
+    
+    def test_upgrade_reloads_limits(self):
+        with patch('src.subscription.get_usage_meter', return_value=self.meter):
+            manager = SubscriptionManager()
+            manager.check_usage_limits(self.user_id)
+            
+            manager.upgrade_plan(self.user_id, 'pro')
+            
+            self.assertEqual(manager.check_usage_limits(self.user_id)['leads_limit'], 10000)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,185 @@
+"""
+Tests for the website scanner against a local HTTP server
+"""
+
+import unittest
+import os
+import sys
+import tempfile
+import shutil
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.cache_manager import CacheManager
+from src.advanced_features import WebsiteScanner
+
+GOOD_PAGE = """<html><head><title>Acme Dental</title>
+<meta name="description" content="Family dentist in Delhi">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<script type="application/ld+json">{"@type": "Dentist"}</script>
+<link rel="stylesheet" href="/wp-content/themes/acme/style.css">
+</head><body><img src="a.png" alt="Clinic"><img src="b.png" alt="Team"></body></html>"""
+
+BARE_PAGE = """<html><head><title>Old Shop</title></head>
+<body><img src="a.png"><img src="b.png"><img src="c.png" alt="Logo"></body></html>"""
+
+
+class SiteHandler(BaseHTTPRequestHandler):
+    """Serves a well-built page and a slow bare page, tracking hits and peak concurrency"""
+    
+    hits = []
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+    
+    def do_GET(self):
+        cls = type(self)
+        with cls.lock:
+            cls.hits.append(self.path)
+            cls.active += 1
+            cls.peak = max(cls.peak, cls.active)
+        try:
+            if self.path.startswith('/redirect'):
+                self.send_response(302)
+                self.send_header('Location', f"http://localhost:{self.server.server_address[1]}/good")
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            if self.path.startswith('/broken'):
+                self.send_response(503)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            if self.path.startswith('/slow'):
+                time.sleep(0.3)
+                body = BARE_PAGE
+            elif self.path.startswith('/bare'):
+                time.sleep(0.05)
+                body = BARE_PAGE
+            else:
+                body = GOOD_PAGE
+            data = body.encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(data)))
+            self.send_header('X-Powered-By', 'PHP/8.2')
+            self.end_headers()
+            self.wfile.write(data)
+        finally:
+            with cls.lock:
+                cls.active -= 1
+    
+    def version_string(self):
+        return 'nginx/1.24'
+    
+    def log_message(self, *args):
+        pass
+
+
+class TestWebsiteScanner(unittest.TestCase):
+    """Test real measurements, SEO checks, tech detection, batching, caching and address checks"""
+    
+    def setUp(self):
+        SiteHandler.hits = []
+        SiteHandler.active = 0
+        SiteHandler.peak = 0
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), SiteHandler)
+        self.base = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.cache_dir = tempfile.mkdtemp()
+        self.scanner = WebsiteScanner(cache=CacheManager(cache_dir=self.cache_dir), allowed_hosts={'127.0.0.1'})
+    
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.cache_dir)
+    
+    def test_good_site(self):
+        result = self.scanner.scan_website(f"{self.base}/good")
+        analysis = result['analysis']
+        
+        self.assertTrue(result['success'])
+        self.assertTrue(analysis['has_meta_description'])
+        self.assertTrue(analysis['mobile_friendly'])
+        self.assertTrue(analysis['has_structured_data'])
+        self.assertEqual(analysis['alt_coverage'], 1.0)
+        self.assertFalse(analysis['has_ssl'])
+        self.assertEqual(analysis['issues'], ['No SSL (site not served over HTTPS)'])
+        self.assertEqual(analysis['seo_score'], 85)
+        self.assertIn('WordPress', analysis['tech_stack'])
+        self.assertIn('PHP', analysis['tech_stack'])
+        self.assertIn('Nginx', analysis['tech_stack'])
+        self.assertLessEqual(analysis['ttfb'], analysis['load_time'])
+    
+    def test_bare_site_issues_feed_the_pitch(self):
+        self.scanner.SLOW_LOAD_SECONDS = 0.2
+        analysis = self.scanner.scan_website(f"{self.base}/slow")['analysis']
+        
+        self.assertGreaterEqual(analysis['load_time'], 0.3)
+        self.assertIn('No meta description', analysis['issues'])
+        self.assertIn('Not mobile optimized', analysis['issues'])
+        self.assertIn('Missing alt tags on images (33% covered)', analysis['issues'])
+        self.assertTrue(any(issue.startswith('Slow load time') for issue in analysis['issues']))
+        self.assertLess(analysis['seo_score'], 50)
+        
+        pitch = self.scanner.generate_personalized_pitch(analysis, 'Old Shop')
+        self.assertIn('Slow load time', pitch)
+    
+    def test_batch_scan_respects_host_limit_and_cache(self):
+        urls = [f"{self.base}/bare{i}" for i in range(8)] + [f"{self.base}/bare0"]
+        
+        results = self.scanner.scan_websites(urls)
+        
+        self.assertEqual(len(results), 8)
+        self.assertTrue(all(r['success'] for r in results.values()))
+        self.assertEqual(len(SiteHandler.hits), 8)
+        self.assertLessEqual(SiteHandler.peak, self.scanner.per_host_limit)
+        
+        # Second pass is served from the per-URL cache
+        self.scanner.scan_websites(urls)
+        self.assertEqual(len(SiteHandler.hits), 8)
+    
+    def test_server_errors_are_not_cached(self):
+        result = self.scanner.scan_website(f"{self.base}/broken")
+        self.assertEqual(result['analysis']['status'], 'error')
+        
+        self.scanner.scan_website(f"{self.base}/broken")
+        self.assertEqual(SiteHandler.hits, ['/broken', '/broken'])
+    
+    def test_unreachable_site(self):
+        result = self.scanner.scan_website('http://127.0.0.1:9/down')
+        
+        self.assertFalse(result['success'])
+        self.assertEqual(result['analysis']['status'], 'offline')
+    
+    def test_private_addresses_are_refused(self):
+        scanner = WebsiteScanner(cache=CacheManager(cache_dir=self.cache_dir))
+        
+        for url in (f"{self.base}/good", 'http://169.254.169.254/latest/meta-data/', 'file:///etc/passwd'):
+            result = scanner.scan_website(url)
+            self.assertFalse(result['success'], url)
+        self.assertEqual(SiteHandler.hits, [])
+    
+    def test_redirect_targets_are_checked(self):
+        result = self.scanner.scan_website(f"{self.base}/redirect")
+        
+        self.assertFalse(result['success'])
+        self.assertIn('localhost', result['error'])
+        self.assertEqual(SiteHandler.hits, ['/redirect'])
+    
+    def test_page_read_is_capped(self):
+        scanner = WebsiteScanner(cache=CacheManager(cache_dir=self.cache_dir), allowed_hosts={'127.0.0.1'},
+                                 max_bytes=100)
+        
+        analysis = scanner.scan_website(f"{self.base}/good")['analysis']
+        
+        self.assertEqual(analysis['page_size_kb'], 0.1)
+        self.assertIsNone(scanner.cached_scan(f"{self.base}/bare"))
+        self.assertEqual(scanner.cached_scan(f"{self.base}/good")['analysis'], analysis)
+
+
+if __name__ == '__main__':
+    unittest.main()